@@ -0,0 +1,920 @@
+# Benchmarks do compilador e da VM local (pas_vm)
+# Uso: python benchmark.py [nome ...]   (sem argumentos corre todos)
+import asyncio
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pas_yacc import compile_program, init
+from pas_vm import OP, VM, parse_program
+import pas_bytecode
+from pas_profile import ProfiledCode
+from pas_server import CompileServer, percentile
+
+
+def compile_source(code, **options):
+    """Compila código Pascal e devolve o texto VM (falha se houver erros)"""
+    parser = init(**options)
+    result = parser.parse(code)
+    if parser.error or parser.semantic_errors:
+        raise RuntimeError(parser.error or "\n".join(parser.semantic_errors))
+    return result
+
+
+def best_time(fn, repeat=3):
+    """Executa fn várias vezes e devolve (melhor tempo em segundos, último resultado)"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_vm(text, input_lines=None):
+    """Executa texto VM na VM local e devolve a VM no fim da execução"""
+    return VM(parse_program(text), input_lines).run()
+
+
+def report(name, seconds, steps=None):
+    """Imprime uma linha de resultado com tempo e, se conhecido, instruções executadas"""
+    line = f"  {name:<32} {seconds * 1000:9.2f} ms"
+    if steps is not None:
+        line += f"  {steps:>10} instr  {steps / seconds / 1e6:6.2f} Minstr/s"
+    print(line)
+
+
+# ============================================================================
+# CHAMADAS DE SUBPROGRAMAS
+# ============================================================================
+
+FIB_SOURCE = """
+program Fib;
+var n: integer;
+function fib(n: integer): integer;
+begin
+  if n < 2 then
+    fib := n
+  else
+    fib := fib(n - 1) + fib(n - 2)
+end;
+begin
+  writeln(fib(%d));
+end.
+"""
+
+def bench_fib(n=20):
+    """Fibonacci recursivo: mede o custo de cada chamada/retorno de função"""
+    print(f"fib({n}) recursivo")
+    text = compile_source(FIB_SOURCE % n)
+    seconds, vm = best_time(lambda: run_vm(text))
+    calls = sum(1 for _ in fib_calls(n))
+    report("execução", seconds, vm.steps)
+    print(f"  {calls} chamadas, {vm.steps / calls:.1f} instruções por chamada")
+
+
+def fib_calls(n):
+    """Gera uma entrada por cada chamada feita por fib(n) (para contar chamadas)"""
+    stack = [n]
+    while stack:
+        k = stack.pop()
+        yield k
+        if k >= 2:
+            stack.extend((k - 1, k - 2))
+
+
+INLINE_SOURCE = """
+program Inline;
+var i, s: integer;
+function sq(x: integer): integer;
+begin
+  sq := x * x
+end;
+function maxi(a, b: integer): integer;
+begin
+  if a > b then maxi := a else maxi := b
+end;
+procedure acumula(var total: integer; v: integer);
+begin
+  total := total + v
+end;
+begin
+  s := 0;
+  for i := 1 to %d do
+    acumula(s, sq(i mod 100) + maxi(i mod 7, 3));
+  writeln(s);
+end.
+"""
+
+def bench_inline(n=20000):
+    """Subprogramas folha pequenos: chamados (inline_budget=0) vs expandidos inline"""
+    print(f"inlining ({n} iterações com 3 chamadas)")
+    results = {}
+    for name, budget in (("chamadas", 0), ("inline", None)):
+        options = {} if budget is None else {'inline_budget': budget}
+        text = compile_source(INLINE_SOURCE % n, **options)
+        seconds, vm = best_time(lambda: run_vm(text))
+        report(name, seconds, vm.steps)
+        results[name] = (seconds, vm.output())
+    assert results["chamadas"][1] == results["inline"][1], "inlining alterou o resultado"
+    print(f"  speedup: {results['chamadas'][0] / results['inline'][0]:.2f}x")
+
+
+TAIL_SOURCE = """
+program Cauda;
+function soma(n, acc: integer): integer;
+begin
+  if n = 0 then
+    soma := acc
+  else
+    soma := soma(n - 1, acc + n)
+end;
+function mdc(a, b: integer): integer;
+begin
+  if b = 0 then mdc := a else mdc := mdc(b, a mod b)
+end;
+begin
+  writeln(soma(%d, 0), ' ', mdc(832040, 514229));
+end.
+"""
+
+def bench_tail_calls(n=50000):
+    """Recursão em cauda: frames novos (tail_calls=False) vs salto para o corpo"""
+    print(f"recursão em cauda (soma de 1..{n} acumulada, mdc de Fibonacci consecutivos)")
+    results = {}
+    for name, enabled in (("chamadas", False), ("cauda eliminada", True)):
+        text = compile_source(TAIL_SOURCE % n, tail_calls=enabled)
+        seconds, vm = best_time(lambda: run_vm(text))
+        report(name, seconds, vm.steps)
+        print(f"  {'':<32} profundidade máxima de chamadas: {vm.max_depth}")
+        results[name] = (seconds, vm.output())
+    assert results["chamadas"][1] == results["cauda eliminada"][1], "eliminação alterou o resultado"
+    print(f"  speedup: {results['chamadas'][0] / results['cauda eliminada'][0]:.2f}x")
+
+
+# ============================================================================
+# TABELA DE SÍMBOLOS
+# ============================================================================
+
+def symbols_source(n):
+    """Programa que declara n variáveis e atribui cada uma (com outra capitalização)"""
+    names = ", ".join(f"v{i}" for i in range(n))
+    body = ";\n".join(f"  V{i} := {i}" for i in range(n))
+    return f"program Simbolos;\nvar {names}: integer;\nbegin\n{body}\nend."
+
+
+def bench_symbols(sizes=(5000, 20000, 50000)):
+    """Compilação de programas com muitas variáveis: o tempo deve crescer linearmente"""
+    print("tabela de símbolos (n variáveis declaradas e atribuídas)")
+    previous = None
+    for n in sizes:
+        code = symbols_source(n)
+        seconds, _ = best_time(lambda: compile_source(code), repeat=1)
+        report(f"compilação n={n}", seconds)
+        if previous is not None:
+            print(f"  {'':<32} {n / previous[0]:.1f}x variáveis -> {seconds / previous[1]:.1f}x tempo")
+        previous = (n, seconds)
+
+
+def bench_diagnostics(sizes=(2000, 8000, 20000)):
+    """Programas com muitos erros distintos: o registo de diagnósticos deve ser linear"""
+    print("diagnósticos (n atribuições a variáveis não declaradas, sem limite de erros)")
+    for n in sizes:
+        body = ";\n".join(f"  u{i} := {i}" for i in range(n))
+        code = f"program Erros;\nbegin\n{body}\nend."
+        seconds, (_, diagnostics) = best_time(lambda: compile_program(code, max_errors=0), repeat=1)
+        report(f"compilação n={n}", seconds)
+        assert len(diagnostics) == n
+    seconds, (_, diagnostics) = best_time(lambda: compile_program(code))
+    report(f"n={n}, limite por omissão", seconds)
+    print(f"  {'':<32} interrompida após {len(diagnostics) - 1} erros")
+
+
+# ============================================================================
+# FORMATO BINÁRIO
+# ============================================================================
+
+def bytecode_source(n):
+    """Programa grande gerado: n blocos com aritmética, ciclos, strings e reais"""
+    blocks = []
+    for i in range(n):
+        blocks.append(f"""  s := s + {i} * 3 - (s div 7);
+  r := r * 0.5 + {i}.25;
+  while s > {1000 + i} do s := s - {i % 97 + 1};
+  if s mod 2 = 0 then writeln('bloco {i % 50}: ', s) else writeln('impar');""")
+    body = "\n".join(blocks)
+    return f"program Grande;\nvar s: integer; r: real;\nbegin\n  s := 0; r := 1.0;\n{body}\n  writeln(r)\nend."
+
+
+def bench_bytecode(n=5000):
+    """Tamanho e tempo de carregamento: texto VM (parse_program) vs bytecode (mmap)"""
+    text = compile_source(bytecode_source(n))
+    directory = tempfile.mkdtemp()
+    text_path = os.path.join(directory, "grande.vm")
+    binary_path = os.path.join(directory, "grande.pasb")
+    with open(text_path, 'w') as f:
+        f.write(text)
+    pas_bytecode.write_file(binary_path, text)
+
+    def load_text():
+        with open(text_path) as f:
+            return parse_program(f.read())
+
+    text_size = os.path.getsize(text_path)
+    binary_size = os.path.getsize(binary_path)
+    text_seconds, program = best_time(load_text)
+    binary_seconds, loaded = best_time(lambda: pas_bytecode.load(binary_path))
+    assert program.code == loaded.code, "bytecode diferente do texto"
+
+    print(f"formato binário ({len(program.code)} instruções)")
+    print(f"  tamanho: texto {text_size} bytes, bytecode {binary_size} bytes "
+          f"({text_size / binary_size:.1f}x menor)")
+    report("carregar texto", text_seconds)
+    report("carregar bytecode (mmap)", binary_seconds)
+    print(f"  speedup: {text_seconds / binary_seconds:.2f}x")
+    os.remove(text_path)
+    os.remove(binary_path)
+    os.rmdir(directory)
+
+
+# ============================================================================
+# TABELA DE CONSTANTES
+# ============================================================================
+
+CONSTANTS_SOURCE = """
+program Constantes;
+var i, x, soma: integer;
+    par: boolean;
+begin
+  soma := 0;
+  for i := 1 to %d do
+  begin
+    readln(x);
+    par := x mod 2 = 0;
+    writeln('Valor: ', x, ' par: ', par);
+    if par then writeln('Valor: ', x, ' somado') else writeln('Valor: ', x, ' ignorado');
+    if par then soma := soma + x
+  end;
+  writeln('Soma: ', soma);
+end.
+"""
+
+def bench_constants(n=5000):
+    """Literais repetidos: PUSHS em cada uso vs carregados de globais (tabela de constantes)"""
+    print(f"tabela de constantes ({n} iterações com readln e writeln)")
+    input_lines = [str(i) for i in range(n)]
+    results = {}
+    for name, enabled in (("pushs em cada uso", False), ("tabela de constantes", True)):
+        text = compile_source(CONSTANTS_SOURCE % n, constant_pool=enabled)
+        program = parse_program(text)
+        seconds, vm = best_time(lambda: VM(program, input_lines).run())
+        report(name, seconds, vm.steps)
+        # Strings criadas em execução: PUSHS executados (contados com o profiler)
+        counted = parse_program(text)
+        counted.code = ProfiledCode(counted.code)
+        VM(counted, input_lines).run()
+        strings = sum(count for count, (op, _) in zip(counted.code.counts, program.code)
+                      if op == OP['pushs'])
+        print(f"  {'':<32} {len(text)} bytes, {strings} strings criadas (PUSHS executados)")
+        results[name] = vm.output()
+    assert results["pushs em cada uso"] == results["tabela de constantes"], "tabela alterou o resultado"
+
+
+# ============================================================================
+# ESCRITA (WRITE/WRITELN)
+# ============================================================================
+
+OUTPUT_SOURCE = """
+program Relatorio;
+var i: integer;
+    nome: string;
+    par: boolean;
+begin
+  nome := 'item';
+  for i := 1 to %d do
+  begin
+    par := i mod 2 = 0;
+    writeln('[', i, '] ', nome, ' - par: ', par, ' (fim)');
+    write('linha ', i);
+    writeln(' de ', %d, '.')
+  end;
+  writeln('Total: ', %d, ' ', 'linhas', '.');
+end.
+"""
+
+def bench_output(n=5000):
+    """WRITE/WRITELN com vários argumentos: uma escrita por argumento vs escritas juntadas"""
+    print(f"escrita ({n} iterações, {2 * n + 1} linhas impressas)")
+    results = {}
+    for name, enabled in (("uma escrita por argumento", False), ("escritas juntadas", True)):
+        text = compile_source(OUTPUT_SOURCE % (n, n, n), coalesce_writes=enabled)
+        program = parse_program(text)
+        seconds, vm = best_time(lambda: VM(program).run())
+        report(name, seconds, vm.steps)
+        lines = vm.output().count("\n")
+        print(f"  {'':<32} {len(program.code)} instruções no código, "
+              f"{vm.steps / lines:.1f} instruções por linha impressa")
+        results[name] = vm.output()
+    assert results["uma escrita por argumento"] == results["escritas juntadas"], "escrita alterou o resultado"
+
+
+# ============================================================================
+# LEITURA (READLN)
+# ============================================================================
+
+INPUT_LOOP_SOURCE = """
+program LeituraCiclo;
+var v: array[1..%d] of integer;
+    i, soma: integer;
+begin
+  for i := 1 to %d do
+    readln(v[i]);
+  soma := 0;
+  for i := 1 to %d do soma := soma + v[i];
+  writeln(soma);
+end.
+"""
+
+INPUT_ARRAY_SOURCE = """
+program LeituraArray;
+var v: array[1..%d] of integer;
+    i, soma: integer;
+begin
+  readln(v);
+  soma := 0;
+  for i := 1 to %d do soma := soma + v[i];
+  writeln(soma);
+end.
+"""
+
+def bench_input(n=50000):
+    """Leitura de n números: um readln por linha (com e sem prompt) vs array inteiro numa linha"""
+    print(f"leitura ({n} números)")
+    numbers = [str(i * 37 % 100003) for i in range(n)]
+    cases = (
+        ("readln(v[i]) com prompt", INPUT_LOOP_SOURCE, {}, numbers),
+        ("readln(v[i]) sem prompt", INPUT_LOOP_SOURCE, {'read_prompts': False}, numbers),
+        ("readln(v) numa linha", INPUT_ARRAY_SOURCE, {'read_prompts': False}, [" ".join(numbers)]),
+    )
+    results = {}
+    for name, source, options, input_lines in cases:
+        text = compile_source(source.replace('%d', str(n)), **options)
+        program = parse_program(text)
+        seconds, vm = best_time(lambda: VM(program, input_lines).run())
+        report(name, seconds, vm.steps)
+        print(f"  {'':<32} {len(input_lines)} linhas de entrada, {n / seconds / 1e3:.1f} mil números/s, "
+              f"{len(vm.output())} bytes escritos")
+        results[name] = vm.output().split("? ")[-1]
+    assert len(set(results.values())) == 1, "leitura alterou o resultado"
+
+
+# ============================================================================
+# ESPECIALIZAÇÃO DE TIPOS
+# ============================================================================
+
+SERIES_SOURCE = """
+program Series;
+var k, sinal: integer;
+    pi, basileia, geometrica, razao: real;
+begin
+  pi := 0; basileia := 0; geometrica := 0; razao := 1;
+  sinal := 1;
+  for k := 1 to %d do
+  begin
+    pi := pi + sinal * 4 / (2 * k - 1);
+    basileia := basileia + 1 / (k * k);
+    geometrica := geometrica + razao;
+    razao := razao * (1 - 1 / 2) + 0 * 2;
+    if pi > 4 * 1.0 then pi := 4;
+    sinal := -sinal
+  end;
+  writeln(pi, ' ', basileia * 6, ' ', geometrica);
+end.
+"""
+
+def bench_series(n=20000):
+    """Séries numéricas com reais e literais inteiros: ITOF em execução vs literais convertidos em compilação"""
+    print(f"séries numéricas ({n} termos)")
+    results = {}
+    for name, enabled in (("conversões em execução", False), ("tipos especializados", True)):
+        text = compile_source(SERIES_SOURCE % n, specialize_types=enabled)
+        program = parse_program(text)
+        seconds, vm = best_time(lambda: VM(program).run())
+        report(name, seconds, vm.steps)
+        conversions = sum(1 for op, _ in program.code if op == OP['itof'])
+        print(f"  {'':<32} {vm.steps / n:.1f} instruções por termo, {conversions} ITOF no código")
+        results[name] = (seconds, vm.output())
+    assert results["conversões em execução"][1] == results["tipos especializados"][1], "especialização alterou o resultado"
+    print(f"  speedup: {results['conversões em execução'][0] / results['tipos especializados'][0]:.2f}x")
+
+
+# ============================================================================
+# SERVIDOR DE COMPILAÇÃO
+# ============================================================================
+
+def start_server(workers):
+    """Arranca um CompileServer numa thread própria (porta livre); devolve (servidor, loop, porta)"""
+    server = CompileServer(workers)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start(port=0))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server, loop, server.address()[1]
+
+
+def bench_server(n=400, clients=4, spawned=10, workers=None):
+    """Compilação por pedido: um processo novo por pedido vs servidor com processos aquecidos"""
+    source = bytecode_source(20)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "programa.pas")
+    with open(path, 'w') as f:
+        f.write(source)
+    workers = workers or os.cpu_count() or 1
+    print(f"servidor de compilação ({workers} processos, {clients} clientes)")
+
+    # Um processo por pedido (import do compilador e construção das tabelas em cada um)
+    latencies = []
+    for _ in range(spawned):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "compilador.py", path, "-o", os.devnull], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"  {'processo por pedido':<32} p50 {percentile(latencies, 50) * 1000:8.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:8.2f} ms")
+
+    # Servidor: clientes concorrentes, cada um com uma ligação keep-alive
+    server, loop, port = start_server(workers)
+    body = json.dumps({'source': source})
+
+    def client(count):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            connection.request('POST', '/compile', body, {'Content-Type': 'application/json'})
+            response = json.loads(connection.getresponse().read())
+            assert response['ok'], response['diagnostics']
+            times.append(time.perf_counter() - start)
+        connection.close()
+        return times
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        latencies = sorted(t for times in executor.map(client, [n // clients] * clients) for t in times)
+    elapsed = time.perf_counter() - start
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', '/metrics')
+    metrics = json.loads(connection.getresponse().read())
+    connection.close()
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+    print(f"  {'servidor':<32} p50 {percentile(latencies, 50) * 1000:8.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:8.2f} ms  {len(latencies) / elapsed:7.1f} pedidos/s")
+    queue, compiling = metrics['latency']['queue_ms'], metrics['latency']['compile_ms']
+    print(f"  {'':<32} compilação p50 {compiling['p50']:.2f} ms; fila: máximo {metrics['max_queue_depth']} "
+          f"pedidos, espera p50 {queue['p50']:.2f} ms, p99 {queue['p99']:.2f} ms")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+# ============================================================================
+# SERVIDOR DE LINGUAGEM (LSP)
+# ============================================================================
+
+def lsp_source(n):
+    """Programa gerado com cerca de 5*n linhas: subprogramas, arrays e chamadas no corpo"""
+    lines = ["program Editor;", "var s, i: integer; r: real; v: array[1..100] of integer;"]
+    for k in range(1, 21):
+        lines += [f"function passo{k}(x: integer): integer;", "begin",
+                  f"  passo{k} := x * {k} + s", "end;"]
+    lines += ["procedure mostra(var total: integer; x: real);", "begin",
+              "  total := total + 1;", "  writeln(total, ' ', x)", "end;", "begin", "  s := 0; r := 0.5;"]
+    for i in range(n):
+        lines += [f"  v[{i % 100 + 1}] := passo{i % 20 + 1}(s) mod 1000;",
+                  f"  r := r * 0.5 + v[{i % 100 + 1}];",
+                  f"  if v[{i % 100 + 1}] > {i % 500} then mostra(s, r)",
+                  f"  else s := s - passo{(i * 7) % 20 + 1}({i % 13});",
+                  "  i := i + 1;"]
+    lines += ["  writeln(s)", "end."]
+    return "\n".join(lines)
+
+
+def bench_lsp(n=1000, bursts=20, seed=1):
+    """
+    Reprodução de uma sessão de edição no servidor LSP: rajadas de escrita (uma
+    alteração por tecla), hover e definição entre teclas e pausas que provocam a
+    recompilação. O relógio é simulado; as análises correm no próprio processo
+    (no servidor real correm noutro processo e não atrasam as respostas).
+    """
+    import random
+    from pas_lsp import LanguageServer
+
+    rng = random.Random(seed)
+    uri = "file:///editor.pas"
+    source = lsp_source(n)
+    now = [0.0]
+    sent = []
+    server = LanguageServer(sent.append, clock=lambda: now[0])
+    times = {'didChange': [], 'hover': [], 'definition': []}
+    analysis = []
+    names = ('passo', 'mostra', 'v[', 's :=', 'r :=')
+
+    def send(method, params, id_=None):
+        """Entrega uma mensagem ao servidor e regista o tempo de resposta"""
+        message = {'jsonrpc': '2.0', 'method': method, 'params': params}
+        if id_ is not None:
+            message['id'] = id_
+        start = time.perf_counter()
+        server.handle(message)
+        kind = method.split('/')[-1]
+        if kind in times:
+            times[kind].append(time.perf_counter() - start)
+
+    def advance(seconds):
+        now[0] += seconds
+        start = time.perf_counter()
+        count = server.compiles
+        server.run_due()
+        if server.compiles != count:
+            analysis.append(time.perf_counter() - start)
+
+    def cursor():
+        """Posição de um identificador numa linha ao acaso do corpo do programa"""
+        doc = server.documents[uri]
+        while True:
+            line = rng.randrange(len(doc.lines) - 5 * n, len(doc.lines) - 2)
+            column = max(doc.lines[line].find(name) for name in names)
+            if column >= 0:
+                return {'textDocument': {'uri': uri}, 'position': {'line': line, 'character': column}}
+
+    send('initialize', {}, 0)
+    send('textDocument/didOpen', {'textDocument': {'uri': uri, 'text': source, 'version': 1}})
+    advance(0)
+    version, edits, hovers, found = 1, 0, 0, 0
+    for _ in range(bursts):
+        # Nova linha no corpo, escrita tecla a tecla (30 ms por tecla)
+        doc = server.documents[uri]
+        line = rng.randrange(len(doc.lines) - 5 * n, len(doc.lines) - 2)
+        text = f"  s := s + passo{rng.randrange(1, 21)}(i);"
+        for column, char in enumerate(text):
+            version += 1
+            change = {'range': {'start': {'line': line, 'character': column},
+                                'end': {'line': line, 'character': column}}, 'text': char}
+            if column == 0:
+                change['text'] = char + "\n"  # Primeira tecla: cria a linha
+                change['range']['start']['character'] = change['range']['end']['character'] = 0
+            send('textDocument/didChange', {'textDocument': {'uri': uri, 'version': version},
+                                            'contentChanges': [change]})
+            edits += 1
+            advance(0.03)
+            if rng.random() < 0.2:
+                hovers += 1
+                method = rng.choice(('textDocument/hover', 'textDocument/definition'))
+                send(method, cursor(), hovers)
+                found += sent[-1]['result'] is not None
+        advance(1.0)  # Pausa: recompila
+
+    lines = len(source.split('\n'))
+    print(f"servidor de linguagem ({lines} linhas, {edits} alterações, {hovers} pedidos hover/definição)")
+    for kind, values in times.items():
+        values.sort()
+        print(f"  {kind:<32} p50 {percentile(values, 50) * 1000:8.3f} ms  "
+              f"p99 {percentile(values, 99) * 1000:8.3f} ms  máximo {values[-1] * 1000:8.3f} ms")
+    analysis.sort()
+    print(f"  {'análise (recompilação)':<32} p50 {percentile(analysis, 50) * 1000:8.2f} ms  "
+          f"({server.compiles} compilações para {edits} alterações)")
+    print(f"  pedidos com resposta: {found}/{hovers}")
+
+
+# ============================================================================
+# MODOS SÓ LÉXICO / SÓ SINTÁTICO
+# ============================================================================
+
+def bench_modes(n=2000):
+    """Débito de cada modo sobre o mesmo programa: tokens, tokens em JSONL, só sintaxe e compilação completa"""
+    import io
+    from compilador import tokens_jsonl
+    from pas_lex import tokenize
+    from pas_yacc import check_syntax
+
+    source = lsp_source(n)
+    size = len(source.encode('utf-8')) / 1e6
+    count = sum(1 for _ in tokenize(source))
+    print(f"modos de análise ({len(source.splitlines())} linhas, {size:.2f} MB, {count} tokens)")
+    modes = [
+        ("tokens", lambda: sum(1 for _ in tokenize(source))),
+        ("tokens (JSONL)", lambda: tokens_jsonl(source, io.StringIO())),
+        ("só sintaxe", lambda: check_syntax(source)),
+        ("compilação completa", lambda: compile_program(source)),
+    ]
+    timings = [(name, best_time(fn)[0]) for name, fn in modes]
+    full = timings[-1][1]
+    for name, seconds in timings:
+        print(f"  {name:<32} {seconds * 1000:9.2f} ms  {size / seconds:6.2f} MB/s  "
+              f"{count / seconds / 1e3:8.1f} ktokens/s  {full / seconds:5.2f}x")
+    assert not check_syntax(source), "programa gerado com erros de sintaxe"
+
+
+# ============================================================================
+# FUZZING DIFERENCIAL
+# ============================================================================
+
+def bench_fuzz(n=300, workers=None):
+    """Programas verificados por minuto (gerar, referência, 3 compilações e execuções)"""
+    from pas_fuzz import fuzz
+    workers = workers or os.cpu_count() or 1
+    print(f"fuzzing diferencial ({n} programas)")
+    for count in sorted({1, workers}):
+        stats = fuzz(seed=0, count=n, workers=count, out=os.path.join(tempfile.gettempdir(), 'fuzz-falhas'))
+        rate = stats['programs'] / stats['seconds'] * 60
+        print(f"  {f'{count} processo(s)':<32} {stats['seconds'] * 1000:9.2f} ms  {rate:8.0f} programas/min  "
+              f"({stats['fail']} falhas, {stats['skip']} descartados)")
+
+
+# ============================================================================
+# INTERPRETADOR
+# ============================================================================
+
+def example_programs():
+    """Programas de examples.pas: lista de (nome, código)"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples.pas'), encoding='utf-8') as f:
+        text = f.read()
+    programs = re.findall(r'^program\s+(\w+).*?^end\.', text, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+    sources = re.findall(r'^program\b.*?^end\.', text, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+    return list(zip(programs, sources))
+
+
+def bench_interp(runs=200, n=20):
+    """Interpretador (pas_interp) contra compilar, carregar o texto VM e executar na VM"""
+    from pas_interp import load
+    inputs = ['7'] * 10
+    print(f"interpretador vs compilação + VM (examples.pas, média de {runs} execuções)")
+
+    def via_vm(code, lines):
+        text, _ = compile_program(code)
+        return run_vm(text, lines).output()
+
+    def via_interp(code, lines):
+        program, _ = load(code)
+        return program.run(lines).output()
+
+    def mean_time(fn, *args):
+        seconds, _ = best_time(lambda: [fn(*args) for _ in range(runs)])
+        return seconds / runs
+
+    totals = [0.0, 0.0]
+    for name, code in example_programs():
+        assert via_vm(code, inputs) == via_interp(code, inputs), f"saídas diferentes em {name}"
+        vm_time, interp_time = mean_time(via_vm, code, inputs), mean_time(via_interp, code, inputs)
+        totals[0] += vm_time
+        totals[1] += interp_time
+        print(f"  {name:<32} {vm_time * 1000:7.3f} ms -> {interp_time * 1000:7.3f} ms  {vm_time / interp_time:5.2f}x")
+    print(f"  {'total':<32} {totals[0] * 1000:7.3f} ms -> {totals[1] * 1000:7.3f} ms  {totals[0] / totals[1]:5.2f}x")
+
+    # Programa com muito cálculo: só a execução (já compilado / já analisado)
+    text = compile_source(FIB_SOURCE % n)
+    program, _ = load(FIB_SOURCE % n)
+    vm_seconds, vm = best_time(lambda: run_vm(text))
+    interp_seconds, _ = best_time(program.run)
+    assert vm.output() == program.output(), "saídas diferentes em fib"
+    report(f"fib({n}) na VM", vm_seconds, vm.steps)
+    report(f"fib({n}) no interpretador", interp_seconds)
+    print(f"  speedup: {vm_seconds / interp_seconds:.2f}x")
+
+
+# ============================================================================
+# TRADUÇÃO PARA PYTHON (AOT)
+# ============================================================================
+
+def bench_aot(prime=200003, factorial=1000, n=22):
+    """Código VM traduzido para Python (pas_aot) contra a VM, em programas com muito cálculo"""
+    from pas_aot import Program
+    examples = dict(example_programs())
+    cases = [
+        (f"primo({prime})", compile_source(examples['NumeroPrimo']), [str(prime)]),
+        (f"fatorial({factorial})", compile_source(examples['Fatorial']), [str(factorial)]),
+        (f"fib({n})", compile_source(FIB_SOURCE % n), []),
+    ]
+    print("VM vs código VM traduzido para Python (só a execução)")
+    for name, text, lines in cases:
+        translate_seconds, program = best_time(lambda: Program(text))
+        vm_seconds, vm = best_time(lambda: run_vm(text, lines))
+        aot_seconds, _ = best_time(lambda: program.run(lines))
+        assert vm.output() == program.output(), f"saídas diferentes em {name}"
+        report(f"{name} na VM", vm_seconds, vm.steps)
+        report(f"{name} traduzido", aot_seconds)
+        print(f"  tradução: {translate_seconds * 1000:.2f} ms  speedup: {vm_seconds / aot_seconds:.1f}x")
+
+
+VECTOR_SOURCE = """
+program Vetores;
+var a, b, c: array[1..%d] of integer;
+    x: array[1..%d] of real;
+    i, n, soma: integer;
+    total: real;
+begin
+  n := %d;
+  for i := 1 to n do a[i] := i;
+  for i := 1 to n do b[i] := a[i] * 3 - 7;
+  for i := 1 to n do c[i] := a[i] + b[i];
+  for i := 1 to n do x[i] := c[i] * 0.5;
+  soma := 0;
+  for i := 1 to n do soma := soma + c[i];
+  total := 0.0;
+  for i := 1 to n do total := total + x[i] * x[i];
+  writeln(soma);
+  writeln(total)
+end.
+"""
+
+
+def bench_vector(n=200000):
+    """Ciclos elemento a elemento sobre arrays: VM, tradução para Python e tradução com NumPy"""
+    from pas_aot import Program, numpy
+    text = compile_source(VECTOR_SOURCE % (n, n, n))
+    scalar = Program(text, vectorize=False)
+    vm_seconds, vm = best_time(lambda: run_vm(text))
+    scalar_seconds, _ = best_time(scalar.run)
+    assert vm.output() == scalar.output(), "saídas diferentes (tradução)"
+    print(f"Arrays de {n} elementos (4 ciclos map, 2 somas)")
+    report("VM", vm_seconds, vm.steps)
+    report("traduzido", scalar_seconds)
+    print(f"  speedup: {vm_seconds / scalar_seconds:.1f}x")
+    if numpy is None:
+        print("  NumPy não instalado: sem ciclos vetorizados")
+        return
+    vector = Program(text)
+    vector_seconds, _ = best_time(vector.run)
+    assert vm.output() == vector.output(), "saídas diferentes (NumPy)"
+    report("traduzido com NumPy", vector_seconds)
+    print(f"  speedup: {vm_seconds / vector_seconds:.1f}x "
+          f"({scalar_seconds / vector_seconds:.1f}x sobre a tradução sem NumPy)")
+
+
+# ============================================================================
+# SNAPSHOTS DA VM
+# ============================================================================
+
+SNAPSHOT_SOURCE = """
+program Estado;
+var a, b: array[1..%d] of integer;
+    x: array[1..%d] of real;
+    i, n: integer;
+begin
+  n := %d;
+  for i := 1 to n do a[i] := i * 7919 mod 10007;
+  for i := 1 to n do x[i] := a[i] / 3;
+  for i := 1 to n do b[i] := a[i] + 1
+end.
+"""
+
+
+def bench_snapshot(sizes=(1000, 10000, 100000, 300000), intervals=(1000000, 10000000)):
+    """Custo de um snapshot da VM (pas_snapshot) em função do tamanho do estado"""
+    import pas_snapshot
+    print("Snapshot a meio do último ciclo (3 arrays de n elementos no heap)")
+    for n in sizes:
+        text = compile_source(SNAPSHOT_SOURCE % (n, n, n))
+        finished = run_vm(text)
+        vm = VM(parse_program(text))
+        vm.run(finished.steps * 5 // 6)
+        snapshot_seconds, data = best_time(lambda: pas_snapshot.snapshot(vm))
+        restore_seconds, restored = best_time(lambda: pas_snapshot.restore(data))
+        assert restored.run().globals == finished.globals, "estado restaurado diferente"
+        cells = vm.heap_cells + len(vm.globals)
+        print(f"  n={n:<7} {cells:>8} células  {len(data):>9} bytes  "
+              f"snapshot {snapshot_seconds * 1000:8.2f} ms  restauro {restore_seconds * 1000:8.2f} ms  "
+              f"({snapshot_seconds / cells * 1e9:.0f} ns/célula)")
+
+    # Snapshots periódicos num ficheiro (com fsync), no maior estado: o custo de
+    # cada intervalo é o de um save, já que as paragens só acontecem em saltos
+    # e chamadas, onde run compara o número de instruções com o limite
+    n = sizes[-1]
+    text = compile_source(SNAPSHOT_SOURCE % (n, n, n))
+    plain_seconds, finished = best_time(lambda: run_vm(text), repeat=1)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'estado.snap')
+        vm = VM(parse_program(text))
+        vm.run(finished.steps * 5 // 6)
+        save_seconds, size = best_time(lambda: pas_snapshot.save(vm, path))
+        checkpointed = pas_snapshot.run(VM(parse_program(text)), path, intervals[0])
+        assert checkpointed.globals == finished.globals, "execução com snapshots diferente"
+    report(f"n={n} sem snapshots", plain_seconds, finished.steps)
+    report(f"save ({size} bytes)", save_seconds)
+    for interval in intervals:
+        count = finished.steps // interval
+        print(f"  um snapshot a cada {interval} instruções: {count} snapshots, "
+              f"custo {save_seconds * count / plain_seconds * 100:.1f}% do tempo de execução")
+
+# ============================================================================
+# ESTIMATIVA ESTÁTICA DO CUSTO
+# ============================================================================
+
+COST_SOURCE = """
+program Custo;
+var n, i, j, s: integer;
+    a: array[1..2000] of integer;
+function soma(k: integer): integer;
+var t, r: integer;
+begin
+  r := 0;
+  for t := 1 to k do r := r + t;
+  soma := r;
+end;
+begin
+  readln(n);
+  s := 0;
+  for i := 1 to n do
+    for j := i to n do
+      if (i + j) mod 3 = 0 then s := s + 1 else s := s - 1;
+  for i := 1 to n do a[i] := soma(i);
+  writeln(s, a[n]);
+end.
+"""
+
+def bench_cost(sizes=(10, 100, 1000)):
+    """Estimativa do custo (pas_cost) comparada com as instruções executadas"""
+    import pas_cost
+    analysis_seconds, estimator = best_time(lambda: pas_cost.estimate_source(COST_SOURCE))
+    report("análise estática", analysis_seconds)
+    print(f"  custo estimado: {estimator.cost}")
+    text = compile_source(COST_SOURCE)
+    for n in sizes:
+        estimate = pas_cost.evaluate(estimator.cost, {'n': n})
+        seconds, vm = best_time(lambda: run_vm(text, [str(n)]), repeat=1)
+        report(f"n={n} execução", seconds, vm.steps)
+        print(f"  n={n:<5} estimativa {estimate:>10} instr  ({estimate / vm.steps:.3f} x real)")
+
+
+
+# ============================================================================
+# LIMITES DE EXECUÇÃO (SANDBOX)
+# ============================================================================
+
+def bench_limits(fib=22, n=300):
+    """Custo dos limites da VM (instruções, heap, chamadas, saída, tempo) em programas com e sem chamadas"""
+    from pas_vm import SANDBOX_LIMITS
+    unlimited = dict.fromkeys(SANDBOX_LIMITS, 10 ** 12)
+    programs = [(f"fib({fib})", compile_source(FIB_SOURCE % fib), None),
+                (f"ciclos n={n}", compile_source(COST_SOURCE), [str(n)])]
+    for name, text, lines in programs:
+        program = parse_program(text)
+        # Medições alternadas (a carga da máquina afeta as duas da mesma forma)
+        plain_seconds = limited_seconds = float('inf')
+        for _ in range(5):
+            seconds, vm = best_time(lambda: VM(program, lines).run(), repeat=1)
+            plain_seconds = min(plain_seconds, seconds)
+            seconds, _ = best_time(lambda: VM(program, lines, **unlimited).run(), repeat=1)
+            limited_seconds = min(limited_seconds, seconds)
+        report(f"{name} sem limites", plain_seconds, vm.steps)
+        report(f"{name} com limites", limited_seconds, vm.steps)
+        print(f"  custo dos limites: {(limited_seconds / plain_seconds - 1) * 100:+.1f}%")
+
+
+BENCHMARKS = {
+    'fib': bench_fib,
+    'inline': bench_inline,
+    'tail': bench_tail_calls,
+    'symbols': bench_symbols,
+    'diagnostics': bench_diagnostics,
+    'bytecode': bench_bytecode,
+    'constants': bench_constants,
+    'output': bench_output,
+    'input': bench_input,
+    'series': bench_series,
+    'server': bench_server,
+    'lsp': bench_lsp,
+    'modes': bench_modes,
+    'fuzz': bench_fuzz,
+    'interp': bench_interp,
+    'aot': bench_aot,
+    'vector': bench_vector,
+    'snapshot': bench_snapshot,
+    'cost': bench_cost,
+    'limits': bench_limits,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconhecido: {name} (disponíveis: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        BENCHMARKS[name]()
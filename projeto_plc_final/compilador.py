@@ -0,0 +1,116 @@
+# Compilador Pascal -> EWVM (linha de comandos)
+# Uso: python compilador.py programa.pas [-o programa.vm] [--json] [--max-errors N]
+#                           [--source-map programa.map.json] [--bytecode programa.pasb] [--no-prompt]
+#                           [--tokens | --syntax-only]
+import argparse
+import contextlib
+import json
+import sys
+
+import pas_bytecode
+from pas_lex import tokenize
+from pas_yacc import MAX_ERRORS, check_syntax, compile_program, parser
+
+
+def diagnostics_json(diagnostics):
+    """Serializa os diagnósticos em JSON (um objeto com a lista e os totais)"""
+    records = [d.to_dict() for d in diagnostics]
+    return json.dumps({
+        'errors': sum(1 for r in records if r['severity'] == 'error'),
+        'warnings': sum(1 for r in records if r['severity'] == 'warning'),
+        'diagnostics': records,
+    }, ensure_ascii=False, indent=2)
+
+
+def source_map_json(source, source_map):
+    """
+    Serializa o mapa de código fonte: para cada instrução VM (índice como na VM,
+    sem labels), [linha, coluna] do código Pascal que a gerou, ou null.
+    """
+    return json.dumps({
+        'version': 1,
+        'source': source,
+        'mappings': [list(position) if position else None for position in source_map],
+    })
+
+
+def tokens_jsonl(code, out):
+    """Escreve os tokens do programa em JSON Lines: [tipo, valor, linha, coluna] por linha"""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    out.writelines(encode(token) + '\n' for token in tokenize(code))
+
+
+def main(argv=None):
+    """Compila o ficheiro indicado; devolve o código de saída (0 = sucesso)"""
+    args = argparse.ArgumentParser(description="Compilador Pascal para a EWVM")
+    args.add_argument('source', help="ficheiro Pascal ('-' para stdin)")
+    args.add_argument('-o', '--output', help="ficheiro onde escrever o código VM (por omissão, stdout)")
+    args.add_argument('--json', action='store_true', help="escrever os diagnósticos em JSON no stdout")
+    args.add_argument('--max-errors', type=int, default=MAX_ERRORS,
+                      help=f"interromper após N erros (0 = sem limite, por omissão {MAX_ERRORS})")
+    args.add_argument('--source-map', metavar='FICHEIRO',
+                      help="escrever o mapa instrução VM -> linha/coluna Pascal (JSON)")
+    args.add_argument('--bytecode', metavar='FICHEIRO',
+                      help="escrever também o programa em formato binário (ver pas_bytecode)")
+    args.add_argument('--no-prompt', action='store_true',
+                      help="não mostrar o prompt '? ' antes de cada leitura (entrada em modo batch)")
+    mode = args.add_mutually_exclusive_group()
+    mode.add_argument('--tokens', action='store_true',
+                      help="só análise léxica: escrever os tokens em JSON Lines ([tipo, valor, linha, coluna])")
+    mode.add_argument('--syntax-only', action='store_true',
+                      help="só verificar a sintaxe (sem análise semântica nem geração de código)")
+    options = args.parse_args(argv)
+
+    if options.source == '-':
+        code = sys.stdin.read()
+    else:
+        with open(options.source, encoding='utf-8') as f:
+            code = f.read()
+
+    if options.tokens:
+        # Caracteres inválidos são reportados pelo lexer no stdout: vão para o stderr
+        stdout = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            if options.output:
+                with open(options.output, 'w', encoding='utf-8') as f:
+                    tokens_jsonl(code, f)
+            else:
+                tokens_jsonl(code, stdout)
+        return 0
+
+    if options.syntax_only:
+        diagnostics = check_syntax(code, max_errors=options.max_errors)
+        if options.json:
+            print(diagnostics_json(diagnostics))
+        else:
+            for diagnostic in diagnostics:
+                print(diagnostic, file=sys.stderr)
+        return 1 if diagnostics else 0
+
+    result, diagnostics = compile_program(code, max_errors=options.max_errors,
+                                          source_map=bool(options.source_map),
+                                          read_prompts=not options.no_prompt)
+
+    if options.json:
+        print(diagnostics_json(diagnostics))
+    else:
+        for diagnostic in diagnostics:
+            print(diagnostic, file=sys.stderr)
+
+    if result is None:
+        return 1
+    if options.source_map:
+        with open(options.source_map, 'w', encoding='utf-8') as f:
+            f.write(source_map_json(options.source, parser.source_map))
+    if options.bytecode:
+        pas_bytecode.write_file(options.bytecode, result)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            f.write(result)
+    elif not options.json:
+        print(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
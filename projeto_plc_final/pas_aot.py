@@ -0,0 +1,1153 @@
+# Tradução antecipada (AOT) de programas VM para Python: o texto gerado pelo
+# compilador é convertido em código fonte Python, compilado com compile() e
+# executado com exec, sem o ciclo de despacho da VM.
+# Uso: python pas_aot.py programa.pas [--no-prompt] [--python] [--no-vectorize] < entrada.txt
+#      (um ficheiro .vm é traduzido diretamente, sem compilar)
+#
+# O código do compilador é estruturado (ver pas_yacc): um label é o início de
+# um ciclo (alvo de um salto para trás), o fim de um ciclo, o ramo else ou o
+# fim de um IF. A tradução reconstrói essa estrutura:
+#   label com salto para trás (JUMP)   while True: ... (JZ para o fim -> break)
+#   label com salto para trás (JZ)     REPEAT: while True: ... if c: break
+#   JZ para a frente                   if c: ... [else: ...]
+#   boolfalse/boolend (só PUSH)        expressão condicional (escrita de booleanos)
+#   JUMP tailbody<n>                   continue (recursão em cauda)
+# A pilha da VM é simulada durante a tradução: cada entrada é uma expressão
+# Python e as instruções com efeitos (STOREG, escrita, chamadas de
+# procedimentos, ciclos) tornam-se statements. Antes de cada statement, as
+# entradas pendentes são guardadas em temporários, para manter a ordem de
+# avaliação da VM.
+#   globais      variáveis locais de program() (nonlocal nos subprogramas)
+#   frames       resultado, parâmetros e locais são variáveis da função Python
+#   endereços    variáveis passadas por referência (PUSHGP/PUSHFP + PADD) ficam
+#                numa lista de uma posição; os parâmetros VAR guardam
+#                (bloco, posição), como os endereços da VM
+#   arrays       listas (ALLOCN)
+# As rotinas readint/readreal do compilador são substituídas por
+# Runtime.read_number (pas_interp), que tem a mesma semântica.
+#
+# Com NumPy instalado, os FOR com um único statement elemento a elemento
+# (a[i] := b[i] + c[i] * k, ou somas s := s + a[i]) são também executados como
+# operações NumPy sobre as fatias dos arrays (ver vector_map/vector_reduce).
+# Os arrays continuam a ser listas Python fora desses ciclos (inteiros sem
+# limite, valores de tipos diferentes); as fatias são convertidas em buffers
+# int64/float64 à entrada do ciclo e o resultado volta à lista. Se a conversão
+# não for exata (overflow de int64, valores não numéricos, índices fora dos
+# limites, divisão por zero) o ciclo é executado normalmente.
+import argparse
+import sys
+
+from pas_interp import RECURSION_LIMIT, Runtime, real_div
+from pas_vm import VMError, format_real, int_div, int_mod, unescape_string
+
+try:
+    import numpy
+except ImportError:  # Sem NumPy: os ciclos são sempre executados elemento a elemento
+    numpy = None
+
+# Rotinas de leitura geradas pelo compilador (nome -> lê um real)
+READ_ROUTINES = {'readint': False, 'readreal': True}
+
+# Prefixo do label do corpo de um subprograma com recursão em cauda (ver pas_yacc.eliminate_tail_calls)
+TAIL_LABEL = 'tailbody'
+
+# Número máximo de passagens para determinar o que cada slot guarda
+MAX_PASSES = 8
+
+# Operadores binários: instrução -> formato da expressão Python
+BINARY = {
+    'add': '({} + {})', 'sub': '({} - {})', 'mul': '({} * {})',
+    'fadd': '({} + {})', 'fsub': '({} - {})', 'fmul': '({} * {})', 'fdiv': 'real_div({}, {})',
+    'concat': '({} + {})', 'charat': 'ord({}[{}])',
+}
+COMPARISON = {
+    'inf': '<', 'infeq': '<=', 'sup': '>', 'supeq': '>=',
+    'finf': '<', 'finfeq': '<=', 'fsup': '>', 'fsupeq': '>=', 'equal': '==',
+}
+UNARY = {
+    'itof': 'float({})', 'ftoi': 'int({})', 'atoi': 'int({}.strip())', 'atof': 'float({}.strip())',
+    'stri': 'str({})', 'strf': 'format_real({})', 'strlen': 'len({})',
+}
+WRITES = {'writei': 'out(str({}))', 'writef': 'out(format_real({}))', 'writes': 'out({})'}
+PUSHES = {'pushi', 'pushf', 'pushs', 'pushg'}
+
+# Ciclos vetorizados: operações aceites (instrução -> operador NumPy) e número
+# mínimo de iterações (abaixo disto converter as fatias custa mais do que o ciclo)
+VECTOR_OPS = {'add': '+', 'sub': '-', 'mul': '*', 'fadd': '+', 'fsub': '-', 'fmul': '*', 'fdiv': '/'}
+INTEGER_OPS = {'add', 'sub', 'mul'}
+VECTOR_MIN = 32
+INT64_LIMIT = 2 ** 63
+
+
+class TranslationError(Exception):
+    """Código VM que não segue a estrutura gerada pelo compilador"""
+    pass
+
+
+# ============================================================================
+# PILHA SIMBÓLICA
+# ============================================================================
+
+class Entry:
+    """
+    Entrada da pilha simulada.
+
+    kind:
+        'val'   valor (expr)
+        'list'  array: lista devolvida por ALLOCN
+        'ref'   endereço (bloco, posição) guardado numa variável (parâmetro VAR)
+        'addr'  endereço conhecido: expr é o bloco e index a posição
+        'gp'    PUSHGP (base das globais), 'fp' PUSHFP (base do frame)
+    """
+
+    __slots__ = ('kind', 'expr', 'index', 'atom', 'bool', 'call')
+
+    def __init__(self, kind, expr, index=None, atom=False, bool_=False, call=False):
+        self.kind = kind
+        self.expr = expr
+        self.index = index
+        self.atom = atom            # Constante ou variável (pode ser avaliada duas vezes)
+        self.bool = bool_           # Resultado de uma comparação/NOT/AND/OR (bool do Python)
+        self.call = call            # Contém uma chamada ou leitura (efeitos)
+
+    def value(self):
+        """Expressão Python do valor da entrada (endereços como tuplos)"""
+        if self.kind == 'addr':
+            return f"({self.expr}, {self.index})"
+        return self.expr
+
+
+def literal(value):
+    """Constante Python (entre parênteses se for negativa)"""
+    text = repr(value)
+    if isinstance(value, float) and text in ('inf', '-inf', 'nan'):
+        return f"float('{text}')"
+    return f"({text})" if text.startswith('-') else text
+
+
+def constant(value):
+    return Entry('val', literal(value), atom=True)
+
+
+# ============================================================================
+# TRADUÇÃO
+# ============================================================================
+
+def parse_items(text):
+    """Linhas do texto VM: (instrução, argumento), com os labels como (None, nome)"""
+    items = []
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.endswith(':') and ' ' not in line:
+            items.append((None, line[:-1]))
+        else:
+            name, _, arg = line.partition(' ')
+            items.append((name.lower(), arg.strip()))
+    return items
+
+
+class Translator:
+    """Converte o texto VM de um programa no código fonte de program(rt)"""
+
+    def __init__(self, text, vector_min=None):
+        self.items = items = parse_items(text)
+        self.vector_min = vector_min  # Iterações mínimas de um ciclo vetorizado (None = sem NumPy)
+        self.positions = {}         # Label -> posição em items
+        self.jumps = {}             # Label -> posições dos JUMP/JZ para esse label
+        self.params = {}            # Label de um subprograma -> número de parâmetros
+        calls = {}                  # Label de um subprograma -> posições dos PUSHA
+        num_globals = 0
+        for i, (op, arg) in enumerate(items):
+            if op is None:
+                self.positions[arg] = i
+            elif op in ('jump', 'jz'):
+                self.jumps.setdefault(arg, []).append(i)
+            elif op == 'pusha' and arg not in READ_ROUTINES:
+                calls.setdefault(arg, []).append(i)
+            elif op in ('pushg', 'storeg'):
+                num_globals = max(num_globals, int(arg) + 1)
+        self.num_globals = num_globals
+        ops = [op for op, _ in items]
+        if 'start' not in ops or 'stop' not in ops:
+            raise TranslationError("Programa sem START/STOP")
+        self.start = ops.index('start')
+        self.stop = ops.index('stop')
+
+        # Subprogramas e rotinas: de um label de entrada até ao RETURN
+        self.regions = []
+        i = self.stop + 1
+        while i < len(items):
+            if items[i][0] is not None:
+                raise TranslationError(f"Instrução fora de um subprograma: {items[i][0]}")
+            end = ops.index('return', i)
+            self.regions.append((i, end))
+            i = end + 1
+        self.params = {label: self.count_params(label, sites) for label, sites in calls.items()}
+        self.reachable = self.reachable_subprograms()
+
+        # Leitura de vários valores: a global com o comprimento da linha atual
+        # (STOREG 0 reinicia a leitura) e o prompt antes de cada linha nova
+        self.read_length = None
+        self.prompts = False
+        for start, end in self.regions:
+            name = items[start][1]
+            if name in READ_ROUTINES:
+                skip = self.positions[f"{name}skip"]
+                self.read_length = int(items[skip + 2][1])
+                self.prompts = self.prompts or any(op == 'writes' for op, _ in items[start:end])
+
+        # Slots (globais ('g', endereço) ou locais (label, endereço)) com o endereço
+        # tomado: PUSHGP/PUSHFP seguido de PUSHI + PADD
+        self.boxed = set()
+        owners = {start: items[start][1] for start, _ in self.regions}
+        label = None
+        for i, (op, arg) in enumerate(items[:-2]):
+            label = owners.get(i, label)
+            if op in ('pushgp', 'pushfp') and items[i + 2][0] == 'padd':
+                address = int(items[i + 1][1])
+                self.boxed.add(('g', address) if op == 'pushgp' else (label, address))
+        self.kinds = {}             # Slot -> 'list' ou 'ref' (os restantes guardam valores)
+
+    def count_params(self, label, sites):
+        """
+        Número de parâmetros de um subprograma, a partir do POP n depois de cada CALL.
+
+        Num procedimento chamado no fim de outro subprograma, "CALL, POP n, RETURN"
+        tanto pode ser a remoção dos argumentos (sem locais) como o epílogo (sem
+        argumentos); decidem as outras chamadas e o uso de locais no chamador. Sem
+        mais informação, assume-se que são os argumentos: se não forem, os valores
+        iniciais das locais (não usadas) passam a argumentos que o procedimento não
+        usa, o que dá o mesmo resultado.
+        """
+        items = self.items
+        ambiguous = set()
+        for i in sites:
+            following = items[i + 2] if i + 2 < len(items) else (None, None)
+            if following[0] != 'pop':
+                return 0
+            count = int(following[1] or 1)
+            if label.startswith('proc') and i + 3 < len(items) and items[i + 3][0] == 'return':
+                start = max(start for start, _ in self.regions if start < i)
+                if any(op in ('pushl', 'storel') and int(arg) >= 0 for op, arg in items[start:i]):
+                    return 0  # O chamador tem locais: o POP é o epílogo
+                ambiguous.add(count)
+            else:
+                return count
+        return ambiguous.pop() if len(ambiguous) == 1 else 0
+
+    def reachable_subprograms(self):
+        """Labels dos subprogramas chamados (direta ou indiretamente) pelo programa principal"""
+        regions = {self.items[start][1]: (start, end) for start, end in self.regions}
+        reachable = set()
+        pending = [(0, self.stop)]
+        while pending:
+            start, end = pending.pop()
+            for op, arg in self.items[start:end]:
+                if op == 'pusha' and arg in self.params and arg not in reachable:
+                    reachable.add(arg)
+                    pending.append(regions[arg])
+        return reachable
+
+    def epilogue_size(self, end):
+        """Número de locais removidas pelo POP antes do RETURN em items[end] (ver count_params)"""
+        items = self.items
+        if items[end - 1][0] != 'pop':
+            return 0
+        count = int(items[end - 1][1] or 1)
+        if items[end - 2][0] == 'call' and self.params.get(items[end - 3][1]) == count:
+            return 0  # POP dos argumentos da última chamada
+        return count
+
+    # ------------------------------------------------------------------------
+    # Resultado
+
+    def translate(self):
+        """Código fonte Python do programa (várias passagens até os tipos dos slots estabilizarem)"""
+        for _ in range(MAX_PASSES):
+            self.found = {}
+            self.unresolved = False
+            source = self.program()
+            if self.found == self.kinds:
+                if self.unresolved:
+                    raise TranslationError("LOAD/STORE sobre um valor que não é um endereço")
+                return source
+            self.kinds = self.found
+        raise TranslationError("Tipos dos slots não estabilizaram")
+
+    def program(self):
+        lines = ["def program(rt):",
+                 "    out = rt.output.append",
+                 "    read_line = rt.next_line",
+                 "    read_number = rt.read_number"]
+        plain = [f"g{a}" for a in range(self.num_globals) if ('g', a) not in self.boxed]
+        if plain:
+            lines.append(f"    {' = '.join(plain)} = 0")
+        for a in sorted(a for kind, a in self.boxed if kind == 'g'):
+            lines.append(f"    gb{a} = [0]")
+        for start, end in self.regions:
+            if self.items[start][1] in self.reachable:
+                lines += self.subprogram(start, end)
+        # Inicialização das globais (antes do START) e programa principal
+        self.enter(None, 0)
+        self.block(0, self.start)
+        self.block(self.start + 1, self.stop)
+        self.check_empty()
+        lines += self.lines
+        return '\n'.join(lines) + '\n'
+
+    # ------------------------------------------------------------------------
+    # Contexto de uma função Python (programa principal ou subprograma)
+
+    def enter(self, label, n):
+        self.label = label          # Label do subprograma (None no programa principal)
+        self.n = n                  # Número de parâmetros
+        self.lines = []
+        self.indent = 1 if label is None else 2
+        self.stack = []
+        self.temps = 0
+        self.stored = set()         # Globais atribuídas (nonlocal nos subprogramas)
+        self.exits = []             # Ciclos abertos: [label de saída, (linha, condição) do primeiro "if not c: break"]
+        self.body_label = None      # Label do corpo (recursão em cauda)
+
+    def check_empty(self):
+        if self.stack:
+            raise TranslationError("Pilha não vazia no fim de um bloco")
+
+    def line(self, text):
+        self.lines.append('    ' * self.indent + text)
+
+    def temp(self, expr):
+        """Guarda uma expressão num temporário (avaliada neste ponto)"""
+        self.temps += 1
+        name = f"t{self.temps}"
+        self.line(f"{name} = {expr}")
+        return name
+
+    def flush(self):
+        """Avalia as entradas pendentes antes de um statement (ordem da VM)"""
+        for entry in self.stack:
+            if entry.kind in ('gp', 'fp'):
+                continue
+            if entry.kind == 'addr':
+                if not entry.expr.startswith(('t', 'gb', 'b_')):
+                    entry.expr = self.temp(entry.expr)
+                if not entry.index.lstrip('(-').rstrip(')').isdigit() and not entry.index.startswith('t'):
+                    entry.index = self.temp(entry.index)
+            elif not (entry.atom and (entry.expr[0] in "('\"" or entry.expr[0].isdigit() or
+                                      entry.expr.startswith('t'))):
+                entry.expr = self.temp(entry.expr)
+                entry.atom = True
+
+    def emit(self, text):
+        """Statement com efeitos: as entradas pendentes são avaliadas antes"""
+        self.flush()
+        self.line(text)
+
+    def pop(self):
+        if not self.stack:
+            raise TranslationError("Pilha vazia")
+        return self.stack.pop()
+
+    def push(self, entry):
+        self.stack.append(entry)
+
+    # ------------------------------------------------------------------------
+    # Slots
+
+    def note(self, key, entry):
+        """Regista o que um slot recebe (arrays e endereços; o resto são valores)"""
+        if entry.kind in ('list', 'ref', 'addr'):
+            self.found[key] = 'list' if entry.kind == 'list' else 'ref'
+
+    def slot(self, key, name):
+        """Entrada com o valor de um slot (name é a variável Python)"""
+        if key in self.boxed:
+            return Entry('val', f"b_{name}[0]" if key[0] != 'g' else f"gb{key[1]}[0]")
+        return Entry(self.kinds.get(key, 'val'), name, atom=True)
+
+    def local_name(self, address):
+        """Variável Python de um endereço do frame"""
+        if address >= 0:
+            return f"l{address}"
+        if address == -(self.n + 1):
+            return "res"
+        if address < -(self.n + 1):
+            raise TranslationError(f"Endereço fora do frame: {address}")
+        return f"p{address + self.n}"
+
+    def store_slot(self, key, name, entry):
+        self.note(key, entry)
+        if key in self.boxed:
+            target = f"b_{name}[0]" if key[0] != 'g' else f"gb{key[1]}[0]"
+        else:
+            target = name
+            if key[0] == 'g':
+                self.stored.add(name)
+        self.emit(f"{target} = {entry.value()}")
+
+    # ------------------------------------------------------------------------
+    # Blocos estruturados
+
+    def block(self, i, end):
+        """Traduz items[i:end] (statements; a pilha pode ter entradas pendentes)"""
+        items = self.items
+        while i < end:
+            op, arg = items[i]
+            if op is None:
+                if arg == self.body_label:
+                    i += 1
+                    continue
+                back = [j for j in self.jumps.get(arg, ()) if i < j < end]
+                if back:
+                    i = self.loop(i, max(back))
+                else:
+                    i += 1
+                continue
+            if op == 'jz':
+                target = self.positions[arg]
+                if self.exits and arg == self.exits[-1][0]:
+                    cond = self.pop().expr
+                    self.emit(f"if not {cond}: break")
+                    if self.exits[-1][1] is None:
+                        self.exits[-1][1] = (len(self.lines) - 1, cond)
+                    i += 1
+                elif target > i:
+                    i = self.conditional(i, target, end)
+                else:
+                    raise TranslationError(f"JZ para trás fora de um ciclo: {arg}")
+                continue
+            if op == 'jump':
+                if arg != self.body_label:
+                    raise TranslationError(f"JUMP não estruturado: {arg}")
+                self.emit("continue")
+                i += 1
+                continue
+            if op == 'pusha':
+                i = self.call(i)
+                continue
+            self.instruction(op, arg)
+            i += 1
+
+    def loop(self, i, back):
+        """Ciclo de items[i] (label) até ao salto para trás em items[back]"""
+        items = self.items
+        op = items[back][0]
+        self.flush()
+        if self.vector_min is not None and op == 'jump':
+            self.vector_loop(i, back)
+        depth = len(self.stack)
+        self.line("while True:")
+        header = len(self.lines) - 1
+        self.indent += 1
+        exit_label = items[back + 1][1] if back + 1 < len(items) and items[back + 1][0] is None else None
+        self.exits.append([exit_label, None])
+        self.block(i + 1, back)
+        first_exit = self.exits.pop()[1]
+        if op == 'jz':
+            # REPEAT: volta ao início enquanto a condição for falsa
+            self.emit(f"if {self.pop().expr}: break")
+        elif first_exit and first_exit[0] == header + 1:
+            # WHILE/FOR: a condição é o primeiro statement do ciclo
+            self.lines[header] = self.lines[header].replace("while True:", f"while {first_exit[1]}:")
+            del self.lines[header + 1]
+        if len(self.stack) != depth:
+            raise TranslationError("Ciclo deixa valores na pilha")
+        self.indent -= 1
+        return back + 1
+
+    def conditional(self, i, target, end):
+        """JZ para a frente em items[i]: IF (com ou sem else) ou expressão condicional"""
+        items = self.items
+        cond = self.pop()
+        after = items[target - 1]
+        has_else = (after[0] == 'jump' and after[1] in self.positions and
+                    target < self.positions[after[1]] <= end)
+        if has_else:
+            join = self.positions[after[1]]
+            then_items = items[i + 1:target - 1]
+            else_items = items[target + 1:join]
+            if (len(then_items) == 1 and len(else_items) == 1 and
+                    then_items[0][0] in PUSHES and else_items[0][0] in PUSHES):
+                # Escrita de booleanos: uma constante em cada ramo
+                self.instruction(*then_items[0])
+                self.instruction(*else_items[0])
+                no, yes = self.pop(), self.pop()
+                self.push(Entry('val', f"({yes.expr} if {cond.expr} else {no.expr})",
+                                call=cond.call or yes.call or no.call))
+                return join + 1
+        self.flush()
+        self.line(f"if {cond.expr}:")
+        self.branch(i + 1, target - 1 if has_else else target)
+        if has_else:
+            self.line("else:")
+            self.branch(target + 1, join)
+            return join + 1
+        return target + 1
+
+    def branch(self, i, end):
+        """Ramo de um IF (não pode deixar valores na pilha)"""
+        depth = len(self.stack)
+        self.indent += 1
+        mark = len(self.lines)
+        self.block(i, end)
+        if len(self.stack) != depth:
+            raise TranslationError("Ramo de um IF deixa valores na pilha")
+        if len(self.lines) == mark:
+            self.line("pass")
+        self.indent -= 1
+
+    # ------------------------------------------------------------------------
+    # Ciclos vetorizados (NumPy)
+    #
+    # Um FOR crescente cujo corpo é um único statement
+    #   a[i + c] := expressão       (map)
+    #   s := s + expressão          (redução; também -, e + com s à direita)
+    # em que a expressão só usa +, -, *, /, conversões para real, constantes,
+    # variáveis que o corpo não altera, o próprio i e elementos a[i + c] de
+    # arrays, é antecedido por uma tentativa de o executar com NumPy. Se a
+    # tentativa resultar, i passa para o fim e o ciclo normal não tem iterações.
+
+    def vector_loop(self, i, back):
+        """Emite a versão NumPy do FOR de items[i] a items[back], se tiver a forma acima"""
+        items = self.items
+        if back - i < 10 or back + 1 >= len(items):
+            return
+        (var_op, var_arg), (end_op, end_arg), compare, exit_jump = items[i + 1:i + 5]
+        if var_op not in ('pushg', 'pushl') or end_op not in ('pushi', 'pushg', 'pushl'):
+            return
+        if compare[0] != 'infeq' or exit_jump != ('jz', items[back + 1][1]):
+            return
+        store = 'storeg' if var_op == 'pushg' else 'storel'
+        if items[back - 4:back] != [(var_op, var_arg), ('pushi', '1'), ('add', ''), (store, var_arg)]:
+            return
+        var = self.slot_key(var_op, var_arg)
+        if var in self.boxed or self.kinds.get(var):
+            return
+        statement = self.vector_statement(items[i + 5:back - 4], var)
+        if statement is None:
+            return
+        end = self.slot_key(end_op, end_arg) if end_op != 'pushi' else None
+        if end == var or (statement[0] == 'reduce' and end == statement[1]):
+            return  # O limite tem de ser constante durante o ciclo
+        index = self.slot_expr(var)
+        last = literal(int(end_arg)) if end is None else self.slot_expr(end)
+        operands = []
+        if statement[0] == 'map':
+            _, target, offset, value = statement
+            function, bound = self.vector_function(value, operands)
+            self.line(f"if {last} - {index} >= {self.vector_min - 1} and vector_map({self.slot_expr(target)}, "
+                      f"{offset}, {index}, {last}, ({''.join(o + ', ' for o in operands)}), {function}, {bound}):")
+            self.indent += 1
+        else:
+            _, total, op, term = statement
+            function, bound = self.vector_function(term, operands, op in INTEGER_OPS)
+            self.line(f"if {last} - {index} >= {self.vector_min - 1}:")
+            self.indent += 1
+            result = self.temp(f"vector_reduce({self.slot_expr(total)}, '{VECTOR_OPS[op]}', {index}, {last}, "
+                               f"({''.join(o + ', ' for o in operands)}), {function}, {bound}, {op in INTEGER_OPS})")
+            self.line(f"if {result} is not None:")
+            self.indent += 1
+            self.assign(total, result)
+        self.assign(var, f"{last} + 1")
+        self.indent -= 1 if statement[0] == 'map' else 2
+
+    def slot_key(self, op, arg):
+        """Slot de PUSHG/STOREG ou PUSHL/STOREL"""
+        return ('g', int(arg)) if op in ('pushg', 'storeg') else (self.label, int(arg))
+
+    def slot_expr(self, key):
+        """Expressão Python do valor de um slot"""
+        return self.slot(key, f"g{key[1]}" if key[0] == 'g' else self.local_name(key[1])).expr
+
+    def assign(self, key, expr):
+        """Atribuição a um slot (sem passar pela pilha)"""
+        target = self.slot_expr(key)
+        if key[0] == 'g' and key not in self.boxed:
+            self.stored.add(target)
+        self.line(f"{target} = {expr}")
+
+    def vector_statement(self, body, var):
+        """
+        Árvore do único statement do corpo de um FOR, se for vetorizável.
+
+        Returns:
+            ('map', array, deslocamento, valor) ou ('reduce', variável, operação, termo)
+            ou None; nós das expressões: ('const', v), ('var', slot), ('i',),
+            ('elem', array, deslocamento), ('itof', x), (instrução, esquerda, direita)
+        """
+        stack = []
+        statement = None
+        try:
+            for op, arg in body:
+                if statement is not None:
+                    return None  # Mais do que um statement
+                if op in ('pushi', 'pushf'):
+                    stack.append(('const', int(arg) if op == 'pushi' else float(arg)))
+                elif op in ('pushg', 'pushl'):
+                    key = self.slot_key(op, arg)
+                    kind = self.kinds.get(key)
+                    if key == var:
+                        stack.append(('i',))
+                    elif kind == 'list' and key not in self.boxed:
+                        stack.append(('list', key))
+                    elif kind is None:
+                        stack.append(('var', key))
+                    else:
+                        return None
+                elif op == 'padd':
+                    index, base = stack.pop(), stack.pop()
+                    affine = self.affine(index)
+                    if base[0] != 'list' or affine is None or affine[0] != 1:
+                        return None
+                    stack.append(('addr', base[1], affine[1]))
+                elif op == 'load' and arg in ('', '0'):
+                    address = stack.pop()
+                    if address[0] != 'addr':
+                        return None
+                    stack.append(('elem',) + address[1:])
+                elif op in VECTOR_OPS:
+                    right, left = stack.pop(), stack.pop()
+                    stack.append((op, left, right))
+                elif op == 'itof':
+                    stack.append(('itof', stack.pop()))
+                elif op == 'store' and arg in ('', '0'):
+                    value, address = stack.pop(), stack.pop()
+                    if address[0] != 'addr':
+                        return None
+                    statement = ('map', address[1], address[2], value)
+                elif op in ('storeg', 'storel'):
+                    statement = ('reduce', self.slot_key(op.replace('store', 'push'), arg), stack.pop())
+                else:
+                    return None
+        except IndexError:
+            return None
+        if statement is None or stack:
+            return None
+        if any(leaf[0] in ('list', 'addr') for leaf in self.leaves(statement[-1])):
+            return None
+        if statement[0] == 'map':
+            return statement  # Leituras do próprio array destino: ver vector_map
+        _, total, value = statement
+        if total == var or total in self.boxed or self.kinds.get(total) or value[0] not in VECTOR_OPS:
+            return None
+        op, left, right = value
+        if left == ('var', total) and op not in ('mul', 'fmul', 'fdiv'):
+            term = right
+        elif right == ('var', total) and op in ('add', 'fadd'):
+            term = left
+        else:
+            return None
+        if ('var', total) in self.leaves(term):
+            return None
+        return 'reduce', total, op, term
+
+    def leaves(self, node):
+        """Folhas de uma árvore de expressão (vector_statement)"""
+        if node[0] in VECTOR_OPS:
+            yield from self.leaves(node[1])
+            yield from self.leaves(node[2])
+        elif node[0] == 'itof':
+            yield from self.leaves(node[1])
+        else:
+            yield node
+
+    def affine(self, node):
+        """Índice da forma a * i + b: (a, b), ou None"""
+        if node == ('i',):
+            return 1, 0
+        if node[0] == 'const' and isinstance(node[1], int):
+            return 0, node[1]
+        if node[0] in ('add', 'sub'):
+            left, right = self.affine(node[1]), self.affine(node[2])
+            if left is None or right is None:
+                return None
+            sign = 1 if node[0] == 'add' else -1
+            return left[0] + sign * right[0], left[1] + sign * right[1]
+        return None
+
+    def vector_function(self, node, operands, integer=False):
+        """
+        Código das duas lambdas de um ciclo vetorizado: a expressão NumPy (sobre
+        os operandos v0, v1, ...) e o majorante do valor absoluto das partes
+        inteiras (sobre os máximos m0, m1, ... de cada operando), que tem de
+        caber em int64 (integer: a própria expressão é um termo de uma soma
+        inteira). Acrescenta os operandos (tipo, valor, deslocamento) a operands.
+        """
+        bounds = []                 # Majorantes das subárvores inteiras mais altas
+
+        def expression(node, integer):
+            kind = node[0]
+            if kind in VECTOR_OPS:
+                op_integer = kind in INTEGER_OPS
+                left, right = expression(node[1], op_integer), expression(node[2], op_integer)
+                function = (f"vector_divide({left[0]}, {right[0]})" if kind == 'fdiv' else
+                            f"({left[0]} {VECTOR_OPS[kind]} {right[0]})")
+                result = (function,
+                          f"({left[1]} {'*' if kind == 'mul' else '+'} {right[1]})")
+                if op_integer and not integer:
+                    bounds.append(result[1])
+                return result
+            if kind == 'itof':
+                inner = expression(node[1], True)
+                bounds.append(inner[1])
+                return f"as_real({inner[0]})", inner[1]
+            if kind == 'const':
+                return literal(node[1]), literal(abs(node[1]))
+            name = len(operands)
+            if kind == 'elem':
+                operands.append(f"('a', {self.slot_expr(node[1])}, {node[2]})")
+            elif kind == 'var':
+                operands.append(f"('s', {self.slot_expr(node[1])}, 0)")
+            else:
+                operands.append("('i', None, 0)")
+            return f"v{name}", f"m{name}"
+
+        function, root = expression(node, False)
+        if integer:
+            bounds.append(root)
+        names = ', '.join(f"v{n}" for n in range(len(operands)))
+        maxima = ', '.join(f"m{n}" for n in range(len(operands)))
+        bound = f"max({', '.join(bounds)}, 0)" if bounds else '0'
+        return f"lambda {names}: {function}", f"lambda {maxima}: {bound}"
+
+    # ------------------------------------------------------------------------
+    # Chamadas
+
+    def call(self, i):
+        """PUSHA + CALL (+ POP n): chamada de um subprograma ou de uma rotina de leitura"""
+        items = self.items
+        label = items[i][1]
+        if items[i + 1][0] != 'call':
+            raise TranslationError("PUSHA sem CALL")
+        if label in READ_ROUTINES:
+            self.pop()  # Espaço do resultado
+            self.push(Entry('val', f"read_number({READ_ROUTINES[label]})", call=True))
+            return i + 2
+        n = self.params[label]
+        args = self.stack[len(self.stack) - n:] if n else []
+        del self.stack[len(self.stack) - n:]
+        for index, arg in enumerate(args):
+            self.note((label, index - n), arg)
+        values = [arg.value() for arg in args]
+        i += 2
+        if n:
+            i += 1  # POP n
+        if label.startswith('func'):
+            result = self.pop()
+            self.push(Entry('val', f"{label}({', '.join([result.value()] + values)})", call=True))
+        else:
+            self.emit(f"{label}({', '.join(values)})")
+        return i
+
+    def subprogram(self, start, end):
+        """Função Python de um subprograma (de items[start], o label, até ao RETURN em items[end])"""
+        items = self.items
+        label = items[start][1]
+        n = self.params[label]
+        is_function = label.startswith('func')
+        self.enter(label, n)
+        # Epílogo: POP k (locais) antes do RETURN
+        k = self.epilogue_size(end)
+        body_end = end - 1 if k else end
+
+        # Prólogo: valores iniciais das locais (PUSH* ou PUSHI n + ALLOCN)
+        i = start + 1
+        while len(self.stack) < k:
+            self.instruction(*items[i])
+            i += 1
+        locals_ = self.stack
+        self.stack = []
+        boxed = self.boxed
+        names = ["res"] if is_function else []
+        names += [f"p{index}" for index in range(n)]
+        for address in range(-(n + 1) if is_function else -n, 0):
+            if (label, address) in boxed:
+                name = self.local_name(address)
+                self.line(f"b_{name} = [{name}]")
+        for address, entry in enumerate(locals_):
+            self.note((label, address), entry)
+            if (label, address) in boxed:
+                self.line(f"b_l{address} = [{entry.value()}]")
+            else:
+                self.line(f"l{address} = {entry.value()}")
+
+        if i < body_end and items[i][0] is None and items[i][1].startswith(TAIL_LABEL):
+            # Recursão em cauda: o corpo é um ciclo e cada chamada em cauda um continue
+            self.body_label = items[i][1]
+            self.line("while True:")
+            self.indent += 1
+            self.block(i + 1, body_end)
+            self.line("break")
+            self.indent -= 1
+        else:
+            self.block(i, body_end)
+        self.check_empty()
+        if is_function:
+            self.line(f"return {'b_res[0]' if (label, -(n + 1)) in boxed else 'res'}")
+        header = [f"    def {label}({', '.join(names)}):"]
+        if self.stored:
+            header.append(f"        nonlocal {', '.join(sorted(self.stored, key=lambda g: int(g[1:])))}")
+        body = self.lines or ["        pass"]
+        return header + body
+
+    # ------------------------------------------------------------------------
+    # Instruções
+
+    def instruction(self, op, arg):
+        """Uma instrução sem saltos: atualiza a pilha simulada ou emite um statement"""
+        if op == 'pushi':
+            self.push(constant(int(arg)))
+        elif op == 'pushf':
+            self.push(constant(float(arg)))
+        elif op == 'pushs':
+            self.push(Entry('val', repr(unescape_string(arg[1:-1])), atom=True))
+        elif op == 'pushg':
+            self.push(self.slot(('g', int(arg)), f"g{arg}"))
+        elif op == 'storeg':
+            address = int(arg)
+            value = self.pop()
+            if address == self.read_length:
+                # Reinício da leitura de vários valores (o resto da linha é descartado)
+                self.emit("rt.line = ''")
+            else:
+                self.store_slot(('g', address), f"g{address}", value)
+        elif op == 'pushl':
+            address = int(arg)
+            self.push(self.slot((self.label, address), self.local_name(address)))
+        elif op == 'storel':
+            address = int(arg)
+            self.store_slot((self.label, address), self.local_name(address), self.pop())
+        elif op in ('pushgp', 'pushfp'):
+            self.push(Entry(op[4:], None))
+        elif op == 'padd':
+            offset, base = self.pop(), self.pop()
+            if base.kind in ('gp', 'fp'):
+                address = int(offset.expr.strip('()'))
+                if base.kind == 'gp':
+                    self.push(Entry('addr', f"gb{address}", '0'))
+                else:
+                    self.push(Entry('addr', f"b_{self.local_name(address)}", '0'))
+            elif base.kind == 'addr':
+                self.push(Entry('addr', base.expr, f"({base.index} + {offset.expr})", call=offset.call))
+            else:
+                self.push(Entry('addr', base.expr, offset.expr, call=base.call or offset.call))
+        elif op == 'load':
+            self.push(Entry('val', self.target(self.pop(), int(arg or 0))))
+        elif op == 'store':
+            value, address = self.pop(), self.pop()
+            if value.call:
+                # A VM calcula o endereço antes do valor
+                self.stack.append(address)
+                self.flush()
+                self.stack.pop()
+            self.emit(f"{self.target(address, int(arg or 0))} = {value.value()}")
+        elif op == 'allocn':
+            size = self.pop()
+            self.push(Entry('list', f"[0] * {size.expr}"))
+        elif op in BINARY:
+            b, a = self.pop(), self.pop()
+            self.push(Entry('val', BINARY[op].format(a.expr, b.expr), call=a.call or b.call))
+        elif op in ('div', 'mod'):
+            b, a = self.pop(), self.pop()
+            function = 'int_div' if op == 'div' else 'int_mod'
+            if a.atom and b.atom:
+                # Caso comum (operandos não negativos) sem chamar a função
+                fast = '//' if op == 'div' else '%'
+                test = f"{a.expr} >= 0" if b.expr.isdigit() and int(b.expr) > 0 else f"{a.expr} >= 0 and {b.expr} > 0"
+                expr = f"({a.expr} {fast} {b.expr} if {test} else {function}({a.expr}, {b.expr}))"
+            else:
+                expr = f"{function}({a.expr}, {b.expr})"
+            self.push(Entry('val', expr, call=a.call or b.call))
+        elif op in COMPARISON:
+            b, a = self.pop(), self.pop()
+            self.push(Entry('val', f"({a.expr} {COMPARISON[op]} {b.expr})", bool_=True, call=a.call or b.call))
+        elif op in ('and', 'or'):
+            b, a = self.pop(), self.pop()
+            # Os dois operandos são sempre avaliados (como na VM): & e | em vez de and/or
+            left = a.expr if a.bool else f"bool({a.expr})"
+            right = b.expr if b.bool else f"bool({b.expr})"
+            symbol = '&' if op == 'and' else '|'
+            self.push(Entry('val', f"({left} {symbol} {right})", bool_=True, call=a.call or b.call))
+        elif op == 'not':
+            a = self.pop()
+            self.push(Entry('val', f"(not {a.expr})", bool_=True, call=a.call))
+        elif op in UNARY:
+            a = self.pop()
+            self.push(Entry('val', UNARY[op].format(a.expr), call=a.call))
+        elif op == 'read':
+            self.push(Entry('val', "read_line()", call=True))
+        elif op in WRITES:
+            self.emit(WRITES[op].format(self.pop().expr))
+        elif op == 'writeln':
+            self.emit("out('\\n')")
+        elif op == 'pop':
+            for _ in range(int(arg or 1)):
+                entry = self.pop()
+                if entry.call:
+                    self.emit(entry.value())
+        elif op == 'nop':
+            pass
+        else:
+            raise TranslationError(f"Instrução não suportada: {op}")
+
+    def target(self, entry, offset):
+        """Expressão da célula apontada por uma entrada (LOAD/STORE)"""
+        if entry.kind == 'addr':
+            index = entry.index if not offset else f"({entry.index} + {offset})"
+            return f"{entry.expr}[{index}]"
+        if entry.kind == 'list':
+            return f"{entry.expr}[{offset}]"
+        if entry.kind != 'ref':
+            self.unresolved = True
+        return f"{entry.expr}[0][{entry.expr}[1] + {offset}]" if offset else f"{entry.expr}[0][{entry.expr}[1]]"
+
+
+# ============================================================================
+# CICLOS VETORIZADOS (NUMPY)
+# ============================================================================
+# Funções chamadas pelo código gerado em vector_loop. Os operandos são tuplos
+#   ('a', lista, deslocamento)   elementos lista[i + deslocamento]
+#   ('s', valor, 0)              variável que o ciclo não altera
+#   ('i', None, 0)               a variável de controlo
+# function recebe os valores NumPy dos operandos e devolve o resultado de
+# todas as iterações; bound recebe o máximo do valor absoluto de cada operando
+# inteiro e devolve um majorante dos valores intermédios inteiros, que têm de
+# caber em int64 para o resultado ser igual ao dos inteiros Python.
+
+def as_real(value):
+    """ITOF numa expressão vetorizada"""
+    return numpy.asarray(value, dtype=numpy.float64)
+
+
+def vector_divide(a, b):
+    """FDIV numa expressão vetorizada (inf / 0 não é um erro de vírgula flutuante)"""
+    if numpy.any(numpy.asarray(b) == 0):
+        raise ZeroDivisionError
+    return numpy.true_divide(a, b)
+
+
+def vector_operands(start, end, operands):
+    """Valores NumPy e máximos absolutos dos operandos, ou None se algum não for int/float"""
+    count = end - start + 1
+    values, maxima = [], []
+    converted = {}              # (id da lista, deslocamento) -> (array, máximo)
+    for kind, value, offset in operands:
+        if kind == 'a':
+            first = start + offset
+            if type(value) is not list or first < 0 or first + count > len(value):
+                return None
+            key = (id(value), offset)
+            if key not in converted:
+                converted[key] = vector_array(value[first:first + count])
+                if converted[key] is None:
+                    return None
+            array, maximum = converted[key]
+            values.append(array)
+            maxima.append(maximum)
+        elif kind == 's':
+            if type(value) not in (int, float):
+                return None
+            maxima.append(abs(value) if type(value) is int else 0)
+            values.append(value)
+        else:
+            maxima.append(max(abs(start), abs(end)))
+            values.append(numpy.arange(start, end + 1, dtype=numpy.int64))
+    return values, maxima
+
+
+def vector_array(part):
+    """Array NumPy (int64 ou float64) dos valores de uma fatia de lista e o máximo absoluto dos inteiros, ou None"""
+    try:
+        array = numpy.array(part)
+    except (OverflowError, TypeError, ValueError):
+        return None
+    if array.dtype.kind == 'i':
+        return array, max(int(array.max()), -int(array.min()))
+    if array.dtype.kind != 'f':
+        return None  # Inteiros fora de int64, strings, booleanos, endereços, ...
+    # Reais (os zeros iniciais de ALLOCN são inteiros); inteiros acima de 2**63
+    # misturados com negativos também dão float64 e não podem ser arredondados
+    if not numpy.abs(array).max() < INT64_LIMIT and int in set(map(type, part)):
+        return None
+    return array, 0
+
+
+def vector_terms(start, end, operands, function, bound):
+    """Resultado de function para todas as iterações (array NumPy) e o majorante, ou (None, 0)"""
+    if type(start) is not int or type(end) is not int:
+        return None, 0
+    found = vector_operands(start, end, operands)
+    if found is None:
+        return None, 0
+    values, maxima = found
+    limit = bound(*maxima)
+    if limit >= INT64_LIMIT:
+        return None, 0
+    try:
+        # Divisões por zero (e inf - inf, ...) fazem o ciclo normal dar o erro
+        with numpy.errstate(divide='raise', invalid='raise', over='ignore'):
+            result = numpy.broadcast_to(function(*values), (end - start + 1,))
+    except (FloatingPointError, OverflowError, ZeroDivisionError):
+        return None, 0
+    if result.dtype.kind not in 'if':
+        return None, 0
+    return result, limit
+
+
+def vector_map(target, offset, start, end, operands, function, bound):
+    """
+    FOR i := start TO end DO target[i + offset] := expressão.
+
+    Returns:
+        bool: True se o ciclo foi executado (False: executar elemento a elemento)
+    """
+    count = end - start + 1
+    first = start + offset
+    if type(target) is not list or first < 0 or first + count > len(target):
+        return False
+    # Ler o destino numa posição anterior à escrita veria valores já atribuídos
+    if any(kind == 'a' and value is target and other < offset for kind, value, other in operands):
+        return False
+    result, _ = vector_terms(start, end, operands, function, bound)
+    if result is None:
+        return False
+    target[first:first + count] = result.tolist()
+    return True
+
+
+def vector_reduce(total, op, start, end, operands, function, bound, integer):
+    """
+    FOR i := start TO end DO total := total + termo (ou total - termo).
+
+    Returns:
+        o novo valor de total, ou None se o ciclo tiver de ser executado normalmente
+    """
+    terms, limit = vector_terms(start, end, operands, function, bound)
+    if terms is None:
+        return None
+    if integer:
+        # Soma exata em int64; o total pode ser um inteiro Python de qualquer tamanho
+        if terms.dtype.kind != 'i' or type(total) is not int or len(terms) * limit >= INT64_LIMIT:
+            return None
+        value = int(terms.sum())
+        return total + value if op == '+' else total - value
+    try:
+        start_value = float(total)
+    except (OverflowError, TypeError, ValueError):
+        return None
+    # Soma real da esquerda para a direita (accumulate), com os arredondamentos da VM
+    with numpy.errstate(all='ignore'):
+        ufunc = numpy.add if op == '+' else numpy.subtract
+        values = ufunc.accumulate(numpy.concatenate(([start_value], terms.astype(numpy.float64))))
+    return float(values[-1])
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+class Program:
+    """
+    Programa VM traduzido e compilado para código Python.
+
+    Args:
+        text (str): Código VM gerado pelo compilador
+        vectorize (bool): Executar os ciclos elemento a elemento reconhecidos com
+            NumPy (ignorado se o NumPy não estiver instalado)
+        vector_min (int): Número mínimo de iterações para usar a versão NumPy
+    """
+
+    def __init__(self, text, vectorize=True, vector_min=VECTOR_MIN):
+        translator = Translator(text, vector_min if vectorize and numpy is not None else None)
+        self.source = translator.translate()
+        namespace = {'int_div': int_div, 'int_mod': int_mod, 'real_div': real_div,
+                     'format_real': format_real, 'VMError': VMError, 'as_real': as_real,
+                     'vector_divide': vector_divide, 'vector_map': vector_map, 'vector_reduce': vector_reduce}
+        exec(compile(self.source, '<pas_aot>', 'exec'), namespace)
+        self.function = namespace['program']
+        self.runtime = Runtime(translator.prompts)
+
+    def run(self, input_lines=None, stdout=None):
+        """Executa o programa; erros de execução são VMError, como na VM"""
+        runtime = self.runtime
+        del runtime.output[:]
+        runtime.stdout = stdout
+        runtime.input = iter(input_lines or [])
+        runtime.line, runtime.position = '', 0
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, RECURSION_LIMIT))
+        try:
+            self.function(runtime)
+        except RecursionError:
+            raise VMError("Recursão demasiado profunda") from None
+        except (IndexError, TypeError, ValueError, KeyError, OverflowError, ZeroDivisionError) as e:
+            raise VMError(f"{type(e).__name__}: {e}") from None
+        finally:
+            sys.setrecursionlimit(limit)
+            runtime.flush()
+        return self
+
+    def output(self):
+        """Texto escrito pelo programa (quando não foi indicado stdout)"""
+        return ''.join(self.runtime.output)
+
+
+def translate(text):
+    """Código fonte Python de um programa VM (TranslationError se não tiver a estrutura do compilador)"""
+    return Translator(text).translate()
+
+
+def load(code, vectorize=True, **options):
+    """
+    Compila um programa Pascal e traduz o código VM para Python.
+
+    Args:
+        code (str): Código fonte Pascal
+        vectorize (bool): Usar NumPy nos ciclos elemento a elemento (ver Program)
+        **options: Opções de compile_program (inline_budget, tail_calls, ...)
+
+    Returns:
+        tuple: (Program ou None se houve erros, lista de Diagnostic)
+    """
+    from pas_yacc import compile_program
+    text, diagnostics = compile_program(code, **options)
+    if text is None:
+        return None, diagnostics
+    return Program(text, vectorize), diagnostics
+
+
+def run_source(code, input_lines=None, **options):
+    """Atalho: compila, traduz e executa um programa; devolve a saída (ValueError se houver erros)"""
+    program, diagnostics = load(code, **options)
+    if program is None:
+        raise ValueError("\n".join(str(d) for d in diagnostics))
+    return program.run(input_lines).output()
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Tradução de programas VM para Python (AOT)")
+    args.add_argument('source', help="ficheiro Pascal ou .vm")
+    args.add_argument('--no-prompt', action='store_true', help="não mostrar o prompt '? ' antes de cada leitura")
+    args.add_argument('--python', action='store_true', help="mostrar o código Python gerado em vez de executar")
+    args.add_argument('--no-vectorize', action='store_true', help="não usar NumPy nos ciclos elemento a elemento")
+    options = args.parse_args()
+    with open(options.source, encoding='utf-8') as f:
+        code = f.read()
+    if options.source.endswith('.vm'):
+        program = Program(code, not options.no_vectorize)
+    else:
+        program, diagnostics = load(code, not options.no_vectorize, read_prompts=not options.no_prompt)
+        for diagnostic in diagnostics:
+            print(diagnostic, file=sys.stderr)
+        if program is None:
+            sys.exit(1)
+    if options.python:
+        print(program.source, end='')
+        sys.exit(0)
+    try:
+        program.run((line.rstrip('\n') for line in sys.stdin), sys.stdout)
+    except VMError as e:
+        print(f"\nErro de execução: {e}", file=sys.stderr)
+        sys.exit(1)
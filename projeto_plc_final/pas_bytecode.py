@@ -0,0 +1,254 @@
+# Formato binário (bytecode) para o código VM gerado pelo compilador
+# Alternativa compacta ao texto: um byte por opcode, operandos inteiros em
+# varint, strings e reais numa tabela de constantes partilhada e saltos já
+# resolvidos (deslocamento relativo). O carregador lê o ficheiro com mmap.
+#
+# Estrutura do ficheiro:
+#   MAGIC, versão (1 byte)
+#   constantes: n, e para cada uma: tipo (0 = string, 1 = real) + dados
+#   labels:     n, e para cada um: nome + índice da instrução (só para depuração/profiler)
+#   código:     n, e para cada instrução: opcode (1 byte) + operando (conforme o opcode)
+# Todos os inteiros são varints (LEB128); os inteiros com sinal usam zigzag.
+import mmap
+import struct
+import sys
+
+from pas_vm import OPCODES, OP, LABEL_OPS, INT_OPS, Program, VMError, parse_program
+
+MAGIC = b'PASB'
+VERSION = 1
+
+CONST_STRING = 0
+CONST_REAL = 1
+
+# Classe do operando de cada opcode
+OPERAND_NONE, OPERAND_INT, OPERAND_LABEL, OPERAND_CONST = range(4)
+OPERANDS = [OPERAND_NONE] * len(OPCODES)
+for _name in INT_OPS:
+    OPERANDS[OP[_name]] = OPERAND_INT
+for _name in LABEL_OPS:
+    OPERANDS[OP[_name]] = OPERAND_LABEL
+OPERANDS[OP['pushs']] = OPERAND_CONST
+OPERANDS[OP['pushf']] = OPERAND_CONST
+
+REAL = struct.Struct('>d')
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def write_varint(out, value):
+    """Acrescenta a out (bytearray) um inteiro não negativo em LEB128"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_signed(out, value):
+    """Acrescenta um inteiro com sinal (codificação zigzag: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...)"""
+    write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def write_bytes(out, data):
+    """Acrescenta uma sequência de bytes precedida do seu comprimento"""
+    write_varint(out, len(data))
+    out += data
+
+
+def encode(program):
+    """
+    Converte um programa VM em bytecode.
+
+    Args:
+        program: Texto VM (saída de p_program) ou Program já carregado
+
+    Returns:
+        bytes: Programa em formato binário
+    """
+    if isinstance(program, str):
+        program = parse_program(program)
+
+    # Tabela de constantes: cada string/real distinto aparece uma só vez
+    constants = {}
+    pool = []
+    body = bytearray()
+    write_varint(body, len(program.code))
+    for pc, (op, arg) in enumerate(program.code):
+        body.append(op)
+        kind = OPERANDS[op]
+        if kind == OPERAND_INT:
+            write_signed(body, arg)
+        elif kind == OPERAND_LABEL:
+            write_signed(body, arg - pc)  # Deslocamento relativo (saltos curtos ocupam 1 byte)
+        elif kind == OPERAND_CONST:
+            # Reais comparados pelos bytes (0.0 == -0.0, mas são constantes diferentes)
+            key = arg if isinstance(arg, str) else REAL.pack(arg)
+            if key not in constants:
+                constants[key] = len(pool)
+                pool.append(arg)
+            write_varint(body, constants[key])
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    write_varint(out, len(pool))
+    for value in pool:
+        if isinstance(value, str):
+            out.append(CONST_STRING)
+            write_bytes(out, value.encode('utf-8'))
+        else:
+            out.append(CONST_REAL)
+            out += REAL.pack(value)
+    write_varint(out, len(program.labels))
+    for name, index in program.labels.items():
+        write_bytes(out, name.encode('utf-8'))
+        write_varint(out, index)
+    out += body
+    return bytes(out)
+
+
+def write_file(path, program):
+    """Escreve o bytecode de um programa (texto VM ou Program) num ficheiro"""
+    data = encode(program)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+# ============================================================================
+# LEITURA
+# ============================================================================
+
+class Disassembly:
+    """
+    Texto de cada instrução, gerado só quando é pedido (mensagens de erro da VM).
+    Substitui Program.names, que no formato binário não é guardado.
+    """
+
+    def __init__(self, code):
+        self.code = code
+
+    def __len__(self):
+        return len(self.code)
+
+    def __getitem__(self, pc):
+        op, arg = self.code[pc]
+        if OPERANDS[op] == OPERAND_NONE:
+            return OPCODES[op]
+        if OPCODES[op] == 'pushs':
+            arg = '"' + arg.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        return f"{OPCODES[op]} {arg}"
+
+
+def decode(data):
+    """
+    Converte bytecode (bytes, memoryview ou mmap) num Program.
+
+    Raises:
+        VMError: Se os dados não forem bytecode válido
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise VMError("Ficheiro não é bytecode da VM (assinatura inválida)")
+    if len(data) <= len(MAGIC):
+        raise VMError("Bytecode truncado")
+    if data[len(MAGIC)] != VERSION:
+        raise VMError(f"Versão de bytecode não suportada: {data[len(MAGIC)]}")
+    pos = len(MAGIC) + 1
+    end = len(data)
+
+    # Varints lidos em linha (evita uma chamada de função por operando)
+    def varint():
+        nonlocal pos
+        result = shift = 0
+        while True:
+            if pos >= end:
+                raise VMError("Bytecode truncado")
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def text():
+        nonlocal pos
+        size = varint()
+        if pos + size > end:
+            raise VMError("Bytecode truncado")
+        pos += size
+        try:
+            return bytes(data[pos - size:pos]).decode('utf-8')
+        except UnicodeDecodeError:
+            raise VMError("Bytecode inválido: texto não é UTF-8") from None
+
+    pool = []
+    for _ in range(varint()):
+        if pos >= end:
+            raise VMError("Bytecode truncado")
+        tag = data[pos]
+        pos += 1
+        if tag == CONST_STRING:
+            pool.append(text())
+        elif tag == CONST_REAL:
+            if pos + REAL.size > end:
+                raise VMError("Bytecode truncado")
+            pool.append(REAL.unpack_from(data, pos)[0])
+            pos += REAL.size
+        else:
+            raise VMError(f"Tipo de constante inválido: {tag}")
+
+    labels = {}
+    for _ in range(varint()):
+        name = text()
+        labels[name] = varint()
+
+    code = []
+    append = code.append
+    operands = OPERANDS
+    try:
+        for pc in range(varint()):
+            op = data[pos]
+            pos += 1
+            kind = operands[op]
+            if kind == OPERAND_NONE:
+                append((op, None))
+                continue
+            # Varint (quase sempre 1 byte: caminho rápido)
+            value = data[pos]
+            pos += 1
+            if value >= 0x80:
+                pos -= 1
+                value = varint()
+            if kind == OPERAND_CONST:
+                append((op, pool[value]))
+            else:
+                value = (value >> 1) ^ -(value & 1)  # Desfaz o zigzag
+                append((op, value + pc if kind == OPERAND_LABEL else value))
+    except IndexError:
+        raise VMError("Bytecode truncado ou inválido") from None
+    return Program(code, labels, Disassembly(code))
+
+
+def load(path):
+    """Carrega um ficheiro de bytecode (mapeado em memória com mmap) e devolve o Program"""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return decode(data)
+
+
+def is_bytecode(path):
+    """Verifica se um ficheiro começa pela assinatura do formato binário"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+if __name__ == '__main__':
+    # Uso: python pas_bytecode.py programa.vm programa.pasb   (texto -> binário)
+    if len(sys.argv) != 3:
+        print("Uso: python pas_bytecode.py programa.vm programa.pasb")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        text = f.read()
+    size = write_file(sys.argv[2], text)
+    print(f"{len(text.encode('utf-8'))} bytes (texto) -> {size} bytes (bytecode)")
@@ -0,0 +1,800 @@
+# Estimativa estática do custo de programas compilados: sem executar o
+# programa, o código VM gerado pelo compilador é percorrido e o número de
+# instruções executadas é dado por uma fórmula nas variáveis do programa
+# (tipicamente os valores lidos com READ), para escolher timeouts e agendar os
+# trabalhos mais pesados antes de os correr.
+# Uso: python pas_cost.py programa.pas [--set n=1000 ...] [--blocks]
+#      (um ficheiro .vm é analisado diretamente, sem nomes de variáveis nem linhas)
+#
+# O código do compilador é estruturado (ver pas_aot): a análise reconstrói os
+# ciclos, os IF e as chamadas e soma o custo de cada parte:
+#   bloco básico       número de instruções (entre labels, saltos e chamadas)
+#   FOR                o corpo é somado para v = início..fim (somas de potências:
+#                      o custo do corpo pode depender de v, como num FOR interior
+#                      de j := i to n); iterações = fim - início + 1
+#   WHILE/REPEAT       o número de iterações é um símbolo (o label do ciclo)
+#   IF                 o maior dos dois ramos (coeficiente a coeficiente)
+#   chamada            o custo do subprograma, com os parâmetros substituídos
+#                      pelos argumentos; num subprograma recursivo, o custo de
+#                      uma ativação vezes o símbolo chamadas_<nome>
+# Os valores dos limites são seguidos simbolicamente (PUSHI, PUSHG/PUSHL e
+# +, -, *): uma variável com valor desconhecido (lido, calculado com DIV...)
+# entra na fórmula com o seu nome.
+#
+# Pressupostos: as variáveis da fórmula não são negativas e o fim de cada FOR
+# não é menor do que início - 1 (com limites constantes, um FOR vazio conta 0
+# iterações). Com estes pressupostos a estimativa é um majorante, exceto nas
+# rotinas de leitura (custo fixo: o tamanho da rotina, por número lido).
+import argparse
+import math
+import sys
+from fractions import Fraction
+
+from pas_aot import READ_ROUTINES, TAIL_LABEL, TranslationError, Translator
+from pas_profile import LOOP_KINDS, LOOP_LABEL
+from pas_yacc import compile_program, parser
+
+
+class CostError(Exception):
+    """Código que a análise não sabe percorrer (não gerado pelo compilador)"""
+
+
+# ============================================================================
+# POLINÓMIOS
+# ============================================================================
+
+class Poly:
+    """
+    Polinómio com coeficientes racionais nas variáveis do programa.
+
+    Cada monómio é um tuplo ordenado de (nome, expoente); o polinómio constante
+    tem o monómio ().
+    """
+
+    __slots__ = ('terms',)
+
+    def __init__(self, terms=None):
+        self.terms = {monomial: c for monomial, c in (terms or {}).items() if c}
+
+    @classmethod
+    def const(cls, value):
+        return cls({(): Fraction(value)})
+
+    @classmethod
+    def var(cls, name):
+        return cls({((name, 1),): Fraction(1)})
+
+    @staticmethod
+    def lift(value):
+        return value if isinstance(value, Poly) else Poly.const(value)
+
+    def is_constant(self):
+        return all(monomial == () for monomial in self.terms)
+
+    def constant(self):
+        return self.terms.get((), Fraction(0))
+
+    def variables(self):
+        return {name for monomial in self.terms for name, _ in monomial}
+
+    def __add__(self, other):
+        terms = dict(self.terms)
+        for monomial, c in Poly.lift(other).terms.items():
+            terms[monomial] = terms.get(monomial, 0) + c
+        return Poly(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Poly({monomial: -c for monomial, c in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + -Poly.lift(other)
+
+    def __rsub__(self, other):
+        return Poly.lift(other) - self
+
+    def __mul__(self, other):
+        terms = {}
+        for m1, c1 in self.terms.items():
+            for m2, c2 in Poly.lift(other).terms.items():
+                powers = dict(m1)
+                for name, power in m2:
+                    powers[name] = powers.get(name, 0) + power
+                monomial = tuple(sorted(powers.items()))
+                terms[monomial] = terms.get(monomial, 0) + c1 * c2
+        return Poly(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent):
+        result = Poly.const(1)
+        for _ in range(exponent):
+            result = result * self
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, Poly) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(frozenset(self.terms.items()))
+
+    def upper(self, other):
+        """Máximo coeficiente a coeficiente: majorante dos dois (variáveis >= 0)"""
+        terms = dict(self.terms)
+        for monomial, c in other.terms.items():
+            terms[monomial] = max(terms.get(monomial, 0), c)
+        for monomial in self.terms.keys() - other.terms.keys():
+            terms[monomial] = max(terms[monomial], 0)
+        return Poly(terms)
+
+    def powers(self, name):
+        """Coeficientes das potências de uma variável: {expoente: polinómio sem essa variável}"""
+        result = {}
+        for monomial, c in self.terms.items():
+            power = dict(monomial).get(name, 0)
+            rest = tuple(item for item in monomial if item[0] != name)
+            result[power] = result.get(power, Poly()) + Poly({rest: c})
+        return result
+
+    def substitute(self, values):
+        """Substitui variáveis por polinómios (ou números)"""
+        result = Poly()
+        for monomial, c in self.terms.items():
+            term = Poly.const(c)
+            for name, power in monomial:
+                term = term * (Poly.lift(values[name]) if name in values else Poly.var(name)) ** power
+            result = result + term
+        return result
+
+    def evaluate(self, values):
+        """
+        Valor do polinómio.
+
+        Raises:
+            CostError: Se faltar o valor de alguma variável
+        """
+        missing = self.variables() - values.keys()
+        if missing:
+            raise CostError(f"Falta o valor de: {', '.join(sorted(missing))}")
+        return self.substitute(values).constant()
+
+    def __str__(self):
+        if not self.terms:
+            return "0"
+        order = sorted(self.terms, key=lambda m: (-sum(p for _, p in m), m))
+        text = ""
+        for monomial in order:
+            c = self.terms[monomial]
+            names = "*".join(name if power == 1 else f"{name}^{power}" for name, power in monomial)
+            magnitude = abs(c)
+            if not names:
+                term = str(magnitude)
+            else:
+                term = names if magnitude.numerator == 1 else f"{magnitude.numerator}*{names}"
+                if magnitude.denominator != 1:
+                    term += f"/{magnitude.denominator}"
+            if not text:
+                text = term if c > 0 else f"-{term}"
+            else:
+                text += f" + {term}" if c > 0 else f" - {term}"
+        return text
+
+    __repr__ = __str__
+
+
+ZERO = Poly()
+ONE = Poly.const(1)
+
+# Somas de potências S_k(x) = 1^k + ... + x^k (fórmula de Faulhaber), na variável SUM_VAR
+SUM_VAR = '#x'
+_power_sums = []
+
+
+def power_sum(k):
+    """S_k(x) como polinómio em SUM_VAR"""
+    while len(_power_sums) <= k:
+        p = len(_power_sums)
+        # Números de Bernoulli B_j (com B_1 = +1/2)
+        bernoulli = [Fraction(1)]
+        for m in range(1, p + 1):
+            bernoulli.append(1 - sum(math.comb(m, j) * bernoulli[j] / (m - j + 1) for j in range(m)))
+        x = Poly.var(SUM_VAR)
+        _power_sums.append(sum((Fraction(math.comb(p + 1, j)) * bernoulli[j] / (p + 1) * x ** (p + 1 - j)
+                                for j in range(p + 1)), ZERO))
+    return _power_sums[k]
+
+
+def summation(poly, name, first, last):
+    """Soma de poly para name = first..last (válida para last >= first - 1)"""
+    result = ZERO
+    for power, coefficient in poly.powers(name).items():
+        s = power_sum(power)
+        result = result + coefficient * (s.substitute({SUM_VAR: last}) - s.substitute({SUM_VAR: first - 1}))
+    return result
+
+
+# ============================================================================
+# ANÁLISE
+# ============================================================================
+
+# Efeito na pilha das instruções sem tratamento especial: (valores retirados, valores postos)
+STACK_EFFECT = {
+    'pushf': (0, 1), 'pushs': (0, 1), 'pushgp': (0, 1), 'pushfp': (0, 1), 'read': (0, 1),
+    'load': (1, 1), 'store': (2, 0), 'padd': (2, 1), 'allocn': (1, 1),
+    'writei': (1, 0), 'writef': (1, 0), 'writes': (1, 0), 'writeln': (0, 0),
+    'start': (0, 0), 'stop': (0, 0), 'nop': (0, 0), 'err': (0, 0),
+}
+for _op in ('div', 'mod', 'fadd', 'fsub', 'fmul', 'fdiv', 'inf', 'infeq', 'sup', 'supeq',
+            'finf', 'finfeq', 'fsup', 'fsupeq', 'equal', 'and', 'or', 'concat', 'charat'):
+    STACK_EFFECT[_op] = (2, 1)
+for _op in ('not', 'itof', 'ftoi', 'atoi', 'atof', 'stri', 'strf', 'strlen'):
+    STACK_EFFECT[_op] = (1, 1)
+
+# Operações seguidas simbolicamente
+ARITHMETIC = {'add': Poly.__add__, 'sub': Poly.__sub__, 'mul': Poly.__mul__}
+
+# Comparação do cabeçalho de um FOR -> (sentido, o fim é incluído)
+FOR_COMPARE = {'infeq': (1, True), 'inf': (1, False), 'supeq': (-1, True)}
+
+
+class Estimator:
+    """
+    Custo de um programa VM: fórmula total, frequência de cada bloco básico e
+    número de iterações de cada ciclo.
+    """
+
+    def __init__(self, text, names=None, source_map=None):
+        """
+        Args:
+            text (str): Código VM gerado pelo compilador
+            names (dict): Slot (('g', endereço) ou (label, endereço)) -> nome da variável
+            source_map (list): Instrução -> (linha, coluna) ou None (ver pas_yacc.build_source_map)
+        """
+        try:
+            code = Translator(text)
+        except TranslationError as e:
+            raise CostError(str(e)) from None
+        self.items = items = code.items
+        self.positions = code.positions
+        self.jumps = code.jumps
+        self.params = code.params
+        self.boxed = code.boxed
+        self.names = names or {}
+        self.source_map = source_map
+
+        # Posição em items -> número da instrução (os labels não são instruções)
+        self.index = {}
+        for i, (op, _) in enumerate(items):
+            if op is not None:
+                self.index[i] = len(self.index)
+
+        # Blocos básicos: começam depois de um label, salto ou chamada
+        self.leaders = {self.next_instruction(0)}
+        for i, (op, _) in enumerate(items):
+            if op in (None, 'jump', 'jz', 'call', 'return', 'start'):
+                self.leaders.add(self.next_instruction(i + 1))
+        self.leaders.discard(None)
+
+        # Subprogramas: região, globais atribuídas e subprogramas chamados
+        self.regions = {items[start][1]: (start, end) for start, end in code.regions}
+        self.owner = {}
+        direct = {}
+        self.callees = {}
+        for label, (start, end) in self.regions.items():
+            for i in range(start, end + 1):
+                self.owner[i] = label
+            direct[label] = {int(arg) for op, arg in items[start:end] if op == 'storeg'}
+            self.callees[label] = {arg for op, arg in items[start:end] if op == 'pusha' and arg in self.regions}
+            if any(op == 'jump' and arg.startswith(TAIL_LABEL) for op, arg in items[start:end]):
+                self.callees[label].add(label)  # Recursão em cauda
+        self.stores = {label: set().union(*(direct[other] for other in self.reachable(label)))
+                       for label in self.regions}
+        # Grupos de subprogramas mutuamente recursivos (componentes do grafo de chamadas)
+        self.groups = {}
+        for label in self.regions:
+            if label in self.reachable(label, strict=True):
+                self.groups[label] = frozenset(other for other in self.reachable(label, strict=True)
+                                               if label in self.reachable(other, strict=True))
+
+        self.memo = {}              # Label -> (custo de uma chamada/ativação, frequências)
+        self.active = set()         # Grupos recursivos a ser analisados
+        self.loops = []             # (label, tipo, posição, iterações) de cada ciclo
+        self.cost, self.counts = self.program(code)
+
+    def next_instruction(self, i):
+        """Posição da primeira instrução a partir de items[i] (None no fim)"""
+        while i < len(self.items) and self.items[i][0] is None:
+            i += 1
+        return i if i < len(self.items) else None
+
+    def reachable(self, label, strict=False):
+        """Subprogramas chamados (direta ou indiretamente) por label (incluindo-o se não strict)"""
+        found = set() if strict else {label}
+        pending = list(self.callees[label])
+        while pending:
+            other = pending.pop()
+            if other not in found:
+                found.add(other)
+                pending.extend(self.callees[other])
+        return found
+
+    # ------------------------------------------------------------------------
+    # Resultado
+
+    def program(self, code):
+        self.enter(None)
+        cost, counts = self.block(0, code.start)
+        main_cost, main_counts = self.block(code.start, code.stop + 1)
+        merge(counts, main_counts)
+        return cost + main_cost, counts
+
+    def line(self, i):
+        """Linha Pascal da instrução em items[i] (ou do label, pela instrução seguinte)"""
+        i = self.next_instruction(i)
+        if self.source_map is None or i is None or self.index[i] >= len(self.source_map):
+            return None
+        position = self.source_map[self.index[i]]
+        return position[0] if position else None
+
+    def blocks(self):
+        """Blocos básicos executados: (posição, linha, instruções do bloco, execuções)"""
+        result = []
+        for leader in sorted(self.counts):
+            end = leader + 1
+            while end < len(self.items) and end not in self.leaders:
+                end += 1
+            size = sum(1 for op, _ in self.items[leader:end] if op is not None)
+            result.append((leader, self.line(leader), size, self.counts[leader]))
+        return result
+
+    # ------------------------------------------------------------------------
+    # Estado simbólico: valores conhecidos dos slots e pilha
+
+    def enter(self, label):
+        self.label = label          # Subprograma analisado (None no programa principal)
+        self.env = {}               # Slot -> Poly (valor conhecido)
+        self.stack = []             # Valores na pilha (Poly ou None)
+
+    def slot_key(self, op, arg):
+        return ('g', int(arg)) if op in ('pushg', 'storeg') else (self.label, int(arg))
+
+    def symbol(self, key):
+        """Nome de um slot na fórmula"""
+        if key in self.names:
+            return self.names[key]
+        return f"g{key[1]}" if key[0] == 'g' else f"{key[0]}[{key[1]}]"
+
+    def value(self, key):
+        """Valor de um slot: o conhecido ou a variável com o nome do slot"""
+        value = self.env.get(key)
+        return value if value is not None else Poly.var(self.symbol(key))
+
+    def forget(self, keys):
+        for key in keys:
+            self.env.pop(key, None)
+
+    def forget_boxed(self):
+        """Uma escrita por endereço (STORE) pode alterar qualquer slot com o endereço tomado"""
+        self.forget([key for key in self.env if key in self.boxed])
+
+    def pop(self):
+        if not self.stack:
+            raise CostError("Pilha vazia")
+        return self.stack.pop()
+
+    def modified(self, i, end):
+        """Slots que items[i:end] pode alterar"""
+        keys = set()
+        for op, arg in self.items[i:end]:
+            if op in ('storeg', 'storel'):
+                keys.add(self.slot_key(op, arg))
+            elif op == 'store':
+                keys |= self.boxed
+            elif op == 'pusha':
+                keys |= {('g', a) for a in self.stores.get(arg, ())} | self.boxed
+        return keys
+
+    # ------------------------------------------------------------------------
+    # Blocos estruturados
+
+    def block(self, i, end):
+        """
+        Custo de items[i:end] (statements; a pilha pode ter valores pendentes).
+
+        Returns:
+            (Poly, dict): Instruções executadas e execuções de cada bloco básico
+        """
+        items = self.items
+        cost = ZERO
+        counts = {}
+        while i < end:
+            op, arg = items[i]
+            if i in self.leaders:
+                merge(counts, {i: ONE})
+            if op is None:
+                back = [j for j in self.jumps.get(arg, ()) if i < j < end]
+                if back and not arg.startswith(TAIL_LABEL):
+                    part, part_counts, i = self.loop(i, max(back))
+                    cost += part
+                    merge(counts, part_counts)
+                else:
+                    i += 1
+                continue
+            if op == 'jz' and i < self.positions[arg] <= end:
+                part, part_counts, i = self.conditional(i, end)
+            elif op == 'jump' and arg.startswith(TAIL_LABEL):
+                part, part_counts = ONE, {}  # Recursão em cauda (contada como uma ativação)
+                i += 1
+            elif op in ('jz', 'jump'):
+                raise CostError(f"Salto não estruturado: {op} {arg}")
+            elif op == 'pusha':
+                part, part_counts = self.call(arg)
+                i += 2
+            else:
+                self.instruction(op, arg)
+                part, part_counts = ONE, {}
+                i += 1
+            cost += part
+            merge(counts, part_counts)
+        return cost, counts
+
+    def instruction(self, op, arg):
+        """Efeito simbólico de uma instrução"""
+        stack = self.stack
+        if op == 'pushi':
+            stack.append(Poly.const(int(arg)))
+        elif op in ('pushg', 'pushl'):
+            stack.append(self.value(self.slot_key(op, arg)))
+        elif op in ('storeg', 'storel'):
+            key = self.slot_key(op, arg)
+            value = self.pop()
+            if value is None:
+                self.env.pop(key, None)
+            else:
+                self.env[key] = value
+        elif op in ARITHMETIC:
+            b, a = self.pop(), self.pop()
+            stack.append(ARITHMETIC[op](a, b) if a is not None and b is not None else None)
+        elif op == 'pushn':
+            stack.extend([Poly()] * int(arg or 1))
+        elif op == 'pop':
+            for _ in range(int(arg or 1)):
+                self.pop()
+        elif op == 'dup':
+            count = int(arg or 1)
+            if len(stack) < count:
+                raise CostError("Pilha vazia")
+            stack.extend(stack[len(stack) - count:])
+        elif op == 'swap':
+            b, a = self.pop(), self.pop()
+            stack += [b, a]
+        elif op in STACK_EFFECT:
+            popped, pushed = STACK_EFFECT[op]
+            for _ in range(popped):
+                self.pop()
+            stack.extend([None] * pushed)
+            if op == 'store':
+                self.forget_boxed()
+        else:
+            raise CostError(f"Instrução desconhecida: {op}")
+
+    def loop(self, i, back):
+        """
+        Ciclo de items[i] (label) até ao salto para trás em items[back].
+
+        Returns:
+            (Poly, dict, int): Custo, execuções dos blocos e posição depois do ciclo
+        """
+        items = self.items
+        label = items[i][1]
+        exit_label = items[back + 1][1] if back + 1 < len(items) and items[back + 1][0] is None else None
+        header = next((j for j in range(i + 1, back) if items[j] == ('jz', exit_label)), None)
+        modified = self.modified(i, back)
+        depth = len(self.stack)
+        entry = dict(self.env)
+        self.forget(modified)
+        result = None
+        if header is not None and items[back][0] == 'jump':
+            result = self.for_loop(i, header, back, entry)
+            if result is None:
+                # WHILE: o cabeçalho é executado uma vez mais do que o corpo
+                trips = Poly.var(label)
+                head, head_counts = self.block(i + 1, header)
+                self.pop()
+                body, body_counts = self.block(header + 1, back)
+                result = ((trips + 1) * (head + 1) + trips * (body + 1),
+                          {**scale(head_counts, trips + 1), **scale(body_counts, trips)})
+                self.note_loop(i, trips)
+        elif items[back][0] == 'jz':
+            # REPEAT: a condição está no fim do corpo
+            trips = Poly.var(label)
+            body, body_counts = self.block(i + 1, back)
+            self.pop()
+            result = (trips * (body + 1), scale(body_counts, trips))
+            self.note_loop(i, trips)
+        if result is None:
+            raise CostError(f"Ciclo não estruturado: {label}")
+        self.forget(modified)
+        if len(self.stack) != depth:
+            raise CostError("Ciclo deixa valores na pilha")
+        return result + (back + 1,)
+
+    def for_loop(self, i, header, back, entry):
+        """
+        FOR (ou leitura de um array com READLN, que tem a mesma forma):
+            variável := início
+            L: PUSHG/PUSHL v, fim, INFEQ/INF/SUPEQ, JZ saída
+               corpo
+               PUSHG/PUSHL v, PUSHI 1, ADD/SUB, STOREG/STOREL v, JUMP L
+        Um início ou fim com valor desconhecido fica como inicio_<label>/fim_<label>.
+
+        Args:
+            entry (dict): Valores dos slots à entrada do ciclo
+
+        Returns:
+            (Poly, dict) ou None se o ciclo não tiver esta forma
+        """
+        items = self.items
+        var_op, var_arg = items[i + 1]
+        compare = items[header - 1][0]
+        if var_op not in ('pushg', 'pushl') or compare not in FOR_COMPARE:
+            return None
+        step, inclusive = FOR_COMPARE[compare]
+        store = 'storeg' if var_op == 'pushg' else 'storel'
+        increment = [(var_op, var_arg), ('pushi', '1'), ('add' if step > 0 else 'sub', ''), (store, var_arg)]
+        if items[back - 4:back] != increment:
+            return None
+        key = self.slot_key(var_op, var_arg)
+        variable = self.symbol(key)
+        label = items[i][1]
+        first = entry.get(key, Poly.var(f"inicio_{label}"))
+        head, head_counts = self.block(i + 1, header - 1)
+        last = self.pop()
+        self.pop()
+        if last is None:
+            last = Poly.var(f"fim_{label}")
+        if variable in last.variables() | first.variables():
+            return None
+        if not inclusive:
+            last = last - 1
+        head += 2  # Comparação e JZ
+        trips = last - first + 1 if step > 0 else first - last + 1
+        if trips.is_constant() and trips.constant() <= 0:
+            trips = ZERO
+        self.note_loop(i, trips)
+        if trips == ZERO:
+            return head, head_counts
+        self.env[key] = Poly.var(variable)
+        body, body_counts = self.block(header + 1, back)
+        low, high = (first, last) if step > 0 else (last, first)
+        return ((trips + 1) * head + summation(body + 1, variable, low, high),
+                {**scale(head_counts, trips + 1),
+                 **{leader: summation(count, variable, low, high) for leader, count in body_counts.items()}})
+
+    def note_loop(self, i, trips):
+        match = LOOP_LABEL.match(self.items[i][1])
+        kind = LOOP_KINDS[match.group(1)] if match else 'ciclo'
+        self.loops.append((self.items[i][1], kind, i, trips))
+
+    def conditional(self, i, end):
+        """
+        JZ para a frente em items[i]: IF (com ou sem else) ou escrita de booleanos.
+        Conta o maior dos dois ramos; os blocos de ambos contam uma vez.
+
+        Returns:
+            (Poly, dict, int): Custo, execuções dos blocos e posição depois do IF
+        """
+        items = self.items
+        target = self.positions[items[i][1]]
+        self.pop()
+        after = items[target - 1]
+        has_else = (after[0] == 'jump' and after[1] in self.positions and
+                    target < self.positions[after[1]] <= end)
+        env, stack = dict(self.env), list(self.stack)
+        then_cost, counts = self.block(i + 1, target - 1 if has_else else target)
+        if not has_else:
+            # Sem else: o caminho alternativo não executa nada
+            self.join(env, stack)
+            return ONE + then_cost, counts, target + 1
+        join = self.positions[after[1]]
+        then_env, then_stack = self.env, self.stack
+        self.env, self.stack = env, stack
+        else_cost, else_counts = self.block(target + 1, join)
+        self.join(then_env, then_stack)
+        merge(counts, else_counts)
+        return ONE + (then_cost + 1).upper(else_cost), counts, join + 1
+
+    def join(self, env, stack):
+        """Junta o estado de outro caminho: só ficam os valores iguais nos dois"""
+        if len(stack) != len(self.stack):
+            raise CostError("Ramos de um IF com pilhas diferentes")
+        self.env = {key: value for key, value in self.env.items() if env.get(key) == value}
+        self.stack = [a if a == b else None for a, b in zip(self.stack, stack)]
+
+    def call(self, label):
+        """
+        PUSHA label, CALL: custo da chamada com os argumentos no topo da pilha.
+
+        Returns:
+            (Poly, dict): Custo e execuções dos blocos do subprograma
+        """
+        if label not in self.regions:
+            raise CostError(f"Chamada a um label desconhecido: {label}")
+        count = 0 if label in READ_ROUTINES else self.params.get(label, 0)
+        if len(self.stack) < count:
+            raise CostError("Pilha vazia")
+        arguments = self.stack[len(self.stack) - count:]
+        self.forget({('g', a) for a in self.stores[label]} | self.boxed)
+        # O resultado (de uma função) fica abaixo dos argumentos
+        for k in range(max(len(self.stack) - count - 1, 0), len(self.stack)):
+            self.stack[k] = None
+        if label in READ_ROUTINES:
+            # Rotina de leitura: custo fixo (ver o início do ficheiro)
+            start, end = self.regions[label]
+            return Poly.const(2 + sum(1 for op, _ in self.items[start:end + 1] if op is not None)), {}
+        group = self.groups.get(label)
+        if group and group in self.active:
+            return Poly.const(2), {}  # Chamada recursiva: contada em chamadas_<nome>
+        cost, counts = self.subprogram(label)
+        values = {self.param_name(label, k - count): argument
+                  for k, argument in enumerate(arguments) if argument is not None}
+        cost = cost.substitute(values)
+        return 2 + cost, {leader: n.substitute(values) for leader, n in counts.items()}
+
+    def param_name(self, label, address):
+        return self.symbol((label, address))
+
+    def subprogram(self, label):
+        """Custo de uma chamada a label (com os parâmetros como variáveis), memorizado"""
+        if label not in self.memo:
+            group = self.groups.get(label)
+            saved = self.label, self.env, self.stack
+            if group:
+                # Recursão: custo de uma ativação (o maior dos subprogramas do grupo),
+                # vezes o número de ativações
+                self.active.add(group)
+                activation, counts = ZERO, {}
+                for member in sorted(group):
+                    self.enter(member)
+                    member_cost, member_counts = self.block(*self.regions[member])
+                    activation = activation.upper(member_cost + 1)
+                    merge(counts, member_counts)
+                self.active.discard(group)
+                calls = Poly.var(f"chamadas_{self.subprogram_name(label)}")
+                self.memo[label] = (calls * activation, scale(counts, calls))
+            else:
+                self.enter(label)
+                cost, counts = self.block(*self.regions[label])
+                self.memo[label] = (cost + 1, counts)  # + RETURN
+            self.label, self.env, self.stack = saved
+        return self.memo[label]
+
+    def subprogram_name(self, label):
+        return self.names.get(label, label)
+
+
+def merge(counts, other):
+    for leader, count in other.items():
+        counts[leader] = counts.get(leader, ZERO) + count
+
+
+def scale(counts, factor):
+    return {leader: count * factor for leader, count in counts.items()}
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+def slot_names():
+    """
+    Nomes das variáveis do último programa compilado (parser.symbol_table).
+
+    Returns:
+        dict: Slot -> nome; as locais e os parâmetros dos subprogramas ficam
+        "sub.nome" (também quando o subprograma foi expandido inline e usa
+        globais), o resultado de uma função fica com o nome da função e o label
+        do subprograma -> nome
+    """
+    names = {}
+    for name, symbol in parser.symbol_table.scopes[0].items():
+        if symbol.kind == 'var' and symbol.address is not None:
+            names[('g', symbol.address)] = name
+        elif symbol.kind in ('function', 'procedure') and symbol.label:
+            names[symbol.label] = name
+            count = len(symbol.params)
+            frame = {k - count: f"{name}.{param[0]}" for k, param in enumerate(symbol.params)}
+            frame.update({local.address: f"{name}.{local.name}" for local in symbol.locals
+                          if local.address is not None})
+            if symbol.kind == 'function':
+                frame[-(count + 1)] = name
+            for address, text in frame.items():
+                names[(symbol.label, address)] = text
+                if symbol.inline_slots and address in symbol.inline_slots:
+                    names[('g', symbol.inline_slots[address])] = text
+    return names
+
+
+def estimate_source(code, **options):
+    """
+    Compila um programa Pascal e estima o seu custo.
+
+    Args:
+        code (str): Código Pascal
+        **options: Opções do compilador (ver pas_yacc.init)
+
+    Returns:
+        Estimator: Fórmula do custo, ciclos e blocos básicos
+
+    Raises:
+        ValueError: Se o programa tiver erros de compilação
+        CostError: Se o código gerado não puder ser analisado
+    """
+    text, diagnostics = compile_program(code, source_map=True, **options)
+    if text is None:
+        raise ValueError("\n".join(str(d) for d in diagnostics) or parser.error)
+    return Estimator(text, slot_names(), parser.source_map)
+
+
+def evaluate(poly, values):
+    """Valor (inteiro, arredondado para cima) de um polinómio da estimativa"""
+    return math.ceil(poly.evaluate(values))
+
+
+def report(estimator, values=None, blocks=False):
+    """Fórmula do custo, ciclos (e blocos básicos) com os valores de values, se dados"""
+    values = values or {}
+
+    def show(poly):
+        try:
+            return f"{poly}  =  {evaluate(poly, values):,}" if values or poly.is_constant() else str(poly)
+        except CostError:
+            return str(poly)
+
+    out = [f"custo: {show(estimator.cost)}"]
+    symbols = sorted(estimator.cost.variables())
+    if symbols:
+        out.append(f"variáveis: {', '.join(symbols)}")
+    if estimator.loops:
+        out.append("")
+        out.append("ciclos (iterações por execução do bloco que os contém):")
+        for label, kind, i, trips in estimator.loops:
+            line = estimator.line(i)
+            out.append(f"  {kind:<7} linha {line if line else '?':>4} ({label}): {show(trips)}")
+    if blocks:
+        out.append("")
+        out.append(f"{'bloco':>6} {'linha':>5} {'instruções':>10}  execuções")
+        for leader, line, size, count in estimator.blocks():
+            out.append(f"{estimator.index[leader]:>6} {line if line else '-':>5} {size:>10}  {show(count)}")
+    return "\n".join(out)
+
+
+def parse_values(assignments):
+    """['n=1000', ...] -> {'n': 1000, ...}"""
+    values = {}
+    for text in assignments:
+        name, _, value = text.partition('=')
+        values[name.strip()] = Fraction(value.strip())
+    return values
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Estimativa estática do custo de programas Pascal")
+    args.add_argument('source', help="ficheiro Pascal (ou .vm)")
+    args.add_argument('--set', action='append', default=[], metavar='NOME=VALOR',
+                      help="valor de uma variável da fórmula (pode repetir)")
+    args.add_argument('--blocks', action='store_true', help="listar os blocos básicos")
+    options = args.parse_args()
+    with open(options.source, encoding='utf-8') as f:
+        source = f.read()
+    try:
+        values = parse_values(options.set)
+        if options.source.endswith('.vm'):
+            result = Estimator(source)
+        else:
+            result = estimate_source(source)
+    except (ValueError, CostError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(report(result, values, options.blocks))
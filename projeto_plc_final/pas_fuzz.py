@@ -0,0 +1,1228 @@
+# Fuzzing diferencial do compilador e da VM local.
+# Gera programas Pascal aleatórios e bem tipados (subconjunto de gramatica.txt:
+# integer, real, boolean, arrays, funções, procedimentos com parâmetros por
+# valor e por referência, parâmetros e locais reenviados por referência,
+# recursão, IF, FOR, WHILE, REPEAT, WRITE/WRITELN),
+# compila-os com pas_yacc em várias configurações, executa-os em pas_vm (no
+# interpretador pas_interp e traduzidos para Python por pas_aot) e compara a saída com a de um avaliador de referência
+# que percorre a árvore do programa gerado (independente do parser e da VM).
+# Os casos que falham são reduzidos automaticamente e guardados como ficheiros .pas.
+# Uso: python pas_fuzz.py [--count N | --seconds S] [--workers N] [--seed S] [--out DIR]
+#      python pas_fuzz.py --show SEED      (mostra o programa gerado para uma semente)
+import argparse
+import math
+import os
+import random
+import signal
+import sys
+import time
+from multiprocessing import Pool, TimeoutError
+
+import pas_aot
+import pas_bytecode
+import pas_interp
+from pas_vm import VM, VMError, format_real, parse_program
+from pas_yacc import compile_program
+
+# Limites dos programas gerados (todos terminam: ciclos com contadores próprios)
+MAX_DEPTH = 3           # Profundidade das expressões
+MAX_NESTING = 3         # Statements compostos encadeados
+MAX_TRIPS = 4           # Iterações de cada ciclo
+MAX_RECURSION = 8       # Profundidade das chamadas recursivas
+MAX_STEPS = 200000      # Statements executados pelo avaliador de referência
+MAX_INT = 2 ** 62       # Valores maiores tornam o programa inválido (crescimento sem limite)
+RUN_TIMEOUT = 5.0       # Segundos por execução na VM (código mal compilado pode não terminar)
+BATCH = 16              # Sementes por processo em cada lote (ver fuzz)
+DEADLINE_GRACE = RUN_TIMEOUT  # Espera pelo programa em curso depois do prazo de --seconds
+
+# Sufixos dos labels gerados pelo compilador (recursão em cauda, inline, rotinas de
+# leitura, numeração): subprogramas com nomes que partilham prefixo ou sufixo
+# (f e fbody, p1 e p1i0) testam colisões entre labels derivados dos nomes
+NAME_SUFFIXES = ('body', 'i0', 'i1', '0', '1', 'end', 'skip')
+
+# Configurações comparadas com a referência: (nome, opções de compilação, executar via bytecode)
+CONFIGURATIONS = [
+    ('otimizado', {}, False),
+    ('sem otimizações', {'inline_budget': 0, 'tail_calls': False, 'constant_pool': False,
+                         'coalesce_writes': False, 'specialize_types': False}, False),
+    ('bytecode', {}, True),
+]
+
+NUMERIC = ('integer', 'real')
+RELOPS = ('<', '>', '<=', '>=', '=', '<>')
+
+
+# ============================================================================
+# PROGRAMAS (árvore)
+# ============================================================================
+#
+# Expressões (tuplos com o tipo na posição 1):
+#   ('lit', tipo, valor)                     ('var', tipo, nome)
+#   ('elem', tipo, nome, [índices])          ('un', tipo, op, expr)
+#   ('bin', tipo, op, esq, dir)              ('call', tipo, função, [args])
+#   ('rcall', tipo, função, [args])          chamada recursiva: profundidade - 1 + args
+# Statements:
+#   ('assign', alvo, expr)                   ('if', cond, [então], [senão] ou None)
+#   ('for', var, início, fim, downto, [corpo])
+#   ('while', contador, limite, cond ou None, [corpo])
+#   ('repeat', contador, limite, [corpo])    ('write', [args], newline)
+#   ('pcall', procedimento, [args])          args por referência: ('ref', tipo, nome)
+# Os índices dos arrays são normalizados para os limites (lo + ((e mod n) + n) mod n)
+# e os contadores dos ciclos não são atribuídos no corpo, para que qualquer redução
+# do programa continue a terminar.
+
+
+class Subprogram:
+    """Procedimento ou função gerado"""
+
+    def __init__(self, kind, name, params, result=None, recursive=False):
+        self.kind = kind            # 'procedure' ou 'function'
+        self.name = name
+        self.params = params        # [(nome, tipo, por referência)]
+        self.result = result        # Tipo do resultado (funções)
+        self.recursive = recursive  # Primeiro parâmetro = profundidade da recursão
+        self.locals = {}            # Nome -> tipo (variáveis simples)
+        self.body = []
+
+
+class FuzzProgram:
+    """Programa gerado: globais, arrays, subprogramas e corpo principal"""
+
+    def __init__(self):
+        self.globals = {}           # Nome -> tipo
+        self.arrays = {}            # Nome -> (tipo dos elementos, [(lo, hi)])
+        self.subprograms = []
+        self.body = []
+
+
+class Scope:
+    """Variáveis visíveis e atribuíveis durante a geração de um corpo"""
+
+    def __init__(self, program, subprogram=None):
+        self.program = program
+        self.subprogram = subprogram
+        self.readable = {}          # Nome -> tipo
+        self.writable = {}          # Nome -> tipo (exclui variáveis de ciclo e contadores)
+        self.busy = set()           # Variáveis de ciclo em uso nos ciclos que envolvem o atual
+        self.loop_vars = []         # Variáveis de ciclo (reutilizadas por ciclos não encadeados)
+        self.counters = []
+
+    @property
+    def pure(self):
+        """Corpo de função: não altera globais nem escreve (avaliação sem efeitos laterais)"""
+        return self.subprogram is not None and self.subprogram.kind == 'function'
+
+
+class Generator:
+    """Gerador de programas aleatórios bem tipados"""
+
+    def __init__(self, rng, size=1.0):
+        self.rng = rng
+        self.size = size
+        self.names = {}             # Prefixo -> próximo número (nomes únicos em todo o programa)
+        self.used = set()           # Nomes já usados
+        self.forwarding = []        # Procedimentos que reenviam parâmetros por referência
+
+    def new_name(self, prefix):
+        while True:
+            number = self.names.get(prefix, 0)
+            self.names[prefix] = number + 1
+            name = f"{prefix}{number}"
+            if name not in self.used:
+                self.used.add(name)
+                return name
+
+    def subprogram_name(self, program, prefix):
+        """
+        Nome de um subprograma novo: às vezes o de um subprograma anterior com um
+        dos NAME_SUFFIXES acrescentado ou retirado, ou um nome novo com sufixo (que
+        um subprograma seguinte pode usar sem o sufixo).
+        """
+        rng = self.rng
+        if program.subprograms and self.chance(0.4):
+            base = rng.choice(program.subprograms).name
+            candidates = [base + suffix for suffix in NAME_SUFFIXES]
+            candidates += [base[:-len(suffix)] for suffix in NAME_SUFFIXES
+                           if base.endswith(suffix) and base[:-len(suffix)].rstrip('0123456789')]
+            candidates = [name for name in candidates if name not in self.used]
+            if candidates:
+                name = rng.choice(candidates)
+                self.used.add(name)
+                return name
+        name = self.new_name(prefix)
+        if self.chance(0.3):
+            self.used.discard(name)
+            name += rng.choice(NAME_SUFFIXES)
+            self.used.add(name)
+        return name
+
+    def chance(self, p):
+        return self.rng.random() < p
+
+    # ---- Programa ----
+
+    def program(self):
+        rng = self.rng
+        program = FuzzProgram()
+        for type_ in ('integer', 'integer', 'real', 'boolean'):
+            for _ in range(rng.randint(1, 2)):
+                program.globals[self.new_name('g')] = type_
+        for _ in range(rng.randint(0, 3)):
+            dims = []
+            for _ in range(1 if self.chance(0.7) else 2):
+                lo = rng.randint(-2, 2)
+                dims.append((lo, lo + rng.randint(0, 4)))
+            program.arrays[self.new_name('a')] = (rng.choice(('integer', 'integer', 'real', 'boolean')), dims)
+        for _ in range(rng.randint(0, 4)):
+            program.subprograms.append(self.subprogram(program))
+
+        scope = Scope(program)
+        scope.readable.update(program.globals)
+        scope.writable.update(program.globals)
+        program.body = [('assign', ('var', type_, name), self.literal(type_))
+                        for name, type_ in program.globals.items()]
+        program.body += self.statements(scope, rng.randint(3, int(8 * self.size) + 3), 0)
+        for subprogram in self.forwarding:
+            # Chamados pelo programa principal, onde o inline os expande
+            program.body.insert(rng.randint(len(program.globals), len(program.body)),
+                                ('pcall', subprogram.name, self.arguments(scope, subprogram)))
+        # Variáveis de ciclo e contadores do programa principal são globais
+        for name in scope.loop_vars + scope.counters:
+            program.globals[name] = 'integer'
+        return program
+
+    def subprogram(self, program):
+        rng = self.rng
+        if self.chance(0.55):
+            kind, result = 'function', rng.choice(('integer', 'integer', 'real', 'boolean'))
+        else:
+            kind, result = 'procedure', None
+        recursive = kind == 'function' and result == 'integer' and self.chance(0.35)
+        params = []
+        if recursive:
+            params.append((self.new_name('x'), 'integer', False))
+        for _ in range(rng.randint(1 if kind == 'function' else 0, 3)):
+            by_ref = kind == 'procedure' and self.chance(0.4)
+            params.append((self.new_name('x'), rng.choice(('integer', 'integer', 'real', 'boolean')), by_ref))
+        subprogram = Subprogram(kind, self.subprogram_name(program, 'f' if kind == 'function' else 'p'),
+                                params, result, recursive)
+
+        scope = Scope(program, subprogram)
+        scope.readable.update(program.globals)
+        if kind == 'procedure':
+            scope.writable.update(program.globals)
+        for name, type_, _ in params:
+            scope.readable[name] = type_
+            scope.writable[name] = type_
+        if recursive:
+            # A profundidade só é lida (decrementada na chamada recursiva)
+            del scope.writable[params[0][0]]
+        for _ in range(rng.randint(0, 2)):
+            name = self.new_name('l')
+            subprogram.locals[name] = rng.choice(('integer', 'real', 'boolean'))
+        scope.readable.update(subprogram.locals)
+        scope.writable.update(subprogram.locals)
+
+        body = [('assign', ('var', type_, name), self.literal(type_)) for name, type_ in subprogram.locals.items()]
+        body += self.statements(scope, rng.randint(0, int(3 * self.size) + 1), 1)
+        # Procedimento que passa os seus parâmetros ou locais a um procedimento com
+        # parâmetros por referência (ver arguments): ambos são candidatos ao inline
+        forwarding = [s for s in program.subprograms
+                      if s.kind == 'procedure' and any(by_ref for _, _, by_ref in s.params)]
+        if kind == 'procedure' and forwarding and self.chance(0.6):
+            callee = rng.choice(forwarding)
+            body.insert(rng.randint(len(subprogram.locals), len(body)),
+                        ('pcall', callee.name, self.arguments(scope, callee)))
+            self.forwarding.append(subprogram)
+        if kind == 'function':
+            target = ('var', result, subprogram.name)
+            if recursive:
+                depth = params[0][0]
+                base = ('assign', target, self.expression(scope, result, 1))
+                args = [self.expression(scope, type_, 1) for _, type_, _ in params[1:]]
+                call = ('rcall', result, subprogram.name, args)
+                if self.chance(0.5):
+                    value = call  # Chamada em cauda
+                else:
+                    value = ('bin', result, rng.choice(('+', '-')), self.expression(scope, result, 2), call)
+                stop = ('bin', 'boolean', '<=', ('var', 'integer', depth), ('lit', 'integer', 0))
+                body.append(('if', stop, [base], [('assign', target, value)]))
+            else:
+                body.append(('assign', target, self.expression(scope, result, 0)))
+        subprogram.body = body
+        for name in scope.loop_vars + scope.counters:
+            subprogram.locals[name] = 'integer'
+        return subprogram
+
+    # ---- Statements ----
+
+    def statements(self, scope, count, nesting):
+        return [self.statement(scope, nesting) for _ in range(count)]
+
+    def statement(self, scope, nesting):
+        rng = self.rng
+        kinds = ['assign', 'assign', 'assign']
+        if not scope.pure:
+            kinds += ['write', 'write']
+        if nesting < MAX_NESTING:
+            kinds += ['if', 'for', 'while', 'repeat']
+        if any(s.kind == 'procedure' for s in self.callable(scope)):
+            kinds.append('pcall')
+        kind = rng.choice(kinds)
+
+        if kind == 'assign':
+            targets = [('var', type_, name) for name, type_ in scope.writable.items()]
+            if not scope.pure:
+                targets += [('array', type_, name) for name, (type_, _) in scope.program.arrays.items()]
+            if not targets:
+                return ('write', [('str', 'x')], True) if not scope.pure else ('if', ('lit', 'boolean', True), [], None)
+            target = rng.choice(targets)
+            if target[0] == 'array':
+                target = self.element(scope, target[2], 0)
+            type_ = target[1]
+            if type_ == 'real' and self.chance(0.3):
+                type_ = 'integer'  # Atribuição integer -> real (conversão implícita)
+            return ('assign', target, self.expression(scope, type_, 0))
+
+        if kind == 'write':
+            args = []
+            for _ in range(rng.randint(1, 4)):
+                if self.chance(0.3):
+                    args.append(('str', rng.choice((' ', ', ', 'x = ', 'fim', ''))))
+                else:
+                    args.append(self.expression(scope, rng.choice(('integer', 'real', 'boolean')), 1))
+            return ('write', args, self.chance(0.8))
+
+        if kind == 'if':
+            then = self.statements(scope, rng.randint(1, 2), nesting + 1)
+            other = self.statements(scope, rng.randint(1, 2), nesting + 1) if self.chance(0.5) else None
+            return ('if', self.expression(scope, 'boolean', 0), then, other)
+
+        if kind == 'for':
+            var = self.loop_variable(scope, scope.loop_vars, 'i')
+            start = self.expression(scope, 'integer', 2)
+            start = ('bin', 'integer', 'mod', start, ('lit', 'integer', 3))  # -2..2
+            end = ('lit', 'integer', rng.randint(-1, MAX_TRIPS - 1))
+            downto = self.chance(0.3)
+            if downto:
+                end = ('lit', 'integer', -end[2])
+            scope.readable[var] = 'integer'
+            body = self.statements(scope, rng.randint(1, 3), nesting + 1)
+            scope.busy.discard(var)
+            return ('for', var, start, end, downto, body)
+
+        if kind in ('while', 'repeat'):
+            counter = self.loop_variable(scope, scope.counters, 'c')
+            limit = rng.randint(0, MAX_TRIPS)
+            scope.readable[counter] = 'integer'
+            body = self.statements(scope, rng.randint(1, 3), nesting + 1)
+            scope.busy.discard(counter)
+            if kind == 'repeat':
+                return ('repeat', counter, limit, body)
+            cond = self.expression(scope, 'boolean', 1) if self.chance(0.4) else None
+            return ('while', counter, limit, cond, body)
+
+        procedure = rng.choice([s for s in self.callable(scope) if s.kind == 'procedure'])
+        return ('pcall', procedure.name, self.arguments(scope, procedure))
+
+    def loop_variable(self, scope, pool, prefix):
+        """Variável de ciclo livre (não usada por um ciclo que envolve este)"""
+        for name in pool:
+            if name not in scope.busy:
+                break
+        else:
+            name = self.new_name(prefix)
+            pool.append(name)
+        scope.busy.add(name)
+        return name
+
+    def callable(self, scope):
+        """Subprogramas declarados antes do corpo atual (funções não chamam procedimentos)"""
+        subprograms = scope.program.subprograms
+        if scope.pure:
+            return [s for s in subprograms if s.kind == 'function']
+        return subprograms
+
+    def arguments(self, scope, subprogram):
+        args = []
+        for name, type_, by_ref in subprogram.params:
+            if by_ref:
+                candidates = [n for n, t in scope.writable.items() if t == type_]
+                # Parâmetros por valor e locais reenviados por referência (o endereço é
+                # do frame: PUSHFP, que o inline tem de converter)
+                frame = [n for n in candidates if scope.subprogram is not None
+                         and (n in scope.subprogram.locals or
+                              any(n == p and not r for p, _, r in scope.subprogram.params))]
+                if frame and self.chance(0.75):
+                    candidates = frame
+                if candidates:
+                    args.append(('ref', type_, self.rng.choice(candidates)))
+                    continue
+                # Sem variável do tipo: usa-se uma global dedicada
+                name = self.new_name('r')
+                scope.program.globals[name] = type_
+                args.append(('ref', type_, name))
+                continue
+            args.append(self.expression(scope, type_, 1))
+        return args
+
+    # ---- Expressões ----
+
+    def literal(self, type_):
+        rng = self.rng
+        if type_ == 'integer':
+            value = rng.choice((0, 1, 2, 3, 5, 7, 10, 100, rng.randint(0, 1000)))
+            return ('lit', 'integer', -value if self.chance(0.2) else value)
+        if type_ == 'real':
+            value = rng.choice((0.0, 0.5, 1.0, 2.5, 0.25, 3.75, rng.randint(0, 400) / 8))
+            return ('lit', 'real', -value if value and self.chance(0.2) else value)
+        return ('lit', 'boolean', self.chance(0.5))
+
+    def element(self, scope, name, depth):
+        type_, dims = scope.program.arrays[name]
+        return ('elem', type_, name, [self.expression(scope, 'integer', depth + 1) for _ in dims])
+
+    def expression(self, scope, type_, depth):
+        rng = self.rng
+        leaf = depth >= MAX_DEPTH or self.chance(0.3 + 0.15 * depth)
+        if leaf:
+            options = ['lit']
+            variables = [n for n, t in scope.readable.items() if t == type_]
+            if variables:
+                options += ['var', 'var']
+            arrays = [n for n, (t, _) in scope.program.arrays.items() if t == type_]
+            if arrays and depth < MAX_DEPTH:
+                options.append('elem')
+            choice = rng.choice(options)
+            if choice == 'lit':
+                return self.literal(type_)
+            if choice == 'var':
+                return ('var', type_, rng.choice(variables))
+            return self.element(scope, rng.choice(arrays), depth)
+
+        functions = [s for s in self.callable(scope) if s.kind == 'function' and s.result == type_]
+        if functions and self.chance(0.2):
+            function = rng.choice(functions)
+            args = self.arguments(scope, function)
+            if function.recursive:
+                args[0] = ('lit', 'integer', rng.randint(0, MAX_RECURSION))
+            return ('call', type_, function.name, args)
+
+        if type_ == 'integer':
+            if self.chance(0.15):
+                return ('un', 'integer', '-', self.expression(scope, 'integer', depth + 1))
+            op = rng.choice(('+', '-', '*', 'div', 'mod', '+', '-'))
+            return ('bin', 'integer', op, self.expression(scope, 'integer', depth + 1),
+                    self.expression(scope, 'integer', depth + 1))
+        if type_ == 'real':
+            if self.chance(0.15):
+                return ('un', 'real', '-', self.expression(scope, 'real', depth + 1))
+            op = rng.choice(('+', '-', '*', '/'))
+            left, right = rng.choice(NUMERIC), rng.choice(NUMERIC)
+            if op != '/' and left == right == 'integer':
+                left = 'real'
+            return ('bin', 'real', op, self.expression(scope, left, depth + 1),
+                    self.expression(scope, right, depth + 1))
+        # boolean
+        choice = rng.choice(('rel', 'rel', 'logic', 'not', 'eq'))
+        if choice == 'rel':
+            return ('bin', 'boolean', rng.choice(RELOPS), self.expression(scope, rng.choice(NUMERIC), depth + 1),
+                    self.expression(scope, rng.choice(NUMERIC), depth + 1))
+        if choice == 'logic':
+            return ('bin', 'boolean', rng.choice(('and', 'or')), self.expression(scope, 'boolean', depth + 1),
+                    self.expression(scope, 'boolean', depth + 1))
+        if choice == 'not':
+            return ('un', 'boolean', 'not', self.expression(scope, 'boolean', depth + 1))
+        return ('bin', 'boolean', rng.choice(('=', '<>')), self.expression(scope, 'boolean', depth + 1),
+                self.expression(scope, 'boolean', depth + 1))
+
+
+def generate(seed, size=1.0):
+    """Programa gerado para uma semente (reprodutível)"""
+    return Generator(random.Random(seed), size).program()
+
+
+# ============================================================================
+# TEXTO PASCAL
+# ============================================================================
+
+def render_literal(type_, value):
+    if type_ == 'boolean':
+        return 'true' if value else 'false'
+    text = repr(abs(value)) if type_ == 'real' else str(abs(value))
+    return f"(-{text})" if value < 0 else text
+
+
+def render_expression(expr, program):
+    kind = expr[0]
+    if kind == 'lit':
+        return render_literal(expr[1], expr[2])
+    if kind in ('var', 'ref'):
+        return expr[2]
+    if kind == 'elem':
+        _, dims = program.arrays[expr[2]]
+        indices = []
+        for index, (lo, hi) in zip(expr[3], dims):
+            n = hi - lo + 1
+            indices.append(f"{lo} + (({render_expression(index, program)}) mod {n} + {n}) mod {n}")
+        return f"{expr[2]}[{', '.join(indices)}]"
+    if kind == 'un':
+        return f"({expr[2]} {render_expression(expr[3], program)})"
+    if kind == 'bin':
+        return f"({render_expression(expr[3], program)} {expr[2]} {render_expression(expr[4], program)})"
+    args = [render_expression(arg, program) for arg in expr[3]]
+    if kind == 'rcall':
+        depth = next(s for s in program.subprograms if s.name == expr[2]).params[0][0]
+        args.insert(0, f"{depth} - 1")
+    return f"{expr[2]}({', '.join(args)})"
+
+
+def render_statements(statements, program, indent):
+    lines = []
+    for i, statement in enumerate(statements):
+        text = render_statement(statement, program, indent)
+        lines.append(text + (';' if i < len(statements) - 1 else ''))
+    return lines
+
+
+def render_block(statements, program, indent):
+    """Corpo de um statement composto: BEGIN ... END"""
+    pad = '  ' * indent
+    return [f"{pad}begin"] + render_statements(statements, program, indent + 1) + [f"{pad}end"]
+
+
+def render_statement(statement, program, indent):
+    pad = '  ' * indent
+    kind = statement[0]
+    if kind == 'assign':
+        return f"{pad}{render_expression(statement[1], program)} := {render_expression(statement[2], program)}"
+    if kind == 'write':
+        args = []
+        for arg in statement[1]:
+            args.append(f"'{arg[1]}'" if arg[0] == 'str' else render_expression(arg, program))
+        return f"{pad}{'writeln' if statement[2] else 'write'}({', '.join(args)})"
+    if kind == 'pcall':
+        args = [render_expression(arg, program) for arg in statement[2]]
+        return f"{pad}{statement[1]}({', '.join(args)})" if args else f"{pad}{statement[1]}"
+    if kind == 'if':
+        lines = [f"{pad}if {render_expression(statement[1], program)} then"] + render_block(statement[2], program, indent)
+        if statement[3] is not None:
+            lines[-1] += ' else'
+            lines += render_block(statement[3], program, indent)
+        return '\n'.join(lines)
+    if kind == 'for':
+        _, var, start, end, downto, body = statement
+        head = (f"{pad}for {var} := {render_expression(start, program)} "
+                f"{'downto' if downto else 'to'} {render_expression(end, program)} do")
+        return '\n'.join([head] + render_block(body, program, indent))
+    if kind == 'while':
+        _, counter, limit, cond, body = statement
+        test = f"({counter} < {limit})"
+        if cond is not None:
+            test += f" and {render_expression(cond, program)}"
+        step = ('assign', ('var', 'integer', counter), ('bin', 'integer', '+', ('var', 'integer', counter), ('lit', 'integer', 1)))
+        return '\n'.join([f"{pad}{counter} := 0;", f"{pad}while {test} do"]
+                         + render_block(body + [step], program, indent))
+    # repeat
+    _, counter, limit, body = statement
+    step = ('assign', ('var', 'integer', counter), ('bin', 'integer', '+', ('var', 'integer', counter), ('lit', 'integer', 1)))
+    return '\n'.join([f"{pad}{counter} := 0;", f"{pad}repeat"] + render_statements(body + [step], program, indent + 1)
+                     + [f"{pad}until {counter} >= {limit}"])
+
+
+def render_type(type_, dims=None):
+    if dims is None:
+        return type_
+    ranges = ', '.join(f"{lo}..{hi}" for lo, hi in dims)
+    return f"array[{ranges}] of {type_}"
+
+
+def render(program):
+    """Texto Pascal do programa gerado"""
+    lines = ["program Fuzz;"]
+    if program.globals or program.arrays:
+        lines.append("var")
+        lines += [f"  {name}: {type_};" for name, type_ in program.globals.items()]
+        lines += [f"  {name}: {render_type(type_, dims)};" for name, (type_, dims) in program.arrays.items()]
+    for subprogram in program.subprograms:
+        params = '; '.join(f"{'var ' if by_ref else ''}{name}: {type_}" for name, type_, by_ref in subprogram.params)
+        head = f"{subprogram.kind} {subprogram.name}" + (f"({params})" if params else "")
+        if subprogram.kind == 'function':
+            head += f": {subprogram.result}"
+        lines.append(head + ";")
+        if subprogram.locals:
+            lines.append("var")
+            lines += [f"  {name}: {type_};" for name, type_ in subprogram.locals.items()]
+        lines += render_block(subprogram.body, program, 0)
+        lines[-1] += ";"
+    lines += render_block(program.body, program, 0)
+    lines[-1] += "."
+    return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# AVALIADOR DE REFERÊNCIA
+# ============================================================================
+
+class RuntimeFault(Exception):
+    """Erro de execução esperado (divisão por zero): a VM também deve falhar"""
+
+
+class Unbounded(Exception):
+    """Programa fora dos limites do fuzzer (valores ou passos): é descartado"""
+
+
+def pascal_div(a, b):
+    """Divisão inteira com truncatura para zero"""
+    if b == 0:
+        raise RuntimeFault("divisão por zero")
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+
+def checked(value):
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise Unbounded("real não finito")
+    elif not -MAX_INT <= value <= MAX_INT:
+        raise Unbounded("inteiro demasiado grande")
+    return value
+
+
+class Reference:
+    """
+    Executa a árvore de um programa gerado com a semântica do Pascal suportado:
+    operandos de AND/OR ambos avaliados, inteiros promovidos a real nas operações
+    mistas, DIV/MOD com truncatura para zero, parâmetros VAR partilham a variável.
+    """
+
+    def __init__(self, program):
+        self.program = program
+        self.subprograms = {s.name: s for s in program.subprograms}
+        self.globals = {}
+        for name, type_ in program.globals.items():
+            self.globals[name] = [self.zero(type_)]
+        for name, (type_, dims) in program.arrays.items():
+            size = 1
+            for lo, hi in dims:
+                size *= hi - lo + 1
+            self.globals[name] = [self.zero(type_) for _ in range(size)]
+        self.output = []
+        self.written = 0            # Saída até ao início do WRITE/WRITELN em curso
+        self.steps = 0
+
+    @staticmethod
+    def zero(type_):
+        return 0.0 if type_ == 'real' else (False if type_ == 'boolean' else 0)
+
+    def run(self):
+        """
+        Devolve (saída, erro de execução ou None). Se houver erro durante um
+        WRITE/WRITELN, a saída é a anterior a esse statement: o compilador pode
+        juntar os argumentos e escrever só depois de os avaliar todos.
+        """
+        try:
+            self.block(self.program.body, self.globals)
+        except RuntimeFault as e:
+            return ''.join(self.output[:self.written]), ''.join(self.output), str(e)
+        output = ''.join(self.output)
+        return output, output, None
+
+    # ---- Statements ----
+
+    def block(self, statements, env):
+        for statement in statements:
+            self.statement(statement, env)
+
+    def statement(self, statement, env):
+        self.steps += 1
+        if self.steps > MAX_STEPS:
+            raise Unbounded("demasiados passos")
+        kind = statement[0]
+        if kind == 'assign':
+            target, expr = statement[1], statement[2]
+            value = self.expression(expr, env)
+            if target[1] == 'real':
+                value = float(value)
+            cells, index = self.location(target, env)
+            cells[index] = value
+        elif kind == 'write':
+            self.written = len(self.output)
+            for arg in statement[1]:
+                if arg[0] == 'str':
+                    self.output.append(arg[1])
+                else:
+                    self.output.append(self.text(self.expression(arg, env), arg[1]))
+            if statement[2]:
+                self.output.append('\n')
+            self.written = len(self.output)
+        elif kind == 'if':
+            if self.expression(statement[1], env):
+                self.block(statement[2], env)
+            elif statement[3] is not None:
+                self.block(statement[3], env)
+        elif kind == 'for':
+            _, var, start, end, downto, body = statement
+            cell = env[var]
+            cell[0] = self.expression(start, env)
+            step = -1 if downto else 1
+            while (cell[0] >= self.expression(end, env)) if downto else (cell[0] <= self.expression(end, env)):
+                self.block(body, env)
+                cell[0] += step
+        elif kind == 'while':
+            _, counter, limit, cond, body = statement
+            cell = env[counter]
+            cell[0] = 0
+            while True:
+                go = cell[0] < limit
+                if cond is not None:
+                    go = self.expression(cond, env) and go  # Os dois operandos são avaliados
+                if not go:
+                    break
+                self.block(body, env)
+                cell[0] += 1
+        elif kind == 'repeat':
+            _, counter, limit, body = statement
+            cell = env[counter]
+            cell[0] = 0
+            while True:
+                self.block(body, env)
+                cell[0] += 1
+                if cell[0] >= limit:
+                    break
+        else:  # pcall
+            self.call(self.subprograms[statement[1]], statement[2], env)
+
+    def text(self, value, type_):
+        if type_ == 'boolean':
+            return 'true' if value else 'false'
+        if type_ == 'real':
+            return format_real(value)
+        return str(value)
+
+    # ---- Expressões ----
+
+    def location(self, target, env):
+        """(lista de células, índice) de uma variável ou elemento de array"""
+        if target[0] == 'var':
+            return env[target[2]], 0
+        _, dims = self.program.arrays[target[2]]
+        offset = 0
+        for index, (lo, hi) in zip(target[3], dims):
+            n = hi - lo + 1
+            value = self.expression(index, env)
+            offset = offset * n + (value - n * pascal_div(value, n) + n) % n
+        return self.globals[target[2]], offset
+
+    def expression(self, expr, env):
+        kind = expr[0]
+        if kind == 'lit':
+            return expr[2]
+        if kind in ('var', 'elem'):
+            cells, index = self.location(expr, env)
+            return cells[index]
+        if kind == 'un':
+            value = self.expression(expr[3], env)
+            if expr[2] == 'not':
+                return not value
+            return checked(0.0 - value if isinstance(value, float) else -value)  # -x = 0 - x (0.0 e não -0.0)
+        if kind == 'bin':
+            left = self.expression(expr[3], env)
+            right = self.expression(expr[4], env)
+            return self.binary(expr[2], left, right)
+        function = self.subprograms[expr[2]]
+        args = expr[3]
+        if kind == 'rcall':
+            depth = self.expression(('var', 'integer', function.params[0][0]), env)
+            args = [('lit', 'integer', depth - 1)] + args
+        return self.call(function, args, env)
+
+    def binary(self, op, left, right):
+        if op in ('and', 'or'):
+            return (left and right) if op == 'and' else (left or right)
+        if isinstance(left, bool) or isinstance(right, bool):
+            return (left == right) if op == '=' else (left != right)
+        if op in RELOPS:
+            if isinstance(left, float) or isinstance(right, float):
+                left, right = float(left), float(right)
+            return {'<': left < right, '>': left > right, '<=': left <= right,
+                    '>=': left >= right, '=': left == right, '<>': left != right}[op]
+        if op == 'div':
+            return pascal_div(left, right)
+        if op == 'mod':
+            return left - right * pascal_div(left, right)
+        if op == '/':
+            if right == 0:
+                raise RuntimeFault("divisão por zero")
+            return checked(float(left) / float(right))
+        if isinstance(left, float) or isinstance(right, float):
+            left, right = float(left), float(right)
+        if op == '+':
+            return checked(left + right)
+        if op == '-':
+            return checked(left - right)
+        return checked(left * right)
+
+    def call(self, subprogram, args, env):
+        frame = dict(self.globals)
+        for (name, type_, by_ref), arg in zip(subprogram.params, args):
+            if by_ref:
+                frame[name] = env[arg[2]]
+            else:
+                value = self.expression(arg, env)
+                frame[name] = [float(value) if type_ == 'real' else value]
+        for name, type_ in subprogram.locals.items():
+            frame[name] = [self.zero(type_)]
+        if subprogram.kind == 'function':
+            frame[subprogram.name] = [self.zero(subprogram.result)]
+        self.block(subprogram.body, frame)
+        if subprogram.kind == 'function':
+            return frame[subprogram.name][0]
+        return None
+
+
+# ============================================================================
+# EXECUÇÃO E COMPARAÇÃO
+# ============================================================================
+
+class Timeout(Exception):
+    pass
+
+
+def on_alarm(signum, frame):
+    raise Timeout()
+
+
+def run_compiled(text, bytecode):
+    """Executa o código VM (opcionalmente via bytecode); devolve (saída, erro ou None)"""
+    program = pas_bytecode.decode(pas_bytecode.encode(text)) if bytecode else parse_program(text)
+    vm = VM(program)
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, RUN_TIMEOUT)
+    try:
+        vm.run()
+    except VMError as e:
+        return vm.output(), str(e)
+    except Timeout:
+        return vm.output(), "tempo esgotado"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return vm.output(), None
+
+
+def run_interpreted(program):
+    """Executa um programa do interpretador (pas_interp) ou traduzido (pas_aot); devolve (saída, erro ou None)"""
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, RUN_TIMEOUT)
+    try:
+        program.run()
+    except VMError as e:
+        return program.output(), str(e)
+    except Timeout:
+        return program.output(), "tempo esgotado"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    return program.output(), None
+
+
+def compare(name, output, error, expected, partial, fault):
+    """Compara uma execução com a referência; devolve a falha (configuração, tipo, detalhe) ou None"""
+    if error == "tempo esgotado":
+        return name, 'timeout', error
+    if (error is None) != (fault is None):
+        return name, 'runtime', f"esperado erro={fault!r}, obtido erro={error!r}"
+    if fault is not None:
+        # Erro a meio de um WRITE: a parte já escrita desse statement pode faltar
+        if not (output.startswith(expected) and partial.startswith(output)):
+            return name, 'output', f"esperado {expected!r}..{partial!r}, obtido {output!r}"
+    elif output != expected:
+        return name, 'output', f"esperado {expected!r}, obtido {output!r}"
+    return None
+
+
+def check(program):
+    """
+    Compara a referência com cada configuração do compilador, com o
+    interpretador (pas_interp) e com a tradução para Python (pas_aot).
+
+    Returns:
+        None se o programa foi descartado (fora dos limites), ou uma lista de
+        falhas (configuração, tipo, detalhe); lista vazia = tudo coincide
+    """
+    try:
+        expected, partial, fault = Reference(program).run()
+    except (Unbounded, RecursionError):
+        return None
+    source = render(program)
+    failures = []
+    compiled = {}               # Opções -> (código VM, diagnósticos): configurações com as mesmas opções compilam uma vez
+    for name, options, bytecode in CONFIGURATIONS:
+        key = tuple(sorted(options.items()))
+        try:
+            if key not in compiled:
+                compiled[key] = compile_program(source, **options)
+            text, diagnostics = compiled[key]
+        except Exception as e:  # Falha interna do compilador
+            failures.append((name, 'crash', f"{type(e).__name__}: {e}"))
+            continue
+        if text is None:
+            failures.append((name, 'compile', "; ".join(str(d) for d in diagnostics)))
+            continue
+        try:
+            output, error = run_compiled(text, bytecode)
+        except Exception as e:
+            failures.append((name, 'crash', f"{type(e).__name__}: {e}"))
+            continue
+        failure = compare(name, output, error, expected, partial, fault)
+        if failure:
+            failures.append(failure)
+
+    # Interpretador: o mesmo programa executado sem gerar código VM
+    name = 'interpretador'
+    try:
+        interpreted, diagnostics = pas_interp.load(source)
+        if interpreted is None:
+            failures.append((name, 'compile', "; ".join(str(d) for d in diagnostics)))
+        else:
+            failure = compare(name, *run_interpreted(interpreted), expected, partial, fault)
+            if failure:
+                failures.append(failure)
+    except Exception as e:
+        failures.append((name, 'crash', f"{type(e).__name__}: {e}"))
+
+    # Tradução para Python do código VM da configuração otimizada (com os ciclos
+    # vetorizados a partir de uma iteração, para os exercitar com arrays pequenos)
+    name = 'aot'
+    text = compiled.get((), (None,))[0]
+    if text is not None:
+        try:
+            program = pas_aot.Program(text, vector_min=1)
+            failure = compare(name, *run_interpreted(program), expected, partial, fault)
+            if failure:
+                failures.append(failure)
+        except Exception as e:
+            failures.append((name, 'crash', f"{type(e).__name__}: {e}"))
+    return failures
+
+
+def signature(failures):
+    """Identifica uma falha para a redução (configurações e tipos de falha)"""
+    return sorted({(name, kind) for name, kind, _ in failures})
+
+
+# ============================================================================
+# REDUÇÃO DOS CASOS QUE FALHAM
+# ============================================================================
+
+def default_literal(type_):
+    return ('lit', type_, {'integer': 0, 'real': 0.0, 'boolean': False}[type_])
+
+
+def reduce_expression(expr):
+    """Variantes mais simples de uma expressão (mesmo tipo)"""
+    kind, type_ = expr[0], expr[1]
+    if kind == 'ref':
+        return
+    if expr != default_literal(type_):
+        yield default_literal(type_)
+    if kind == 'lit':
+        return
+    children = {'elem': lambda: list(expr[3]), 'un': lambda: [expr[3]], 'bin': lambda: [expr[3], expr[4]],
+                'call': lambda: list(expr[3]), 'rcall': lambda: list(expr[3])}.get(kind, lambda: [])()
+    for child in children:
+        if child[1] == type_ and child[0] != 'ref':
+            yield child
+    for i, child in enumerate(children):
+        for variant in reduce_expression(child):
+            if kind == 'elem':
+                yield expr[:3] + (expr[3][:i] + [variant] + expr[3][i + 1:],)
+            elif kind == 'un':
+                yield expr[:3] + (variant,)
+            elif kind == 'bin':
+                yield expr[:3] + ((variant, expr[4]) if i == 0 else (expr[3], variant))
+            else:
+                yield expr[:3] + (expr[3][:i] + [variant] + expr[3][i + 1:],)
+
+
+def reduce_statements(statements):
+    """Variantes de uma lista de statements: remover, achatar e simplificar cada um"""
+    for i in range(len(statements)):
+        yield statements[:i] + statements[i + 1:]
+    for i, statement in enumerate(statements):
+        for inner in inner_blocks(statement):
+            yield statements[:i] + inner + statements[i + 1:]
+    for i, statement in enumerate(statements):
+        for variant in reduce_statement(statement):
+            yield statements[:i] + [variant] + statements[i + 1:]
+
+
+def inner_blocks(statement):
+    kind = statement[0]
+    if kind == 'if':
+        yield statement[2]
+        if statement[3] is not None:
+            yield statement[3]
+    elif kind == 'for':
+        yield statement[5]
+    elif kind in ('while', 'repeat'):
+        yield statement[-1]
+
+
+def reduce_statement(statement):
+    kind = statement[0]
+    if kind == 'assign':
+        for variant in reduce_expression(statement[1]):
+            if variant[0] == 'elem':
+                yield ('assign', variant, statement[2])
+        for variant in reduce_expression(statement[2]):
+            yield ('assign', statement[1], variant)
+    elif kind == 'write':
+        args = statement[1]
+        if statement[2]:
+            yield ('write', args, False)
+        for i in range(len(args)):
+            if len(args) > 1:
+                yield ('write', args[:i] + args[i + 1:], statement[2])
+        for i, arg in enumerate(args):
+            if arg[0] != 'str':
+                for variant in reduce_expression(arg):
+                    yield ('write', args[:i] + [variant] + args[i + 1:], statement[2])
+    elif kind == 'pcall':
+        for i, arg in enumerate(statement[2]):
+            for variant in reduce_expression(arg):
+                yield ('pcall', statement[1], statement[2][:i] + [variant] + statement[2][i + 1:])
+    elif kind == 'if':
+        if statement[3] is not None:
+            yield statement[:3] + (None,)
+        for variant in reduce_expression(statement[1]):
+            yield ('if', variant, statement[2], statement[3])
+        for variant in reduce_statements(statement[2]):
+            yield ('if', statement[1], variant, statement[3])
+        if statement[3] is not None:
+            for variant in reduce_statements(statement[3]):
+                yield ('if', statement[1], statement[2], variant)
+    elif kind == 'for':
+        for variant in reduce_expression(statement[2]):
+            yield statement[:2] + (variant,) + statement[3:]
+        for variant in reduce_statements(statement[5]):
+            yield statement[:5] + (variant,)
+    elif kind == 'while':
+        if statement[3] is not None:
+            yield statement[:3] + (None, statement[4])
+            for variant in reduce_expression(statement[3]):
+                yield statement[:3] + (variant, statement[4])
+        for variant in reduce_statements(statement[4]):
+            yield statement[:4] + (variant,)
+    else:  # repeat
+        for variant in reduce_statements(statement[3]):
+            yield statement[:3] + (variant,)
+
+
+def used_names(program):
+    """Nomes referidos em algum corpo do programa (variáveis e subprogramas)"""
+    names = set()
+
+    def visit(node):
+        if isinstance(node, tuple):
+            if node and node[0] in ('var', 'ref', 'elem', 'call', 'rcall') and len(node) > 2:
+                names.add(node[2])
+            if node and node[0] == 'pcall':
+                names.add(node[1])
+            if node and node[0] in ('for', 'while', 'repeat'):
+                names.add(node[1])
+            for child in node:
+                visit(child)
+        elif isinstance(node, list):
+            for child in node:
+                visit(child)
+
+    visit(program.body)
+    for subprogram in program.subprograms:
+        visit(subprogram.body)
+    return names
+
+
+def copy_program(program, body=None, subprograms=None):
+    result = FuzzProgram()
+    result.globals = dict(program.globals)
+    result.arrays = dict(program.arrays)
+    result.subprograms = list(program.subprograms if subprograms is None else subprograms)
+    result.body = program.body if body is None else body
+    return result
+
+
+def copy_subprogram(subprogram, body):
+    result = Subprogram(subprogram.kind, subprogram.name, subprogram.params, subprogram.result, subprogram.recursive)
+    result.locals = subprogram.locals
+    result.body = body
+    return result
+
+
+def reduce_program(program):
+    """Variantes de um programa: subprogramas e variáveis não usados, corpos mais simples"""
+    used = used_names(program)
+    for i, subprogram in enumerate(program.subprograms):
+        # Só se nenhum outro corpo o chama (as chamadas recursivas não contam)
+        others = copy_program(program, subprograms=program.subprograms[:i] + program.subprograms[i + 1:])
+        if subprogram.name not in used_names(others):
+            yield others
+    for name in list(program.globals) + list(program.arrays):
+        if name not in used:
+            variant = copy_program(program)
+            variant.globals.pop(name, None)
+            variant.arrays.pop(name, None)
+            yield variant
+    for variant in reduce_statements(program.body):
+        yield copy_program(program, body=variant)
+    for i, subprogram in enumerate(program.subprograms):
+        for variant in reduce_statements(subprogram.body):
+            subprograms = list(program.subprograms)
+            subprograms[i] = copy_subprogram(subprogram, variant)
+            yield copy_program(program, subprograms=subprograms)
+
+
+def minimize(program, failures, budget=2000, deadline=None):
+    """
+    Reduz um programa que falha mantendo a mesma falha (mesmas configurações e
+    tipos): aplica a primeira simplificação que preserva a falha e recomeça.
+    Pára (com a redução feita até aí) ao fim de budget tentativas ou quando
+    time.monotonic() passar deadline.
+    """
+    target = signature(failures)
+    tries = 0
+    progress = True
+    while progress and tries < budget:
+        progress = False
+        for candidate in reduce_program(program):
+            if deadline is not None and time.monotonic() >= deadline:
+                return program, failures
+            tries += 1
+            result = check(candidate)
+            if result and signature(result) == target:
+                program, failures, progress = candidate, result, True
+                break
+            if tries >= budget:
+                break
+    return program, failures
+
+
+# ============================================================================
+# EXECUÇÃO EM PARALELO
+# ============================================================================
+
+def fuzz_one(seed, size=1.0, reduce=True, deadline=None):
+    """
+    Gera, verifica e (se falhar) reduz o programa de uma semente.
+
+    Returns:
+        tuple: (semente, estado, falhas, texto do programa reduzido ou None);
+        estado é 'ok', 'skip' (fora dos limites) ou 'fail'.
+        None se deadline (time.monotonic) já passou
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        return None
+    program = generate(seed, size)
+    failures = check(program)
+    if failures is None:
+        return seed, 'skip', None, None
+    if not failures:
+        return seed, 'ok', None, None
+    if reduce:
+        program, failures = minimize(program, failures, deadline=deadline)
+    return seed, 'fail', failures, render(program)
+
+
+def save_failure(directory, seed, failures, source):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"fuzz-{seed}.pas")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{{ pas_fuzz: semente {seed}\n")
+        for name, kind, detail in failures:
+            f.write(f"  [{name}] {kind}: {detail.replace('}', ')')}\n")
+        f.write("}\n")
+        f.write(source)
+    return path
+
+
+def fuzz(seed=0, count=None, seconds=None, workers=None, size=1.0, out='fuzz-falhas', reduce=True, report=print):
+    """
+    Corre o fuzzer com sementes seed, seed + 1, ... até count programas ou seconds
+    segundos. Devolve as estatísticas (dict).
+
+    seconds é um limite para tudo, incluindo a redução dos casos que falham: os
+    processos recebem o prazo e as sementes são distribuídas aos lotes (BATCH
+    por processo), pelo que no fim só se espera pelos programas em curso.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {'ok': 0, 'skip': 0, 'fail': 0, 'failures': []}
+    start = time.perf_counter()
+    # time.monotonic é comum a todos os processos (o prazo é passado aos workers)
+    deadline = None if seconds is None else time.monotonic() + seconds
+
+    def remaining():
+        return None if deadline is None else deadline - time.monotonic()
+
+    def batches(size):
+        n = seed
+        while (count is None or n < seed + count) and (deadline is None or remaining() > 0):
+            end = n + size if count is None else min(n + size, seed + count)
+            yield range(n, end)
+            n = end
+
+    def record(result):
+        if result is None:
+            return  # Semente que só começaria depois do prazo
+        program_seed, status, failures, source = result
+        stats[status] += 1
+        if status == 'fail':
+            path = save_failure(out, program_seed, failures, source)
+            stats['failures'].append(path)
+            report(f"FALHA (semente {program_seed}): {failures[0][0]}: {failures[0][1]} -> {path}")
+
+    if workers == 1:
+        for batch in batches(1):
+            record(fuzz_one(batch[0], size, reduce, deadline))
+    else:
+        # Ao sair do with os processos ainda ocupados são terminados
+        with Pool(workers) as pool:
+            for batch in batches(workers * BATCH):
+                results = pool.imap_unordered(_fuzz_task, ((n, size, reduce, deadline) for n in batch))
+                try:
+                    for _ in batch:
+                        timeout = remaining()
+                        record(results.next(None if timeout is None else max(timeout, 0) + DEADLINE_GRACE))
+                except TimeoutError:
+                    break
+    stats['seconds'] = time.perf_counter() - start
+    stats['programs'] = stats['ok'] + stats['skip'] + stats['fail']
+    return stats
+
+
+def _fuzz_task(args):
+    return fuzz_one(*args)
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Fuzzing diferencial do compilador Pascal e da VM")
+    args.add_argument('--count', type=int, help="número de programas (por omissão, 1000)")
+    args.add_argument('--seconds', type=float, help="parar ao fim de S segundos")
+    args.add_argument('--workers', type=int, help="processos (por omissão, um por CPU)")
+    args.add_argument('--seed', type=int, default=0, help="primeira semente (por omissão, 0)")
+    args.add_argument('--size', type=float, default=1.0, help="tamanho relativo dos programas (por omissão, 1.0)")
+    args.add_argument('--out', default='fuzz-falhas', help="diretório dos casos que falham")
+    args.add_argument('--no-reduce', action='store_true', help="não reduzir os casos que falham")
+    args.add_argument('--show', type=int, metavar='SEED', help="mostrar o programa gerado para uma semente")
+    options = args.parse_args()
+
+    if options.show is not None:
+        print(render(generate(options.show, options.size)), end='')
+        sys.exit(0)
+    count = options.count if options.count or options.seconds else 1000
+    stats = fuzz(options.seed, count, options.seconds, options.workers, options.size,
+                 options.out, not options.no_reduce)
+    rate = stats['programs'] / stats['seconds'] * 60
+    print(f"{stats['programs']} programas em {stats['seconds']:.1f} s ({rate:.0f}/min): "
+          f"{stats['ok']} ok, {stats['skip']} descartados, {stats['fail']} falhas")
+    sys.exit(1 if stats['fail'] else 0)
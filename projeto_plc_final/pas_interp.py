@@ -0,0 +1,1082 @@
+# Interpretador de referência: executa programas Pascal diretamente a partir da
+# análise sintática, sem gerar nem carregar código VM (útil para programas
+# pequenos, em que compilar e carregar o texto VM custa mais do que executá-lo).
+# Uso: python pas_interp.py programa.pas [--no-prompt] < entrada.txt
+#
+# Usa as mesmas tabelas LALR e a mesma tabela de símbolos do compilador: as
+# ações que só tratam declarações (variáveis, tipos, parâmetros, cabeçalhos dos
+# subprogramas) são as de pas_yacc; as que geram código são substituídas por
+# ações que constroem closures Python (ver pas_yacc.bind_actions). Cada variável
+# fica com o slot calculado a partir de Symbol.address, com o mesmo modelo da VM:
+#   globais         lista de globais, posição = endereço
+#   subprogramas    frame = [resultado, parâmetros..., locais...]
+#                   (endereço -(n+1) .. -1 e 0 .. k-1, deslocados de n+1)
+# Os parâmetros VAR guardam (bloco, posição), como os endereços da VM, e os
+# arrays são listas com o layout row-major do compilador (strides e bias).
+# A semântica é a da VM: div/mod com truncatura para zero, inteiros promovidos
+# a real, AND/OR avaliam os dois operandos e reais escritos com format_real.
+import argparse
+import sys
+
+from pas_yacc import (MAX_ERRORS, TooManyErrors, add_semantic_error, bind_actions,
+                      check_assignment_compatibility, check_operation_compatibility,
+                      compile_productions, compile_program, init, is_boolean_type,
+                      is_numeric_type, is_string_or_char_type, parse_with, parser, token_position)
+from pas_vm import VMError, format_real, int_div, int_mod, unescape_string
+
+# Limite de recursão do Python durante a execução (cada chamada Pascal usa
+# vários frames Python: chamada, corpo, statements e expressões)
+RECURSION_LIMIT = 100000
+
+
+# ============================================================================
+# EXECUÇÃO
+# ============================================================================
+
+class Runtime:
+    """Estado de uma execução: globais, saída, entrada e linha da leitura de vários valores"""
+
+    __slots__ = ('globals', 'output', 'stdout', 'input', 'prompts', 'line', 'position')
+
+    def __init__(self, prompts=True):
+        self.globals = []           # Mesma lista durante toda a vida do programa (capturada pelas closures)
+        self.output = []            # Texto escrito e ainda não enviado para stdout
+        self.stdout = None
+        self.input = iter(())
+        self.prompts = prompts      # Prompt "? " antes de cada leitura
+        self.line = ''              # Linha atual da leitura de vários valores (termina com ' ')
+        self.position = 0
+
+    def flush(self):
+        """Envia a saída pendente para stdout (antes de cada leitura e no fim)"""
+        if self.stdout is not None and self.output:
+            self.stdout.write(''.join(self.output))
+            del self.output[:]
+
+    def next_line(self):
+        """READ: próxima linha da entrada (a saída pendente é enviada antes)"""
+        self.flush()
+        try:
+            return next(self.input)
+        except StopIteration:
+            raise VMError("READ sem mais linhas de entrada") from None
+
+    def read(self):
+        """Próxima linha da entrada, depois do prompt"""
+        if self.prompts:
+            self.output.append('? ')
+        return self.next_line()
+
+    def read_number(self, real):
+        """
+        Próximo número da linha atual, como as rotinas readint/readreal do
+        compilador: salta espaços (lendo linhas novas), aceita um '-' e os
+        dígitos; um carácter inválido dá 0 e não é consumido.
+        """
+        line, position = self.line, self.position
+        while True:
+            while position < len(line) and line[position] <= ' ':
+                position += 1
+            if position < len(line):
+                break
+            line = self.read() + ' '  # Sentinela: os ciclos dos dígitos param no fim da linha
+            position = 0
+        sign = 1
+        if line[position] == '-':
+            sign = -1
+            position += 1
+        value = 0
+        while '0' <= line[position] <= '9':
+            value = value * 10 + ord(line[position]) - 48
+            position += 1
+        scale = 1
+        if real and line[position] == '.':
+            position += 1
+            while '0' <= line[position] <= '9':
+                value = value * 10 + ord(line[position]) - 48
+                scale *= 10
+                position += 1
+        self.line, self.position = line, position
+        if real:
+            return float(value * sign) / float(scale)
+        return value * sign
+
+
+class Program:
+    """Programa analisado, pronto a executar (várias vezes, com entradas diferentes)"""
+
+    def __init__(self, runtime, body, initial, arrays):
+        self.runtime = runtime
+        self.body = body            # Closure dos statements do programa principal
+        self.initial = initial      # Valores iniciais das globais
+        self.arrays = arrays        # Arrays globais: (endereço, tamanho), alocados em cada execução
+
+    def run(self, input_lines=None, stdout=None):
+        """Executa o programa; erros de execução são VMError, como na VM"""
+        runtime = self.runtime
+        runtime.globals[:] = self.initial
+        for address, size in self.arrays:
+            runtime.globals[address] = [0] * size  # ALLOCN: células a 0 (qualquer tipo)
+        del runtime.output[:]
+        runtime.stdout = stdout
+        runtime.input = iter(input_lines or [])
+        runtime.line, runtime.position = '', 0
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, RECURSION_LIMIT))
+        try:
+            self.body(None)
+        except RecursionError:
+            raise VMError("Recursão demasiado profunda") from None
+        except (IndexError, TypeError, ValueError, KeyError, OverflowError) as e:
+            raise VMError(f"{type(e).__name__}: {e}") from None
+        finally:
+            sys.setrecursionlimit(limit)
+            runtime.flush()
+        return self
+
+    def output(self):
+        """Texto escrito pelo programa (quando não foi indicado stdout)"""
+        return ''.join(self.runtime.output)
+
+
+# ============================================================================
+# EXPRESSÕES
+# ============================================================================
+
+class Expr:
+    """
+    Expressão analisada: tipo, closure que a avalia num frame, valor se for um
+    literal (ou operação entre literais) e, se for uma variável, closure que
+    devolve o seu endereço (bloco, posição) para a passagem por referência.
+    """
+
+    __slots__ = ('type', 'eval', 'const', 'ref')
+
+    def __init__(self, type_, eval_, const=None, ref=None):
+        self.type = type_
+        self.eval = eval_
+        self.const = const
+        self.ref = ref
+
+
+def constant(type_, value):
+    """Expressão com valor conhecido na análise"""
+    return Expr(type_, lambda fr: value, const=value)
+
+
+def invalid(type_='integer'):
+    """Expressão de um erro semântico (já reportado): o programa não chega a ser executado"""
+    return constant(type_, 0)
+
+
+def default_value(type_):
+    """Valor inicial de uma variável do tipo dado (como default_value_code)"""
+    if type_ == 'real':
+        return 0.0
+    if type_ in ('string', 'char'):
+        return ''
+    return 0
+
+
+def real_div(a, b):
+    """Divisão real (FDIV)"""
+    if b == 0:
+        raise VMError("Divisão por zero")
+    return float(a) / b
+
+
+def to_real(expr):
+    """Closure do valor de uma expressão convertido para real (ITOF nos inteiros)"""
+    if expr.type != 'integer':
+        return expr.eval
+    if expr.const is not None:
+        value = float(expr.const)
+        return lambda fr: value
+    evaluate = expr.eval
+    return lambda fr: float(evaluate(fr))
+
+
+def converted(var_type, expr):
+    """Closure do valor de expr depois das conversões implícitas de uma atribuição"""
+    if var_type == 'real' and expr.type == 'integer':
+        return to_real(expr)
+    if var_type == 'boolean' and expr.type == 'integer':
+        evaluate = expr.eval
+        return lambda fr: evaluate(fr) > 0  # Como PUSHI 0 / SUP
+    return expr.eval
+
+
+# Operações binárias: operador -> fábrica da closure (operandos já convertidos)
+BINARY = {
+    '+': lambda l, r: lambda fr: l(fr) + r(fr),
+    '-': lambda l, r: lambda fr: l(fr) - r(fr),
+    '*': lambda l, r: lambda fr: l(fr) * r(fr),
+    '/': lambda l, r: lambda fr: real_div(l(fr), r(fr)),
+    'div': lambda l, r: lambda fr: int_div(l(fr), r(fr)),
+    'mod': lambda l, r: lambda fr: int_mod(l(fr), r(fr)),
+    '<': lambda l, r: lambda fr: l(fr) < r(fr),
+    '>': lambda l, r: lambda fr: l(fr) > r(fr),
+    '<=': lambda l, r: lambda fr: l(fr) <= r(fr),
+    '>=': lambda l, r: lambda fr: l(fr) >= r(fr),
+    '=': lambda l, r: lambda fr: l(fr) == r(fr),
+    '<>': lambda l, r: lambda fr: l(fr) != r(fr),
+    'and': lambda l, r: lambda fr: bool(l(fr)) & bool(r(fr)),  # Os dois operandos são sempre avaliados
+    'or': lambda l, r: lambda fr: bool(l(fr)) | bool(r(fr)),
+}
+
+# Operando direito literal (i + 1, n mod 2, i <= 10): o valor fica na closure
+BINARY_CONSTANT = {
+    '+': lambda l, c: lambda fr: l(fr) + c,
+    '-': lambda l, c: lambda fr: l(fr) - c,
+    '*': lambda l, c: lambda fr: l(fr) * c,
+    '<': lambda l, c: lambda fr: l(fr) < c,
+    '>': lambda l, c: lambda fr: l(fr) > c,
+    '<=': lambda l, c: lambda fr: l(fr) <= c,
+    '>=': lambda l, c: lambda fr: l(fr) >= c,
+    '=': lambda l, c: lambda fr: l(fr) == c,
+    '<>': lambda l, c: lambda fr: l(fr) != c,
+}
+
+# Operações entre literais calculadas na análise (como binary_operation_code)
+FOLDED = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': real_div,
+    'div': int_div,
+    'mod': int_mod,
+}
+
+
+def binary(op, type_, left, right):
+    """
+    Expressão de uma operação binária sobre duas closures já convertidas.
+    left e right são (closure, literal ou None).
+    """
+    (left, left_const), (right, right_const) = left, right
+    if op in FOLDED and left_const is not None and right_const is not None:
+        try:
+            return constant(type_, FOLDED[op](left_const, right_const))
+        except VMError:
+            pass  # Divisão por zero: o erro fica para a execução
+    if right_const is not None and op in BINARY_CONSTANT:
+        return Expr(type_, BINARY_CONSTANT[op](left, right_const))
+    return Expr(type_, BINARY[op](left, right))
+
+
+def operand(expr, real):
+    """(closure, literal ou None) de um operando, convertido para real se real=True"""
+    if not real or expr.type != 'integer':
+        return expr.eval, expr.const
+    return to_real(expr), (float(expr.const) if expr.const is not None else None)
+
+
+# ============================================================================
+# VARIÁVEIS E ARRAYS
+# ============================================================================
+
+def frame_slot(symbol):
+    """Posição no frame de um parâmetro, local ou resultado do subprograma atual"""
+    return symbol.address + len(parser.current_subprogram['symbol'].params) + 1
+
+
+def variable_load(symbol):
+    """Closure que lê uma variável simples (global, local, resultado ou parâmetro VAR)"""
+    if symbol.is_global:
+        G, address = parser.runtime.globals, symbol.address
+        return lambda fr: G[address]
+    slot = frame_slot(symbol)
+    if symbol.is_reference:
+        def load(fr):
+            block, index = fr[slot]
+            return block[index]
+        return load
+    return lambda fr: fr[slot]
+
+
+def variable_ref(symbol):
+    """Closure que devolve o endereço (bloco, posição) de uma variável simples"""
+    if symbol.is_global:
+        G, address = parser.runtime.globals, symbol.address
+        return lambda fr: (G, address)
+    slot = frame_slot(symbol)
+    if symbol.is_reference:
+        return lambda fr: fr[slot]  # O slot já guarda o endereço
+    return lambda fr: (fr, slot)
+
+
+def variable_store(symbol, value):
+    """Statement que calcula value (closure) e o guarda na variável"""
+    if symbol.is_global:
+        G, address = parser.runtime.globals, symbol.address
+        def store(fr):
+            G[address] = value(fr)
+        return store
+    slot = frame_slot(symbol)
+    if symbol.is_reference:
+        def store_reference(fr):
+            block, index = fr[slot]  # Endereço lido antes do valor (como PUSHL / STORE)
+            block[index] = value(fr)
+        return store_reference
+    def store_local(fr):
+        fr[slot] = value(fr)
+    return store_local
+
+
+def array_base(symbol):
+    """Closure que devolve a lista de um array (global ou local)"""
+    if symbol.is_global:
+        G, address = parser.runtime.globals, symbol.address
+        return lambda fr: G[address]
+    slot = frame_slot(symbol)
+    return lambda fr: fr[slot]
+
+
+def array_element(array_name, indices, position=(None, None)):
+    """
+    Analisa o acesso a um elemento de array, com as verificações de
+    array_element_address (declaração, dimensões, tipos e limites dos índices).
+
+    Returns:
+        tuple: (símbolo, closure da base, closure da posição ou None, posição constante),
+        ou None se houver erro semântico
+    """
+    if array_name not in parser.symbol_table:
+        add_semantic_error('E007', *position, array_name=array_name)
+        return None
+    symbol = parser.symbol_table[array_name]
+    if not symbol.is_array:
+        add_semantic_error('E008', *position, array_name=array_name)
+        return None
+    if len(indices) != len(symbol.dims):
+        add_semantic_error('E009', *position, array_name=array_name, expected=len(symbol.dims), given=len(indices))
+        return None
+
+    offset = -symbol.bias   # Parte constante da posição
+    terms = []              # (closure do índice, stride) dos índices variáveis
+    for index, (start, end), stride in zip(indices, symbol.dims, symbol.strides):
+        if index.type != 'integer':
+            add_semantic_error('E010', *position, index_type=index.type)
+            return None
+        if index.const is not None:
+            if index.const < start or index.const > end:
+                add_semantic_error('W002', *position, index_val=index.const, array_name=array_name, start=start, end=end)
+            offset += index.const * stride
+        else:
+            terms.append((index.eval, stride))
+
+    base = array_base(symbol)
+    if not terms:
+        return symbol, base, None, offset
+    if len(terms) == 1 and terms[0][1] == 1:
+        index = terms[0][0]
+        locate = index if offset == 0 else (lambda fr: index(fr) + offset)
+    else:
+        def locate(fr):
+            position = offset
+            for index, stride in terms:
+                position += index(fr) * stride
+            return position
+    return symbol, base, locate, offset
+
+
+def element_load(base, locate, offset):
+    """Closure que lê um elemento de array"""
+    if locate is None:
+        return lambda fr: base(fr)[offset]
+    return lambda fr: base(fr)[locate(fr)]
+
+
+def element_ref(base, locate, offset):
+    """Closure que devolve o endereço (lista, posição) de um elemento de array"""
+    if locate is None:
+        return lambda fr: (base(fr), offset)
+    return lambda fr: (base(fr), locate(fr))
+
+
+# ============================================================================
+# SUBPROGRAMAS
+# ============================================================================
+
+def entry_cell(symbol):
+    """
+    Célula com a closure do corpo de um subprograma, preenchida no fim da sua
+    declaração (as chamadas recursivas são analisadas antes de o corpo existir).
+    """
+    cell = parser.runtime_entries.get(symbol)
+    if cell is None:
+        cell = parser.runtime_entries[symbol] = [None]
+    return cell
+
+
+def subprogram_call(name, args, position, as_function):
+    """
+    Analisa uma chamada (com as verificações de subprogram_call_code).
+
+    Returns:
+        tuple: (símbolo, closure que faz a chamada e devolve o resultado), ou None se houver erro
+    """
+    if name not in parser.symbol_table:
+        add_semantic_error('E014', *position, name=name)
+        return None
+    symbol = parser.symbol_table[name]
+    if symbol.kind == 'result':
+        symbol = symbol.function
+    if symbol.kind not in ('procedure', 'function'):
+        add_semantic_error('E015', *position, name=name)
+        return None
+    if as_function and symbol.kind == 'procedure':
+        add_semantic_error('E016', *position, name=name)
+        return None
+    if not as_function and symbol.kind == 'function':
+        add_semantic_error('E017', *position, name=name)
+        return None
+    if len(args) != len(symbol.params):
+        add_semantic_error('E018', *position, name=name, expected=len(symbol.params), given=len(args))
+        return None
+
+    # Valores (ou endereços, nos parâmetros VAR) dos argumentos, pela ordem da declaração
+    values = []
+    for (param_name, param_type, by_ref), arg in zip(symbol.params, args):
+        if by_ref:
+            if arg.ref is None:
+                add_semantic_error('E019', *position, param_name=param_name, name=name)
+                return None
+            if arg.type != param_type:
+                add_semantic_error('E020', *position, param_name=param_name, name=name, param_type=param_type, arg_type=arg.type)
+                return None
+            values.append(arg.ref)
+        else:
+            if not check_assignment_compatibility(param_type, arg.type, param_name, position):
+                return None
+            values.append(converted(param_type, arg))
+
+    # Frame novo: [resultado, argumentos...]; o corpo acrescenta as locais
+    cell = entry_cell(symbol)
+    result = default_value(symbol.type)
+    if not values:
+        def call(fr):
+            frame = [result]
+            cell[0](frame)
+            return frame[0]
+    elif len(values) == 1:
+        first, = values
+        def call(fr):
+            frame = [result, first(fr)]
+            cell[0](frame)
+            return frame[0]
+    elif len(values) == 2:
+        first, second = values
+        def call(fr):
+            frame = [result, first(fr), second(fr)]
+            cell[0](frame)
+            return frame[0]
+    else:
+        def call(fr):
+            frame = [result]
+            for value in values:
+                frame.append(value(fr))
+            cell[0](frame)
+            return frame[0]
+    return symbol, call
+
+
+def sequence(statements):
+    """Closure que executa uma lista de statements"""
+    statements = tuple(statements)
+    if not statements:
+        return lambda fr: None
+    if len(statements) == 1:
+        return statements[0]
+    def run(fr):
+        for statement in statements:
+            statement(fr)
+    return run
+
+
+# ============================================================================
+# AÇÕES SEMÂNTICAS
+# ============================================================================
+#
+# Têm o nome das funções de pas_yacc que substituem (bind_actions associa-as
+# pela função de cada produção). Os statements são listas de closures, como as
+# listas de instruções do compilador, por isso as regras que só juntam listas
+# (statement, statement_list, block) são as de pas_yacc.
+
+def p_program(p):
+    r'program : PROGRAM ID ";" declarations BEGIN statements opt_semicolon END "."'
+    if parser.diagnostics:
+        p[0] = None  # Erros ou avisos: o compilador também não geraria código
+        return
+    initial = [0] * parser.next_address
+    arrays = []
+    for symbol in parser.symbol_table.scopes[0].values():
+        if symbol.kind != 'var':
+            continue
+        if symbol.is_array:
+            arrays.append((symbol.address, symbol.size))
+        else:
+            initial[symbol.address] = default_value(symbol.type)
+    p[0] = Program(parser.runtime, sequence(p[6]), initial, arrays)
+
+def p_subprogram_decl(p):
+    r'subprogram_decl : subprogram_head var_decls BEGIN statements opt_semicolon END ";"'
+    info = parser.current_subprogram
+    symbol = info['symbol']
+    symbol.locals = info['locals']
+    body = sequence(p[4])
+
+    # Prólogo: locais acrescentadas ao frame (arrays alocados em cada chamada)
+    values = tuple(None if local.is_array else default_value(local.type) for local in info['locals'])
+    arrays = [(frame_slot(local), local.size) for local in info['locals'] if local.is_array]
+    if arrays:
+        def enter(frame):
+            frame.extend(values)
+            for slot, size in arrays:
+                frame[slot] = [0] * size
+            body(frame)
+    elif values:
+        def enter(frame):
+            frame.extend(values)
+            body(frame)
+    else:
+        enter = body
+    entry_cell(symbol)[0] = enter
+
+    parser.symbol_table.exit_scope()
+    parser.current_scope = parser.symbol_table.level
+    parser.current_subprogram = None
+    p[0] = None
+
+def p_procedure_call(p):
+    r'''procedure_call : ID
+                       | ID "(" expression_list ")"'''
+    args = p[3] if len(p) == 5 else []
+    call = subprogram_call(p[1], args, token_position(p, 1), as_function=False)
+    p[0] = [call[1]] if call else []
+
+def p_repeat_statement(p):
+    r'repeat_statement : REPEAT statements UNTIL expression'
+    expr = p[4]
+    if not is_boolean_type(expr.type):
+        add_semantic_error('E023', *token_position(p, 4), expr_type=expr.type)
+    body, cond = sequence(p[2]), expr.eval
+    def run(fr):
+        body(fr)
+        while not cond(fr):
+            body(fr)
+    p[0] = [run]
+
+def p_assignment(p):
+    r'assignment : ID ASSIGN expression'
+    var_name, expr = p[1], p[3]
+    symbol = parser.symbol_table.get(var_name)
+    if symbol is None:
+        add_semantic_error('E024', *token_position(p, 1), var_name=var_name)
+        p[0] = []
+        return
+    if symbol.type and not check_assignment_compatibility(symbol.type, expr.type, var_name, token_position(p, 1)):
+        p[0] = []
+        return
+    if symbol.is_array:
+        add_semantic_error('E025', *token_position(p, 1), var_name=var_name)
+        p[0] = []
+        return
+    if symbol.kind in ('procedure', 'function'):
+        add_semantic_error('E026', *token_position(p, 1), var_name=var_name)
+        p[0] = []
+        return
+    p[0] = [variable_store(symbol, converted(symbol.type, expr))]
+
+def p_assignment_array(p):
+    r'assignment : ID subscripts ASSIGN expression'
+    element = array_element(p[1], p[2], token_position(p, 1))
+    if element is None:
+        p[0] = []
+        return
+    symbol, base, locate, offset = element
+    expr = p[4]
+    if expr.type != symbol.type:
+        if not check_assignment_compatibility(symbol.type, expr.type, f"{p[1]}[...]", token_position(p, 1)):
+            p[0] = []
+            return
+    value = converted(symbol.type, expr)
+    if locate is None:
+        def store(fr):
+            block = base(fr)
+            block[offset] = value(fr)
+    else:
+        def store(fr):
+            block, index = base(fr), locate(fr)  # Endereço calculado antes do valor
+            block[index] = value(fr)
+    p[0] = [store]
+
+
+# ESCRITA
+
+def p_writeln(p):
+    r'writeln : WRITELN "(" writeln_args ")"'
+    p[0] = [write_statement(p[3], newline=True)]
+
+def p_writeln_empty(p):
+    r'writeln : WRITELN'
+    out = parser.runtime.output.append
+    p[0] = [lambda fr: out('\n')]
+
+def p_write(p):
+    r'write : WRITE "(" writeln_args ")"'
+    p[0] = [write_statement(p[3], newline=False)]
+
+def p_writeln_arg_string(p):
+    r'writeln_arg : STRING'
+    p[0] = ('text', unescape_string(p[1]))  # Como PUSHS "..." depois de carregado na VM
+
+def p_writeln_arg_expression(p):
+    r'writeln_arg : expression'
+    p[0] = (p[1].type, p[1])
+
+def write_text(kind, expr):
+    """Texto constante, ou closure que produz o texto escrito por WRITEI/WRITEF/WRITES"""
+    if kind == 'text':
+        return expr
+    evaluate = expr.eval
+    if kind in ('string', 'char'):
+        if expr.const is not None:
+            return expr.const
+        def text(fr):
+            value = evaluate(fr)
+            if value.__class__ is not str:
+                raise VMError(f"WRITES de um valor que não é uma string: {value!r}")
+            return value
+        return text
+    if kind == 'real':
+        return lambda fr: format_real(evaluate(fr))
+    if kind == 'boolean':
+        return lambda fr: 'true' if evaluate(fr) else 'false'
+    return lambda fr: str(evaluate(fr))
+
+def write_statement(pieces, newline):
+    """
+    Closure de WRITE/WRITELN: cada argumento é avaliado e escrito por ordem
+    (os textos constantes vizinhos são juntados na análise).
+    """
+    parts = []
+    for kind, value in pieces:
+        text = write_text(kind, value)
+        if isinstance(text, str) and parts and isinstance(parts[-1], str):
+            parts[-1] += text
+        else:
+            parts.append(text)
+    if newline:
+        if parts and isinstance(parts[-1], str):
+            parts[-1] += '\n'
+        else:
+            parts.append('\n')
+    out = parser.runtime.output.append
+    if len(parts) == 1 and isinstance(parts[0], str):
+        text, = parts
+        return lambda fr: out(text)
+    parts = tuple((lambda fr, text=text: text) if isinstance(text, str) else text for text in parts)
+    def write(fr):
+        for part in parts:
+            out(part(fr))
+    return write
+
+
+# LEITURA
+
+def p_readln(p):
+    r'readln : READLN "(" read_targets ")"'
+    targets = p[3]
+    if None in targets:
+        p[0] = []
+        return
+    runtime = parser.runtime
+    read = runtime.read
+
+    # Um único valor: linha inteira convertida como ATOI/ATOF
+    if len(targets) == 1 and targets[0][0] != 'array':
+        kind, symbol, element = targets[0]
+        if symbol.type == 'real':
+            value = lambda fr: float(read().strip())
+        elif symbol.type in ('integer', 'boolean'):
+            value = lambda fr: int(read().strip())
+        else:
+            value = lambda fr: read()
+        if kind == 'var':
+            p[0] = [variable_store(symbol, value)]
+        else:
+            base, locate, offset = element
+            ref = element_ref(base, locate, offset)
+            def store(fr):
+                block, index = ref(fr)  # Endereço calculado antes da leitura
+                block[index] = value(fr)
+            p[0] = [store]
+        return
+
+    # Vários valores: números separados por espaços, continuando nas linhas seguintes
+    for kind, symbol, _ in targets:
+        if symbol.type not in ('integer', 'real', 'boolean'):
+            add_semantic_error('E036', *token_position(p, 1), var_name=symbol.name, var_type=symbol.type)
+            p[0] = []
+            return
+    read_number = runtime.read_number
+    steps = []
+    for kind, symbol, element in targets:
+        real = symbol.type == 'real'
+        if kind == 'var':
+            steps.append(variable_store(symbol, lambda fr, real=real: read_number(real)))
+        elif kind == 'element':
+            ref = element_ref(*element)
+            def store(fr, ref=ref, real=real):
+                block, index = ref(fr)
+                block[index] = read_number(real)
+            steps.append(store)
+        else:
+            # Array inteiro: todos os elementos pela ordem em memória (row-major)
+            def store_all(fr, base=array_base(symbol), size=symbol.size, real=real):
+                block = base(fr)
+                for index in range(size):
+                    block[index] = read_number(real)
+            steps.append(store_all)
+    steps = tuple(steps)
+    def readln(fr):
+        runtime.line = ''  # O primeiro número lê sempre uma linha nova
+        for step in steps:
+            step(fr)
+    p[0] = [readln]
+
+def p_read_target_array(p):
+    r'read_target : ID subscripts'
+    element = array_element(p[1], p[2], token_position(p, 1))
+    p[0] = ('element', element[0], element[1:]) if element is not None else None
+
+
+# ESTRUTURAS DE CONTROLO
+
+def p_if_statement(p):
+    r'if_statement : IF expression THEN statement ELSE statement'
+    if not is_boolean_type(p[2].type):
+        add_semantic_error('E027', *token_position(p, 2), expr_type=p[2].type)
+    cond, then, otherwise = p[2].eval, sequence(p[4]), sequence(p[6])
+    def run(fr):
+        if cond(fr):
+            then(fr)
+        else:
+            otherwise(fr)
+    p[0] = [run]
+
+def p_if_statement_no_else(p):
+    r'if_statement : IF expression THEN statement'
+    if not is_boolean_type(p[2].type):
+        add_semantic_error('E027', *token_position(p, 2), expr_type=p[2].type)
+    cond, then = p[2].eval, sequence(p[4])
+    def run(fr):
+        if cond(fr):
+            then(fr)
+    p[0] = [run]
+
+def p_while_statement(p):
+    r'while_statement : WHILE expression DO statement'
+    if not is_boolean_type(p[2].type):
+        add_semantic_error('E028', *token_position(p, 2), expr_type=p[2].type)
+    cond, body = p[2].eval, sequence(p[4])
+    def run(fr):
+        while cond(fr):
+            body(fr)
+    p[0] = [run]
+
+def p_for_statement(p):
+    '''for_statement : FOR ID ASSIGN expression TO expression DO statement
+                     | FOR ID ASSIGN expression DOWNTO expression DO statement'''
+    var_name, start, end = p[2], p[4], p[6]
+    symbol = parser.symbol_table.get(var_name)
+    if symbol is None:
+        add_semantic_error('E024', *token_position(p, 2), var_name=var_name)
+        p[0] = []
+        return
+    if symbol.type and symbol.type != 'integer':
+        add_semantic_error('E029', *token_position(p, 2), var_type=symbol.type)
+    if start.type != 'integer':
+        add_semantic_error('E030', *token_position(p, 4), start_type=start.type)
+    if end.type != 'integer':
+        add_semantic_error('E031', *token_position(p, 6), end_type=end.type)
+    if symbol.kind in ('procedure', 'function'):
+        add_semantic_error('E026', *token_position(p, 2), var_name=var_name)
+        p[0] = []
+        return
+
+    # O limite é avaliado em cada iteração e a variável é lida de novo no incremento (como na VM)
+    step = 1 if p[5].lower() == 'to' else -1
+    body, first, last = sequence(p[8]), start.eval, end.eval
+    if symbol.is_global and not symbol.is_array:
+        G, address = parser.runtime.globals, symbol.address
+        if step == 1:
+            def run(fr):
+                G[address] = first(fr)
+                while G[address] <= last(fr):
+                    body(fr)
+                    G[address] += 1
+        else:
+            def run(fr):
+                G[address] = first(fr)
+                while G[address] >= last(fr):
+                    body(fr)
+                    G[address] -= 1
+        p[0] = [run]
+        return
+    if not symbol.is_global and not symbol.is_reference:
+        slot = frame_slot(symbol)
+        if step == 1:
+            def run(fr):
+                fr[slot] = first(fr)
+                while fr[slot] <= last(fr):
+                    body(fr)
+                    fr[slot] += 1
+        else:
+            def run(fr):
+                fr[slot] = first(fr)
+                while fr[slot] >= last(fr):
+                    body(fr)
+                    fr[slot] -= 1
+        p[0] = [run]
+        return
+    # Parâmetro VAR: a variável é acedida através do endereço guardado no slot
+    load, ref = variable_load(symbol), variable_ref(symbol)
+    def run_reference(fr):
+        block, index = ref(fr)
+        block[index] = first(fr)
+        while (load(fr) - last(fr)) * step <= 0:
+            body(fr)
+            block, index = ref(fr)
+            block[index] = load(fr) + step
+    p[0] = [run_reference]
+
+
+# EXPRESSÕES
+
+def p_logical_or_expression(p):
+    '''logical_or_expression : logical_and_expression
+                             | logical_or_expression OR logical_and_expression'''
+    p[0] = p[1] if len(p) == 2 else logical(p, 'or')
+
+def p_logical_and_expression(p):
+    '''logical_and_expression : relational_expression
+                              | logical_and_expression AND relational_expression'''
+    p[0] = p[1] if len(p) == 2 else logical(p, 'and')
+
+def logical(p, op):
+    """Expressão AND/OR (os dois operandos são sempre avaliados)"""
+    if not check_operation_compatibility(op, p[1].type, p[3].type, token_position(p, 2)):
+        return invalid('boolean')
+    return Expr('boolean', BINARY[op](p[1].eval, p[3].eval))
+
+def p_relational_expression(p):
+    '''relational_expression : simple_expression
+                            | simple_expression RELOP simple_expression'''
+    if len(p) == 2:
+        p[0] = p[1]
+        return
+    left, op, right = p[1], p[2], p[3]
+    if not check_operation_compatibility(op, left.type, right.type, token_position(p, 2)):
+        p[0] = invalid('boolean')
+        return
+    real = 'real' in (left.type, right.type)
+    left_fn, _ = operand(left, real)
+    right_fn, right_const = operand(right, real)
+    if right_const is not None:
+        p[0] = Expr('boolean', BINARY_CONSTANT[op](left_fn, right_const))
+    else:
+        p[0] = Expr('boolean', BINARY[op](left_fn, right_fn))
+
+def p_simple_expression(p):
+    '''simple_expression : term
+                        | simple_expression ADDOP term
+                        | ADDOP term'''
+    if len(p) == 2:
+        p[0] = p[1]
+    elif len(p) == 3:
+        term = p[2]
+        if p[1] != '-':
+            p[0] = term  # '+' unário: o termo inalterado (continua a poder ser passado por referência)
+            return
+        if not is_numeric_type(term.type):
+            add_semantic_error('E032', *token_position(p, 1), term_type=term.type)
+        evaluate = term.eval
+        if term.type == 'real':
+            # Como PUSHF 0.0 / FSUB: -0.0 nunca aparece
+            if term.const is not None:
+                p[0] = constant('real', 0.0 - term.const)
+            else:
+                p[0] = Expr('real', lambda fr: 0.0 - evaluate(fr))
+        elif term.const is not None:
+            p[0] = constant(term.type, -term.const)
+        else:
+            p[0] = Expr(term.type, lambda fr: -evaluate(fr))
+    else:
+        left, op, right = p[1], p[2], p[3]
+        if op == '+' and is_string_or_char_type(left.type) and is_string_or_char_type(right.type):
+            p[0] = Expr('string', BINARY['+'](left.eval, right.eval))  # Concatenação
+            return
+        if not check_operation_compatibility(op, left.type, right.type, token_position(p, 2)):
+            p[0] = invalid()
+            return
+        type_ = 'real' if 'real' in (left.type, right.type) else 'integer'
+        real = type_ == 'real'
+        p[0] = binary(op, type_, operand(left, real), operand(right, real))
+
+def p_term(p):
+    '''term : factor
+            | term MULOP factor
+            | term DIV factor
+            | term MOD factor'''
+    if len(p) == 2:
+        p[0] = p[1]
+        return
+    left, op, right = p[1], p[2].lower(), p[3]
+    if not check_operation_compatibility(op, left.type, right.type, token_position(p, 2)):
+        p[0] = invalid()
+        return
+    type_ = 'real' if op == '/' or 'real' in (left.type, right.type) else 'integer'
+    real = type_ == 'real'
+    p[0] = binary(op, type_, operand(left, real), operand(right, real))
+
+
+# FATORES
+
+def p_factor_string(p):
+    r'factor : STRING'
+    p[0] = constant('string', unescape_string(p[1]))
+
+def p_factor_charlit(p):
+    r'factor : CHARLIT'
+    p[0] = constant('char', unescape_string(p[1]))
+
+def p_factor_id(p):
+    r'factor : ID'
+    name = p[1]
+    symbol = parser.symbol_table.get(name)
+    if symbol is None:
+        add_semantic_error('E024', *token_position(p, 1), var_name=name)
+        p[0] = invalid()
+        return
+    if symbol.is_array:
+        add_semantic_error('E033', *token_position(p, 1), var_name=name)
+        p[0] = invalid()
+        return
+    # Função (ou o nome da função dentro do seu corpo): chamada sem argumentos
+    if symbol.kind in ('function', 'result', 'procedure'):
+        call = subprogram_call(name, [], token_position(p, 1), as_function=True)
+        p[0] = Expr(call[0].type, call[1]) if call else invalid()
+        return
+    p[0] = Expr(symbol.type, variable_load(symbol), ref=variable_ref(symbol))
+
+def p_factor_num(p):
+    r'factor : NUM'
+    p[0] = constant('real' if isinstance(p[1], float) else 'integer', p[1])
+
+def p_factor_not(p):
+    r'factor : NOT factor'
+    if not is_boolean_type(p[2].type):
+        add_semantic_error('E034', *token_position(p, 1), factor_type=p[2].type)
+    evaluate = p[2].eval
+    p[0] = Expr('boolean', lambda fr: not evaluate(fr))
+
+def p_factor_true(p):
+    r'factor : TRUE'
+    p[0] = constant('boolean', True)
+
+def p_factor_false(p):
+    r'factor : FALSE'
+    p[0] = constant('boolean', False)
+
+def p_factor_length(p):
+    r'factor : LENGTH "(" expression ")"'
+    if not is_string_or_char_type(p[3].type):
+        add_semantic_error('E035', *token_position(p, 1), arg_type=p[3].type)
+        p[0] = invalid()
+        return
+    evaluate = p[3].eval
+    p[0] = Expr('integer', lambda fr: len(evaluate(fr)))
+
+def p_factor_array(p):
+    r'factor : ID subscripts'
+    element = array_element(p[1], p[2], token_position(p, 1))
+    if element is None:
+        p[0] = invalid()
+        return
+    symbol, base, locate, offset = element
+    p[0] = Expr(symbol.type, element_load(base, locate, offset), ref=element_ref(base, locate, offset))
+
+def p_factor_call(p):
+    r'factor : ID "(" expression_list ")"'
+    call = subprogram_call(p[1], p[3], token_position(p, 1), as_function=True)
+    p[0] = Expr(call[0].type, call[1]) if call else invalid()
+
+
+# Produções do parser com as ações do interpretador (as restantes ficam com as do compilador)
+interpreter_productions = bind_actions(
+    compile_productions, {name: action for name, action in globals().items() if name.startswith('p_')})
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+def load(code, max_errors=MAX_ERRORS, read_prompts=True):
+    """
+    Analisa um programa Pascal e prepara-o para execução.
+
+    Com erros (ou avisos), os diagnósticos são os do compilador (compile_program),
+    para que as mensagens sejam exatamente as mesmas.
+
+    Args:
+        code (str): Código fonte Pascal
+        max_errors (int): Número de erros que interrompe a análise (None ou 0 = sem limite)
+        read_prompts (bool): Mostrar o prompt "? " antes de cada leitura
+
+    Returns:
+        tuple: (Program ou None se houve erros, lista de Diagnostic)
+    """
+    init(max_errors=max_errors, read_prompts=read_prompts)
+    parser.runtime = Runtime(read_prompts)
+    parser.runtime_entries = {}     # Símbolo do subprograma -> célula com o corpo
+    try:
+        program = parse_with(interpreter_productions, code)
+    except TooManyErrors:
+        program = None
+    if program is None or parser.diagnostics:
+        return None, compile_program(code, max_errors=max_errors, read_prompts=read_prompts)[1]
+    return program, []
+
+
+def run_source(code, input_lines=None, **options):
+    """Atalho: analisa e executa um programa; devolve a saída (ValueError se houver erros)"""
+    program, diagnostics = load(code, **options)
+    if program is None:
+        raise ValueError("\n".join(str(d) for d in diagnostics))
+    return program.run(input_lines).output()
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Interpretador de referência de Pascal (sem VM)")
+    args.add_argument('source', help="ficheiro Pascal ('-' para stdin)")
+    args.add_argument('--no-prompt', action='store_true', help="não mostrar o prompt '? ' antes de cada leitura")
+    options = args.parse_args()
+    if options.source == '-':
+        code = sys.stdin.read()
+        lines = iter(())
+    else:
+        with open(options.source, encoding='utf-8') as f:
+            code = f.read()
+        lines = (line.rstrip('\n') for line in sys.stdin)
+    program, diagnostics = load(code, read_prompts=not options.no_prompt)
+    for diagnostic in diagnostics:
+        print(diagnostic, file=sys.stderr)
+    if program is None:
+        sys.exit(1)
+    try:
+        program.run(lines, sys.stdout)
+    except VMError as e:
+        print(f"\nErro de execução: {e}", file=sys.stderr)
+        sys.exit(1)
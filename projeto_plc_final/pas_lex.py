@@ -13,7 +13,7 @@ literals = ['+', '-', '*', '/', '(', ')', ';', '.', ',', ':', '>', '<', '=', '['
 # - Palavras-chave da linguagem Pascal: program, begin, end, var, tipos, estruturas de controle, etc.
 # - Palavras-chave para subprogramas (function, procedure) e arrays (array, of)
 # - Valores booleanos (true, false) e função intrínseca (length)
-tokens = ['NUM', 'ID', 'CHARLIT', 'STRING',  
+tokens = ['NUM', 'ID', 'CHARLIT', 'STRING',
           'ASSIGN', 'GE', 'LE', 'NE', 'DOTDOT',
           'PROGRAM', 'BEGIN', 'END', 'VAR', 'INTEGER', 'BOOLEAN', 'REAL', 'CHAR', 'STRING_TYPE',
           'IF', 'THEN', 'ELSE', 'WHILE', 'DO', 'FOR', 'TO', 'DOWNTO', 'REPEAT', 'UNTIL',
@@ -21,147 +21,47 @@ tokens = ['NUM', 'ID', 'CHARLIT', 'STRING',
           'WRITELN', 'READLN', 'FUNCTION', 'PROCEDURE', 'ARRAY', 'OF', 'WRITE',
           'TRUE', 'FALSE', 'LENGTH']
 
-# Definição das regras para as palavras-chave usando expressões regulares com \b (boundary)
-# O \b assegura que a palavra seja reconhecida apenas como uma palavra completa, evitando
-# que seja confundida com parte de um identificador (ex: 'end' em 'endpoint').
-
-def t_PROGRAM(t):
-    r'\bprogram\b'  # Reconhece a palavra 'program' como token PROGRAM
-    return t        # Retorna o token
-
-def t_BEGIN(t):
-    r'\bbegin\b'    # Reconhece 'begin'
-    return t
-
-def t_END(t):
-    r'\bend\b'      # Reconhece 'end'
-    return t
-
-def t_WRITE(t):
-    r'\bwrite\b'  # Reconhece 'write' (sem pular linha)
-    return t
-
-def t_VAR(t):
-    r'\bvar\b'      # Reconhece 'var'
-    return t
-
-def t_INTEGER(t):
-    r'\binteger\b'  # Reconhece 'integer' (tipo inteiro)
-    return t
-
-def t_BOOLEAN(t):
-    r'\bboolean\b'  # Reconhece 'boolean' (tipo lógico)
-    return t
-
-def t_REAL(t):
-    r'\breal\b'     # Reconhece 'real' (tipo real)
-    return t
-
-def t_CHAR(t):
-    r'\bchar\b'     # Reconhece 'char' (tipo caractere)
-    return t
-
-def t_STRING_TYPE(t):
-    r'\bstring\b'   # Reconhece 'string' (tipo string)
-    return t
-
-def t_ARRAY(t):
-    r'\barray\b'    # Reconhece 'array'
-    return t
-
-def t_OF(t):
-    r'\bof\b'       # Reconhece 'of'
-    return t
-
-def t_FUNCTION(t):
-    r'\bfunction\b' # Reconhece 'function' (não implementada, mas reconhecida lexicalmente)
-    return t
-
-def t_PROCEDURE(t):
-    r'\bprocedure\b' # Reconhece 'procedure' (não implementada, mas reconhecida lexicalmente)
-    return t
-
-def t_IF(t):
-    r'\bif\b'       # Reconhece 'if'
-    return t
-
-def t_THEN(t):
-    r'\bthen\b'     # Reconhece 'then'
-    return t
-
-def t_ELSE(t):
-    r'\belse\b'     # Reconhece 'else'
-    return t
-
-def t_WHILE(t):
-    r'\bwhile\b'    # Reconhece 'while'
-    return t
-
-def t_DO(t):
-    r'\bdo\b'       # Reconhece 'do'
-    return t
-
-def t_FOR(t):
-    r'\bfor\b'      # Reconhece 'for'
-    return t
-
-def t_TO(t):
-    r'\bto\b'       # Reconhece 'to' (usado em loops for)
-    return t
-
-def t_DOWNTO(t):
-    r'\bdownto\b'   # Reconhece 'downto' (usado em loops for decrescentes)
-    return t
-
-def t_REPEAT(t):
-    r'\brepeat\b'   # Reconhece 'repeat'
-    return t
-
-def t_UNTIL(t):
-    r'\buntil\b'    # Reconhece 'until'
-    return t
-
-def t_AND(t):
-    r'\band\b'      # Reconhece 'and' (operador lógico)
-    return t
-
-def t_OR(t):
-    r'\bor\b'       # Reconhece 'or' (operador lógico)
-    return t
-
-def t_NOT(t):
-    r'\bnot\b'      # Reconhece 'not' (operador lógico) - agora só como palavra completa
-    return t
-
-def t_DIV(t):
-    r'\bdiv\b'      # Reconhece 'div' (divisão inteira)
-    return t
-
-def t_MOD(t):
-    r'\bmod\b'      # Reconhece 'mod' (resto da divisão inteira)
-    return t
-
-def t_WRITELN(t):
-    r'\bwriteln\b'  # Reconhece 'writeln' (saída de dados)
-    return t
-
-def t_READLN(t):
-    r'\breadln\b'   # Reconhece 'readln' (entrada de dados)
-    return t
-
-def t_LENGTH(t):
-    r'\blength\b'   # Reconhece 'length' (função intrínseca para strings)
-    return t
-
-def t_TRUE(t):
-    r'\btrue\b'     # Reconhece 'true' (valor booleano)
-    t.value = True  # Converte o valor do token para o booleano Python True
-    return t
-
-def t_FALSE(t):
-    r'\bfalse\b'    # Reconhece 'false' (valor booleano)
-    t.value = False # Converte o valor do token para o booleano Python False
-    return t
+# Palavras reservadas: reconhecidas pela regra dos identificadores (t_ID) e
+# convertidas no token respetivo com uma consulta a este dicionário. Uma regra
+# por palavra (r'\bprogram\b', ...) obrigava o lexer a testar todas as palavras
+# antes de reconhecer cada identificador. Como o Pascal não diferencia
+# maiúsculas de minúsculas, a consulta é feita com o texto em minúsculas.
+reserved = {
+    'program': 'PROGRAM',       # Cabeçalho do programa
+    'begin': 'BEGIN',
+    'end': 'END',
+    'write': 'WRITE',           # Sem pular linha
+    'var': 'VAR',
+    'integer': 'INTEGER',       # Tipo inteiro
+    'boolean': 'BOOLEAN',       # Tipo lógico
+    'real': 'REAL',             # Tipo real
+    'char': 'CHAR',             # Tipo caractere
+    'string': 'STRING_TYPE',    # Tipo string
+    'array': 'ARRAY',
+    'of': 'OF',
+    'function': 'FUNCTION',     # Declaração de função
+    'procedure': 'PROCEDURE',   # Declaração de procedimento
+    'if': 'IF',
+    'then': 'THEN',
+    'else': 'ELSE',
+    'while': 'WHILE',
+    'do': 'DO',
+    'for': 'FOR',
+    'to': 'TO',                 # Usado em loops for
+    'downto': 'DOWNTO',         # Usado em loops for decrescentes
+    'repeat': 'REPEAT',
+    'until': 'UNTIL',
+    'and': 'AND',               # Operador lógico
+    'or': 'OR',                 # Operador lógico
+    'not': 'NOT',               # Operador lógico
+    'div': 'DIV',               # Divisão inteira
+    'mod': 'MOD',               # Resto da divisão inteira
+    'writeln': 'WRITELN',       # Saída de dados
+    'readln': 'READLN',         # Entrada de dados
+    'length': 'LENGTH',         # Função intrínseca para strings
+    'true': 'TRUE',             # Valor booleano
+    'false': 'FALSE',           # Valor booleano
+}
 
 # Regras para tokens não-palavras-chave (operadores compostos, identificadores, números, strings, etc.)
 
@@ -183,6 +83,11 @@ def t_NE(t):
 
 def t_ID(t):
     r'[a-zA-Z_][a-zA-Z0-9_]*'  # Identificadores: começam com letra ou underscore, seguido por zero ou mais letras, dígitos ou underscores
+    kind = reserved.get(t.value.lower())
+    if kind is not None:
+        t.type = kind  # Palavra reservada (ex: 'Begin' -> BEGIN)
+        if kind == 'TRUE' or kind == 'FALSE':
+            t.value = kind == 'TRUE'  # Converte o valor do token para o booleano Python
     return t
 
 def t_DOTDOT(t):
@@ -211,6 +116,7 @@ def t_CHARLIT(t):
 # --- REGRA STRING MODIFICADA (2+ caracteres) ---
 def t_STRING(t):
     r"'(\\'|[^'])*'|\"(\\\"|[^\"])*\""  # Zero ou mais caracteres entre aspas
+    record_newlines(t.lexer, t.lexpos, t.value)  # Uma string pode conter quebras de linha
     # Remove as aspas delimitadoras
     t.value = t.value[1:-1]
     # Processa caracteres escapados
@@ -219,20 +125,69 @@ def t_STRING(t):
 
 def t_COMMENT(t):
     r'(\{[^}]*\}|//.*|\#.*)'  # Comentários: estilo Pascal { ... }, estilo C++ //, ou estilo shell #
+    record_newlines(t.lexer, t.lexpos, t.value)  # Comentários { ... } podem ocupar várias linhas
     pass  # Descarta comentários (não retorna token)
 
 def t_newline(t):
     r'\n+'          # Reconhece uma ou mais novas linhas
-    t.lexer.lineno += len(t.value)  # Incrementa o contador de linhas do lexer
+    record_newlines(t.lexer, t.lexpos, t.value)  # Incrementa o contador de linhas do lexer
     # Não retorna token (apenas atualiza o estado)
 
+def record_newlines(lexer, lexpos, text):
+    """
+    Conta as quebras de linha de um texto reconhecido na posição lexpos.
+
+    Além de incrementar lineno, guarda em lexer.line_starts a posição onde começa
+    cada nova linha, para que a coluna de um token seja calculada em O(1).
+    """
+    pos = text.find('\n')
+    while pos != -1:
+        lexer.lineno += 1
+        lexer.line_starts.append(lexpos + pos + 1)  # A linha seguinte começa depois do '\n'
+        pos = text.find('\n', pos + 1)
+
+def find_column(lineno, lexpos):
+    """
+    Devolve a coluna (a partir de 1) de um token, dada a sua linha e posição (lexpos).
+
+    Returns:
+        int ou None: Coluna do token (None se a linha for desconhecida)
+    """
+    if not 1 <= lineno <= len(lexer.line_starts):
+        return None
+    return lexpos - lexer.line_starts[lineno - 1] + 1
+
+def reset_lexer():
+    """Reinicia a contagem de linhas antes de analisar um novo programa"""
+    lexer.lineno = 1
+    lexer.line_starts = [0]  # line_starts[n - 1] = posição (lexpos) onde começa a linha n
+
+def tokenize(code):
+    """
+    Gera os tokens de um programa, sem análise sintática (ferramentas como
+    formatadores e realce de sintaxe só precisam dos tokens).
+
+    Yields:
+        tuple: (tipo, valor, linha, coluna) de cada token; linhas e colunas a partir de 1
+    """
+    reset_lexer()
+    lexer.input(code)
+    starts = lexer.line_starts  # Cresce à medida que o lexer avança
+    next_token = lexer.token
+    while True:
+        token = next_token()
+        if token is None:
+            return
+        yield token.type, token.value, token.lineno, token.lexpos - starts[token.lineno - 1] + 1
+
 # Caracteres a ignorar: espaços, tabs e retornos de carro
 t_ignore = ' \t\r'
 
 # Função de tratamento de erros léxicos
 def t_error(t):
-    print(f"Caractere inválido: '{t.value[0]}' na linha {t.lineno}")  # Imprime mensagem de erro com o caractere e linha
+    print(f"Caractere inválido: '{t.value[0]}' na linha {t.lineno}, coluna {find_column(t.lineno, t.lexpos)}")  # Imprime mensagem de erro com o caractere e linha
     t.lexer.skip(1)  # Pula o caractere inválido e continua a análise
 
 # Criação do lexer com a flag re.IGNORECASE para tornar as regras case-insensitive (Pascal não diferencia maiúsculas/minúsculas)
-lexer = lex.lex(reflags=re.IGNORECASE)
\ No newline at end of file
+lexer = lex.lex(reflags=re.IGNORECASE)
+reset_lexer()
\ No newline at end of file
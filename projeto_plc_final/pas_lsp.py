@@ -0,0 +1,503 @@
+# Servidor de linguagem (Language Server Protocol) para o Pascal do compilador.
+# Comunica por stdin/stdout (JSON-RPC com cabeçalhos Content-Length), como
+# esperado pelos editores (VS Code, Neovim, ...):
+#   - diagnósticos: erros e avisos do compilador, recalculados após uma pausa na escrita
+#   - hover: tipo ou assinatura do identificador sob o cursor
+#   - definição: posição da declaração do identificador sob o cursor
+# As compilações correm num processo à parte; enquanto não terminam, o hover e a
+# definição usam a última análise, com as posições ajustadas às edições seguintes.
+# Uso: python pas_lsp.py [--debounce MS] [--sync]
+import argparse
+import bisect
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pas_yacc import compile_program, parser
+
+DEBOUNCE = 0.25     # Pausa na escrita (segundos) antes de recompilar
+
+# Opções de compilação da análise: só interessam os diagnósticos e o índice de símbolos
+ANALYSIS_OPTIONS = {'index_symbols': True, 'inline_budget': 0, 'tail_calls': False,
+                    'constant_pool': False}
+
+# Gravidade LSP de cada gravidade dos diagnósticos do compilador
+SEVERITIES = {'error': 1, 'warning': 2, 'fatal': 1}
+
+# Códigos de erro JSON-RPC
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+# ============================================================================
+# ANÁLISE (corre no processo de compilação)
+# ============================================================================
+
+def describe(symbol):
+    """Texto do hover: declaração do símbolo em sintaxe Pascal"""
+    if symbol.kind == 'result':
+        symbol = symbol.function
+    if symbol.kind in ('procedure', 'function'):
+        params = "; ".join(f"{'var ' if by_ref else ''}{name}: {type_}" for name, type_, by_ref in symbol.params)
+        signature = f"{symbol.kind} {symbol.name}" + (f"({params})" if params else "")
+        return signature + (f": {symbol.type}" if symbol.kind == 'function' else "")
+    if symbol.is_array:
+        bounds = ", ".join(f"{start}..{end}" for start, end in symbol.dims)
+        type_ = f"array[{bounds}] of {symbol.type}"
+    else:
+        type_ = symbol.type
+    if symbol.is_global:
+        return f"var {symbol.name}: {type_}"
+    if symbol.address < 0:
+        return f"(parâmetro) {'var ' if symbol.is_reference else ''}{symbol.name}: {type_}"
+    return f"(local) {symbol.name}: {type_}"
+
+
+def analyze(source):
+    """
+    Compila o código e devolve os diagnósticos e o índice de símbolos em dados simples
+    (para poderem vir de outro processo).
+
+    Returns:
+        dict: 'diagnostics' (dicionários de Diagnostic.to_dict), 'symbols' (lista de
+        (nome, descrição, posição da declaração)) e 'occurrences' (lista ordenada de
+        (linha, coluna, comprimento, índice em symbols)); linhas e colunas começam em 1
+    """
+    _, diagnostics = compile_program(source, **ANALYSIS_OPTIONS)
+    numbers = {}
+    symbols = []
+    occurrences = []
+    for line, column, symbol in parser.symbol_index:
+        target = symbol.function if symbol.kind == 'result' else symbol
+        number = numbers.get(id(target))
+        if number is None:
+            number = numbers[id(target)] = len(symbols)
+            symbols.append((target.name, describe(target), target.position))
+        occurrences.append((line, column, len(symbol.name), number))
+    occurrences.sort()
+    return {'diagnostics': [d.to_dict() for d in diagnostics], 'symbols': symbols, 'occurrences': occurrences}
+
+
+def warm_worker():
+    """Inicialização do processo de compilação (primeira compilação fora dos pedidos)"""
+    analyze("program Aquecimento;\nvar x: integer;\nbegin\n  x := 1\nend.")
+
+
+# ============================================================================
+# DOCUMENTOS
+# ============================================================================
+
+class Document:
+    """
+    Texto de um documento aberto no editor e a última análise recebida.
+
+    As edições feitas depois da análise ficam em self.edits como (primeira linha,
+    última linha, número de linhas que as substituem), com linhas a começar em 0,
+    para converter posições entre o texto atual e o texto analisado.
+    """
+
+    def __init__(self, uri, text, version):
+        self.uri = uri
+        self.lines = text.split('\n')
+        self.version = version
+        self.analysis = None      # Resultado de analyze() da última compilação
+        self.edits = []           # Edições desde o texto analisado
+        self.deadline = None      # Momento da próxima compilação (None = nenhuma pendente)
+        self.job = None           # Compilação em curso: número do pedido
+        self.job_edits = 0        # len(self.edits) quando a compilação em curso começou
+        self.published = None     # Últimos diagnósticos enviados
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+    def apply_change(self, change):
+        """Aplica uma alteração de textDocument/didChange (completa ou incremental)"""
+        if 'range' not in change:
+            old = len(self.lines)
+            self.lines = change['text'].split('\n')
+            self.edits.append((0, old - 1, len(self.lines)))
+            return
+        start, end = change['range']['start'], change['range']['end']
+        first, last = start['line'], end['line']
+        if first >= len(self.lines):
+            self.lines.append('')
+            first = last = len(self.lines) - 1
+        last = min(last, len(self.lines) - 1)
+        prefix = self.lines[first][:start['character']]
+        suffix = self.lines[last][end['character']:]
+        replacement = (prefix + change['text'] + suffix).split('\n')
+        old = self.lines[first:last + 1]
+        self.lines[first:last + 1] = replacement
+        # Linhas iguais no início e no fim (ex: uma linha inserida antes de outra) não contam como editadas
+        while old and replacement and old[-1] == replacement[-1]:
+            old.pop()
+            replacement.pop()
+            last -= 1
+        skip = 0
+        while skip < min(len(old), len(replacement)) and old[skip] == replacement[skip]:
+            skip += 1
+        self.edits.append((first + skip, last, len(replacement) - skip))
+
+    def to_analyzed_line(self, line):
+        """Linha (0..) do texto atual -> linha do texto analisado, ou None se foi editada"""
+        for first, last, count in reversed(self.edits):
+            if line >= first + count:
+                line -= count - (last - first + 1)
+            elif line >= first:
+                return None
+        return line
+
+    def to_current_line(self, line):
+        """Linha (0..) do texto analisado -> linha do texto atual, ou None se foi editada"""
+        for first, last, count in self.edits:
+            if line > last:
+                line += count - (last - first + 1)
+            elif line >= first:
+                return None
+        return line
+
+    def find_occurrence(self, line, character):
+        """Ocorrência (linha, coluna, comprimento, símbolo) na posição LSP dada, ou None"""
+        if self.analysis is None:
+            return None
+        analyzed = self.to_analyzed_line(line)
+        if analyzed is None:
+            return None
+        occurrences = self.analysis['occurrences']
+        # Última ocorrência que começa antes ou na posição (linhas e colunas a partir de 1)
+        index = bisect.bisect_right(occurrences, (analyzed + 1, character + 1, float('inf'), 0)) - 1
+        if index < 0:
+            return None
+        occurrence = occurrences[index]
+        if occurrence[0] == analyzed + 1 and occurrence[1] <= character + 1 < occurrence[1] + occurrence[2]:
+            return occurrence
+        return None
+
+    def word_range(self, line, column):
+        """Intervalo LSP do identificador que começa em (linha, coluna) do texto atual"""
+        text = self.lines[line] if line < len(self.lines) else ''
+        start = min(column, len(text))
+        end = start
+        while end < len(text) and (text[end].isalnum() or text[end] == '_'):
+            end += 1
+        return {'start': {'line': line, 'character': start},
+                'end': {'line': line, 'character': max(end, start + 1)}}
+
+    def diagnostics(self):
+        """Diagnósticos LSP da última análise, nas posições do texto atual"""
+        result = []
+        for record in self.analysis['diagnostics']:
+            line = self.to_current_line(record['line'] - 1) if record['line'] else 0
+            if line is None:
+                continue  # Linha editada depois da análise: o diagnóstico pode já não se aplicar
+            if record['column']:
+                range_ = self.word_range(line, record['column'] - 1)
+            else:
+                length = len(self.lines[line]) if line < len(self.lines) else 0
+                range_ = {'start': {'line': line, 'character': 0}, 'end': {'line': line, 'character': length}}
+            result.append({'range': range_, 'severity': SEVERITIES[record['severity']],
+                           'code': record['code'], 'source': 'pascal', 'message': record['message']})
+        return result
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+
+def log_exception(context):
+    """Escreve no stderr a exceção em curso (o stdout é o canal do protocolo)"""
+    print(f"pas-lsp: erro em {context}", file=sys.stderr)
+    traceback.print_exc(file=sys.stderr)
+    sys.stderr.flush()
+
+
+class LanguageServer:
+    """
+    Estado do servidor e tratamento das mensagens (independente do transporte).
+
+    Args:
+        send: Função chamada com cada mensagem a enviar ao editor (dict)
+        debounce (float): Pausa (segundos) após a última edição antes de recompilar
+        executor: Executor onde correm as compilações (None = no próprio processo)
+        notify: Função chamada (noutra thread) quando uma compilação do executor termina;
+            o ciclo principal deve então chamar finish(job, future)
+        clock: Relógio (segundos); substituível para reproduzir sessões gravadas
+    """
+
+    def __init__(self, send, debounce=DEBOUNCE, executor=None, notify=None, clock=time.monotonic):
+        self.send = send
+        self.debounce = debounce
+        self.executor = executor
+        self.notify = notify
+        self.clock = clock
+        self.documents = {}
+        self.jobs = {}              # Número do pedido -> (documento, versão)
+        self.next_job = 0
+        self.compiles = 0           # Compilações feitas
+        self.shutdown = False
+        self.exited = False
+
+    # ---- Ciclo principal ----
+
+    def timeout(self):
+        """Segundos até à próxima compilação agendada (None se não houver)"""
+        deadlines = [doc.deadline for doc in self.documents.values()
+                     if doc.deadline is not None and doc.job is None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - self.clock())
+
+    def run_due(self):
+        """Começa as compilações cujo prazo já passou"""
+        now = self.clock()
+        for doc in list(self.documents.values()):
+            if doc.deadline is not None and doc.deadline <= now and doc.job is None:
+                self.start_analysis(doc)
+
+    def start_analysis(self, doc):
+        doc.deadline = None
+        job = self.next_job
+        self.next_job += 1
+        doc.job = job
+        doc.job_edits = len(doc.edits)
+        self.jobs[job] = doc
+        self.compiles += 1
+        if self.executor is not None:
+            try:
+                future = self.executor.submit(analyze, doc.text)
+            except BrokenProcessPool:
+                # O processo de compilação morreu: as análises passam a correr aqui
+                log_exception("compilação")
+                self.executor = None
+            else:
+                future.add_done_callback(lambda f: self.notify(job, f))
+                return
+        try:
+            result = analyze(doc.text)
+        except Exception:
+            log_exception(f"análise de {doc.uri}")
+            result = None
+        self.finish(job, result)
+
+    def finish(self, job, result):
+        """
+        Recebe o resultado de uma compilação (dict ou Future) e publica os diagnósticos.
+        Se a compilação falhou (result None ou exceção no Future), mantém a análise anterior.
+        """
+        doc = self.jobs.pop(job)
+        if hasattr(result, 'result'):
+            try:
+                result = result.result()
+            except Exception:
+                log_exception(f"análise de {doc.uri}")
+                result = None
+        doc.job = None
+        if result is None or self.documents.get(doc.uri) is not doc:
+            return  # Compilação falhada ou documento fechado entretanto
+        # As edições feitas durante a compilação continuam pendentes
+        doc.analysis = result
+        doc.edits = doc.edits[doc.job_edits:]
+        self.publish(doc)
+
+    def publish(self, doc):
+        """Envia os diagnósticos do documento (só se mudaram desde o último envio)"""
+        diagnostics = doc.diagnostics()
+        if diagnostics != doc.published:
+            doc.published = diagnostics
+            self.notification('textDocument/publishDiagnostics',
+                              {'uri': doc.uri, 'version': doc.version, 'diagnostics': diagnostics})
+
+    # ---- Mensagens ----
+
+    def respond(self, id_, result=None, error=None):
+        message = {'jsonrpc': '2.0', 'id': id_}
+        if error is not None:
+            message['error'] = error
+        else:
+            message['result'] = result
+        self.send(message)
+
+    def notification(self, method, params):
+        self.send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def handle(self, message):
+        """Trata uma mensagem recebida do editor (pedido ou notificação)"""
+        method = message.get('method')
+        handler = getattr(self, 'on_' + method.replace('/', '_').replace('$', '_'), None) if method else None
+        if 'id' in message:
+            if handler is None:
+                self.respond(message['id'], error={'code': METHOD_NOT_FOUND, 'message': f"Método desconhecido: {method}"})
+                return
+            try:
+                self.respond(message['id'], handler(message.get('params') or {}))
+            except (KeyError, TypeError, ValueError) as e:
+                self.respond(message['id'], error={'code': INVALID_PARAMS, 'message': str(e)})
+            except Exception as e:
+                log_exception(method)
+                self.respond(message['id'], error={'code': INTERNAL_ERROR, 'message': f"Erro interno: {e}"})
+        elif handler is not None:
+            try:
+                handler(message.get('params') or {})
+            except (KeyError, TypeError, ValueError):
+                pass  # Notificação inválida (ex: documento não aberto): não há a quem responder
+            except Exception:
+                log_exception(method)  # O servidor continua com os restantes documentos
+
+    def on_initialize(self, params):
+        return {
+            'capabilities': {
+                'textDocumentSync': {'openClose': True, 'change': 2, 'save': True},  # 2 = incremental
+                'hoverProvider': True,
+                'definitionProvider': True,
+            },
+            'serverInfo': {'name': 'pas-lsp'},
+        }
+
+    def on_initialized(self, params):
+        pass
+
+    def on_shutdown(self, params):
+        self.shutdown = True
+        return None
+
+    def on_exit(self, params):
+        self.exited = True
+
+    def on_textDocument_didOpen(self, params):
+        item = params['textDocument']
+        doc = Document(item['uri'], item['text'], item.get('version', 0))
+        doc.deadline = self.clock()  # Primeira análise sem esperar
+        self.documents[doc.uri] = doc
+
+    def on_textDocument_didChange(self, params):
+        doc = self.documents[params['textDocument']['uri']]
+        doc.version = params['textDocument'].get('version', doc.version)
+        for change in params['contentChanges']:
+            doc.apply_change(change)
+        doc.deadline = self.clock() + self.debounce
+
+    def on_textDocument_didSave(self, params):
+        doc = self.documents[params['textDocument']['uri']]
+        if doc.edits or doc.deadline is not None:
+            doc.deadline = self.clock()
+
+    def on_textDocument_didClose(self, params):
+        doc = self.documents.pop(params['textDocument']['uri'], None)
+        if doc is not None:
+            self.notification('textDocument/publishDiagnostics', {'uri': doc.uri, 'diagnostics': []})
+
+    def on_textDocument_hover(self, params):
+        doc = self.documents[params['textDocument']['uri']]
+        position = params['position']
+        occurrence = doc.find_occurrence(position['line'], position['character'])
+        if occurrence is None:
+            return None
+        _, detail, _ = doc.analysis['symbols'][occurrence[3]]
+        return {'contents': {'kind': 'markdown', 'value': f"```pascal\n{detail}\n```"},
+                'range': doc.word_range(position['line'], occurrence[1] - 1)}
+
+    def on_textDocument_definition(self, params):
+        doc = self.documents[params['textDocument']['uri']]
+        position = params['position']
+        occurrence = doc.find_occurrence(position['line'], position['character'])
+        if occurrence is None:
+            return None
+        _, _, declaration = doc.analysis['symbols'][occurrence[3]]
+        if declaration is None:
+            return None
+        line = doc.to_current_line(declaration[0] - 1)
+        if line is None:
+            return None
+        return {'uri': doc.uri, 'range': doc.word_range(line, declaration[1] - 1)}
+
+
+# ============================================================================
+# TRANSPORTE (stdin/stdout)
+# ============================================================================
+
+def read_message(stream):
+    """Lê uma mensagem JSON-RPC (cabeçalhos + corpo); devolve None no fim da entrada"""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode('ascii').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    if length is None:
+        return None
+    return json.loads(stream.read(length))
+
+
+def write_message(stream, message):
+    """Escreve uma mensagem JSON-RPC com o cabeçalho Content-Length"""
+    body = json.dumps(message, ensure_ascii=False).encode('utf-8')
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+    stream.flush()
+
+
+def serve(stdin, stdout, debounce=DEBOUNCE, sync=False):
+    """
+    Ciclo principal: uma thread lê as mensagens do editor para uma fila; o ciclo
+    trata-as por ordem, junto com as compilações terminadas e os prazos de debounce.
+    """
+    incoming = queue.Queue()
+
+    def reader():
+        while True:
+            message = read_message(stdin)
+            incoming.put(('message', message))
+            if message is None:
+                break
+
+    executor = None
+    if not sync:
+        # O processo de compilação é criado antes da thread de leitura (um fork com
+        # a thread bloqueada a ler o stdin herdaria o lock do stdin)
+        executor = ProcessPoolExecutor(1, initializer=warm_worker)
+        executor.submit(time.sleep, 0).result()
+    server = LanguageServer(lambda message: write_message(stdout, message), debounce, executor,
+                            notify=lambda job, future: incoming.put(('analysis', (job, future))))
+    threading.Thread(target=reader, daemon=True).start()
+    try:
+        while not server.exited:
+            try:
+                kind, item = incoming.get(timeout=server.timeout())
+            except queue.Empty:
+                kind, item = None, None
+            if kind == 'message':
+                if item is None:
+                    break  # O editor fechou a ligação
+                server.handle(item)
+            elif kind == 'analysis':
+                server.finish(*item)
+            server.run_due()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    return 0 if server.shutdown else 1
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Servidor de linguagem (LSP) para Pascal")
+    args.add_argument('--debounce', type=float, default=DEBOUNCE * 1000,
+                      help=f"pausa na escrita (ms) antes de recompilar (por omissão, {DEBOUNCE * 1000:.0f})")
+    args.add_argument('--sync', action='store_true', help="compilar no próprio processo")
+    args.add_argument('--stdio', action='store_true', help="ignorado (o transporte é sempre stdin/stdout)")
+    options = args.parse_args()
+    code = serve(sys.stdin.buffer, sys.stdout.buffer, options.debounce / 1000, options.sync)
+    sys.stdout.flush()
+    # Sem esperar pela thread de leitura (pode estar bloqueada a ler o stdin)
+    os._exit(code)
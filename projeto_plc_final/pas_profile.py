@@ -0,0 +1,182 @@
+# Profiler de programas Pascal: executa o código compilado na VM local e
+# atribui as instruções executadas e o tempo a cada linha do código fonte
+# (através do mapa de código fonte) e a cada ciclo (labels while/for/repeat).
+# Uso: python pas_profile.py programa.pas [--top N] < entrada.txt
+import argparse
+import re
+import sys
+import time
+
+from pas_vm import VM, VMError, parse_program, OP
+from pas_yacc import compile_program, parser
+
+# Labels de início de ciclo gerados pelo compilador (com sufixo iN quando expandidos inline)
+LOOP_LABEL = re.compile(r'(while|forstart|repeatstart|readarray)(\d+)(i\d+)?$')
+LOOP_KINDS = {'while': 'while', 'forstart': 'for', 'repeatstart': 'repeat', 'readarray': 'readln'}
+
+# Fração do tempo total a partir da qual uma linha é destacada na listagem
+HOT_THRESHOLD = 0.05
+
+
+class ProfiledCode(list):
+    """
+    Lista de instruções que regista cada acesso feito pelo ciclo da VM.
+
+    A VM lê code[pc] uma vez por instrução executada, por isso basta substituir
+    program.code por esta lista: o ciclo principal da VM não muda (e não fica
+    mais lento quando não se está a medir). O tempo entre duas leituras é
+    atribuído à instrução anterior.
+    """
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.counts = [0] * len(code)     # Execuções de cada instrução
+        self.times = [0.0] * len(code)    # Tempo (segundos) de cada instrução
+        self.last = None                  # Última instrução lida
+        self.last_time = 0.0
+
+    def __getitem__(self, pc):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.times[self.last] += now - self.last_time
+        self.counts[pc] += 1
+        self.last = pc
+        self.last_time = now
+        return list.__getitem__(self, pc)
+
+    def finish(self):
+        """Atribui o tempo desde a última leitura (chamada no fim da execução)"""
+        if self.last is not None:
+            self.times[self.last] += time.perf_counter() - self.last_time
+            self.last = None
+
+
+class Profile:
+    """Resultado de uma execução medida: totais por linha e por ciclo"""
+
+    def __init__(self, source, program, source_map, counts, times, output):
+        self.source = source              # Código Pascal
+        self.program = program            # Program executado
+        self.source_map = source_map      # Instrução -> (linha, coluna) ou None
+        self.counts = counts
+        self.times = times
+        self.output = output              # Texto escrito pelo programa
+        self.lines = self._aggregate_lines()
+        self.loops = self._find_loops()
+
+    @property
+    def total_count(self):
+        return sum(self.counts)
+
+    @property
+    def total_time(self):
+        return sum(self.times)
+
+    def _aggregate_lines(self):
+        """Linha Pascal (None = código sem linha, ex: inicialização) -> [instruções executadas, tempo]"""
+        lines = {}
+        for pc, position in enumerate(self.source_map):
+            if self.counts[pc]:
+                entry = lines.setdefault(position[0] if position else None, [0, 0.0])
+                entry[0] += self.counts[pc]
+                entry[1] += self.times[pc]
+        return lines
+
+    def _find_loops(self):
+        """
+        Ciclos do programa: o corpo vai do label de início até ao salto para trás
+        (JUMP para while/forstart, JZ para repeatstart), inclusive.
+
+        Returns:
+            list: Tuplos (tipo, linha, instruções executadas, tempo, iterações), pelo tempo decrescente
+        """
+        loops = []
+        by_index = {}
+        for name, index in self.program.labels.items():
+            match = LOOP_LABEL.match(name)
+            if match:
+                by_index.setdefault(index, []).append(match.group(1))
+        jumps = (OP['jump'], OP['jz'])
+        for pc, (op, arg) in enumerate(self.program.code):
+            if op in jumps and arg <= pc and arg in by_index:
+                kind = by_index[arg][0]
+                position = self.source_map[pc]  # O salto para trás tem a posição do próprio ciclo
+                count = sum(self.counts[arg:pc + 1])
+                seconds = sum(self.times[arg:pc + 1])
+                iterations = self.counts[pc] if op == OP['jump'] else self.counts[arg]
+                loops.append((LOOP_KINDS[kind], position[0] if position else None,
+                              count, seconds, iterations))
+        loops.sort(key=lambda loop: -loop[3])
+        return loops
+
+    def report(self, top=10):
+        """Listagem anotada do código fonte seguida do resumo dos ciclos"""
+        total_time = self.total_time or 1e-12
+        out = [f"{'linha':>5} {'instruções':>11} {'tempo ms':>10} {'%':>6}  código"]
+        for number, text in enumerate(self.source.split('\n'), 1):
+            count, seconds = self.lines.get(number, (0, 0.0))
+            share = seconds / total_time
+            mark = '>>' if share >= HOT_THRESHOLD else '  '
+            if count:
+                out.append(f"{number:>5} {count:>11} {seconds * 1000:>10.3f} {share:>6.1%}{mark}{text}")
+            else:
+                out.append(f"{number:>5} {'':>11} {'':>10} {'':>6}{mark}{text}")
+        if None in self.lines:
+            count, seconds = self.lines[None]
+            out.append(f"{'-':>5} {count:>11} {seconds * 1000:>10.3f} {seconds / total_time:>6.1%}  "
+                       f"(sem linha: inicialização, START/STOP)")
+        out.append(f"total: {self.total_count} instruções, {self.total_time * 1000:.3f} ms")
+        if self.loops:
+            out.append("")
+            out.append(f"ciclos (top {top} por tempo, inclui ciclos interiores):")
+            for kind, line, count, seconds, iterations in self.loops[:top]:
+                out.append(f"  {kind:<7} linha {line if line else '?':>4}: {iterations:>9} iterações "
+                           f"{count:>11} instruções {seconds * 1000:>10.3f} ms "
+                           f"({seconds / total_time:.1%})")
+        return "\n".join(out)
+
+
+def profile(source, input_lines=None, **options):
+    """
+    Compila e executa um programa Pascal, medindo cada instrução.
+
+    Args:
+        source (str): Código Pascal
+        input_lines: Linhas de entrada para READ
+        **options: Opções do compilador (ver pas_yacc.init)
+
+    Returns:
+        Profile: Totais por linha e por ciclo
+
+    Raises:
+        ValueError: Se o programa tiver erros de compilação
+    """
+    text, diagnostics = compile_program(source, source_map=True, **options)
+    if text is None:
+        raise ValueError("\n".join(str(d) for d in diagnostics) or parser.error)
+    program = parse_program(text)
+    code = ProfiledCode(program.code)
+    program.code = code
+    vm = VM(program, input_lines)
+    try:
+        vm.run()
+    finally:
+        code.finish()
+    return Profile(source, program, parser.source_map, code.counts, code.times, vm.output())
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Profiler por linha de programas Pascal")
+    args.add_argument('source', help="ficheiro Pascal")
+    args.add_argument('--top', type=int, default=10, help="número de ciclos no resumo")
+    options = args.parse_args()
+    with open(options.source, encoding='utf-8') as f:
+        source = f.read()
+    try:
+        result = profile(source, (line.rstrip('\n') for line in sys.stdin))
+    except (ValueError, VMError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.write(result.output)
+    print(f"\n{'=' * 60}")
+    print(result.report(options.top))
@@ -0,0 +1,358 @@
+# Servidor de compilação: mantém processos com o compilador já carregado e
+# aceita pedidos concorrentes por HTTP (localhost ou socket Unix), evitando o
+# custo de arrancar o Python, importar o PLY e construir as tabelas por pedido.
+# Uso: python pas_server.py [--port 8765 | --unix /tmp/pas.sock] [--workers N] [--timeout S]
+#
+# Pedidos:
+#   POST /compile   {"source": "...", "options": {...}}  -> código VM e diagnósticos (JSON)
+#   GET  /metrics   latência (percentis), pedidos em fila e em execução
+#   GET  /health    {"status": "ok"}
+# Uma compilação que excede o tempo limite ou um processo que termina (ex: sem
+# memória) recebem 503; os processos do pool são substituídos por novos.
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_PORT = 8765
+MAX_BODY = 1 << 20              # Tamanho máximo do corpo de um pedido (bytes)
+LATENCY_WINDOW = 10000          # Pedidos recentes usados no cálculo dos percentis
+COMPILE_TIMEOUT = 30.0          # Segundos por compilação (depois, o pool é recriado)
+# Os processos do pool arrancam com spawn: um fork feito a meio de um pedido (ao
+# recriar o pool) herdaria os sockets dos clientes e as ligações não fechariam
+POOL_CONTEXT = multiprocessing.get_context('spawn')
+PERCENTILES = (50, 90, 99)
+
+# Opções de pas_yacc.init aceites nos pedidos
+COMPILE_OPTIONS = {'inline_budget', 'tail_calls', 'max_errors', 'source_map', 'constant_pool',
+                   'coalesce_writes', 'read_prompts', 'specialize_types'}
+
+# Programa compilado por cada processo ao arrancar (primeira compilação fora dos pedidos)
+WARMUP_SOURCE = """
+program Aquecimento;
+var i, s: integer; x: real;
+function dobro(n: integer): integer;
+begin
+  dobro := n * 2
+end;
+begin
+  s := 0; x := 0.5;
+  for i := 1 to 3 do s := s + dobro(i);
+  while s > 0 do s := s - 1;
+  writeln('s = ', s, ' x = ', x, ' ', s > 1)
+end.
+"""
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+# ============================================================================
+# PROCESSOS DE COMPILAÇÃO
+# ============================================================================
+
+def warm_worker():
+    """Inicialização de cada processo: importa o compilador e faz uma compilação de aquecimento"""
+    from pas_yacc import compile_program
+    compile_program(WARMUP_SOURCE)
+
+
+def compile_job(source, options):
+    """
+    Compila um programa num processo do pool (o parser é global em cada processo,
+    e cada processo só executa um pedido de cada vez).
+
+    Returns:
+        dict: Resposta do pedido (código VM, diagnósticos e tempo de compilação)
+    """
+    from pas_yacc import compile_program, parser
+    start = time.perf_counter()
+    code, diagnostics = compile_program(source, **options)
+    result = {
+        'ok': code is not None,
+        'code': code,
+        'diagnostics': [d.to_dict() for d in diagnostics],
+        'compile_ms': (time.perf_counter() - start) * 1000,
+    }
+    if options.get('source_map') and code is not None:
+        result['source_map'] = [list(position) if position else None for position in parser.source_map]
+    return result
+
+
+# ============================================================================
+# MÉTRICAS
+# ============================================================================
+
+def percentile(values, p):
+    """Percentil p (método nearest-rank) de uma lista ordenada"""
+    if not values:
+        return None
+    rank = max(1, -(-p * len(values) // 100))  # ceil(p/100 * n)
+    return values[rank - 1]
+
+
+class Metrics:
+    """Contadores do servidor e latências dos pedidos recentes"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.time()
+        self.requests = 0           # Pedidos de compilação respondidos
+        self.failed = 0             # Programas com erros de compilação
+        self.rejected = 0           # Pedidos inválidos (JSON, opções, tamanho)
+        self.errors = 0             # Compilações interrompidas (tempo limite, processo terminado)
+        self.pool_restarts = 0      # Vezes que o pool de processos foi recriado
+        self.waiting = 0            # Pedidos à espera de um processo livre (fila)
+        self.running = 0            # Pedidos a compilar
+        self.max_waiting = 0
+        self.latencies = collections.deque(maxlen=window)  # (total, espera, compilação) em ms
+
+    def record(self, total_ms, wait_ms, compile_ms, ok):
+        self.requests += 1
+        if not ok:
+            self.failed += 1
+        self.latencies.append((total_ms, wait_ms, compile_ms))
+
+    def snapshot(self):
+        """Métricas em formato JSON (percentis sobre os últimos pedidos)"""
+        latency = {}
+        for index, name in enumerate(('total_ms', 'queue_ms', 'compile_ms')):
+            values = sorted(sample[index] for sample in self.latencies)
+            summary = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+            summary['max'] = values[-1] if values else None
+            summary['mean'] = sum(values) / len(values) if values else None
+            latency[name] = summary
+        return {
+            'uptime_s': time.time() - self.started,
+            'requests': self.requests,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'pool_restarts': self.pool_restarts,
+            'queue_depth': self.waiting,
+            'max_queue_depth': self.max_waiting,
+            'in_flight': self.running,
+            'latency': latency,
+        }
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+
+class RequestError(Exception):
+    """Pedido inválido: respondido com o código HTTP indicado"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class CompileServer:
+    """Servidor HTTP/1.1 (asyncio) que distribui as compilações por um pool de processos"""
+
+    def __init__(self, workers=None, timeout=COMPILE_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout      # Segundos por compilação (None = sem limite)
+        self.pool = None
+        self.slots = None           # Semáforo: um lugar por processo (o resto espera na fila)
+        self.metrics = Metrics()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        """Cria o pool (com os processos já aquecidos) e começa a aceitar ligações"""
+        self.pool = ProcessPoolExecutor(self.workers, POOL_CONTEXT, initializer=warm_worker)
+        self.slots = asyncio.Semaphore(self.workers)
+        # Arranca todos os processos antes do primeiro pedido
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, time.sleep, 0)
+                               for _ in range(self.workers)))
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    def address(self):
+        """Endereço em que o servidor está à escuta (porta real quando port=0)"""
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def restart_pool(self, pool):
+        """
+        Substitui um pool avariado (BrokenProcessPool) ou com um processo preso numa
+        compilação: os processos antigos são terminados (os pedidos que ainda
+        corriam neles recebem 503) e os novos arrancam no primeiro pedido.
+        """
+        if self.pool is not pool:
+            return  # Já substituído por outro pedido
+        self.metrics.pool_restarts += 1
+        # ProcessPoolExecutor não cancela uma tarefa em curso: só terminando o processo.
+        # O pool fica avariado e a thread que o gere fecha-o (sem shutdown, que
+        # fecharia os mesmos pipes ao mesmo tempo)
+        for process in list((pool._processes or {}).values()):
+            try:
+                process.terminate()
+            except ValueError:
+                pass  # Processo já fechado pela thread do pool
+        self.pool = ProcessPoolExecutor(self.workers, POOL_CONTEXT, initializer=warm_worker)
+
+    async def run_job(self, source, options):
+        """
+        Executa compile_job no pool, com o tempo limite self.timeout.
+
+        Raises:
+            RequestError: 503 se a compilação excedeu o tempo ou o processo terminou
+        """
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, compile_job, source, options), self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.errors += 1
+            self.restart_pool(pool)
+            raise RequestError(503, f"Compilação excedeu o tempo limite ({self.timeout} s)")
+        except BrokenProcessPool:
+            self.metrics.errors += 1
+            self.restart_pool(pool)
+            raise RequestError(503, "O processo de compilação terminou inesperadamente")
+
+    async def compile(self, request):
+        """Valida um pedido de compilação e executa-o num processo livre"""
+        if not isinstance(request, dict) or not isinstance(request.get('source'), str):
+            raise RequestError(400, "Pedido deve ter o campo 'source' (string)")
+        options = request.get('options') or {}
+        if not isinstance(options, dict):
+            raise RequestError(400, "'options' deve ser um objeto")
+        unknown = set(options) - COMPILE_OPTIONS
+        if unknown:
+            raise RequestError(400, f"Opções desconhecidas: {', '.join(sorted(unknown))}")
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        if self.slots.locked():
+            # Todos os processos ocupados: o pedido fica na fila
+            metrics.waiting += 1
+            metrics.max_waiting = max(metrics.max_waiting, metrics.waiting)
+            try:
+                await self.slots.acquire()
+            finally:
+                metrics.waiting -= 1
+        else:
+            await self.slots.acquire()
+        wait_ms = (time.perf_counter() - start) * 1000
+        metrics.running += 1
+        try:
+            result = await self.run_job(request['source'], options)
+        finally:
+            metrics.running -= 1
+            self.slots.release()
+        total_ms = (time.perf_counter() - start) * 1000
+        metrics.record(total_ms, wait_ms, result['compile_ms'], result['ok'])
+        result['queue_ms'] = wait_ms
+        result['total_ms'] = total_ms
+        return result
+
+    async def dispatch(self, method, path, body):
+        """Encaminha um pedido HTTP; devolve (código HTTP, objeto JSON)"""
+        if path == '/compile':
+            if method != 'POST':
+                raise RequestError(405, "Use POST em /compile")
+            try:
+                request = json.loads(body)
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise RequestError(400, f"JSON inválido: {e}")
+            return 200, await self.compile(request)
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics.snapshot()
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok', 'workers': self.workers}
+        raise RequestError(404, f"Caminho desconhecido: {method} {path}")
+
+    async def handle(self, reader, writer):
+        """Uma ligação: vários pedidos seguidos (keep-alive) até o cliente fechar"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    if len(parts) != 3:
+                        raise RequestError(400, "Linha de pedido inválida")
+                    method, path, _ = parts
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length > MAX_BODY:
+                        keep_alive = False  # O corpo não é lido
+                        raise RequestError(413, f"Pedido maior que {MAX_BODY} bytes")
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method, path, body)
+                except RequestError as e:
+                    if e.status < 500:
+                        self.metrics.rejected += 1
+                    status, payload = e.status, {'error': str(e)}
+                except ValueError:
+                    self.metrics.rejected += 1
+                    status, payload = 400, {'error': "Content-Length inválido"}
+                except Exception as e:  # Erro interno: o servidor continua a responder
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, path, workers, timeout=COMPILE_TIMEOUT):
+    """Corre o servidor até SIGINT/SIGTERM"""
+    server = CompileServer(workers, timeout)
+    await server.start(host, port, path)
+    where = path or "http://%s:%d" % server.address()[:2]
+    print(f"Servidor de compilação em {where} ({server.workers} processos)", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await server.close()
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Servidor de compilação Pascal -> EWVM")
+    args.add_argument('--host', default='127.0.0.1', help="endereço (por omissão, 127.0.0.1)")
+    args.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"porta TCP (por omissão, {DEFAULT_PORT})")
+    args.add_argument('--unix', metavar='CAMINHO', help="usar um socket Unix em vez de TCP")
+    args.add_argument('--workers', type=int, help="número de processos (por omissão, um por CPU)")
+    args.add_argument('--timeout', type=float, default=COMPILE_TIMEOUT,
+                      help=f"segundos por compilação (por omissão, {COMPILE_TIMEOUT:g})")
+    options = args.parse_args()
+    asyncio.run(serve(options.host, options.port, options.unix, options.workers, options.timeout))
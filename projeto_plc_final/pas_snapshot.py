@@ -0,0 +1,179 @@
+# Snapshots do estado da VM (pas_vm): um programa longo pode ser guardado num
+# ficheiro a meio da execução e retomado mais tarde (noutro processo), sem
+# perder o que já foi calculado.
+# Uso: python pas_snapshot.py programa.vm estado.snap [--interval N] < entrada.txt
+#      python pas_snapshot.py --resume estado.snap < entrada.txt
+#
+# Estrutura do ficheiro:
+#   MAGIC, versão (1 byte)
+#   zlib(pickle((bytecode do programa, estado)))
+# O programa vai em bytecode (pas_bytecode), para o snapshot não depender do
+# ficheiro original. O estado tem as globais (STOREG), a pilha, os frames, o
+# pc/fp, os contadores da VM, o número de linhas de entrada já lidas e o de
+# caracteres já escritos (written, contado com max_output); é serializado de
+# uma só vez, por isso os blocos partilhados mantêm-se partilhados: um array
+# do heap (ALLOCN) referido por uma global e pela pilha, ou um endereço (bloco,
+# posição) das globais ou da pilha (PUSHGP, PUSHFP), voltam a apontar para o
+# mesmo bloco depois de restaurados.
+#
+# O estado só tem listas, tuplos, números e strings: a leitura não aceita mais
+# nenhum tipo do pickle (um ficheiro alterado não executa código).
+#
+# Não são guardadas as linhas de entrada nem a saída: ao retomar, input_lines
+# é a mesma entrada desde o início (as linhas lidas antes do snapshot são
+# saltadas), e a saída escrita depois do último snapshot (antes da interrupção)
+# volta a ser escrita.
+import argparse
+import io
+import itertools
+import os
+import pickle
+import sys
+import zlib
+
+import pas_bytecode
+from pas_vm import VM, VMError, parse_program
+
+MAGIC = b'PASS'
+VERSION = 2
+
+# Atributos da VM guardados no snapshot
+STATE = ('globals', 'stack', 'frames', 'pc', 'fp', 'steps', 'max_depth', 'heap_cells', 'halted',
+         'lines_read', 'written')
+
+# Instruções entre snapshots (por omissão) e nível de compressão do zlib
+CHECKPOINT_INTERVAL = 10_000_000
+COMPRESSION = 1
+
+
+class StateUnpickler(pickle.Unpickler):
+    """Unpickler que só aceita os tipos básicos (recusa classes e funções)"""
+
+    def find_class(self, module, name):
+        raise VMError(f"Snapshot inválido: referência a {module}.{name}")
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def snapshot(vm):
+    """
+    Estado de uma VM parada (em run(limit) ou depois do fim) em bytes.
+
+    Returns:
+        bytes: Snapshot (ver o início do ficheiro)
+    """
+    state = tuple(getattr(vm, name) for name in STATE)
+    data = pickle.dumps((pas_bytecode.encode(vm.program), state), protocol=pickle.HIGHEST_PROTOCOL)
+    return MAGIC + bytes([VERSION]) + zlib.compress(data, COMPRESSION)
+
+
+def save(vm, path):
+    """
+    Escreve o snapshot de uma VM num ficheiro.
+
+    A escrita é feita num ficheiro temporário que depois substitui o destino:
+    uma interrupção a meio não estraga o snapshot anterior.
+
+    Returns:
+        int: Tamanho do snapshot em bytes
+    """
+    data = snapshot(vm)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return len(data)
+
+
+def run(vm, path, interval=CHECKPOINT_INTERVAL):
+    """
+    Executa uma VM até ao fim, guardando um snapshot em path a cada interval
+    instruções (no primeiro salto ou chamada depois disso).
+
+    Returns:
+        VM: A própria VM, terminada
+    """
+    while True:
+        vm.run(vm.steps + interval)
+        if not vm.paused:
+            return vm
+        # A saída escrita até aqui fica escrita antes do snapshot
+        flush = getattr(vm.stdout, 'flush', None)
+        if flush:
+            flush()
+        save(vm, path)
+
+
+# ============================================================================
+# LEITURA
+# ============================================================================
+
+def restore(data, input_lines=None, stdout=None):
+    """
+    Cria uma VM com o estado de um snapshot (pronta a continuar com run).
+
+    Args:
+        data (bytes): Snapshot (saída de snapshot)
+        input_lines: Linhas de entrada desde o início (as lidas antes do snapshot são saltadas)
+        stdout: Destino da saída (StringIO por omissão)
+
+    Raises:
+        VMError: Se os dados não forem um snapshot válido
+    """
+    if data[:len(MAGIC)] != MAGIC or len(data) == len(MAGIC):
+        raise VMError("Ficheiro não é um snapshot da VM (assinatura inválida)")
+    if data[len(MAGIC)] != VERSION:
+        raise VMError(f"Versão de snapshot não suportada: {data[len(MAGIC)]}")
+    try:
+        code, state = StateUnpickler(io.BytesIO(zlib.decompress(data[len(MAGIC) + 1:]))).load()
+    except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError) as e:
+        raise VMError(f"Snapshot truncado ou inválido: {e}") from None
+    if len(state) != len(STATE):
+        raise VMError("Snapshot truncado ou inválido: estado incompleto")
+    vm = VM(pas_bytecode.decode(code), None, stdout)
+    for name, value in zip(STATE, state):
+        setattr(vm, name, value)
+    vm.input = itertools.islice(iter(input_lines or []), vm.lines_read, None)
+    return vm
+
+
+def load(path, input_lines=None, stdout=None):
+    """Lê um ficheiro de snapshot e devolve a VM restaurada (ver restore)"""
+    with open(path, 'rb') as f:
+        return restore(f.read(), input_lines, stdout)
+
+
+if __name__ == '__main__':
+    args = argparse.ArgumentParser(description="Execução da VM com snapshots periódicos")
+    args.add_argument('program', nargs='?', help="programa .vm (ou .pasb) a executar desde o início")
+    args.add_argument('snapshot', nargs='?', help="ficheiro onde guardar os snapshots")
+    args.add_argument('--resume', metavar='SNAPSHOT', help="retomar a execução guardada neste ficheiro")
+    args.add_argument('--interval', type=int, default=CHECKPOINT_INTERVAL,
+                      help=f"instruções entre snapshots (por omissão {CHECKPOINT_INTERVAL})")
+    options = args.parse_args()
+    lines = (line.rstrip('\n') for line in sys.stdin)
+    try:
+        if options.resume:
+            path = options.resume
+            vm = load(path, lines, sys.stdout)
+        elif options.program and options.snapshot:
+            path = options.snapshot
+            if pas_bytecode.is_bytecode(options.program):
+                program = pas_bytecode.load(options.program)
+            else:
+                with open(options.program) as f:
+                    program = parse_program(f.read())
+            vm = VM(program, lines, sys.stdout)
+        else:
+            args.error("indique o programa e o ficheiro de snapshot, ou --resume")
+        run(vm, path, options.interval)
+    except VMError as e:
+        print(f"\nErro de execução: {e}", file=sys.stderr)
+        sys.exit(1)
+    # Terminado: o snapshot já não é preciso
+    if os.path.exists(path):
+        os.remove(path)
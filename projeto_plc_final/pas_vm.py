@@ -0,0 +1,466 @@
+# Máquina virtual local para executar o código gerado pelo compilador
+# Implementa o subconjunto de instruções da VM de pilha (EWVM) usado por pas_yacc,
+# permitindo correr e medir programas compilados sem a VM web do docente.
+import argparse
+import io
+import sys
+import time
+
+# Códigos internos das instruções (a ordem não tem significado para a VM original)
+OPCODES = [
+    'pushi', 'pushf', 'pushs', 'pushg', 'storeg', 'pushl', 'storel',
+    'pushgp', 'pushfp', 'pushn', 'pop', 'dup', 'swap',
+    'load', 'store', 'padd', 'allocn',
+    'add', 'sub', 'mul', 'div', 'mod',
+    'fadd', 'fsub', 'fmul', 'fdiv',
+    'inf', 'infeq', 'sup', 'supeq', 'finf', 'finfeq', 'fsup', 'fsupeq',
+    'equal', 'not', 'and', 'or',
+    'itof', 'ftoi', 'atoi', 'atof', 'stri', 'strf',
+    'concat', 'strlen', 'charat',
+    'read', 'writei', 'writef', 'writes', 'writeln',
+    'jump', 'jz', 'pusha', 'call', 'return',
+    'start', 'stop', 'nop', 'err',
+]
+OP = {name: code for code, name in enumerate(OPCODES)}
+
+# Instruções cujo argumento é um label (resolvido para índice de instrução)
+LABEL_OPS = {'jump', 'jz', 'pusha'}
+# Instruções com argumento inteiro
+INT_OPS = {'pushi', 'pushg', 'storeg', 'pushl', 'storel', 'pushn', 'pop', 'load', 'store', 'dup'}
+
+
+# Limites de execução: instruções entre verificações do tempo decorrido e
+# limites por omissão do modo sandbox (python pas_vm.py --sandbox)
+CHECK_INTERVAL = 100_000
+SANDBOX_LIMITS = {'max_steps': 50_000_000, 'max_heap': 10_000_000, 'max_frames': 100_000,
+                  'max_output': 1_000_000, 'max_seconds': 30.0}
+
+
+class VMError(Exception):
+    """Erro de execução (ou de carregamento) de um programa na VM"""
+    pass
+
+
+class LimitExceeded(VMError):
+    """Execução interrompida por um limite (instruções, memória, saída ou tempo)"""
+
+    def __init__(self, resource, limit):
+        self.resource = resource    # 'instruções', 'heap', 'chamadas', 'saída' ou 'tempo'
+        self.limit = limit
+        super().__init__(f"Limite de {resource} excedido ({limit})")
+
+
+class Program:
+    """Programa VM descodificado: lista de (opcode, argumento) e labels resolvidos"""
+
+    def __init__(self, code, labels, names=None):
+        self.code = code            # Lista de tuplos (opcode, argumento)
+        self.labels = labels        # Nome do label -> índice da instrução seguinte
+        self.names = names or []    # Linhas de texto originais (para mensagens de erro)
+        # Número de posições globais usadas (pushg/storeg)
+        self.num_globals = max([arg + 1 for op, arg in code
+                                if op in (OP['pushg'], OP['storeg'])] or [0])
+
+
+def unescape_string(text):
+    """Converte o texto entre aspas de um PUSHS no valor da string"""
+    if '\\' not in text:
+        return text
+    return text.replace('\\n', '\n').replace('\\t', '\t').replace('\\"', '"').replace('\\\\', '\\')
+
+
+def parse_program(text):
+    """
+    Converte o texto VM gerado pelo compilador num Program.
+
+    Cada linha é uma instrução ('pushi 5'), um label ('while0:') ou vazia.
+    Os argumentos dos saltos são resolvidos para índices numa segunda passagem.
+
+    Raises:
+        VMError: Instrução desconhecida ou label não definido ou duplicado
+    """
+    instructions = []   # (nome, argumento em texto)
+    labels = {}
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if line.endswith(':') and ' ' not in line:
+            if line[:-1] in labels:
+                raise VMError(f"Label duplicado: '{line[:-1]}'")
+            labels[line[:-1]] = len(instructions)  # Label aponta para a próxima instrução
+            continue
+        name, _, arg = line.partition(' ')
+        instructions.append((name.lower(), arg.strip(), line))
+
+    code = []
+    for name, arg, line in instructions:
+        if name not in OP:
+            raise VMError(f"Instrução desconhecida: '{line}'")
+        if name in LABEL_OPS:
+            if arg not in labels:
+                raise VMError(f"Label não definido: '{arg}'")
+            value = labels[arg]
+        elif name == 'pushs':
+            value = unescape_string(arg[1:-1])  # Remove as aspas
+        elif name == 'pushf':
+            value = float(arg)
+        elif name in INT_OPS:
+            value = int(arg) if arg else (1 if name in ('pop', 'dup') else 0)
+        else:
+            value = None
+        code.append((OP[name], value))
+    return Program(code, labels, [line for _, _, line in instructions])
+
+
+def format_real(value):
+    """Formato de escrita de reais (WRITEF), partilhado pelos motores de execução locais"""
+    return repr(float(value))
+
+
+def int_div(a, b):
+    """Divisão inteira com truncatura para zero (como a VM e o Pascal)"""
+    if b == 0:
+        raise VMError("Divisão por zero")
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def int_mod(a, b):
+    """Resto com o sinal do dividendo (a = b * (a div b) + a mod b)"""
+    return a - b * int_div(a, b)
+
+
+class VM:
+    """
+    Máquina de pilha que executa um Program.
+
+    Os endereços (PUSHGP, PUSHFP, ALLOCN, PADD) são pares (bloco, posição),
+    onde bloco é a lista Python das variáveis globais, da pilha ou de um
+    bloco do heap.
+
+    Limites (None = sem limite; excedidos, run lança LimitExceeded):
+        max_steps    instruções executadas; verificado nos saltos e chamadas,
+                     como a pausa de run(limit), por isso o ciclo principal
+                     continua a ter uma só comparação nesses pontos e o limite
+                     pode ser ultrapassado pelas instruções de um bloco básico
+        max_heap     células alocadas por ALLOCN (verificado antes de alocar)
+        max_frames   profundidade da pilha de chamadas (verificado quando
+                     max_depth aumenta: limita a memória de uma recursão infinita)
+        max_output   caracteres escritos (verificado antes de cada escrita)
+        max_seconds  tempo de cada chamada a run; verificado nos mesmos pontos
+                     que max_steps, a cada CHECK_INTERVAL instruções
+    """
+
+    def __init__(self, program, input_lines=None, stdout=None,
+                 max_steps=None, max_heap=None, max_frames=None, max_output=None, max_seconds=None):
+        if isinstance(program, str):
+            program = parse_program(program)
+        self.program = program
+        self.input = iter(input_lines or [])      # Linhas lidas por READ
+        self.lines_read = 0                       # Linhas já lidas (posição na entrada)
+        self.stdout = stdout if stdout is not None else io.StringIO()
+        self.globals = [0] * program.num_globals
+        self.stack = []
+        self.frames = []                          # Pilha de chamadas: (pc de retorno, fp)
+        self.max_depth = 0                        # Profundidade máxima da pilha de chamadas
+        self.heap_cells = 0                       # Células alocadas por ALLOCN
+        self.pc = 0
+        self.fp = 0
+        self.steps = 0                            # Instruções executadas
+        self.halted = False
+        self.paused = False                       # run(limit) parou antes do fim (retomar com run)
+        self.written = 0                          # Caracteres escritos (com max_output)
+        self.max_steps = max_steps
+        self.max_heap = max_heap
+        self.max_frames = max_frames
+        self.max_output = max_output
+        self.max_seconds = max_seconds
+        self.deadline = None                      # Fim do tempo de run (time.perf_counter)
+
+    def output(self):
+        """Texto escrito pelo programa (quando stdout é o StringIO por omissão)"""
+        return self.stdout.getvalue()
+
+    def write_limited(self, text):
+        """Escrita com o limite max_output"""
+        if self.written + len(text) > self.max_output:
+            raise LimitExceeded('saída', self.max_output)
+        self.written += len(text)
+        self.stdout.write(text)
+
+    def next_check(self, steps, pause):
+        """Número de instruções em que run volta a chamar check_limits"""
+        check = pause
+        if self.max_steps is not None:
+            check = min(check, self.max_steps)
+        if self.deadline is not None:
+            check = min(check, steps + CHECK_INTERVAL)
+        return check
+
+    def check_limits(self, steps, pause):
+        """
+        Verificação dos limites de instruções e de tempo num salto ou chamada.
+
+        Returns:
+            int: Próxima verificação, ou None se run deve parar (pausa)
+
+        Raises:
+            LimitExceeded: Se um dos limites foi excedido
+        """
+        if steps >= pause:
+            return None
+        if self.max_steps is not None and steps >= self.max_steps:
+            raise LimitExceeded('instruções', self.max_steps)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise LimitExceeded('tempo', self.max_seconds)
+        return self.next_check(steps, pause)
+
+    def run(self, limit=None):
+        """
+        Executa o programa até STOP (ou até ao fim do código).
+
+        Args:
+            limit: Número de instruções executadas (self.steps) a partir do qual
+                a execução pára no primeiro salto ou chamada (self.paused fica
+                True e run continua a execução). O estado entre instruções é
+                todo guardado em self, por isso pode ser copiado (pas_snapshot).
+
+        Raises:
+            LimitExceeded: Se for excedido um dos limites da VM (ver a classe)
+            VMError: Outros erros de execução
+        """
+        pause = sys.maxsize if limit is None else limit
+        self.paused = False
+        code = self.program.code
+        size = len(code)
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        glob = self.globals
+        write = self.stdout.write if self.max_output is None else self.write_limited
+        heap_limit = sys.maxsize if self.max_heap is None else self.max_heap
+        frames_limit = sys.maxsize if self.max_frames is None else self.max_frames
+        pc = self.pc
+        fp = self.fp
+        steps = self.steps
+        # limit passa a ser a próxima verificação (pausa ou limites)
+        self.deadline = None if self.max_seconds is None else time.perf_counter() + self.max_seconds
+        limit = self.next_check(steps, pause)
+
+        (PUSHI, PUSHF, PUSHS, PUSHG, STOREG, PUSHL, STOREL, PUSHGP, PUSHFP, PUSHN, POP, DUP,
+         SWAP, LOAD, STORE, PADD, ALLOCN, ADD, SUB, MUL, DIV, MOD, FADD, FSUB, FMUL, FDIV,
+         INF, INFEQ, SUP, SUPEQ, FINF, FINFEQ, FSUP, FSUPEQ, EQUAL, NOT, AND, OR, ITOF, FTOI,
+         ATOI, ATOF, STRI, STRF, CONCAT, STRLEN, CHARAT, READ, WRITEI, WRITEF, WRITES,
+         WRITELN, JUMP, JZ, PUSHA, CALL, RETURN, START, STOP, NOP, ERR) = range(len(OPCODES))
+
+        try:
+            while pc < size:
+                op, arg = code[pc]
+                pc += 1
+                steps += 1
+                # Instruções ordenadas aproximadamente por frequência
+                if op == PUSHG:
+                    push(glob[arg])
+                elif op == PUSHI:
+                    push(arg)
+                elif op == STOREG:
+                    glob[arg] = pop()
+                elif op == PUSHL:
+                    push(stack[fp + arg])
+                elif op == STOREL:
+                    stack[fp + arg] = pop()
+                elif op == JZ:
+                    if not pop():
+                        pc = arg
+                        if steps >= limit:
+                            limit = self.check_limits(steps, pause)
+                            if limit is None:
+                                self.paused = True
+                                break
+                elif op == JUMP:
+                    pc = arg
+                    if steps >= limit:
+                        limit = self.check_limits(steps, pause)
+                        if limit is None:
+                            self.paused = True
+                            break
+                elif op == ADD:
+                    b = pop(); stack[-1] += b
+                elif op == SUB:
+                    b = pop(); stack[-1] -= b
+                elif op == MUL:
+                    b = pop(); stack[-1] *= b
+                elif op == INFEQ:
+                    b = pop(); stack[-1] = int(stack[-1] <= b)
+                elif op == INF:
+                    b = pop(); stack[-1] = int(stack[-1] < b)
+                elif op == SUPEQ:
+                    b = pop(); stack[-1] = int(stack[-1] >= b)
+                elif op == SUP:
+                    b = pop(); stack[-1] = int(stack[-1] > b)
+                elif op == EQUAL:
+                    b = pop(); stack[-1] = int(stack[-1] == b)
+                elif op == PADD:
+                    n = pop(); block, base = pop(); push((block, base + n))
+                elif op == LOAD:
+                    block, base = pop(); push(block[base + arg])
+                elif op == STORE:
+                    value = pop(); block, base = pop(); block[base + arg] = value
+                elif op == DIV:
+                    b = pop(); stack[-1] = int_div(stack[-1], b)
+                elif op == MOD:
+                    b = pop(); stack[-1] = int_mod(stack[-1], b)
+                elif op == NOT:
+                    stack[-1] = int(not stack[-1])
+                elif op == AND:
+                    b = pop(); stack[-1] = int(bool(stack[-1]) and bool(b))
+                elif op == OR:
+                    b = pop(); stack[-1] = int(bool(stack[-1]) or bool(b))
+                elif op == PUSHA:
+                    push(arg)
+                elif op == CALL:
+                    frames = self.frames
+                    frames.append((pc, fp))
+                    if len(frames) > self.max_depth:
+                        self.max_depth = len(frames)
+                        if self.max_depth > frames_limit:
+                            raise LimitExceeded('chamadas', self.max_frames)
+                    pc = pop()
+                    fp = len(stack)
+                    if steps >= limit:
+                        limit = self.check_limits(steps, pause)
+                        if limit is None:
+                            self.paused = True
+                            break
+                elif op == RETURN:
+                    pc, fp = self.frames.pop()
+                elif op == PUSHF:
+                    push(arg)
+                elif op == PUSHS:
+                    push(arg)
+                elif op == FADD:
+                    b = pop(); stack[-1] = float(stack[-1]) + b
+                elif op == FSUB:
+                    b = pop(); stack[-1] = float(stack[-1]) - b
+                elif op == FMUL:
+                    b = pop(); stack[-1] = float(stack[-1]) * b
+                elif op == FDIV:
+                    b = pop()
+                    if b == 0:
+                        raise VMError("Divisão por zero")
+                    stack[-1] = float(stack[-1]) / b
+                elif op == FINF:
+                    b = pop(); stack[-1] = int(stack[-1] < b)
+                elif op == FINFEQ:
+                    b = pop(); stack[-1] = int(stack[-1] <= b)
+                elif op == FSUP:
+                    b = pop(); stack[-1] = int(stack[-1] > b)
+                elif op == FSUPEQ:
+                    b = pop(); stack[-1] = int(stack[-1] >= b)
+                elif op == ITOF:
+                    stack[-1] = float(stack[-1])
+                elif op == FTOI:
+                    stack[-1] = int(stack[-1])
+                elif op == PUSHN:
+                    stack.extend([0] * arg)
+                elif op == POP:
+                    del stack[len(stack) - arg:]
+                elif op == DUP:
+                    stack.extend(stack[len(stack) - arg:])
+                elif op == SWAP:
+                    stack[-1], stack[-2] = stack[-2], stack[-1]
+                elif op == PUSHGP:
+                    push((glob, 0))
+                elif op == PUSHFP:
+                    push((stack, fp))
+                elif op == ALLOCN:
+                    n = pop()
+                    if n < 0:
+                        raise VMError(f"Tamanho de alocação inválido: {n}")
+                    if self.heap_cells + n > heap_limit:
+                        raise LimitExceeded('heap', self.max_heap)
+                    self.heap_cells += n
+                    push(([0] * n, 0))
+                elif op == CONCAT:
+                    b = pop(); stack[-1] = stack[-1] + b
+                elif op == STRLEN:
+                    stack[-1] = len(stack[-1])
+                elif op == CHARAT:
+                    n = pop(); stack[-1] = ord(stack[-1][n])
+                elif op == ATOI:
+                    stack[-1] = int(stack[-1].strip())
+                elif op == ATOF:
+                    stack[-1] = float(stack[-1].strip())
+                elif op == STRI:
+                    stack[-1] = str(stack[-1])
+                elif op == STRF:
+                    stack[-1] = format_real(stack[-1])
+                elif op == READ:
+                    try:
+                        push(next(self.input))
+                    except StopIteration:
+                        raise VMError("READ sem mais linhas de entrada")
+                    self.lines_read += 1
+                elif op == WRITEI:
+                    write(str(pop()))
+                elif op == WRITEF:
+                    write(format_real(pop()))
+                elif op == WRITES:
+                    write(pop())
+                elif op == WRITELN:
+                    write('\n')
+                elif op == START:
+                    fp = len(stack)
+                elif op == STOP:
+                    self.halted = True
+                    break
+                elif op == NOP:
+                    pass
+                elif op == ERR:
+                    raise VMError("Instrução ERR executada")
+        except (IndexError, TypeError, ValueError, KeyError) as e:
+            raise VMError(f"Erro na instrução {pc - 1} ({self.program.names[pc - 1]}): {e}") from None
+        finally:
+            self.pc = pc
+            self.fp = fp
+            self.steps = steps
+        return self
+
+
+def run_text(text, input_lines=None):
+    """Atalho: carrega texto VM, executa-o e devolve (saída, instruções executadas)"""
+    vm = VM(parse_program(text), input_lines).run()
+    return vm.output(), vm.steps
+
+
+if __name__ == '__main__':
+    # Uso: python pas_vm.py programa.vm [--sandbox] [--max-steps N ...] < entrada.txt
+    #      (ou programa.pasb, em bytecode)
+    import pas_bytecode
+    args = argparse.ArgumentParser(description="VM local para o código gerado pelo compilador")
+    args.add_argument('program', help="programa .vm (ou .pasb)")
+    args.add_argument('--sandbox', action='store_true',
+                      help="limites por omissão para programas não confiáveis: " +
+                           ", ".join(f"{name}={value}" for name, value in SANDBOX_LIMITS.items()))
+    args.add_argument('--max-steps', type=int, help="máximo de instruções executadas")
+    args.add_argument('--max-heap', type=int, help="máximo de células alocadas por ALLOCN")
+    args.add_argument('--max-frames', type=int, help="profundidade máxima da pilha de chamadas")
+    args.add_argument('--max-output', type=int, help="máximo de caracteres escritos")
+    args.add_argument('--max-seconds', type=float, help="tempo máximo de execução")
+    options = args.parse_args()
+    limits = dict(SANDBOX_LIMITS) if options.sandbox else {}
+    for name in SANDBOX_LIMITS:
+        if getattr(options, name) is not None:
+            limits[name] = getattr(options, name)
+    if pas_bytecode.is_bytecode(options.program):
+        program = pas_bytecode.load(options.program)
+    else:
+        with open(options.program) as f:
+            program = parse_program(f.read())
+    vm = VM(program, (line.rstrip('\n') for line in sys.stdin), sys.stdout, **limits)
+    try:
+        vm.run()
+    except VMError as e:
+        print(f"\nErro de execução: {e}", file=sys.stderr)
+        sys.exit(1)
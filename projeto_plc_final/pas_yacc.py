@@ -1,7 +1,12 @@
 # IMPORTAÇÕES E CONFIGURAÇÃO INICIAL
-from pas_lex import lexer, tokens, literals  # Importa o lexer e definições de tokens
+from pas_lex import lexer, tokens, literals, find_column, reset_lexer  # Importa o lexer e definições de tokens
 import ply.yacc as yacc  # Biblioteca para construção de parsers LALR
+import copy  # Cópia das produções (análise só sintática)
+import decimal  # Reais em notação fixa (operando de PUSHF)
+import math  # math.isfinite (dobragem de constantes reais)
 import os  # Para operações com sistema de arquivos
+import sys  # Para sys.intern (identificadores internados na tabela de símbolos)
+from pas_vm import int_div, int_mod  # Divisão inteira com a semântica da VM (dobragem de constantes)
 
 # Remove arquivos de cache do parser para forçar regeneração
 # Isso evita problemas com tabelas de parsing desatualizadas
@@ -13,7 +18,7 @@ for f in ['parser.out', 'parsetab.py', 'parsetab.pyc']:
 class Symbol:
     """Classe para representar um símbolo (variável/array) na tabela de símbolos"""
     
-    def __init__(self, name, type_, scope=0, is_array=False, array_start=None, array_end=None):
+    def __init__(self, name, type_, scope=0, is_array=False, array_start=None, array_end=None, dims=None):
         """Inicializa um símbolo com nome, tipo e atributos"""
         self.name = name                # Nome da variável (ex: 'x', 'vetor')
         self.type = type_               # Tipo: 'integer', 'real', 'boolean', 'char', 'string'
@@ -23,50 +28,447 @@ class Symbol:
         self.array_end = array_end      # Índice final do array
         self.declared = True            # Símbolo foi declarado
         self.address = None             # Endereço na VM (atribuído depois)
-        self.is_global = True           # Todas variáveis são globais
+        self.is_global = True           # False para parâmetros e variáveis locais de subprogramas
+        self.is_reference = False       # Parâmetro 'var': o slot guarda o endereço da variável
+        self.kind = 'var'               # 'var', 'procedure', 'function' ou 'result'
+        self.params = []                # Subprogramas: lista de (nome, tipo, por_referência)
+        self.label = None               # Subprogramas: label de entrada do código
+        self.function = None            # 'result': símbolo da função cujo resultado representa
+        self.body_code = None           # Subprogramas: código do corpo (sem prólogo/epílogo)
+        self.locals = []                # Subprogramas: símbolos das variáveis locais
+        self.recursive = False          # Subprogramas: chama-se a si próprio
+        self.inline_slots = None        # Subprogramas expandidos inline: endereço no frame -> global
+        self.position = None            # (linha, coluna) da declaração (só com o índice de símbolos)
+        
+        # Dimensões do array: lista de pares (início, fim), uma por índice
+        # Um array unidimensional tem apenas [(array_start, array_end)]
+        if is_array and dims is None:
+            dims = [(array_start, array_end)]
+        self.dims = dims or []
+        
+        # Layout contíguo row-major: strides pré-calculados por dimensão
+        # Ex: array[1..3, 1..4] -> strides [4, 1], tamanho 12
+        self.strides = []
+        stride = 1
+        for start, end in reversed(self.dims):
+            self.strides.insert(0, stride)
+            stride *= end - start + 1
+        self.size = stride if self.dims else 0
+        
+        # Deslocamento constante do primeiro elemento: soma(início_k * stride_k)
+        # O endereço de a[i1, ..., in] é base + soma(i_k * stride_k) - bias
+        self.bias = sum(start * s for (start, _), s in zip(self.dims, self.strides))
         
     def __repr__(self):
         """Representação para debug: mostra tipo e limites se for array"""
         if self.is_array:
-            return f"Symbol({self.name}, {self.type}[{self.array_start}..{self.array_end}])"
+            bounds = ", ".join(f"{start}..{end}" for start, end in self.dims)
+            return f"Symbol({self.name}, {self.type}[{bounds}])"
         return f"Symbol({self.name}, {self.type})"
 
-def init():
+# Tabela de símbolos com escopos
+class SymbolTable:
+    """
+    Tabela de símbolos organizada como uma pilha de dicionários (um por escopo).
+    
+    O Pascal não distingue maiúsculas de minúsculas, por isso as chaves são os
+    nomes em minúsculas, internados com sys.intern (a conversão de cada nome é
+    feita uma única vez e guardada em cache).
+    """
+    
+    def __init__(self):
+        """Cria a tabela apenas com o escopo global"""
+        self.scopes = [{}]    # scopes[0] = global, scopes[-1] = escopo atual
+        self._keys = {}       # Cache: nome tal como escrito -> chave normalizada
+    
+    def key(self, name):
+        """Devolve a chave normalizada (minúsculas, internada) de um identificador"""
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = sys.intern(name.lower())
+        return key
+    
+    def __contains__(self, name):
+        """Verifica se o nome está visível no escopo atual ou em algum escopo envolvente"""
+        key = self.key(name)
+        for scope in reversed(self.scopes):
+            if key in scope:
+                return True
+        return False
+    
+    def __getitem__(self, name):
+        """Devolve o símbolo visível com este nome (o do escopo mais interior)"""
+        key = self.key(name)
+        for scope in reversed(self.scopes):
+            symbol = scope.get(key)
+            if symbol is not None:
+                return symbol
+        raise KeyError(name)
+    
+    def __setitem__(self, name, symbol):
+        """Declara o símbolo no escopo atual"""
+        self.scopes[-1][self.key(name)] = symbol
+    
+    def get(self, name, default=None):
+        """Como __getitem__, mas devolve default se o nome não existir"""
+        try:
+            return self[name]
+        except KeyError:
+            return default
+    
+    def declared_in_current_scope(self, name):
+        """Verifica se o nome já foi declarado no escopo atual (não nos envolventes)"""
+        return self.key(name) in self.scopes[-1]
+    
+    def enter_scope(self):
+        """Abre um novo escopo (ex: corpo de um subprograma)"""
+        self.scopes.append({})
+    
+    def exit_scope(self):
+        """Fecha o escopo atual, descartando os seus símbolos"""
+        self.scopes.pop()
+    
+    @property
+    def level(self):
+        """Nível do escopo atual (0 = global)"""
+        return len(self.scopes) - 1
+
+# ============================================================================
+# DIAGNÓSTICOS (ERROS E AVISOS)
+# ============================================================================
+
+# Catálogo de diagnósticos: código -> (gravidade, modelo da mensagem)
+# Os argumentos de cada modelo são guardados no diagnóstico (para ferramentas
+# que não querem interpretar o texto da mensagem)
+DIAGNOSTICS = {
+    # Sintaxe
+    'S001': ('error', "Token inesperado '{value}' (tipo: {type})"),
+    'S002': ('error', "Fim do arquivo inesperado"),
+    # Tipos em expressões e atribuições
+    'E001': ('error', "Operação '{op}' requer operandos numéricos, não {left_type} e {right_type}"),
+    'E002': ('error', "Operação '{op}' requer operandos booleanos, não {left_type} e {right_type}"),
+    'E003': ('error', "Comparação '{op}' entre tipos incompatíveis: {left_type} e {right_type}"),
+    'E004': ('error', "Atribuição de real para integer na variável '{var_name}' requer conversão explícita"),
+    'W001': ('warning', "Atribuindo string a char na variável '{var_name}' - em runtime será verificado se tem 1 caractere"),
+    'E005': ('error', "Atribuição de {expr_type} para {var_type} na variável '{var_name}' não permitida"),
+    'E006': ('error', "Atribuição de tipo incompatível na variável '{var_name}': {expr_type} para {var_type}"),
+    # Arrays
+    'E007': ('error', "Array '{array_name}' não declarado"),
+    'E008': ('error', "'{array_name}' não é um array"),
+    'E009': ('error', "Array '{array_name}' requer {expected} índice(s), não {given}"),
+    'E010': ('error', "Índice do array deve ser integer, não {index_type}"),
+    'W002': ('warning', "Índice {index_val} fora dos limites do array {array_name}[{start}..{end}]"),
+    # Declarações
+    'E011': ('error', "Variável '{var_name}' já declarada"),
+    'E012': ('error', "Intervalo de array inválido {start_val}..{end_val}"),
+    'E013': ('error', "Limite de array deve ser integer, não real ({value})"),
+    # Subprogramas
+    'E014': ('error', "Subprograma '{name}' não declarado"),
+    'E015': ('error', "'{name}' não é um procedimento nem uma função"),
+    'E016': ('error', "Procedimento '{name}' não devolve valor"),
+    'E017': ('error', "Função '{name}' usada como procedimento"),
+    'E018': ('error', "'{name}' espera {expected} argumento(s), não {given}"),
+    'E019': ('error', "Argumento '{param_name}' de '{name}' é 'var' e tem de ser uma variável"),
+    'E020': ('error', "Argumento '{param_name}' de '{name}' deve ser {param_type}, não {arg_type}"),
+    'E021': ('error', "Identificador '{name}' já declarado"),
+    'E022': ('error', "Parâmetro '{param_name}' repetido em '{name}'"),
+    # Statements
+    'E023': ('error', "Condição do UNTIL deve ser booleana, não {expr_type}"),
+    'E024': ('error', "Variável '{var_name}' não declarada"),
+    'E025': ('error', "Não é possível atribuir diretamente a um array '{var_name}' (use índice)"),
+    'E026': ('error', "'{var_name}' não é uma variável"),
+    'E027': ('error', "Condição do IF deve ser booleana, não {expr_type}"),
+    'E028': ('error', "Condição do WHILE deve ser booleana, não {expr_type}"),
+    'E029': ('error', "Variável de controle do FOR deve ser integer, não {var_type}"),
+    'E030': ('error', "Valor inicial do FOR deve ser integer, não {start_type}"),
+    'E031': ('error', "Valor final do FOR deve ser integer, não {end_type}"),
+    # Fatores e operadores unários
+    'E032': ('error', "Operador unário '-' requer operando numérico, não {term_type}"),
+    'E033': ('error', "'{var_name}' é um array, não pode ser usado como valor simples"),
+    'E034': ('error', "Operador NOT requer operando booleano, não {factor_type}"),
+    'E035': ('error', "Função 'length' requer argumento do tipo string ou char, não {arg_type}"),
+    # Leitura
+    'E036': ('error', "Leitura de '{var_name}' ({var_type}) com vários valores por linha não suportada (apenas integer, real e boolean)"),
+    # Compilação interrompida
+    'F001': ('fatal', "Demasiados erros ({count}), compilação interrompida"),
+}
+
+# Prefixo das mensagens em texto, por gravidade
+SEVERITY_LABELS = {'error': 'Erro', 'warning': 'Aviso', 'fatal': 'Erro'}
+
+
+class Diagnostic:
+    """
+    Diagnóstico estruturado (erro ou aviso) produzido durante a compilação.
+    
+    Guarda o código do catálogo DIAGNOSTICS, a posição e os argumentos da
+    mensagem; o texto só é formatado quando é pedido.
+    """
+    
+    def __init__(self, code, line=None, column=None, **args):
+        """
+        Args:
+            code (str): Código do diagnóstico (chave de DIAGNOSTICS)
+            line (int, optional): Linha onde ocorreu
+            column (int, optional): Coluna onde ocorreu
+            **args: Valores a substituir no modelo da mensagem
+        """
+        self.code = code
+        self.line = line
+        self.column = column
+        self.args = args
+    
+    @property
+    def severity(self):
+        """Gravidade: 'error', 'warning' ou 'fatal' (compilação interrompida)"""
+        return DIAGNOSTICS[self.code][0]
+    
+    @property
+    def message(self):
+        """Texto da mensagem (sem prefixo de linha nem gravidade)"""
+        return DIAGNOSTICS[self.code][1].format(**self.args)
+    
+    def key(self):
+        """Chave para eliminar diagnósticos repetidos (mesmo código, linha e argumentos)"""
+        return (self.code, self.line, tuple(sorted(self.args.items())))
+    
+    def to_dict(self):
+        """Representação para serialização em JSON"""
+        return {
+            'code': self.code,
+            'severity': self.severity,
+            'line': self.line,
+            'column': self.column,
+            'message': self.message,
+            'args': self.args,
+        }
+    
+    def __str__(self):
+        """Formato textual tradicional: 'Linha N: Erro: mensagem'"""
+        text = f"{SEVERITY_LABELS[self.severity]}: {self.message}"
+        if self.line:
+            text = f"Linha {self.line}: {text}"
+        return text
+
+
+class TooManyErrors(Exception):
+    """Lançada quando o número de erros atinge o limite (parser.max_errors)"""
+    pass
+
+
+# Número de erros a partir do qual a compilação é interrompida
+MAX_ERRORS = 100
+
+# ============================================================================
+# MAPA DE CÓDIGO FONTE
+# ============================================================================
+
+class Instr(str):
+    """
+    Instrução VM (texto) anotada com a posição do código Pascal que a gerou.
+    Comporta-se como uma string normal no resto do gerador de código.
+    """
+    
+    def __new__(cls, text, line, column):
+        instr = super().__new__(cls, text)
+        instr.line = line
+        instr.column = column
+        return instr
+
+class Identifier(str):
+    """
+    Nome de um identificador anotado com a posição onde foi escrito (usado nas
+    declarações quando o índice de símbolos está ativo). Comporta-se como str.
+    """
+    
+    def __new__(cls, text, line, column):
+        name = super().__new__(cls, text)
+        name.line = line
+        name.column = column
+        return name
+    
+    def __reduce__(self):
+        """Cópia por pickle (ex: diagnósticos enviados por outro processo)"""
+        return Identifier, (str(self), self.line, self.column)
+
+def tag_positions(code, position):
+    """
+    Anota com position = (linha, coluna) as instruções de code que ainda não têm posição.
+    
+    Returns:
+        list: Nova lista de instruções (code não é alterada)
+    """
+    line, column = position
+    if not line:
+        return code  # Posição desconhecida (parse sem tracking)
+    return [instr if isinstance(instr, Instr) else Instr(instr, line, column) for instr in code]
+
+def build_source_map(code):
+    """
+    Constrói o mapa de código fonte de um programa.
+    
+    As instruções são numeradas como na VM (sem labels nem linhas vazias); um
+    elemento de code pode conter várias instruções separadas por '\\n'.
+    
+    Returns:
+        list: Para cada instrução, (linha, coluna) do statement que a gerou, ou None
+    """
+    source_map = []
+    for instr in code:
+        position = (instr.line, instr.column) if isinstance(instr, Instr) else None
+        for text in instr.split('\n'):
+            text = text.strip()
+            if not text or (text.endswith(':') and ' ' not in text):
+                continue  # Linha vazia ou label: não é uma instrução
+            source_map.append(position)
+    return source_map
+
+# ÍNDICE DE SÍMBOLOS
+#
+# Com init(index_symbols=True), cada declaração e cada uso de um identificador
+# resolvido na tabela de símbolos fica registado em parser.symbol_index como
+# (linha, coluna, símbolo). É o que o servidor de linguagem (pas_lsp) usa para
+# mostrar o tipo de um identificador e saltar para a sua declaração.
+
+def identifier(p, n):
+    """Nome do token n (anotado com a posição se o índice de símbolos estiver ativo)"""
+    if parser.symbol_index is None:
+        return p[n]
+    return Identifier(p[n], *token_position(p, n))
+
+def name_position(name):
+    """Posição (linha, coluna) de um nome anotado com Identifier, ou (None, None)"""
+    if isinstance(name, Identifier):
+        return name.line, name.column
+    return None, None
+
+def index_symbol(symbol, position, declaration=False):
+    """Regista uma ocorrência de symbol em position (e a declaração em symbol.position)"""
+    if parser.symbol_index is None or not position[0]:
+        return
+    if declaration:
+        symbol.position = position
+    parser.symbol_index.append((position[0], position[1], symbol))
+
+# Tamanho máximo (instruções do corpo) de um subprograma folha expandido inline
+INLINE_BUDGET = 30
+
+def init(inline_budget=INLINE_BUDGET, tail_calls=True, max_errors=MAX_ERRORS, source_map=False,
+         constant_pool=True, coalesce_writes=True, read_prompts=True, specialize_types=True,
+         index_symbols=False):
     """
     Inicializa/reinicializa o estado do parser para compilar um novo programa.
     Deve ser chamada antes de cada análise de um programa Pascal.
     
+    Args:
+        inline_budget (int): Tamanho máximo do corpo dos subprogramas expandidos
+            inline nas chamadas (0 desativa o inlining)
+        tail_calls (bool): Eliminar chamadas recursivas em cauda
+        max_errors (int): Número de erros que interrompe a compilação
+            (None ou 0 = sem limite)
+        source_map (bool): Gerar o mapa instrução -> linha/coluna do código
+            Pascal (parser.source_map); exige parser.parse(..., tracking=True)
+        constant_pool (bool): Carregar literais repetidos de globais (tabela de constantes)
+        coalesce_writes (bool): Juntar os argumentos de WRITE/WRITELN em menos escritas
+        read_prompts (bool): Mostrar o prompt "? " antes de cada leitura (desligar em modo batch)
+        specialize_types (bool): Converter literais inteiros em reais e calcular constantes em compilação
+        index_symbols (bool): Registar declarações e usos dos identificadores (parser.symbol_index)
+    
     Returns:
         parser: O parser com estado limpo para nova compilação
     """
     parser.error = None                     # Limpa erros sintáticos anteriores
     parser.semantic_errors = []            # Lista vazia para novos erros semânticos
+    parser.syntax_errors = []              # Mensagens dos erros de sintaxe (todos, não só o primeiro)
+    parser.error_token = None              # Último token recuperado em modo pânico
+    parser.diagnostics = []                # Diagnósticos estruturados (erros e avisos)
+    parser.diagnostic_keys = set()         # Chaves dos diagnósticos já registados
+    parser.error_count = 0                 # Número de diagnósticos com gravidade 'error'
+    parser.max_errors = max_errors         # Limite de erros antes de abortar
     parser.label = 0                       # Contador de labels (para saltos) reiniciado
-    parser.vars = []                       # Lista de variáveis simples (não arrays)
+    parser.vars = {}                       # Variáveis simples a inicializar (dicionário usado como conjunto ordenado)
     parser.arrays = []                     # Lista de arrays para alocação na VM
-    parser.symbol_table = {}               # Tabela de símbolos vazia
+    parser.symbol_table = SymbolTable()    # Tabela de símbolos vazia (só o escopo global)
     parser.current_scope = 0               # Escopo atual (0 = global)
     parser.next_address = 0                # Próximo endereço disponível na VM
-    lexer.lineno = 1
+    parser.subprogram_code = []            # Código dos procedimentos/funções (após o STOP)
+    parser.current_subprogram = None       # Subprograma em compilação (None = programa principal)
+    parser.inline_budget = inline_budget   # Orçamento do inliner (instruções)
+    parser.inline_slots = []               # Globais auxiliares (inliner e leitura): (endereço, tipo)
+    parser.tail_calls = tail_calls         # Eliminação de chamadas em cauda ativa
+    parser.track_positions = source_map    # Anotar instruções com a posição no código fonte
+    parser.constant_pool = constant_pool   # Literais repetidos guardados em globais
+    parser.coalesce_writes = coalesce_writes  # Argumentos de WRITE/WRITELN juntados
+    parser.read_prompts = read_prompts     # Prompt "? " antes de cada leitura
+    parser.read_slots = None               # Globais da leitura de vários valores por linha
+    parser.read_routines = set()           # Rotinas de leitura usadas (emitidas após os subprogramas)
+    parser.specialize_types = specialize_types  # Literais convertidos e constantes calculadas em compilação
+    parser.symbol_index = [] if index_symbols else None  # Ocorrências: (linha, coluna, símbolo)
+    parser.source_map = None               # Posição (linha, coluna) de cada instrução VM
+    reset_lexer()                          # Linhas e colunas do lexer reiniciadas
     return parser                          # Retorna o parser inicializado
 
-def add_semantic_error(message, line=None):
+def token_position(p, n):
+    """
+    Devolve (linha, coluna) do símbolo n de uma produção.
+    
+    Para tokens a posição é sempre conhecida; para não-terminais só existe
+    quando o parse é feito com tracking=True (senão a linha é 0).
+    """
+    line = p.lineno(n)
+    return line, (find_column(line, p.lexpos(n)) if line else None)
+
+def add_diagnostic(diagnostic):
     """
-    Adiciona um erro semântico à lista de erros do parser.
+    Regista um diagnóstico, ignorando repetições.
     
     Args:
-        message (str): Descrição do erro semântico
+        diagnostic (Diagnostic): Diagnóstico a registar
+    
+    Returns:
+        bool: True se o diagnóstico é novo
+    """
+    key = diagnostic.key()
+    if key in parser.diagnostic_keys:  # Evita duplicação de erros (conjunto, O(1))
+        return False
+    parser.diagnostic_keys.add(key)
+    parser.diagnostics.append(diagnostic)
+    if diagnostic.severity == 'error':
+        parser.error_count += 1
+    return True
+
+def check_error_limit():
+    """Interrompe a compilação (TooManyErrors) se o limite de erros foi atingido"""
+    if parser.max_errors and parser.error_count >= parser.max_errors:
+        raise TooManyErrors(parser.error_count)
+
+def add_semantic_error(code, line=None, column=None, **args):
+    """
+    Adiciona um erro semântico (ou aviso) à lista de erros do parser.
+    
+    Args:
+        code (str): Código do diagnóstico (ver DIAGNOSTICS)
         line (int, optional): Número da linha onde ocorreu o erro
+        column (int, optional): Coluna onde ocorreu o erro
+        **args: Argumentos da mensagem
     """
-    if line:
-        message = f"Linha {line}: {message}"  # Adiciona informação da linha ao erro
-    if message not in parser.semantic_errors:  # Evita duplicação de erros
-        parser.semantic_errors.append(message)
+    diagnostic = Diagnostic(code, line, column, **args)
+    if add_diagnostic(diagnostic):
+        parser.semantic_errors.append(str(diagnostic))  # Texto tradicional "Linha N: Erro: ..."
+        check_error_limit()
 
 # ============================================================================
 # FUNÇÕES AUXILIARES PARA VERIFICAÇÃO DE TIPOS
 # ============================================================================
 
+def default_value_code(type_):
+    """Instrução que empilha o valor inicial de uma variável do tipo dado"""
+    if type_ == 'real':
+        return "pushf 0.0"
+    if type_ == 'string' or type_ == 'char':
+        return 'pushs ""'  # String/char inicia vazio
+    return "pushi 0"       # integer, boolean ou tipo não especificado
+
 def is_numeric_type(type_):
     """Verifica se o tipo é numérico (integer ou real)"""
     return type_ in ['integer', 'real']
@@ -144,7 +546,7 @@ def create_typed_expression(type_, code):
     """
     return (type_, code) if code else (type_, [])
 
-def check_operation_compatibility(op, left_type, right_type, line=None):
+def check_operation_compatibility(op, left_type, right_type, position=(None, None)):
     """
     Verifica se uma operação binária é compatível com os tipos dos operandos
     
@@ -152,7 +554,7 @@ def check_operation_compatibility(op, left_type, right_type, line=None):
         op (str): Operador ('+', '-', '*', '/', '<', '>', '<=', '>=', '=', '<>', 'and', 'or', 'div', 'mod')
         left_type (str): Tipo do operando esquerdo
         right_type (str): Tipo do operando direito
-        line (int, optional): Número da linha para mensagens de erro
+        position (tuple, optional): (linha, coluna) para mensagens de erro
     
     Returns:
         bool: True se a operação é compatível, False se não é
@@ -162,14 +564,14 @@ def check_operation_compatibility(op, left_type, right_type, line=None):
     if op in ['+', '-', '*', '/', '<', '>', '<=', '>=', 'div', 'mod']:
         # Verifica se ambos os operandos são numéricos (integer ou real)
         if not is_numeric_type(left_type) or not is_numeric_type(right_type):
-            add_semantic_error(f"Erro: Operação '{op}' requer operandos numéricos, não {left_type} e {right_type}", line)
+            add_semantic_error('E001', *position, op=op, left_type=left_type, right_type=right_type)
             return False
     
     # Operações booleanas: and, or
     elif op in ['and', 'or']:
         # Verifica se ambos os operandos são booleanos
         if not is_boolean_type(left_type) or not is_boolean_type(right_type):
-            add_semantic_error(f"Erro: Operação '{op}' requer operandos booleanos, não {left_type} e {right_type}", line)
+            add_semantic_error('E002', *position, op=op, left_type=left_type, right_type=right_type)
             return False
     
     # Operações de igualdade/desigualdade: =, <>
@@ -182,13 +584,13 @@ def check_operation_compatibility(op, left_type, right_type, line=None):
             # 3. boolean/boolean (já são iguais, não entra aqui)
             if not ((left_type in ['integer', 'real'] and right_type in ['integer', 'real']) or
                    (is_string_or_char_type(left_type) and is_string_or_char_type(right_type))):
-                add_semantic_error(f"Erro: Comparação '{op}' entre tipos incompatíveis: {left_type} e {right_type}", line)
+                add_semantic_error('E003', *position, op=op, left_type=left_type, right_type=right_type)
                 return False
     
     # Operação é compatível
     return True
 
-def check_assignment_compatibility(var_type, expr_type, var_name, line=None):
+def check_assignment_compatibility(var_type, expr_type, var_name, position=(None, None)):
     """
     Verifica se uma atribuição é válida conforme as regras de tipos do Pascal.
     
@@ -196,7 +598,7 @@ def check_assignment_compatibility(var_type, expr_type, var_name, line=None):
         var_type (str): Tipo da variável que recebe o valor
         expr_type (str): Tipo da expressão que está sendo atribuída
         var_name (str): Nome da variável (para mensagens de erro)
-        line (int, optional): Número da linha no código fonte
+        position (tuple, optional): (linha, coluna) no código fonte
     
     Returns:
         bool: True se a atribuição é válida, False caso contrário
@@ -224,44 +626,348 @@ def check_assignment_compatibility(var_type, expr_type, var_name, line=None):
     
     # 1. real -> integer (perde parte decimal)
     if var_type == 'integer' and expr_type == 'real':
-        add_semantic_error(
-            f"Erro: Atribuição de real para integer na variável '{var_name}' requer conversão explícita", 
-            line
-        )
+        add_semantic_error('E004', *position, var_name=var_name)
         return False  # Ex: integer_var := 3.14 -> ERRO
     
     # 2. string -> char (string pode ter múltiplos caracteres)
     if var_type == 'char' and expr_type == 'string':
-        add_semantic_error(
-            f"Aviso: Atribuindo string a char na variável '{var_name}' - em runtime será verificado se tem 1 caractere", 
-            line
-        )
+        add_semantic_error('W001', *position, var_name=var_name)
         return True  # Ex: char_var := 'ABC' -> ERRO
     
     # 3. Tipos incompatíveis: string/char <- número
     if is_string_or_char_type(var_type) and is_numeric_type(expr_type):
-        add_semantic_error(
-            f"Erro: Atribuição de {expr_type} para {var_type} na variável '{var_name}' não permitida", 
-            line
-        )
+        add_semantic_error('E005', *position, expr_type=expr_type, var_type=var_type, var_name=var_name)
         return False  # Ex: string_var := 123 -> ERRO
     
     # 4. Tipos incompatíveis: número <- string/char
     if is_numeric_type(var_type) and is_string_or_char_type(expr_type):
-        add_semantic_error(
-            f"Erro: Atribuição de {expr_type} para {var_type} na variável '{var_name}' não permitida", 
-            line
-        )
+        add_semantic_error('E005', *position, expr_type=expr_type, var_type=var_type, var_name=var_name)
         return False  # Ex: integer_var := '123' -> ERRO
     
     # Caso geral: qualquer outra combinação não suportada
-    add_semantic_error(
-        f"Erro: Atribuição de tipo incompatível na variável '{var_name}': {expr_type} para {var_type}", 
-        line
-    )
+    add_semantic_error('E006', *position, var_name=var_name, expr_type=expr_type, var_type=var_type)
     return False
 
 
+def convert_for_assignment(var_type, expr_type, expr_code):
+    """
+    Aplica as conversões implícitas necessárias antes de armazenar um valor.
+    
+    Deve ser chamada depois de check_assignment_compatibility ter aceite a atribuição.
+    """
+    if var_type == 'real' and expr_type == 'integer':
+        # Conversão integer → real (ITOF, ou literal real se for constante)
+        return to_real_code(expr_type, expr_code)
+    if var_type == 'boolean' and expr_type == 'integer':
+        # Conversão integer → boolean: qualquer valor diferente de 0 é true
+        return expr_code + ["pushi 0", "sup"]
+    return expr_code
+
+
+# ESPECIALIZAÇÃO DE TIPOS
+#
+# As subexpressões só inteiras ficam em instruções inteiras e são convertidas
+# uma única vez (ITOF) quando entram numa operação com reais. Os literais inteiros
+# usados como reais passam a literais reais (PUSHF) e as operações entre dois
+# literais são calculadas em compilação. Desligado com init(specialize_types=False).
+
+# Operações calculadas em compilação (mesma semântica que a VM)
+CONSTANT_OPERATIONS = {
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'div': int_div,
+    'mod': int_mod,
+    'fadd': lambda a, b: a + b,
+    'fsub': lambda a, b: a - b,
+    'fmul': lambda a, b: a * b,
+    'fdiv': lambda a, b: a / b,
+}
+
+def real_literal(value):
+    """
+    Operando de PUSHF em notação fixa, com todos os dígitos de repr (1e+16 ->
+    10000000000000000.0): o EWVM não aceita expoentes. Valores não finitos
+    (que a dobragem de constantes nunca gera) ficam como repr.
+    """
+    if not math.isfinite(value):
+        return repr(value)
+    text = format(decimal.Decimal(repr(value)), 'f')
+    return text if '.' in text else text + '.0'
+
+def get_constant_real(code):
+    """Devolve o valor de uma expressão real constante (código ['pushf x']) ou None"""
+    if len(code) == 1 and code[0].startswith("pushf "):
+        return float(code[0][6:])
+    return None
+
+def to_real_code(expr_type, expr_code):
+    """Código de uma expressão convertida para real (literais inteiros convertidos em compilação)"""
+    if expr_type != 'integer':
+        return expr_code
+    const_val = get_constant_int(expr_code)
+    if const_val is not None and parser.specialize_types:
+        return [f"pushf {real_literal(float(const_val))}"]
+    return expr_code + ["itof"]
+
+def binary_operation_code(vm_op, left_code, right_code):
+    """
+    Código de uma operação binária; com os dois operandos literais, o resultado
+    é calculado em compilação (exceto divisões por zero e resultados reais não
+    finitos, que ficam para a VM).
+    """
+    if parser.specialize_types and vm_op in CONSTANT_OPERATIONS:
+        if vm_op.startswith('f'):
+            left, right = get_constant_real(left_code), get_constant_real(right_code)
+        else:
+            left, right = get_constant_int(left_code), get_constant_int(right_code)
+        if left is not None and right is not None and not (vm_op in ('div', 'mod', 'fdiv') and right == 0):
+            value = CONSTANT_OPERATIONS[vm_op](left, right)
+            if not vm_op.startswith('f'):
+                return [f"pushi {value}"]
+            if math.isfinite(value):
+                return [f"pushf {real_literal(value)}"]
+    return left_code + right_code + [vm_op]
+
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES PARA ACESSO A VARIÁVEIS
+# ============================================================================
+
+def load_variable_code(symbol):
+    """
+    Gera o código que empilha o valor de uma variável.
+    
+    Globais usam PUSHG; locais e parâmetros usam PUSHL relativo ao frame pointer;
+    parâmetros 'var' guardam um endereço, pelo que o valor é lido com LOAD.
+    """
+    if symbol.is_global:
+        return [f"pushg {symbol.address}"]
+    if symbol.is_reference:
+        return [f"pushl {symbol.address}", "load 0"]
+    return [f"pushl {symbol.address}"]
+
+def store_variable_code(symbol, value_code):
+    """Gera o código que calcula value_code e o armazena na variável"""
+    if symbol.is_global:
+        return value_code + [f"storeg {symbol.address}"]
+    if symbol.is_reference:
+        # STORE espera o endereço abaixo do valor
+        return [f"pushl {symbol.address}"] + value_code + ["store 0"]
+    return value_code + [f"storel {symbol.address}"]
+
+def address_of_variable(code):
+    """
+    Converte o código de leitura de uma variável (ou elemento de array) no código
+    que empilha o seu endereço, para passagem de argumentos por referência.
+    
+    Retorna None se o código não corresponder a uma variável (ex: expressão 'x + 1').
+    """
+    if len(code) == 1 and code[0].startswith("pushg "):
+        return ["pushgp", f"pushi {code[0][6:]}", "padd"]
+    if len(code) == 1 and code[0].startswith("pushl "):
+        return ["pushfp", f"pushi {code[0][6:]}", "padd"]
+    if code and code[-1] == "load 0":
+        # Parâmetro 'var' ou elemento de array: o código anterior já deixa o endereço
+        return code[:-1]
+    return None
+
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES PARA ARRAYS
+# ============================================================================
+
+def get_constant_int(code):
+    """
+    Devolve o valor de uma expressão inteira constante (código ['pushi k']).
+    
+    Retorna None se a expressão não for uma constante conhecida em compilação.
+    """
+    if len(code) == 1 and code[0].startswith("pushi "):
+        return int(code[0][6:])
+    return None
+
+def split_constant_offset(code):
+    """
+    Separa uma expressão inteira na forma 'e + k' / 'e - k' em (código de e, k).
+    
+    Como o código é pós-fixo, um sufixo ['pushi k', 'add'] significa que o
+    operando direito da última soma é exatamente a constante k. Aplica-se
+    repetidamente, pelo que a[i + 1 - 2] dá (código de i, -1).
+    
+    Returns:
+        tuple: (código sem as constantes, soma das constantes)
+    """
+    offset = 0
+    while len(code) >= 3 and code[-1] in ("add", "sub") and code[-2].startswith("pushi "):
+        k = int(code[-2][6:])
+        offset += k if code[-1] == "add" else -k
+        code = code[:-2]
+    return code, offset
+
+def array_element_address(array_name, indices, position=(None, None)):
+    """
+    Gera o código VM que deixa no topo da pilha o endereço de um elemento de array.
+    
+    Os arrays ocupam um único bloco contíguo em ordem row-major, por isso o
+    endereço de a[i1, ..., in] é base + soma(i_k * stride_k) - bias, com os
+    strides e o bias pré-calculados no símbolo. Índices constantes são somados
+    ao bias em tempo de compilação.
+    
+    Args:
+        array_name (str): Nome do array
+        indices (list): Lista de expressões tipadas (tipo, código) dos índices
+        position (tuple, optional): (linha, coluna) para mensagens de erro
+    
+    Returns:
+        tuple: (símbolo, código) ou None se houver erro semântico
+    """
+    # Verificar se o array foi declarado
+    if array_name not in parser.symbol_table:
+        add_semantic_error('E007', *position, array_name=array_name)
+        return None
+    
+    symbol = parser.symbol_table[array_name]
+    index_symbol(symbol, position)
+    
+    # Verificar se o símbolo é realmente um array
+    if not symbol.is_array:
+        add_semantic_error('E008', *position, array_name=array_name)
+        return None
+    
+    # O número de índices tem de coincidir com o número de dimensões
+    if len(indices) != len(symbol.dims):
+        add_semantic_error('E009', *position, array_name=array_name, expected=len(symbol.dims), given=len(indices))
+        return None
+    
+    const_offset = -symbol.bias  # Parte do deslocamento conhecida em compilação
+    terms = []                   # Código de cada índice variável já multiplicado pelo stride
+    
+    for (index_type, index_code), (start, end), stride in zip(indices, symbol.dims, symbol.strides):
+        # Verificar tipo do índice (deve ser integer)
+        if index_type and index_type != 'integer':
+            add_semantic_error('E010', *position, index_type=index_type)
+            return None
+        
+        # Constantes somadas ao índice (a[i + 1]) passam para o deslocamento constante,
+        # gerando a mesma sequência que a[i] com outro bias
+        index_code, index_offset = split_constant_offset(index_code)
+        
+        # Índice constante: verifica limites e junta ao deslocamento constante
+        index_val = get_constant_int(index_code)
+        if index_val is not None:
+            index_val += index_offset
+            if index_val < start or index_val > end:
+                add_semantic_error('W002', *position, index_val=index_val, array_name=array_name, start=start, end=end)
+            const_offset += index_val * stride
+            continue
+        
+        # Índice variável: i_k * stride_k (a última dimensão tem stride 1)
+        const_offset += index_offset * stride
+        terms.append(index_code + ([f"pushi {stride}", "mul"] if stride != 1 else []))
+    
+    # Endereço base do array (ponteiro para o bloco alocado no heap)
+    code = load_variable_code(symbol)
+    
+    # Soma dos termos variáveis
+    for n, term in enumerate(terms):
+        code += term
+        if n > 0:
+            code.append("add")
+    
+    # Deslocamento constante (índices constantes menos o bias)
+    if not terms:
+        if const_offset != 0:
+            code += [f"pushi {const_offset}", "padd"]
+        return symbol, code
+    if const_offset > 0:
+        code += [f"pushi {const_offset}", "add"]
+    elif const_offset < 0:
+        code += [f"pushi {-const_offset}", "sub"]
+    code.append("padd")  # Endereço do elemento = base + deslocamento
+    return symbol, code
+
+
+
+
+# TABELA DE CONSTANTES
+#
+# Cada PUSHS cria uma string nova na VM, e o mesmo literal aparece muitas vezes
+# (o prompt "? " de cada readln, "true"/"false" em cada writeln de booleanos,
+# mensagens dentro de ciclos). Os literais de string e real repetidos, ou usados
+# dentro de ciclos e subprogramas (executados muitas vezes), passam a ser
+# carregados de uma global, inicializada uma única vez antes do START.
+
+# Ocorrências a partir das quais um literal é guardado numa global
+CONSTANT_POOL_MIN_USES = 2
+
+def repeated_code_mask(code):
+    """
+    Marca as instruções que podem ser executadas várias vezes: as que estão entre
+    um label e um salto para trás até ele (ciclos) e as que estão depois do STOP
+    (subprogramas).
+    
+    Returns:
+        list: Um booleano por elemento de code
+    """
+    labels = {}
+    delta = [0] * (len(code) + 1)  # Diferenças: +1 no início de um ciclo, -1 depois do fim
+    stop = len(code)
+    for index, instr in enumerate(code):
+        if instr.endswith(':'):
+            labels[instr[:-1]] = index
+            continue
+        op, _, arg = instr.partition(' ')
+        if op in ('jump', 'jz') and arg in labels:
+            delta[labels[arg]] += 1
+            delta[index + 1] -= 1
+        elif instr == 'stop' and stop == len(code):
+            stop = index
+    mask = []
+    depth = 0
+    for index in range(len(code)):
+        depth += delta[index]
+        mask.append(depth > 0 or index > stop)
+    return mask
+
+def pool_constants(code):
+    """
+    Substitui os PUSHS/PUSHF repetidos (ou em código repetido) de code por PUSHG de globais novas.
+    
+    Args:
+        code (list): Instruções do programa (statements, STOP e subprogramas)
+    
+    Returns:
+        tuple: (código de inicialização das globais, novo código)
+    """
+    uses = {}
+    for instr, repeated in zip(code, repeated_code_mask(code)):
+        if instr.startswith(('pushs ', 'pushf ')):
+            # Um uso dentro de um ciclo conta como repetido
+            uses[instr] = uses.get(instr, 0) + (CONSTANT_POOL_MIN_USES if repeated else 1)
+    
+    # Uma global por literal, pela ordem da primeira ocorrência
+    slots = {}
+    init_code = []
+    for instr, count in uses.items():
+        if count >= CONSTANT_POOL_MIN_USES:
+            slots[instr] = parser.next_address
+            parser.next_address += 1
+            init_code += [str(instr), f"storeg {slots[instr]}"]
+    if not slots:
+        return [], code
+    
+    new_code = []
+    for instr in code:
+        if instr in slots:
+            load = f"pushg {slots[instr]}"
+            # Mantém a posição no código fonte (mapa de código fonte)
+            instr = Instr(load, instr.line, instr.column) if isinstance(instr, Instr) else load
+        new_code.append(instr)
+    return init_code, new_code
+
 
 # REGRAS DO PARSER
 
@@ -269,10 +975,13 @@ def check_assignment_compatibility(var_type, expr_type, var_name, line=None):
 #"""Regra principal: define a estrutura de um programa Pascal"""
 def p_program(p):
     # Sintaxe: program -> PROGRAM ID ; declarações BEGIN statements END .
-    r'program : PROGRAM ID ";" var_decls BEGIN statements opt_semicolon END "."'
+    r'program : PROGRAM ID ";" declarations BEGIN statements opt_semicolon END "."'
     
+    # Erros de sintaxe (recuperados em modo pânico): não gera código
+    if parser.syntax_errors:
+        p[0] = ""
     # Verifica se houve erros semânticos durante o parsing
-    if parser.semantic_errors:
+    elif parser.semantic_errors:
         # Junta todos os erros semânticos em uma única mensagem
         error_msg = "\n".join(parser.semantic_errors)
         parser.error = f"Erros semânticos:\n{error_msg}"
@@ -280,24 +989,19 @@ def p_program(p):
     else:
         # Fase 1: Inicializar variáveis simples com valores padrão
         init_code = []
-        for var in parser.vars:  # Percorre lista de variáveis não-arrays
+        for var in parser.vars:  # Percorre as variáveis não-arrays (pela ordem de declaração)
             if var in parser.symbol_table and not parser.symbol_table[var].is_array:
                 idx = parser.symbol_table[var].address  # Endereço na VM
                 var_type = parser.symbol_table[var].type  # Tipo da variável
                 
                 # Gera código de inicialização conforme o tipo
-                if var_type == 'real':
-                    init_code.append(f"pushf 0.0")
-                    init_code.append(f"storeg {idx}")
-                elif var_type == 'boolean':
-                    init_code.append(f"pushi 0")
-                    init_code.append(f"storeg {idx}")
-                elif var_type == 'string' or var_type == 'char':
-                    init_code.append(f"pushs \"\"")  # String/char inicia vazio
-                    init_code.append(f"storeg {idx}")  # Armazena na posição idx
-                else:  # integer ou tipo não especificado
-                    init_code.append(f"pushi 0")    # Integer inicia com 0
-                    init_code.append(f"storeg {idx}")  # Armazena na posição idx
+                init_code.append(default_value_code(var_type))
+                init_code.append(f"storeg {idx}")  # Armazena na posição idx
+        
+        # Globais usadas pelos subprogramas expandidos inline e pela leitura
+        for idx, var_type in parser.inline_slots:
+            init_code.append(default_value_code(var_type))
+            init_code.append(f"storeg {idx}")
         
         # Fase 2: Alocação de arrays no heap da VM
         array_alloc_code = []
@@ -313,13 +1017,25 @@ def p_program(p):
         # p[6] corresponde aos statements do programa
         stmt_code = p[6] if isinstance(p[6], list) else []
         
-        # Fase 4: Junta todo o código VM na ordem correta:
-        # 1. Inicialização de variáveis
+        # Fase 4: Literais repetidos passam para globais (tabela de constantes)
+        program_code = stmt_code + ["stop"] + parser.subprogram_code
+        for name in sorted(parser.read_routines):  # Rotinas de leitura (só as usadas)
+            program_code += read_routine_code(name)
+        if parser.constant_pool:
+            pool_init, program_code = pool_constants(program_code)
+            init_code += pool_init
+        
+        # Fase 5: Junta todo o código VM na ordem correta:
+        # 1. Inicialização de variáveis (e das constantes)
         # 2. Alocação de arrays
         # 3. Instrução START (inicializa frame pointer)
         # 4. Código dos statements
         # 5. Instrução STOP (termina execução)
-        p[0] = "\n".join(init_code + array_alloc_code + ["start"] + stmt_code + ["stop"])
+        # 6. Código dos subprogramas e das rotinas de leitura (só alcançado através de CALL)
+        code = init_code + array_alloc_code + ["start"] + program_code
+        if parser.track_positions:
+            parser.source_map = build_source_map(code)
+        p[0] = "\n".join(code)
 
 def p_opt_semicolon(p):
     r'opt_semicolon : ";"'
@@ -331,6 +1047,20 @@ def p_opt_semicolon_empty(p):
     """Regra para ponto e vírgula opcional (vazio)"""
     p[0] = None  # Retorna None, indicando que não há ponto e vírgula
 
+def p_declarations(p):
+    r'''declarations : declarations VAR var_decl_list
+                    | declarations subprogram_decl'''
+    """
+    Regra para a parte declarativa do programa: secções VAR e subprogramas,
+    por qualquer ordem (cada subprograma só vê as globais declaradas antes dele)
+    """
+    p[0] = None
+
+def p_declarations_empty(p):
+    r'declarations : '
+    """Regra para a parte declarativa vazia"""
+    p[0] = None
+
 def p_var_decls(p):
     r'var_decls : VAR var_decl_list'
     """Regra para declarações de variáveis (com VAR)"""
@@ -344,14 +1074,24 @@ def p_var_decls_empty(p):
 def p_var_decl_list(p):
     r'var_decl_list : var_decl_list var_decl ";"'
     """Regra para lista de declarações (múltiplas)"""
-    # Concatena a lista existente (p[1]) com a nova declaração (p[2])
-    p[0] = p[1] + p[2]
+    # Estende a lista existente (p[1]) com a nova declaração (p[2]), sem a copiar
+    p[1].extend(p[2])
+    p[0] = p[1]
 
 def p_var_decl_list_one(p):
     r'var_decl_list : var_decl ";"'
     """Regra para lista de declarações (uma única)"""
     p[0] = p[1]  # Retorna a declaração como lista (é uma lista de nomes)
 
+def p_var_decl_error(p):
+    r'var_decl : error'
+    """
+    Recuperação de erros numa declaração de variáveis: o PLY descarta tokens
+    até ao ";" que termina a declaração. Nenhuma variável é declarada.
+    """
+    recover_from_error(p)
+    p[0] = []
+
 def p_var_decl(p):
     r'var_decl : id_list ":" type'
     """
@@ -362,35 +1102,41 @@ def p_var_decl(p):
         vetor: array[1..10] of integer
     """
     var_names = p[1]      # Lista de nomes de variáveis (ex: ['x', 'y'])
-    type_info = p[3]      # Informação do tipo (ex: 'integer' ou ('array', 1, 10, 'integer'))
+    type_info = p[3]      # Informação do tipo (ex: 'integer' ou ('array', [(1, 10)], 'integer'))
     
     # Processa cada variável na lista
     for var_name in var_names:
-        # Verifica se variável já foi declarada
-        if var_name in parser.symbol_table:
-            add_semantic_error(f"Erro: Variável '{var_name}' já declarada")
+        # Verifica se variável já foi declarada no escopo atual
+        # (uma variável local pode esconder uma global com o mesmo nome)
+        if parser.symbol_table.declared_in_current_scope(var_name):
+            add_semantic_error('E011', *name_position(var_name), var_name=var_name)
             continue  # Pula para próxima variável
         
+        # Variável local de um subprograma: fica no frame, não no espaço global
+        if parser.current_subprogram is not None:
+            declare_local(var_name, type_info)
+            continue
+        
         # Se for array (tipo_info é uma tupla começando com 'array')
         if isinstance(type_info, tuple) and type_info[0] == 'array':
-            # Extrai limites do array: ('array', inicio, fim, tipo_elemento)
-            array_start = int(type_info[1].value) if hasattr(type_info[1], 'value') else int(type_info[1])
-            array_end = int(type_info[2].value) if hasattr(type_info[2], 'value') else int(type_info[2])
-            elem_type = type_info[3]  # Tipo dos elementos do array
-            size = array_end - array_start + 1  # Tamanho do array
+            # Extrai dimensões do array: ('array', [(inicio, fim), ...], tipo_elemento)
+            dims = type_info[1]
+            elem_type = type_info[2]  # Tipo dos elementos do array
             
-            # Cria símbolo para o array
+            # Cria símbolo para o array (a primeira dimensão fica em array_start/array_end)
             symbol = Symbol(var_name, elem_type, parser.current_scope, 
-                          is_array=True, array_start=array_start, array_end=array_end)
+                          is_array=True, array_start=dims[0][0], array_end=dims[0][1], dims=dims)
             symbol.address = parser.next_address  # Atribui endereço na VM
             
             # Adiciona à tabela de símbolos
             parser.symbol_table[var_name] = symbol
+            index_symbol(symbol, name_position(var_name), declaration=True)
             
             # Guarda informação para alocação posterior na VM
+            # Todas as dimensões partilham um único bloco contíguo (allocn)
             parser.arrays.append({
                 'name': var_name,
-                'size': size,
+                'size': symbol.size,
                 'address_idx': parser.next_address
             })
             
@@ -402,10 +1148,10 @@ def p_var_decl(p):
             symbol = Symbol(var_name, type_info, parser.current_scope)
             symbol.address = parser.next_address  # Atribui endereço na VM
             parser.symbol_table[var_name] = symbol  # Adiciona à tabela
+            index_symbol(symbol, name_position(var_name), declaration=True)
             
-            # Guarda na lista de variáveis simples (para inicialização)
-            if var_name not in parser.vars:
-                parser.vars.append(var_name)
+            # Guarda nas variáveis simples (para inicialização)
+            parser.vars[parser.symbol_table.key(var_name)] = None
                 
             parser.next_address += 1  # Próximo endereço livre
     
@@ -413,17 +1159,18 @@ def p_var_decl(p):
     p[0] = var_names
 
 def p_id_list(p):
-    r'id_list : ID "," id_list'
+    r'id_list : id_list "," ID'
     """Regra para lista de identificadores com múltiplos elementos"""
-    # p[1] é o primeiro ID, p[3] é a lista restante de IDs
-    # Concatena o primeiro ID com a lista dos demais
-    p[0] = [p[1]] + p[3]
+    # p[1] é a lista de IDs já reconhecidos, p[3] é o novo ID
+    # Recursão à esquerda: acrescenta no fim (linear, sem copiar a lista)
+    p[1].append(identifier(p, 3))
+    p[0] = p[1]
 
 def p_id_list_single(p):
     r'id_list : ID'
     """Regra para lista de identificadores com um único elemento"""
     # Cria uma lista contendo apenas o ID
-    p[0] = [p[1]]
+    p[0] = [identifier(p, 1)]
 
 def p_type(p):
     r'''type : simple_type
@@ -443,13 +1190,514 @@ def p_simple_type(p):
     p[0] = p[1].lower()
 
 def p_array_type(p):
-    r'array_type : ARRAY "[" NUM DOTDOT NUM "]" OF simple_type'
-    """Regra para declaração de arrays unidimensionais"""
-    # Extrai os valores numéricos dos limites do array
-    start_val = int(p[3].value) if hasattr(p[3], 'value') else int(p[3])
-    end_val = int(p[5].value) if hasattr(p[5], 'value') else int(p[5])
-    # Retorna uma tupla: ('array', início, fim, tipo_do_elemento)
-    p[0] = ('array', start_val, end_val, p[8].lower())
+    r'array_type : ARRAY "[" range_list "]" OF type'
+    """
+    Regra para declaração de arrays (uma ou mais dimensões)
+    
+    Exemplos:
+        array[1..10] of integer
+        array[1..3, 1..4] of real
+        array[1..3] of array[1..4] of real   (equivalente ao anterior)
+    """
+    dims = p[3]        # Lista de pares (início, fim)
+    elem_type = p[6]   # Tipo dos elementos (simples ou outro array)
+    
+    # Arrays de arrays são achatados num único array multidimensional,
+    # para que todo o array ocupe um só bloco contíguo na VM
+    if isinstance(elem_type, tuple) and elem_type[0] == 'array':
+        dims = dims + elem_type[1]
+        elem_type = elem_type[2]
+    
+    # Retorna uma tupla: ('array', [(início, fim), ...], tipo_do_elemento)
+    p[0] = ('array', dims, elem_type)
+
+def p_range_list(p):
+    r'range_list : range_list "," range'
+    """Regra para lista de intervalos (várias dimensões)"""
+    p[0] = p[1] + [p[3]]
+
+def p_range_list_one(p):
+    r'range_list : range'
+    """Regra para lista de intervalos com uma única dimensão"""
+    p[0] = [p[1]]
+
+def p_range(p):
+    r'range : const_int DOTDOT const_int'
+    """Regra para um intervalo de índices: início..fim"""
+    start_val, end_val = p[1], p[3]
+    if start_val > end_val:
+        add_semantic_error('E012', *token_position(p, 2), start_val=start_val, end_val=end_val)
+        end_val = start_val  # Evita tamanhos negativos na alocação
+    p[0] = (start_val, end_val)
+
+def p_const_int(p):
+    r'''const_int : NUM
+                  | ADDOP NUM'''
+    """Regra para constante inteira (com sinal opcional) usada nos limites dos arrays"""
+    value = p[len(p) - 1]
+    if isinstance(value, float):
+        add_semantic_error('E013', *token_position(p, len(p) - 1), value=value)
+        value = int(value)
+    p[0] = -value if len(p) == 3 and p[1] == '-' else value
+
+
+
+
+# SUBPROGRAMAS (PROCEDURE / FUNCTION)
+#
+# Modelo de chamada (frame da VM):
+#   fp-(n+1)        resultado da função (empilhado pelo chamador)
+#   fp-n .. fp-1    parâmetros, pela ordem da declaração
+#   fp+0 .. fp+k-1  variáveis locais (inicializadas no prólogo)
+# O chamador empilha resultado e argumentos, faz PUSHA/CALL e no fim POP n,
+# ficando apenas o resultado no topo da pilha.
+
+
+def declare_local(var_name, type_info):
+    """Declara uma variável local do subprograma atual (endereço relativo ao fp)"""
+    info = parser.current_subprogram
+    if isinstance(type_info, tuple) and type_info[0] == 'array':
+        dims = type_info[1]
+        symbol = Symbol(var_name, type_info[2], parser.current_scope,
+                        is_array=True, array_start=dims[0][0], array_end=dims[0][1], dims=dims)
+    else:
+        symbol = Symbol(var_name, type_info, parser.current_scope)
+    symbol.is_global = False
+    symbol.address = len(info['locals'])  # fp+0, fp+1, ...
+    info['locals'].append(symbol)
+    parser.symbol_table[var_name] = symbol
+    index_symbol(symbol, name_position(var_name), declaration=True)
+
+def subprogram_call_code(name, args, position, as_function):
+    """
+    Gera o código de uma chamada a procedimento ou função.
+    
+    Args:
+        name (str): Nome do subprograma
+        args (list): Lista de expressões tipadas dos argumentos
+        position (tuple): (linha, coluna) para mensagens de erro
+        as_function (bool): True se a chamada aparece numa expressão
+    
+    Returns:
+        tuple: (símbolo do subprograma, código) ou None se houver erro
+    """
+    if name not in parser.symbol_table:
+        add_semantic_error('E014', *position, name=name)
+        return None
+    
+    symbol = parser.symbol_table[name]
+    # Dentro de uma função, o seu nome representa o resultado; numa expressão é uma chamada recursiva
+    if symbol.kind == 'result':
+        symbol = symbol.function
+    index_symbol(symbol, position)
+    
+    if symbol.kind not in ('procedure', 'function'):
+        add_semantic_error('E015', *position, name=name)
+        return None
+    if as_function and symbol.kind == 'procedure':
+        add_semantic_error('E016', *position, name=name)
+        return None
+    if not as_function and symbol.kind == 'function':
+        add_semantic_error('E017', *position, name=name)
+        return None
+    
+    # Verificar número de argumentos
+    if len(args) != len(symbol.params):
+        add_semantic_error('E018', *position, name=name, expected=len(symbol.params), given=len(args))
+        return None
+    
+    # Chamada a si próprio (o corpo ainda está a ser compilado)
+    if parser.current_subprogram is not None and parser.current_subprogram['symbol'] is symbol:
+        symbol.recursive = True
+    
+    # Código de cada argumento, pela ordem da declaração
+    arg_codes = []
+    for (param_name, param_type, by_ref), (arg_type, arg_code) in zip(symbol.params, args):
+        if by_ref:
+            # Passagem por referência: empilha o endereço da variável
+            address_code = address_of_variable(arg_code)
+            if address_code is None:
+                add_semantic_error('E019', *position, param_name=param_name, name=name)
+                return None
+            if arg_type != param_type:
+                add_semantic_error('E020', *position, param_name=param_name, name=name, param_type=param_type, arg_type=arg_type)
+                return None
+            arg_codes.append(address_code)
+        else:
+            # Passagem por valor: aplica as mesmas regras de uma atribuição
+            if arg_type and not check_assignment_compatibility(param_type, arg_type, param_name, position):
+                return None
+            arg_codes.append(convert_for_assignment(param_type, arg_type, arg_code))
+    
+    # Subprogramas folha pequenos são expandidos no local da chamada
+    code = inline_call_code(symbol, arg_codes)
+    if code is not None:
+        return symbol, code
+    
+    # Espaço para o resultado (apenas funções) e argumentos
+    code = [default_value_code(symbol.type)] if symbol.kind == 'function' else []
+    for arg_code in arg_codes:
+        code += arg_code
+    
+    # Chamada e remoção dos argumentos (o resultado fica no topo)
+    code += [f"pusha {symbol.label}", "call"]
+    if symbol.params:
+        code.append(f"pop {len(symbol.params)}")
+    return symbol, code
+
+# INLINING DE SUBPROGRAMAS FOLHA
+#
+# Um subprograma folha (sem chamadas) e não recursivo pode ser expandido no local
+# da chamada: os parâmetros, locais e resultado passam a usar globais dedicadas
+# (criadas uma vez por subprograma a partir de parser.next_address, o que é seguro
+# porque um subprograma folha nunca está ativo duas vezes ao mesmo tempo).
+
+def new_inline_slot(type_):
+    """Reserva uma nova posição global auxiliar (inliner e leitura), inicializada antes do START"""
+    address = parser.next_address
+    parser.next_address += 1
+    parser.inline_slots.append((address, type_))
+    return address
+
+def inline_slots_for(symbol):
+    """Devolve (criando na primeira vez) o mapa endereço no frame -> global do subprograma"""
+    if symbol.inline_slots is None:
+        n = len(symbol.params)
+        slots = {}
+        for i, (_, param_type, by_ref) in enumerate(symbol.params):
+            slots[i - n] = new_inline_slot('integer' if by_ref else param_type)
+        if symbol.kind == 'function':
+            slots[-(n + 1)] = new_inline_slot(symbol.type)
+        for local in symbol.locals:
+            slots[local.address] = new_inline_slot('integer' if local.is_array else local.type)
+        symbol.inline_slots = slots
+    return symbol.inline_slots
+
+def count_instructions(code):
+    """Número de instruções de uma lista de código (os labels não contam)"""
+    return sum(1 for instr in code if not instr.endswith(':'))
+
+def inline_call_code(symbol, arg_codes):
+    """
+    Gera o código de uma chamada com o corpo do subprograma expandido inline.
+    
+    Modelo de custo (instruções executadas além do corpo):
+        chamada: resultado + PUSHA + CALL + POP n + prólogo + POP k + RETURN
+        inline:  um STOREG por argumento não substituído + 2 por local
+                 + 2 para inicializar e 1 para ler o resultado (se não ficar na pilha)
+    Só se expande se o corpo couber em parser.inline_budget e o inline não for mais caro.
+    
+    Returns:
+        list: código expandido, ou None se o subprograma deve ser chamado normalmente
+    """
+    body = symbol.body_code
+    if body is None or symbol.recursive or "call" in body:
+        return None  # Ainda em compilação, recursivo ou não folha
+    # Endereços de parâmetros ou locais (PUSHFP; PUSHI k; PADD, ver address_of_variable)
+    # passam a ser endereços das globais que os substituem
+    address_taken = set()
+    for i, instr in enumerate(body):
+        if instr == "pushfp":
+            following = body[i + 1:i + 3]
+            if len(following) < 2 or not following[0].startswith("pushi ") or following[1] != "padd":
+                return None
+            address_taken.add(int(following[0][6:]))
+    if count_instructions(body) > parser.inline_budget:
+        return None
+    
+    n = len(symbol.params)
+    result_address = -(n + 1)
+    is_function = symbol.kind == 'function'
+    written_locals = {int(instr[7:]) for instr in body if instr.startswith("storel ")}
+    written_globals = {int(instr[7:]) for instr in body if instr.startswith("storeg ")}
+    has_store = any(instr.startswith("store ") for instr in body)
+    
+    # Parâmetros por valor nunca alterados no corpo e cujo argumento é uma constante
+    # (ou uma variável que o corpo não pode alterar) são substituídos diretamente;
+    # um parâmetro cujo endereço é tomado pode ser alterado indiretamente (STORE)
+    substitute = {}
+    pending = []  # (endereço no frame, código do argumento) guardados numa global
+    for i, ((_, _, by_ref), arg_code) in enumerate(zip(symbol.params, arg_codes)):
+        address = i - n
+        if not by_ref and address not in written_locals | address_taken and len(arg_code) == 1:
+            operand = arg_code[0]
+            if operand.startswith(("pushi ", "pushf ", "pushs ")):
+                substitute[address] = operand
+                continue
+            if not has_store and (operand.startswith("pushl ") or
+                                  (operand.startswith("pushg ") and int(operand[6:]) not in written_globals)):
+                substitute[address] = operand
+                continue
+        pending.append((address, arg_code))
+    
+    # O resultado pode ficar na pilha se for atribuído uma única vez, na última instrução
+    result_on_stack = (is_function and body[-1] == f"storel {result_address}" and
+                       sum(1 for instr in body if instr in (f"storel {result_address}", f"pushl {result_address}")) == 1)
+    
+    # Modelo de custo
+    call_overhead = (1 if is_function else 0) + 2 + (1 if n else 0) + len(symbol.locals) + (1 if symbol.locals else 0) + 1
+    inline_overhead = len(pending) + 2 * len(symbol.locals) + (3 if is_function and not result_on_stack else 0)
+    if inline_overhead > call_overhead:
+        return None
+    
+    slots = inline_slots_for(symbol)
+    
+    # Avalia todos os argumentos antes de os guardar (um argumento pode conter outra
+    # expansão do mesmo subprograma, que usa as mesmas globais)
+    code = []
+    for _, arg_code in pending:
+        code += arg_code
+    for address, _ in reversed(pending):
+        code.append(f"storeg {slots[address]}")
+    
+    # Inicialização das locais e do resultado (como no prólogo da versão chamada)
+    for local in symbol.locals:
+        init = [f"pushi {local.size}", "allocn"] if local.is_array else [default_value_code(local.type)]
+        code += init + [f"storeg {slots[local.address]}"]
+    if is_function and not result_on_stack:
+        code += [default_value_code(symbol.type), f"storeg {slots[result_address]}"]
+    
+    # Corpo com labels renomeados (cada expansão precisa de labels únicos)
+    suffix = f"i{parser.label}"
+    parser.label += 1
+    labels = {instr[:-1] for instr in body if instr.endswith(':')}
+    frame_address = False  # A instrução anterior foi PUSHFP
+    for instr in (body[:-1] if result_on_stack else body):
+        op, _, arg = instr.partition(' ')
+        if frame_address:
+            frame_address = False
+            new = f"pushi {slots[int(arg)]}"
+        elif op == 'pushfp':
+            frame_address = True
+            new = "pushgp"
+        elif instr.endswith(':'):
+            new = f"{instr[:-1]}{suffix}:"
+        elif op in ('jump', 'jz', 'pusha') and arg in labels:
+            new = f"{op} {arg}{suffix}"
+        elif op == 'pushl':
+            address = int(arg)
+            new = substitute[address] if address in substitute else f"pushg {slots[address]}"
+        elif op == 'storel':
+            new = f"storeg {slots[int(arg)]}"
+        else:
+            code.append(instr)
+            continue
+        # A instrução reescrita mantém a posição no corpo do subprograma (mapa de código fonte)
+        code.append(Instr(new, instr.line, instr.column) if isinstance(instr, Instr) else new)
+    
+    if is_function and not result_on_stack:
+        code.append(f"pushg {slots[result_address]}")
+    return code
+
+# ELIMINAÇÃO DE CHAMADAS EM CAUDA
+#
+# Uma chamada recursiva que é a última ação do subprograma (p(x) no fim de um
+# procedimento, ou f := f(x) no fim de uma função) não precisa de um novo frame:
+# os argumentos já empilhados passam para os parâmetros e salta-se para o início
+# do corpo, pelo que a recursão corre em espaço de pilha constante.
+
+def is_tail_position(code, index):
+    """Verifica se a partir de code[index] só há labels e saltos até ao fim do código"""
+    positions = {instr[:-1]: n for n, instr in enumerate(code) if instr.endswith(':')}
+    visited = set()
+    while index < len(code):
+        if index in visited:
+            return False  # Ciclo sem instruções (não termina)
+        visited.add(index)
+        instr = code[index]
+        if instr.endswith(':'):
+            index += 1
+        elif instr.startswith("jump ") and instr[5:] in positions:
+            index = positions[instr[5:]]
+        else:
+            return False
+    return True
+
+def eliminate_tail_calls(symbol, body_code):
+    """
+    Substitui as chamadas recursivas em cauda por atribuições aos parâmetros
+    seguidas de um salto para o label do corpo (tailbody{n}, numerado como os
+    labels dos ciclos: um nome formado a partir do nome do subprograma podia
+    coincidir com o label de entrada de outro, ex: f e fbody).
+    
+    Returns:
+        tuple: (novo código do corpo, label do corpo ou None se nenhuma chamada foi substituída)
+    """
+    # Endereços de locais passados por referência apontariam para o frame reutilizado
+    if "pushfp" in body_code:
+        return body_code, None
+    
+    n = len(symbol.params)
+    is_function = symbol.kind == 'function'
+    call_tail = ([f"pop {n}"] if n else []) + ([f"storel {-(n + 1)}"] if is_function else [])
+    
+    # Reinicialização das locais, como num frame novo
+    reset_locals = []
+    for local in symbol.locals:
+        init = [f"pushi {local.size}", "allocn"] if local.is_array else [default_value_code(local.type)]
+        reset_locals += init + [f"storel {local.address}"]
+    
+    new_code = []
+    body_label = None
+    i = 0
+    while i < len(body_code):
+        end = i + 2 + len(call_tail)
+        if (body_code[i] == f"pusha {symbol.label}" and body_code[i + 1:i + 2] == ["call"] and
+                body_code[i + 2:end] == call_tail and is_tail_position(body_code, end)):
+            # Argumentos no topo da pilha (o último no topo): passam para os parâmetros
+            new_code += [f"storel {address}" for address in range(-1, -n - 1, -1)]
+            if is_function:
+                new_code.append("pop 1")  # Espaço do resultado empilhado antes dos argumentos
+            if body_label is None:
+                body_label = f"tailbody{parser.label}"
+                parser.label += 1
+            new_code += reset_locals + [f"jump {body_label}"]
+            i = end
+        else:
+            new_code.append(body_code[i])
+            i += 1
+    return new_code, body_label
+
+def p_subprogram_decl(p):
+    r'subprogram_decl : subprogram_head var_decls BEGIN statements opt_semicolon END ";"'
+    """
+    Regra para declaração completa de um procedimento ou função.
+    O código gerado é guardado em parser.subprogram_code e emitido após o STOP.
+    """
+    info = parser.current_subprogram
+    symbol = info['symbol']
+    body_code = p[4] if isinstance(p[4], list) else []
+    symbol.locals = info['locals']
+    
+    # Recursão em cauda: transformada num salto para o início do corpo
+    tail_label = None
+    if symbol.recursive and parser.tail_calls:
+        body_code, tail_label = eliminate_tail_calls(symbol, body_code)
+    
+    # Prólogo: cria as variáveis locais no topo da pilha (fp+0, fp+1, ...)
+    prologue = []
+    for local in info['locals']:
+        if local.is_array:
+            # Arrays locais: o ponteiro devolvido por ALLOCN é o próprio slot local
+            prologue += [f"pushi {local.size}", "allocn"]
+        else:
+            prologue.append(default_value_code(local.type))
+    
+    # Epílogo: remove as locais e regressa ao chamador
+    epilogue = [f"pop {len(info['locals'])}"] if info['locals'] else []
+    epilogue.append("return")
+    
+    body_label = [f"{tail_label}:"] if tail_label else []
+    code = [f"{symbol.label}:"] + prologue + body_label + body_code + epilogue
+    if parser.track_positions:
+        # Prólogo e epílogo atribuídos ao cabeçalho (PROCEDURE/FUNCTION)
+        code = tag_positions(code, info['position'])
+    parser.subprogram_code += code
+    
+    # Guardado para o inliner (chamadas posteriores a este subprograma)
+    symbol.body_code = body_code
+    
+    # Sai do escopo do subprograma: os parâmetros e locais deixam de ser visíveis
+    parser.symbol_table.exit_scope()
+    parser.current_scope = parser.symbol_table.level
+    parser.current_subprogram = None
+    p[0] = None
+
+def p_subprogram_head(p):
+    r'''subprogram_head : PROCEDURE ID formal_params ";"
+                        | FUNCTION ID formal_params ":" simple_type ";"'''
+    """
+    Regra para o cabeçalho de um subprograma.
+    Regista o subprograma (permitindo recursão) e abre o escopo local com os parâmetros.
+    """
+    name = p[2]
+    params = p[3]
+    is_function = p[1].lower() == 'function'
+    
+    if name in parser.symbol_table:
+        add_semantic_error('E021', *token_position(p, 2), name=name)
+    
+    # Símbolo global do subprograma
+    symbol = Symbol(name, p[5] if is_function else None, 0)
+    symbol.kind = 'function' if is_function else 'procedure'
+    symbol.params = params
+    key = parser.symbol_table.key(name)  # Labels independentes de maiúsculas/minúsculas
+    symbol.label = f"func{key}" if is_function else f"proc{key}"
+    if name not in parser.symbol_table:
+        parser.symbol_table[name] = symbol
+    index_symbol(symbol, token_position(p, 2), declaration=True)
+    
+    # Entra no escopo local: as globais continuam visíveis, mas podem ser escondidas
+    parser.symbol_table.enter_scope()
+    parser.current_scope = parser.symbol_table.level
+    parser.current_subprogram = {'symbol': symbol, 'locals': [], 'position': token_position(p, 1)}
+    
+    # Parâmetros: fp-n .. fp-1
+    n = len(params)
+    for i, (param_name, param_type, by_ref) in enumerate(params):
+        if parser.symbol_table.declared_in_current_scope(param_name):
+            add_semantic_error('E022', *token_position(p, 2), param_name=param_name, name=name)
+            continue
+        param = Symbol(param_name, param_type, 1)
+        param.is_global = False
+        param.is_reference = by_ref
+        param.address = i - n
+        parser.symbol_table[param_name] = param
+        index_symbol(param, name_position(param_name), declaration=True)
+    
+    # Resultado da função: fp-(n+1), acessível através do nome da função
+    if is_function:
+        result = Symbol(name, symbol.type, 1)
+        result.kind = 'result'
+        result.is_global = False
+        result.address = -(n + 1)
+        result.function = symbol
+        result.position = symbol.position
+        parser.symbol_table[name] = result
+    
+    p[0] = symbol
+
+def p_formal_params(p):
+    r'formal_params : "(" param_groups ")"'
+    """Regra para a lista de parâmetros formais entre parênteses"""
+    p[0] = p[2]
+
+def p_formal_params_empty(p):
+    r'formal_params : '
+    """Regra para subprograma sem parâmetros"""
+    p[0] = []
+
+def p_param_groups(p):
+    r'''param_groups : param_groups ";" param_group
+                     | param_group'''
+    """Regra para grupos de parâmetros separados por ponto e vírgula"""
+    if len(p) == 2:
+        p[0] = p[1]
+    else:
+        p[0] = p[1] + p[3]
+
+def p_param_group(p):
+    r'''param_group : id_list ":" simple_type
+                    | VAR id_list ":" simple_type'''
+    """
+    Regra para um grupo de parâmetros do mesmo tipo
+    Exemplos: a, b: integer   /   var total: real
+    """
+    by_ref = len(p) == 5  # Com VAR: passagem por referência
+    names = p[2] if by_ref else p[1]
+    param_type = p[len(p) - 1]
+    p[0] = [(name, param_type, by_ref) for name in names]
+
+def p_procedure_call(p):
+    r'''procedure_call : ID
+                       | ID "(" expression_list ")"'''
+    """
+    Regra para chamada de procedimento como statement
+    Exemplos: limpar, trocar(a, b)
+    """
+    args = p[3] if len(p) == 5 else []
+    call = subprogram_call_code(p[1], args, token_position(p, 1), as_function=False)
+    p[0] = call[1] if call else []
 
 
 
@@ -464,25 +1712,32 @@ def p_statements_empty(p):
     r'statements : '
     p[0] = []  # Nenhum statement, lista vazia de código
 
-#"""Regra para lista com apenas um statement"""
-def p_statements_one(p):
-    r'statements : statement'
-    # Se p[1] já for uma lista (código VM), usa-a; senão, lista vazia
-    p[0] = p[1] if isinstance(p[1], list) else []
-
-#"""Regra para concatenar múltiplos statements separados por ponto e vírgula"""
-def p_statements_many(p):
-    r'statements : statement ";" statements'
-    # Combina código do statement atual (p[1]) com os seguintes (p[3])
-    # NOTA: Alterei de "statements ";" statement" para "statement ";" statements"
-    # Isso é recursão à DIREITA, mas está a funcionar que evita conflitos
-    left = p[1] if isinstance(p[1], list) else []
-    right = p[3] if isinstance(p[3], list) else []
-    p[0] = left + right  # Concatena listas de instruções VM
+#"""Regra para uma lista não vazia de statements, com ou sem ";" final"""
+def p_statements_list(p):
+    r'''statements : statement_list
+                  | statement_list ";"'''
+    p[0] = p[1]  # O ";" final é opcional (equivalente a um statement vazio)
+
+#"""Regra para a sequência com apenas um statement"""
+def p_statement_list_one(p):
+    r'statement_list : statement'
+    # Copia o código do statement: a lista é depois estendida no lugar
+    p[0] = list(p[1]) if isinstance(p[1], list) else []
+
+#"""Regra para acrescentar um statement à sequência (separados por ponto e vírgula)"""
+def p_statement_list_many(p):
+    r'statement_list : statement_list ";" statement'
+    # NOTA: Antes era "statement ";" statements" (recursão à DIREITA), o que
+    # obrigava a copiar a lista inteira a cada statement (tempo quadrático).
+    # Com recursão à esquerda o código do novo statement é acrescentado no fim.
+    if isinstance(p[3], list):
+        p[1].extend(p[3])
+    p[0] = p[1]
 
 #    """Regra geral para um statement (pode ser vários tipos)"""
 def p_statement(p):
     '''statement : assignment
+                 | procedure_call
                  | writeln
                  | write       
                  | if_statement
@@ -492,7 +1747,21 @@ def p_statement(p):
                  | readln
                  | block'''
     # Repassa o código gerado pelo statement específico
-    p[0] = p[1] if isinstance(p[1], list) else []
+    code = p[1] if isinstance(p[1], list) else []
+    # Mapa de código fonte: as instruções ainda sem posição (as dos statements
+    # interiores já foram anotadas) ficam com a posição deste statement
+    if parser.track_positions:
+        code = tag_positions(code, token_position(p, 1))
+    p[0] = code
+
+#    """Recuperação de erros: statement inválido"""
+def p_statement_error(p):
+    r'statement : error'
+    # Modo pânico: o PLY descarta tokens até encontrar um que possa seguir
+    # um statement (";", END, UNTIL, ELSE) e continua a análise a partir daí.
+    # O erro já foi registado por p_error; o statement não gera código.
+    recover_from_error(p)
+    p[0] = []
 
 #    """Regra para blocos BEGIN ... END"""
 def p_block(p):
@@ -504,6 +1773,12 @@ def p_block(p):
 
 
 
+def p_repeat_statement_error(p):
+    r'repeat_statement : REPEAT statements UNTIL error'
+    """Recuperação de erros na condição do UNTIL: o REPEAT fica fechado"""
+    recover_from_error(p, 4)
+    p[0] = []
+
 def p_repeat_statement(p):
     r'repeat_statement : REPEAT statements UNTIL expression'
     """
@@ -514,7 +1789,7 @@ def p_repeat_statement(p):
     expr_type = get_expression_type(p, 4)
     
     if expr_type and not is_boolean_type(expr_type):
-        add_semantic_error(f"Erro: Condição do UNTIL deve ser booleana, não {expr_type}", p.lineno(4))
+        add_semantic_error('E023', *token_position(p, 4), expr_type=expr_type)
     
     # Gerar um label único para este loop
     label = parser.label
@@ -548,15 +1823,15 @@ def p_assignment(p):
     
     # Verificar se a variável foi declarada
     if var_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Variável '{var_name}' não declarada", p.lineno(1))
-        # Adiciona à lista de variáveis para inicialização (mesmo com erro)
-        if var_name not in parser.vars:
-            parser.vars.append(var_name)
+        add_semantic_error('E024', *token_position(p, 1), var_name=var_name)
+        # Adiciona às variáveis para inicialização (mesmo com erro)
+        parser.vars[parser.symbol_table.key(var_name)] = None
     
     # Obter tipo da variável (se existir na tabela)
     var_type = None
     if var_name in parser.symbol_table:
         var_type = parser.symbol_table[var_name].type
+        index_symbol(parser.symbol_table[var_name], token_position(p, 1))
     
     # Obter tipo e código VM da expressão do lado direito
     expr_type = get_expression_type(p, 3)
@@ -564,150 +1839,86 @@ def p_assignment(p):
     
     # Verificar compatibilidade de tipos entre variável e expressão
     if var_type and expr_type:
-        if not check_assignment_compatibility(var_type, expr_type, var_name, p.lineno(1)):
+        if not check_assignment_compatibility(var_type, expr_type, var_name, token_position(p, 1)):
             p[0] = []  # Em caso de erro, não gerar código
             return
     
     # Verificar se é tentativa de atribuir a um array sem índice
     if var_name in parser.symbol_table and parser.symbol_table[var_name].is_array:
-        add_semantic_error(f"Erro: Não é possível atribuir diretamente a um array '{var_name}' (use índice)", p.lineno(1))
+        add_semantic_error('E025', *token_position(p, 1), var_name=var_name)
+        p[0] = []
+        return
+    
+    # Verificar se é tentativa de atribuir a um procedimento ou a uma função fora do seu corpo
+    if var_name in parser.symbol_table and parser.symbol_table[var_name].kind in ('procedure', 'function'):
+        add_semantic_error('E026', *token_position(p, 1), var_name=var_name)
         p[0] = []
         return
     
     # Aplicar conversões implícitas necessárias
-    if var_type == 'real' and expr_type == 'integer':
-        # Conversão integer → real: adiciona instrução ITOF
-        expr_code = expr_code + ["itof"]
-    elif var_type == 'boolean' and expr_type == 'integer':
-        expr_code = expr_code + ["pushi 0", "sup"]
+    expr_code = convert_for_assignment(var_type, expr_type, expr_code)
     
-    # Obter endereço da variável na VM (se declarada) ou usar 0 como fallback
-    idx = parser.symbol_table[var_name].address if var_name in parser.symbol_table else 0
+    # Variável não declarada: usa o endereço global 0 como fallback (o erro já foi registado)
+    if var_name not in parser.symbol_table:
+        p[0] = expr_code + ["storeg 0"]
+        return
     
-    # Gerar código: código da expressão seguido de STOREG para armazenar no endereço
-    p[0] = expr_code + [f"storeg {idx}"]
+    # Gerar código: código da expressão seguido do armazenamento na variável
+    # (STOREG para globais, STOREL para locais e para o resultado de uma função)
+    p[0] = store_variable_code(parser.symbol_table[var_name], expr_code)
 
-def p_assignment_array_num(p):
-    r'assignment : ID "[" NUM "]" ASSIGN expression'
-    # Atribuição a elemento de array com índice constante (numérico)
-    # Exemplo: vetor[5] := 100
-    
+def p_assignment_array(p):
+    r'assignment : ID subscripts ASSIGN expression'
+    """
+    Regra para atribuição a elemento de array com índices arbitrários.
+    Exemplos: vetor[5] := 100, vetor[i] := x, matriz[i, j + 1] := 0
+    """
     array_name = p[1]  # Nome do array (token ID)
-    index = p[3]       # Índice numérico (token NUM)
+    indices = p[2]     # Lista de expressões tipadas dos índices
     
-    # Verificar se o array foi declarado
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(1))
+    # Calcular endereço do elemento (verifica declaração, tipos e limites)
+    element = array_element_address(array_name, indices, token_position(p, 1))
+    if element is None:
         p[0] = []  # Não gera código
         return
-    
-    symbol = parser.symbol_table[array_name]
-    
-    # Verificar se o símbolo é realmente um array
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(1))
-        p[0] = []
-        return
-    
-    # Converter o índice para valor numérico
-    # p[3] pode ser um token NUM (com atributo value) ou já um número
-    if hasattr(index, 'value'):
-        index_val = index.value
-    else:
-        index_val = index
-    
-    # Verificar se o índice está dentro dos limites declarados do array
-    # Apenas emite aviso (não erro fatal) para permitir compilação
-    if index_val < symbol.array_start or index_val > symbol.array_end:
-        add_semantic_error(f"Aviso: Índice {index_val} fora dos limites do array {array_name}[{symbol.array_start}..{symbol.array_end}]", p.lineno(3))
+    symbol, address_code = element
     
     # Obter tipo e código da expressão a ser atribuída
-    expr_type = get_expression_type(p, 6)  # p[6] é a expressão
-    expr_code = get_expression_code(p, 6)
+    expr_type = get_expression_type(p, 4)  # p[4] é a expressão
+    expr_code = get_expression_code(p, 4)
     
     # Verificar compatibilidade entre tipo do array e tipo da expressão
     if expr_type and expr_type != symbol.type:
-        if not check_assignment_compatibility(symbol.type, expr_type, f"{array_name}[{index_val}]", p.lineno(6)):
+        if not check_assignment_compatibility(symbol.type, expr_type, f"{array_name}[...]", token_position(p, 1)):
             p[0] = []  # Erro de tipo - não gera código
             return
     
-    # Calcular offset: converter índice Pascal (ex: 1..10) para base 0 da VM
-    # Exemplo: array[1..10], índice 5 -> offset = 5-1 = 4
-    offset = index_val - symbol.array_start
-    
-    # Gerar código VM para atribuição a array com índice constante:
-    # 1. pushg: empilha endereço base do array (armazenado em symbol.address)
-    # 2. pushi: empilha offset calculado
-    # 3. padd: calcula endereço do elemento (endereço_base + offset)
-    # 4. expr_code: código que calcula o valor a ser armazenado
-    # 5. swap: corrige ordem (store espera valor no topo, endereço abaixo)
-    # 6. store 0: armazena valor no endereço calculado
-    p[0] = [
-        f"pushg {symbol.address}",  # Endereço base do array
-        f"pushi {offset}",           # Offset (índice convertido para base 0)
-        "padd",                      # Calcula endereço do elemento
-    ] + expr_code + [                # Código que calcula o valor
-        "store 0"                    # Armazena valor no endereço
-    ]
-
-def p_assignment_array_var(p):
-    r'assignment : ID "[" ID "]" ASSIGN expression'
+    # Gerar código VM para atribuição a elemento de array:
+    # 1. address_code: calcula endereço do elemento (base + deslocamento)
+    # 2. expr_code: código que calcula o valor a ser armazenado
+    # 3. store 0: armazena valor no endereço calculado
+    p[0] = address_code + convert_for_assignment(symbol.type, expr_type, expr_code) + ["store 0"]
 
+def p_subscripts(p):
+    r'''subscripts : "[" expression_list "]"
+                  | subscripts "[" expression_list "]"'''
     """
-    Regra para atribuição a elemento de array com índice variável.
-    Exemplo: vetor[i] := expressão
+    Regra para os índices de um array: a[i, j] ou a[i][j] (equivalentes)
+    Retorna a lista de expressões tipadas de todos os índices
     """
+    if len(p) == 4:
+        p[0] = p[2]
+    else:
+        p[0] = p[1] + p[3]
 
-    # p[1] = nome do array, p[3] = nome da variável índice
-    array_name = p[1]
-    index_var = p[3]
-    
-    # Verificar se o array foi declarado
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(1))
-        p[0] = []
-        return
-    
-    symbol = parser.symbol_table[array_name]
-    
-    # Verificar se é realmente um array
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(1))
-        p[0] = []
-        return
-    
-    # Verificar se a variável índice foi declarada
-    if index_var not in parser.symbol_table:
-        add_semantic_error(f"Erro: Índice '{index_var}' não declarado", p.lineno(3))
-        p[0] = []
-        return
-    
-    index_symbol = parser.symbol_table[index_var]
-    
-    # Verificar tipo do índice (deve ser integer)
-    if index_symbol.type != 'integer':
-        add_semantic_error(f"Erro: Índice do array deve ser integer, não {index_symbol.type}", p.lineno(3))
-    
-    # Obter tipo e código da expressão do lado direito (p[6])
-    expr_type = get_expression_type(p, 6)
-    expr_code = get_expression_code(p, 6)
-    
-    # Verificar compatibilidade entre tipo do array e tipo da expressão
-    if expr_type and expr_type != symbol.type:
-        if not check_assignment_compatibility(symbol.type, expr_type, f"{array_name}[{index_var}]", p.lineno(6)):
-            p[0] = []
-            return
-    
-    # Gerar código VM para atribuição a array com índice variável
-    p[0] = [
-        f"pushg {symbol.address}",      # Empilha endereço base do array (alocado no heap)
-        f"pushg {index_symbol.address}", # Empilha valor do índice (variável)
-        f"pushi {symbol.array_start}",   # Empilha início do array
-        "sub",                           # Subtrai: índice - array_start (converte para base 0)
-        "padd",                          # Soma ao endereço base: endereço do elemento
-    ] + expr_code + [                    # Adiciona código da expressão (valor a armazenar)
-        "store 0"                        # Armazena valor no endereço calculado
-    ]
+def p_expression_list(p):
+    r'''expression_list : expression_list "," expression
+                       | expression'''
+    """Regra para lista de expressões separadas por vírgula"""
+    if len(p) == 2:
+        p[0] = [p[1]]
+    else:
+        p[0] = p[1] + [p[3]]
 
 
 # WRITELN
@@ -716,8 +1927,7 @@ def p_assignment_array_var(p):
 
 def p_writeln(p):
     r'writeln : WRITELN "(" writeln_args ")"'
-    args_code = p[3] if isinstance(p[3], list) else []
-    p[0] = args_code + ["writeln"]  # Código dos argumentos + writeln
+    p[0] = write_pieces_code(p[3], newline=True)  # Argumentos + mudança de linha
 
 def p_writeln_empty(p):
     r'writeln : WRITELN'
@@ -726,22 +1936,22 @@ def p_writeln_empty(p):
 def p_writeln_args_one(p):
     r'writeln_args : writeln_arg'
     # Regra para um único argumento em WRITELN
-    # Retorna o código desse argumento diretamente
-    p[0] = p[1] if isinstance(p[1], list) else []
+    # Cada argumento é uma "peça" (tipo, valor); o código só é gerado em
+    # write_pieces_code, que junta as peças constantes e as strings
+    p[0] = [p[1]]
 
 def p_writeln_args_many(p):
     r'writeln_args : writeln_args "," writeln_arg'
     # Regra para múltiplos argumentos em WRITELN (separados por vírgula)
-    # Concatena código dos argumentos anteriores com o novo argumento
-    left = p[1] if isinstance(p[1], list) else []
-    right = p[3] if isinstance(p[3], list) else []
-    p[0] = left + right
+    # Acrescenta a peça do novo argumento às anteriores
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_writeln_arg_string(p):
     r'writeln_arg : STRING'
     # Processa argumento do tipo string literal em WRITELN
-    # Gera código para empilhar a string e escrevê-la
-    p[0] = [f'pushs "{p[1]}"', 'writes']
+    # Texto constante: pode ser juntado às peças vizinhas
+    p[0] = ('text', p[1])
 
 def p_writeln_arg_expression(p):
     r'writeln_arg : expression'
@@ -752,35 +1962,150 @@ def p_writeln_arg_expression(p):
     expr_code = get_expression_code(p, 1)
     expr_type = get_expression_type(p, 1)
     
-    # Escolhe instrução de escrita baseada no tipo
-    if expr_type == 'real':
-        # Para reais: usa WRITEF
-        p[0] = expr_code + ["writef"]
-    elif expr_type == 'boolean':
-        # Para booleanos: converte para string "true" ou "false"
-        label = parser.label
-        parser.label += 1
-        p[0] = expr_code + [
-            f"jz boolfalse{label}",  # Salta se falso
-            f'pushs "true"',         # Empilha "true"
-            f"jump boolend{label}",  # Salta para o fim
-            f"boolfalse{label}:",    # Label para falso
-            f'pushs "false"',        # Empilha "false"
-            f"boolend{label}:",      # Label do fim
-            "writes"                 # Escreve a string
-        ]
-    elif expr_type == 'string' or expr_type == 'char':
-        # Para strings e chars: usa WRITES
-        p[0] = expr_code + ["writes"]
+    if expr_type in ('string', 'char'):
+        p[0] = ('string', expr_code)   # Escrita com WRITES (pode ser concatenada)
+    elif expr_type in ('real', 'boolean'):
+        p[0] = (expr_type, expr_code)  # WRITEF / "true" ou "false"
     else:
-        # Para inteiros (default): usa WRITEI
-        p[0] = expr_code + ["writei"]
+        p[0] = ('integer', expr_code)  # Para inteiros (default): usa WRITEI
+
+def has_side_effects(code):
+    """Verifica se o código chama subprogramas ou faz entrada/saída (não pode mudar de ordem)"""
+    return any(instr.startswith(('call', 'write', 'read')) for instr in code)
+
+def constant_piece(piece):
+    """
+    Converte em texto constante uma peça cujo valor se conhece em compilação
+    (literal inteiro, booleano, string ou char). Devolve a peça inalterada caso contrário.
+    """
+    kind, code = piece
+    if kind == 'text' or len(code) != 1:
+        return piece
+    instr = code[0]
+    if kind == 'integer' and instr.startswith('pushi '):
+        return ('text', instr[6:])
+    if kind == 'boolean' and instr in ('pushi 1', 'pushi 0'):
+        return ('text', 'true' if instr == 'pushi 1' else 'false')
+    if kind == 'string' and instr.startswith('pushs "'):
+        return ('text', instr[7:-1])
+    return piece
+
+def boolean_text_code(cond_code, if_true, if_false):
+    """Código que empilha o texto if_true ou if_false conforme a condição (booleano)"""
+    label = parser.label
+    parser.label += 1
+    return cond_code + [
+        f"jz boolfalse{label}",      # Salta se falso
+        f'pushs "{if_true}"',        # Empilha o texto do verdadeiro
+        f"jump boolend{label}",      # Salta para o fim
+        f"boolfalse{label}:",        # Label para falso
+        f'pushs "{if_false}"',       # Empilha o texto do falso
+        f"boolend{label}:",          # Label do fim
+    ]
+
+def separate_writes_code(pieces, newline):
+    """Código de WRITE/WRITELN sem otimizações: uma escrita por argumento"""
+    code = []
+    for kind, value in pieces:
+        if kind == 'text':
+            code += [f'pushs "{value}"', 'writes']
+        elif kind == 'string':
+            code += value + ['writes']
+        elif kind == 'boolean':
+            code += boolean_text_code(value, 'true', 'false') + ['writes']
+        else:
+            code += value + ['writef' if kind == 'real' else 'writei']
+    if newline:
+        code.append('writeln')
+    return code
+
+def write_pieces_code(pieces, newline):
+    """
+    Gera o código de WRITE/WRITELN a partir das peças dos argumentos, reduzindo
+    o número de instruções e de escritas na VM:
+    
+    1. Argumentos constantes (literais inteiros, booleanos, strings) viram texto
+       e os textos vizinhos juntam-se num só PUSHS.
+    2. Um booleano absorve os textos à sua volta: cada ramo empilha a string
+       completa ("x = true" / "x = false"), sem WRITES separados.
+    3. Peças que produzem strings seguidas são concatenadas (CONCAT) e escritas
+       com um único WRITES.
+    4. No WRITELN, se a última peça é texto, a mudança de linha vai no próprio
+       texto ("\\n") em vez da instrução WRITELN.
+    
+    Nenhuma peça com efeitos laterais (chamadas, escrita) muda de ordem.
+    Com parser.coalesce_writes desligado, cada argumento é escrito separadamente.
+    """
+    if not parser.coalesce_writes:
+        return separate_writes_code(pieces, newline)
+    
+    # 1. Constantes e textos vizinhos
+    merged = []
+    for piece in pieces:
+        piece = constant_piece(piece)
+        if piece[0] == 'text' and merged and merged[-1][0] == 'text':
+            merged[-1] = ('text', merged[-1][1] + piece[1])
+        else:
+            merged.append(piece)
+    
+    # 2. Booleanos sem efeitos laterais absorvem os textos anteriores e seguintes:
+    #    ('choice', código da condição, texto se verdadeiro, texto se falso)
+    folded = []
+    for piece in merged:
+        if piece[0] == 'boolean' and not has_side_effects(piece[1]):
+            prefix = folded.pop()[1] if folded and folded[-1][0] == 'text' else ''
+            piece = ('choice', piece[1], prefix + 'true', prefix + 'false')
+        elif piece[0] == 'boolean':
+            piece = ('choice', piece[1], 'true', 'false')
+        elif piece[0] == 'text' and folded and folded[-1][0] == 'choice' and not has_side_effects(folded[-1][1]):
+            _, cond, if_true, if_false = folded[-1]
+            folded[-1] = ('choice', cond, if_true + piece[1], if_false + piece[1])
+            continue
+        folded.append(piece)
+    
+    # 4. Mudança de linha no último texto
+    if newline and folded and folded[-1][0] in ('text', 'choice') and not str(folded[-1][-1]).endswith('\\'):
+        if folded[-1][0] == 'text':
+            folded[-1] = ('text', folded[-1][1] + '\\n')
+        else:
+            _, cond, if_true, if_false = folded[-1]
+            folded[-1] = ('choice', cond, if_true + '\\n', if_false + '\\n')
+        newline = False
+    
+    # 3. Geração do código: strings seguidas concatenadas num só WRITES
+    code = []
+    pending = 0  # Strings na pilha à espera de serem escritas
+    for piece in folded:
+        kind = piece[0]
+        if kind in ('text', 'string', 'choice'):
+            if kind == 'text':
+                piece_code = [f'pushs "{piece[1]}"']
+            elif kind == 'string':
+                piece_code = piece[1]
+            else:
+                piece_code = boolean_text_code(piece[1], piece[2], piece[3])
+            if pending and has_side_effects(piece_code):
+                code.append("writes")  # Escreve o que já está na pilha antes da chamada
+                pending = 0
+            code += piece_code
+            if pending:
+                code.append("concat")
+            pending = 1
+        else:
+            if pending:
+                code.append("writes")
+                pending = 0
+            code += piece[1] + ["writef" if kind == 'real' else "writei"]
+    if pending:
+        code.append("writes")
+    if newline:
+        code.append("writeln")
+    return code
 
 
 def p_write(p):
     r'write : WRITE "(" writeln_args ")"'
-    args_code = p[3] if isinstance(p[3], list) else []
-    p[0] = args_code  # Apenas escreve, não pula linha
+    p[0] = write_pieces_code(p[3], newline=False)  # Apenas escreve, não pula linha
 
 # Caso write n tenha argumos (é possivel em pascall)
 def p_write_empty(p):
@@ -796,138 +2121,189 @@ def p_write_empty(p):
 
 
 def p_readln(p):
-    r'readln : READLN "(" ID ")"'
+    r'readln : READLN "(" read_targets ")"'
     """
-    Regra para leitura de variável simples: readln(var)
-    Exemplo: readln(x)
+    Regra de leitura: readln(x), readln(vetor[i]), readln(a, b, c) ou readln(vetor)
+    
+    Com um único valor (variável ou elemento) lê uma linha inteira, como antes.
+    Com vários valores, ou um array inteiro, lê os números separados por espaços
+    (continuando nas linhas seguintes se for preciso) e descarta o resto da linha.
     """
-    # Obtém o nome da variável (p[3] contém o ID entre parênteses)
-    var_name = p[3]
+    targets = p[3]
+    if None in targets:
+        p[0] = []  # Erro semântico já reportado num dos destinos
+        return
     
-    # Verifica se a variável foi declarada
-    if var_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Variável '{var_name}' não declarada", p.lineno(3))
-        p[0] = []  # Não gera código se houver erro
+    # Um único valor: linha inteira convertida com ATOI/ATOF
+    if len(targets) == 1 and targets[0][0] != 'array':
+        kind, symbol, address_code = targets[0]
+        read_code = read_prompt_code() + ['read']
+        if symbol.type == 'real':
+            read_code.append('atof')
+        elif symbol.type in ('integer', 'boolean'):
+            read_code.append('atoi')  # Booleanos lidos como inteiro (0 ou 1)
+        # char e string: string lida sem conversão
+        if kind == 'var':
+            p[0] = store_variable_code(symbol, read_code)
+        else:
+            p[0] = address_code + read_code + ["store 0"]  # Valor no topo, endereço abaixo
         return
     
-    # Obtém o símbolo da tabela de símbolos
-    symbol = parser.symbol_table[var_name]
+    # Vários valores na mesma linha: só números (não há instrução para extrair substrings)
+    for kind, symbol, _ in targets:
+        if symbol.type not in ('integer', 'real', 'boolean'):
+            add_semantic_error('E036', *token_position(p, 1), var_name=symbol.name, var_type=symbol.type)
+            p[0] = []
+            return
     
-    # Adiciona a variável à lista de variáveis (para inicialização, se não estiver)
-    if var_name not in parser.vars:
-        parser.vars.append(var_name)
-    
-    # Endereço da variável na VM
-    idx = symbol.address
-    
-    # Gera código VM conforme o tipo da variável:
-    # 1. Mostra prompt "? "
-    # 2. Lê string do teclado (READ)
-    # 3. Converte para o tipo adequado (ATOI para inteiros, ATOF para reais)
-    # 4. Armazena no endereço da variável (STOREG)
-    if symbol.type == 'real':
-        p[0] = [f'pushs "? "', 'writes', 'read', 'atof', f'storeg {idx}']
-    elif symbol.type == 'integer':
-        p[0] = [f'pushs "? "', 'writes', 'read', 'atoi', f'storeg {idx}']
-    elif symbol.type == 'boolean':
-        # Para booleanos, lê inteiro (0 ou 1)
-        p[0] = [f'pushs "? "', 'writes', 'read', 'atoi', f'storeg {idx}']
-    else:
-        # Para char e string: lê string sem conversão
-        p[0] = [f'pushs "? "', 'writes', 'read', f'storeg {idx}']
+    line, length, position, index = read_slots()
+    code = ["pushi 0", f"storeg {length}"]  # Linha vazia: o primeiro número lê uma linha nova
+    for kind, symbol, address_code in targets:
+        if kind == 'var':
+            code += store_variable_code(symbol, read_number_code(symbol.type))
+        elif kind == 'element':
+            code += address_code + read_number_code(symbol.type) + ["store 0"]
+        else:
+            # Array inteiro: todos os elementos pela ordem em memória (row-major)
+            label = parser.label
+            parser.label += 1
+            code += ["pushi 0", f"storeg {index}",
+                     f"readarray{label}:",
+                     f"pushg {index}", f"pushi {symbol.size}", "inf", f"jz readarrayend{label}"]
+            code += load_variable_code(symbol) + [f"pushg {index}", "padd"]
+            code += read_number_code(symbol.type) + ["store 0"]
+            code += [f"pushg {index}", "pushi 1", "add", f"storeg {index}",
+                     f"jump readarray{label}",
+                     f"readarrayend{label}:"]
+    p[0] = code
+
+def p_read_targets(p):
+    r'read_targets : read_targets "," read_target'
+    """Regra para lista de destinos de leitura (múltiplos)"""
+    p[1].append(p[3])
+    p[0] = p[1]
+
+def p_read_targets_one(p):
+    r'read_targets : read_target'
+    """Regra para lista de destinos de leitura (um único)"""
+    p[0] = [p[1]]
 
-def p_readln_array_var(p):
-    r'readln : READLN "(" ID "[" ID "]" ")"'
+def p_read_target(p):
+    r'read_target : ID'
     """
-    Regra para leitura de elemento de array: readln(array[index])
-    Exemplo: readln(vetor[i])
+    Destino de leitura simples: variável ou array inteiro
+    
+    Returns:
+        tuple: ('var' ou 'array', símbolo, None), ou None se houver erro
     """
-    # Obtém o nome do array (p[3]) e da variável índice (p[5])
-    array_name = p[3]
-    index_var = p[5]
+    var_name = p[1]
     
-    # Verifica se o array foi declarado
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(3))
-        p[0] = []
+    # Verifica se a variável foi declarada
+    if var_name not in parser.symbol_table:
+        add_semantic_error('E024', *token_position(p, 1), var_name=var_name)
+        p[0] = None
         return
     
-    symbol = parser.symbol_table[array_name]
-    
-    # Verifica se o símbolo é realmente um array
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(3))
-        p[0] = []
+    symbol = parser.symbol_table[var_name]
+    index_symbol(symbol, token_position(p, 1))
+    if symbol.kind in ('procedure', 'function'):
+        add_semantic_error('E026', *token_position(p, 1), var_name=var_name)
+        p[0] = None
         return
     
-    # Verifica se a variável índice foi declarada
-    if index_var not in parser.symbol_table:
-        add_semantic_error(f"Erro: Índice '{index_var}' não declarado", p.lineno(5))
-        p[0] = []
+    if symbol.is_array:
+        p[0] = ('array', symbol, None)
         return
     
-    index_symbol = parser.symbol_table[index_var]
-    
-    # Gera código VM para ler elemento de array com índice variável:
-    # 1. Prompt e leitura de string
-    # 2. Conversão para inteiro (ATOI) - assume-se que o array é de inteiros
-    # 3. Calcula endereço do elemento: pushg (endereço base) + índice - início
-    # 4. Troca (SWAP) porque STORE espera valor no topo e endereço abaixo
-    # 5. Armazena (STORE 0)
-    p[0] = [
-        f"pushg {symbol.address}",      # Endereço base
-        f"pushg {index_symbol.address}", # Valor do índice
-        f"pushi {symbol.array_start}",   # Início do array
-        "sub",                           # índice - início (base 0)
-        "padd",                          # Endereço calculado (TOP)
-        f'pushs "? "', 'writes', 'read', 'atoi',  # Valor lido (abaixo do endereço)
-        "store 0"                        # Armazena (valor, endereço) - valor no topo
-    ]
-
+    # Adiciona a variável à lista de variáveis (para inicialização, se não estiver)
+    if symbol.is_global:
+        parser.vars[parser.symbol_table.key(var_name)] = None
+    p[0] = ('var', symbol, None)
 
-def p_readln_array_num(p):
-    r'readln : READLN "(" ID "[" NUM "]" ")"'
+def p_read_target_array(p):
+    r'read_target : ID subscripts'
     """
-    Regra para leitura com índice constante: readln(array[5])
-    Exemplo: readln(numeros[2])
-    """
-    array_name = p[3]
-    index_num = p[5]
+    Destino de leitura num elemento de array: vetor[i], matriz[i, j]
     
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(3))
-        p[0] = []
-        return
-    
-    symbol = parser.symbol_table[array_name]
-    
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(3))
-        p[0] = []
-        return
+    Returns:
+        tuple: ('element', símbolo, código do endereço), ou None se houver erro
+    """
+    # Calcular endereço do elemento (verifica declaração, tipos e limites)
+    element = array_element_address(p[1], p[2], token_position(p, 1))
+    p[0] = ('element',) + element if element is not None else None
+
+
+# LEITURA DE VÁRIOS VALORES POR LINHA
+#
+# A VM não tem instrução para extrair parte de uma string, por isso os números de
+# uma linha são lidos carácter a carácter (CHARAT) por rotinas emitidas uma única
+# vez depois dos subprogramas (readint e readreal), que guardam a linha atual, o
+# seu comprimento e a posição de leitura em globais auxiliares.
+
+def read_prompt_code():
+    """Prompt mostrado antes de cada READ (vazio com read_prompts desligado)"""
+    return ['pushs "? "', 'writes'] if parser.read_prompts else []
+
+def read_slots():
+    """Devolve (criando na primeira vez) as globais (linha, comprimento, posição, índice)"""
+    if parser.read_slots is None:
+        parser.read_slots = (new_inline_slot('string'), new_inline_slot('integer'),
+                             new_inline_slot('integer'), new_inline_slot('integer'))
+    return parser.read_slots
+
+def read_number_code(type_):
+    """Código que lê o próximo número da linha (chamada à rotina) e o deixa no topo"""
+    name = 'readreal' if type_ == 'real' else 'readint'
+    parser.read_routines.add(name)
+    return ["pushi 0", f"pusha {name}", "call"]
+
+def read_routine_code(name):
+    """
+    Rotina de leitura do próximo número (sem argumentos; o resultado fica em fp-1).
     
-    # Converter índice para número
-    if hasattr(index_num, 'value'):
-        index_val = index_num.value
+    Salta espaços (lendo linhas novas quando a atual acaba), aceita um '-' e
+    acumula os dígitos; readreal acumula também a parte decimal e divide pela
+    escala no fim. Cada linha lida termina com um espaço (sentinela), por isso o
+    ciclo dos dígitos não precisa de comparar a posição com o comprimento.
+    """
+    line, length, position, _ = read_slots()
+    char = [f"pushg {line}", f"pushg {position}", "charat"]
+    advance = [f"pushg {position}", "pushi 1", "add", f"storeg {position}"]
+    
+    def digits(loop, end, scale):
+        # d = carácter - '0' fica na pilha; enquanto 0 <= d <= 9: valor := valor * 10 + d
+        # (ao sair, o último d fica no topo da pilha)
+        return [f"{loop}:"] + char + ["pushi 48", "sub",
+                "dup 1", "pushi 0", "supeq", f"jz {end}",
+                "dup 1", "pushi 9", "infeq", f"jz {end}",
+                "pushl -1", "pushi 10", "mul", "add", "storel -1"] + \
+               (["pushl 1", "pushi 10", "mul", "storel 1"] if scale else []) + \
+               advance + [f"jump {loop}"]
+    
+    code = [f"{name}:",
+            "pushi 1",   # fp+0: sinal
+            "pushi 1",   # fp+1: escala da parte decimal (10^casas)
+            # Espaços e fim de linha
+            f"{name}skip:",
+            f"pushg {position}", f"pushg {length}", "inf", f"jz {name}line"]
+    code += char + ["dup 1", "pushi 32", "sup", f"jz {name}space",
+                    "pushi 45", "equal", f"jz {name}int",   # '-'
+                    "pushi -1", "storel 0"] + advance + [f"jump {name}int",
+             f"{name}space:", "pop 1"] + advance + [f"jump {name}skip",
+             f"{name}line:"] + read_prompt_code() + [
+             "read", 'pushs " "', "concat", "dup 1", f"storeg {line}",
+             "strlen", f"storeg {length}", "pushi 0", f"storeg {position}", f"jump {name}skip"]
+    if name == 'readint':
+        code += digits(f"{name}int", f"{name}end", scale=False)
+        code += [f"{name}end:", "pushl -1", "pushl 0", "mul", "storel -1"]
     else:
-        index_val = index_num
-    
-    # Verificar limites
-    if index_val < symbol.array_start or index_val > symbol.array_end:
-        add_semantic_error(f"Aviso: Índice {index_val} fora dos limites", p.lineno(5))
-    
-    # Calcular offset
-    offset = index_val - symbol.array_start
-    
-    # Gerar código para índice CONSTANTE
-    p[0] = [
-        f"pushg {symbol.address}",      # Endereço base
-        f"pushi {offset}",               # Offset constante
-        "padd",                          # Endereço calculado (TOP)
-        f'pushs "? "', 'writes', 'read', 'atoi',  # Valor lido (abaixo)
-        "store 0"                        # Armazena
-    ]
-
+        code += digits(f"{name}int", f"{name}point", scale=False)
+        code += [f"{name}point:", "pushi -2", "equal", f"jz {name}end"] + advance  # '.' - '0' = -2
+        code += digits(f"{name}frac", f"{name}fracend", scale=True)
+        code += [f"{name}fracend:", "pop 1",
+                 f"{name}end:", "pushl -1", "pushl 0", "mul", "itof", "pushl 1", "itof", "fdiv", "storel -1"]
+        return code + ["pop 2", "return"]
+    return code + ["pop 3", "return"]
 
 
 
@@ -946,7 +2322,7 @@ def p_if_statement(p):
     # Verificar se a expressão da condição é booleana
     expr_type = get_expression_type(p, 2)
     if expr_type and not is_boolean_type(expr_type):
-        add_semantic_error(f"Erro: Condição do IF deve ser booleana, não {expr_type}", p.lineno(2))
+        add_semantic_error('E027', *token_position(p, 2), expr_type=expr_type)
     
     # Criar labels únicos para esta estrutura
     label = parser.label
@@ -980,7 +2356,7 @@ def p_if_statement_no_else(p):
     # Verificar se a expressão da condição é booleana
     expr_type = get_expression_type(p, 2)
     if expr_type and not is_boolean_type(expr_type):
-        add_semantic_error(f"Erro: Condição do IF deve ser booleana, não {expr_type}", p.lineno(2))
+        add_semantic_error('E027', *token_position(p, 2), expr_type=expr_type)
     
     # Criar label único para esta estrutura
     label = parser.label
@@ -1011,7 +2387,7 @@ def p_while_statement(p):
     # Verificar se a expressão da condição é do tipo booleano
     expr_type = get_expression_type(p, 2)
     if expr_type and not is_boolean_type(expr_type):
-        add_semantic_error(f"Erro: Condição do WHILE deve ser booleana, não {expr_type}", p.lineno(2))
+        add_semantic_error('E028', *token_position(p, 2), expr_type=expr_type)
     
     # Gerar labels únicos para este while
     label = parser.label
@@ -1044,27 +2420,33 @@ def p_for_statement(p):
     
     # Verifica se a variável de controle foi declarada
     if var_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Variável '{var_name}' não declarada", p.lineno(2))
+        add_semantic_error('E024', *token_position(p, 2), var_name=var_name)
         p[0] = []  # Retorna lista vazia para indicar erro
         return
     
     # Verifica se a variável de controle é do tipo integer (exigência do Pascal)
     var_type = parser.symbol_table[var_name].type if var_name in parser.symbol_table else None
     if var_type and var_type != 'integer':
-        add_semantic_error(f"Erro: Variável de controle do FOR deve ser integer, não {var_type}", p.lineno(2))
+        add_semantic_error('E029', *token_position(p, 2), var_type=var_type)
     
     # Verifica o tipo da expressão inicial (deve ser integer)
     start_type = get_expression_type(p, 4)
     if start_type and start_type != 'integer':
-        add_semantic_error(f"Erro: Valor inicial do FOR deve ser integer, não {start_type}", p.lineno(4))
+        add_semantic_error('E030', *token_position(p, 4), start_type=start_type)
     
     # Verifica o tipo da expressão final (deve ser integer)
     end_type = get_expression_type(p, 6)
     if end_type and end_type != 'integer':
-        add_semantic_error(f"Erro: Valor final do FOR deve ser integer, não {end_type}", p.lineno(6))
+        add_semantic_error('E031', *token_position(p, 6), end_type=end_type)
     
-    # Obtém o endereço da variável de controle na VM
-    idx = parser.symbol_table[var_name].address
+    # Obtém o símbolo da variável de controle (global, local ou parâmetro)
+    symbol = parser.symbol_table[var_name]
+    index_symbol(symbol, token_position(p, 2))
+    if symbol.kind in ('procedure', 'function'):
+        add_semantic_error('E026', *token_position(p, 2), var_name=var_name)
+        p[0] = []
+        return
+    load_code = load_variable_code(symbol)
     # Determina a direção do loop: 'to' (crescente) ou 'downto' (decrescente)
     direction = p[5]
     
@@ -1081,27 +2463,25 @@ def p_for_statement(p):
     # Geração de código para FOR TO (incremento)
     if direction == 'to':
         p[0] = (
-            init_expr + [f"storeg {idx}",        # Armazena valor inicial na variável
-            f"forstart{label}:",                 # Label início do loop
-            f"pushg {idx}"] + end_expr + ["infeq",  # Carrega variável e expressão final, compara <=
+            store_variable_code(symbol, init_expr)  # Armazena valor inicial na variável
+            + [f"forstart{label}:"]              # Label início do loop
+            + load_code + end_expr + ["infeq",   # Carrega variável e expressão final, compara <=
             f"jz forend{label}"]                # Se falso, salta para fora do loop
             + body_code                          # Código do corpo do loop
-            + [f"pushg {idx}", "pushi 1", "add", # Incrementa a variável em 1
-            f"storeg {idx}",                    # Armazena novo valor
-            f"jump forstart{label}",             # Volta para início do loop
+            + store_variable_code(symbol, load_code + ["pushi 1", "add"])  # Incrementa a variável em 1
+            + [f"jump forstart{label}",          # Volta para início do loop
             f"forend{label}:"]                   # Label final do loop
         )
     # Geração de código para FOR DOWNTO (decremento)
     else:  # downto
         p[0] = (
-            init_expr + [f"storeg {idx}",        # Armazena valor inicial na variável
-            f"forstart{label}:",                 # Label início do loop
-            f"pushg {idx}"] + end_expr + ["supeq",  # Carrega variável e expressão final, compara >=
+            store_variable_code(symbol, init_expr)  # Armazena valor inicial na variável
+            + [f"forstart{label}:"]              # Label início do loop
+            + load_code + end_expr + ["supeq",   # Carrega variável e expressão final, compara >=
             f"jz forend{label}"]                # Se falso, salta para fora do loop
             + body_code                          # Código do corpo do loop
-            + [f"pushg {idx}", "pushi 1", "sub", # Decrementa a variável em 1
-            f"storeg {idx}",                    # Armazena novo valor
-            f"jump forstart{label}",             # Volta para início do loop
+            + store_variable_code(symbol, load_code + ["pushi 1", "sub"])  # Decrementa a variável em 1
+            + [f"jump forstart{label}",          # Volta para início do loop
             f"forend{label}:"]                   # Label final do loop
         )
 
@@ -1132,7 +2512,7 @@ def p_logical_or_expression(p):
         right_type = get_expression_type(p, 3)
         
         # Verificar se ambos são booleanos
-        if not check_operation_compatibility('or', left_type, right_type, p.lineno(2)):
+        if not check_operation_compatibility('or', left_type, right_type, token_position(p, 2)):
             # Se erro, criar expressão boolean vazia
             p[0] = create_typed_expression('boolean', [])
             return
@@ -1159,7 +2539,7 @@ def p_logical_and_expression(p):
         right_type = get_expression_type(p, 3)
         
         # Verificar se ambos são booleanos
-        if not check_operation_compatibility('and', left_type, right_type, p.lineno(2)):
+        if not check_operation_compatibility('and', left_type, right_type, token_position(p, 2)):
             # Se erro, criar expressão boolean vazia
             p[0] = create_typed_expression('boolean', [])
             return
@@ -1186,7 +2566,7 @@ def p_relational_expression(p):
         right_type = get_expression_type(p, 3)
         
         # Verificar compatibilidade dos tipos para o operador
-        if not check_operation_compatibility(p[2], left_type, right_type, p.lineno(2)):
+        if not check_operation_compatibility(p[2], left_type, right_type, token_position(p, 2)):
             # Se erro, criar expressão boolean vazia
             p[0] = create_typed_expression('boolean', [])
             return
@@ -1197,10 +2577,10 @@ def p_relational_expression(p):
         
         # Converter integer para real se necessário (promoção de tipo)
         if left_type == 'integer' and right_type == 'real':
-            left_code = left_code + ["itof"]  # Converte left para real
+            left_code = to_real_code(left_type, left_code)  # Converte left para real
             left_type = 'real'
         elif left_type == 'real' and right_type == 'integer':
-            right_code = right_code + ["itof"]  # Converte right para real
+            right_code = to_real_code(right_type, right_code)  # Converte right para real
             right_type = 'real'
         
         op = p[2]  # Operador relacional (<, >, <=, >=, =, <>)
@@ -1244,14 +2624,21 @@ def p_simple_expression(p):
         # Verificar se operador unário '-' está sendo aplicado a tipo não numérico
         if p[1] == '-':
             if term_type and not is_numeric_type(term_type):
-                add_semantic_error(f"Erro: Operador unário '-' requer operando numérico, não {term_type}", p.lineno(1))
+                add_semantic_error('E032', *token_position(p, 1), term_type=term_type)
         
         # Obter código do termo
         term_code = get_expression_code(p, 2)
         
         # Se for operador unário negativo: gerar código para 0 - termo
         if p[1] == '-':
-            if term_type == 'real':
+            # Literal inteiro negado (ex: -2): constante conhecida em compilação
+            const_val = get_constant_int(term_code)
+            if const_val is not None:
+                p[0] = create_typed_expression(term_type, [f"pushi {-const_val}"])
+            elif get_constant_real(term_code) is not None and parser.specialize_types:
+                # Literal real negado (ex: -2.5), calculado como em execução: 0.0 - x (0.0 e não -0.0)
+                p[0] = create_typed_expression(term_type, [f"pushf {real_literal(0.0 - get_constant_real(term_code))}"])
+            elif term_type == 'real':
                 # Para real: 0.0 - termo_real
                 p[0] = create_typed_expression(term_type, [f"pushf 0.0"] + term_code + ["fsub"])
             else:
@@ -1276,7 +2663,7 @@ def p_simple_expression(p):
             return
         
         # Verificar compatibilidade da operação (se não for concatenação)
-        if not check_operation_compatibility(p[2], left_type, right_type, p.lineno(2)):
+        if not check_operation_compatibility(p[2], left_type, right_type, token_position(p, 2)):
             # Se houver erro, cria expressão vazia do tipo integer (default)
             p[0] = create_typed_expression('integer', [])
             return
@@ -1292,16 +2679,20 @@ def p_simple_expression(p):
         
         # Converter inteiros para reais se necessário (para operações com reais)
         if result_type == 'real':
-            if left_type == 'integer':
-                left_code = left_code + ["itof"]  # Converte inteiro para real
-            if right_type == 'integer':
-                right_code = right_code + ["itof"]  # Converte inteiro para real
+            left_code = to_real_code(left_type, left_code)
+            right_code = to_real_code(right_type, right_code)
         
         # Obter a operação VM correta (ADD/FADD, SUB/FSUB, etc.)
         vm_op = get_vm_operation(p[2], left_type, right_type)
         
-        # Criar expressão resultante com tipo e código VM
-        p[0] = create_typed_expression(result_type, left_code + right_code + [vm_op])
+        # Soma inteira com constante à esquerda (ex: 1 + i): a soma é comutativa,
+        # por isso a constante passa para a direita, onde pode ser dobrada
+        # no cálculo de endereços de arrays (ver split_constant_offset)
+        if vm_op == 'add' and get_constant_int(left_code) is not None and get_constant_int(right_code) is None:
+            left_code, right_code = right_code, left_code
+        
+        # Criar expressão resultante com tipo e código VM (literais calculados em compilação)
+        p[0] = create_typed_expression(result_type, binary_operation_code(vm_op, left_code, right_code))
 
 def p_term(p):
     '''term : factor
@@ -1319,7 +2710,7 @@ def p_term(p):
         right_type = get_expression_type(p, 3)
         
         # Verificar compatibilidade dos tipos para a operação
-        if not check_operation_compatibility(p[2], left_type, right_type, p.lineno(2)):
+        if not check_operation_compatibility(p[2], left_type, right_type, token_position(p, 2)):
             # Se erro, retorna expressão com tipo integer padrão e código vazio
             p[0] = create_typed_expression('integer', [])
             return
@@ -1339,10 +2730,8 @@ def p_term(p):
         
         # Converter operandos integer para real se necessário
         if result_type == 'real':
-            if left_type == 'integer':
-                left_code = left_code + ["itof"]  # Converter left para float
-            if right_type == 'integer':
-                right_code = right_code + ["itof"]  # Converter right para float
+            left_code = to_real_code(left_type, left_code)
+            right_code = to_real_code(right_type, right_code)
         
         # Escolher instrução VM correta baseada no operador e tipo
         if p[2] == '*':
@@ -1354,8 +2743,8 @@ def p_term(p):
         elif p[2] == 'mod':
             vm_op = 'mod'  # mod é sempre módulo inteiro
         
-        # Retornar expressão tipada com código concatenado
-        p[0] = create_typed_expression(result_type, left_code + right_code + [vm_op])
+        # Retornar expressão tipada (literais calculados em compilação)
+        p[0] = create_typed_expression(result_type, binary_operation_code(vm_op, left_code, right_code))
 
 
 
@@ -1380,27 +2769,34 @@ def p_factor_id(p):
     var_name = p[1]
     if var_name not in parser.symbol_table:
         # Erro: variável não declarada, usa valor padrão 0
-        add_semantic_error(f"Erro: Variável '{var_name}' não declarada", p.lineno(1))
+        add_semantic_error('E024', *token_position(p, 1), var_name=var_name)
         p[0] = create_typed_expression('integer', [f"pushi 0"])
         return
     
     symbol = parser.symbol_table[var_name]
     
     if symbol.is_array:
+        index_symbol(symbol, token_position(p, 1))
         # Erro: array usado como variável simples
-        add_semantic_error(f"Erro: '{var_name}' é um array, não pode ser usado como valor simples", p.lineno(1))
+        add_semantic_error('E033', *token_position(p, 1), var_name=var_name)
         p[0] = create_typed_expression('integer', [f"pushi 0"])
         return
     
-    # Variável válida: gera pushg endereço
-    idx = symbol.address
-    p[0] = create_typed_expression(symbol.type, [f"pushg {idx}"])
+    # Função (ou o nome da função dentro do seu corpo): chamada sem argumentos
+    if symbol.kind in ('function', 'result', 'procedure'):
+        call = subprogram_call_code(var_name, [], token_position(p, 1), as_function=True)
+        p[0] = create_typed_expression(call[0].type, call[1]) if call else create_typed_expression('integer', [f"pushi 0"])
+        return
+    
+    # Variável válida: gera pushg/pushl conforme o escopo
+    index_symbol(symbol, token_position(p, 1))
+    p[0] = create_typed_expression(symbol.type, load_variable_code(symbol))
 
 def p_factor_num(p):
     r'factor : NUM'
     # Número como factor: determina se é integer ou real e gera push correspondente
     if isinstance(p[1], float):
-        p[0] = create_typed_expression('real', [f"pushf {p[1]}"])
+        p[0] = create_typed_expression('real', [f"pushf {real_literal(p[1])}"])
     else:
         p[0] = create_typed_expression('integer', [f"pushi {p[1]}"])
 
@@ -1416,7 +2812,7 @@ def p_factor_not(p):
     
     if factor_type and not is_boolean_type(factor_type):
         # Verifica se o operando é booleano
-        add_semantic_error(f"Erro: Operador NOT requer operando booleano, não {factor_type}", p.lineno(1))
+        add_semantic_error('E034', *token_position(p, 1), factor_type=factor_type)
     
     factor_code = get_expression_code(p, 2)
     p[0] = create_typed_expression('boolean', factor_code + ["not"])
@@ -1445,7 +2841,7 @@ def p_factor_length(p):
     
     # Validar tipo: length só funciona com string ou char
     if arg_type and not is_string_or_char_type(arg_type):
-        add_semantic_error(f"Erro: Função 'length' requer argumento do tipo string ou char, não {arg_type}", p.lineno(1))
+        add_semantic_error('E035', *token_position(p, 1), arg_type=arg_type)
         # Retorna expressão com tipo integer e código vazio (erro)
         p[0] = create_typed_expression('integer', [])
         return
@@ -1457,111 +2853,35 @@ def p_factor_length(p):
     p[0] = create_typed_expression('integer', arg_code + ["strlen"])
 
 
-# Função para acesso a array com índice constante (número)
-# Exemplo: vetor[5] (onde 5 é constante)
-def p_factor_array_num(p):
-    r'factor : ID "[" NUM "]"'
+# Função para acesso a elemento de array com índices arbitrários
+# Exemplos: vetor[5], vetor[i], matriz[i, j], matriz[i][j]
+def p_factor_array(p):
+    r'factor : ID subscripts'
     array_name = p[1]    # Nome do array (ID)
-    index = p[3]         # Índice constante (NUM)
     
-    # Verificar se array foi declarado
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(1))
+    # Calcular endereço do elemento (verifica declaração, tipos e limites)
+    element = array_element_address(array_name, p[2], token_position(p, 1))
+    if element is None:
         # Retorna valor default (0) em caso de erro
         p[0] = create_typed_expression('integer', [f"pushi 0"])
         return
-    
-    # Obter símbolo do array da tabela
-    symbol = parser.symbol_table[array_name]
-    
-    # Verificar se realmente é um array
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(1))
-        p[0] = create_typed_expression('integer', [f"pushi 0"])
-        return
-    
-    # Converter índice para número inteiro
-    # p[3] pode ser token NUM (com atributo value) ou já ser int
-    if hasattr(index, 'value'):
-        index_val = index.value
-    else:
-        index_val = index
-    
-    # Verificar se índice está dentro dos limites declarados (apenas warning)
-    if index_val < symbol.array_start or index_val > symbol.array_end:
-        add_semantic_error(f"Aviso: Índice {index_val} fora dos limites do array {array_name}[{symbol.array_start}..{symbol.array_end}]", p.lineno(3))
-    
-    # Calcular offset: converter índice Pascal (base 1) para base 0 da VM
-    offset = index_val - symbol.array_start
-    
-    # Gerar código VM para acessar array com índice constante:
-    # 1. pushg address: empilha endereço base do array
-    # 2. pushi offset: empilha offset calculado
-    # 3. padd: calcula endereço do elemento (base + offset)
-    # 4. load 0: carrega valor do endereço calculado
-    p[0] = create_typed_expression(symbol.type, [
-        f"pushg {symbol.address}",
-        f"pushi {offset}",
-        "padd",
-        "load 0"
-    ])
-
-def p_factor_array_var(p):
-    # Regra para acesso a elemento de array com índice variável: arr[i]
-    # Reconhece expressões como: vetor[indice], lista[pos]
-    r'factor : ID "[" ID "]"'
-    
-    # Extrair nome do array (primeiro ID) e nome da variável índice (segundo ID)
-    array_name = p[1]
-    index_var = p[3]
-    
-    # Verificar se o array foi declarado
-    if array_name not in parser.symbol_table:
-        add_semantic_error(f"Erro: Array '{array_name}' não declarado", p.lineno(1))
-        # Retorna expressão tipada com valor padrão 0 (integer) em caso de erro
-        p[0] = create_typed_expression('integer', [f"pushi 0"])
-        return
-    
-    # Obter símbolo do array da tabela
-    symbol = parser.symbol_table[array_name]
-    
-    # Verificar se realmente é um array
-    if not symbol.is_array:
-        add_semantic_error(f"Erro: '{array_name}' não é um array", p.lineno(1))
-        p[0] = create_typed_expression('integer', [f"pushi 0"])
-        return
-    
-    # Verificar se a variável índice foi declarada
-    if index_var not in parser.symbol_table:
-        add_semantic_error(f"Erro: Índice '{index_var}' não declarado", p.lineno(3))
+    symbol, address_code = element
+    
+    # Gerar código VM para acesso ao elemento:
+    # 1. address_code: endereço do elemento (base + deslocamento)
+    # 2. load 0: carrega valor do endereço calculado
+    p[0] = create_typed_expression(symbol.type, address_code + ["load 0"])
+
+# Chamada de função com argumentos: f(a, b)
+def p_factor_call(p):
+    r'factor : ID "(" expression_list ")"'
+    call = subprogram_call_code(p[1], p[3], token_position(p, 1), as_function=True)
+    if call is None:
+        # Retorna valor default (0) em caso de erro
         p[0] = create_typed_expression('integer', [f"pushi 0"])
         return
-    
-    # Obter símbolo da variável índice
-    index_symbol = parser.symbol_table[index_var]
-    
-    # Verificar se o índice é do tipo integer (requisito do Pascal)
-    if index_symbol.type != 'integer':
-        add_semantic_error(f"Erro: Índice do array deve ser integer, não {index_symbol.type}", p.lineno(3))
-        # Continua mesmo com erro, mas gera código com valor 0
-        # (poderia retornar aqui se quisesse parar completamente)
-    
-    # Gerar código VM para acesso a array com índice variável:
-    # 1. pushg {symbol.address}    - empilha endereço base do array
-    # 2. pushg {index_symbol.address} - empilha valor do índice
-    # 3. pushi {symbol.array_start} - empilha início do array
-    # 4. sub                         - converte índice para base 0
-    # 5. padd                        - calcula endereço do elemento
-    # 6. load 0                      - carrega valor da posição calculada
-    
-    p[0] = create_typed_expression(symbol.type, [
-        f"pushg {symbol.address}",
-        f"pushg {index_symbol.address}",
-        f"pushi {symbol.array_start}",
-        "sub",  # índice - array_start (converte para base 0)
-        "padd",
-        "load 0"
-    ])
+    symbol, code = call
+    p[0] = create_typed_expression(symbol.type, code)
 
 """Regras para operadores relacionais: <, >, <=, >=, =, <>"""
 def p_relop(p):
@@ -1586,13 +2906,140 @@ def p_mulop(p):
     p[0] = p[1] # Retorna o próprio operador
 
 """Função de tratamento de erros do parser (PLY)"""
+def recover_from_error(p, index=1):
+    """
+    Chamada nas produções de recuperação (com 'error') para evitar ciclos infinitos.
+    
+    Se a mesma produção de erro é reduzida duas vezes para o mesmo token (ex:
+    END dentro de REPEAT sem UNTIL), o PLY nunca descarta esse token. Neste caso
+    pede-se ao parser que volte a chamar p_error, que o descarta.
+    
+    Args:
+        p: Produção reduzida
+        index (int): Posição do símbolo 'error' na produção
+    """
+    token = p.slice[index].value  # O símbolo 'error' guarda o token que causou o erro
+    if token is parser.error_token:
+        p.parser.errok()
+    parser.error_token = token
+
 def p_error(p):
+    # Chamada pelo PLY em cada erro de sintaxe. Depois de p_error, o parser entra
+    # em modo pânico e retoma nas produções com 'error' (statement, var_decl);
+    # erros nos 3 tokens seguintes não são reportados (evita erros em cascata).
+    if p is not None and p is parser.error_token:
+        # Token em que a recuperação ficou presa (ver recover_from_error):
+        # descarta-o e continua com o seguinte, sem reportar novo erro
+        parser.errok()
+        return parser.token()
     if p:
         # Erro com token específico: mostra token, tipo e linha
-        parser.error = f"Erro de sintaxe no token '{p.value}' (tipo: {p.type}) na linha {p.lineno}"
+        add_diagnostic(Diagnostic('S001', p.lineno, find_column(p.lineno, p.lexpos), value=p.value, type=p.type))
+        message = f"Erro de sintaxe no token '{p.value}' (tipo: {p.type}) na linha {p.lineno}"
     else:
         # Erro no final do arquivo (ex: programa incompleto)
-        parser.error = "Erro de sintaxe no final do arquivo"
+        add_diagnostic(Diagnostic('S002'))
+        message = "Erro de sintaxe no final do arquivo"
+    parser.syntax_errors.append(message)
+    # parser.error acumula todos os erros de sintaxe, um por linha
+    parser.error = "\n".join(parser.syntax_errors)
+    check_error_limit()
 
 # FORÇAR REGENERAÇÃO DAS TABELAS SEM CACHE
-parser = yacc.yacc(debug=False, write_tables=False, errorlog=yacc.NullLogger())
\ No newline at end of file
+parser = yacc.yacc(debug=False, write_tables=False, errorlog=yacc.NullLogger())
+
+
+# ============================================================================
+# ANÁLISE SÓ SINTÁTICA
+# ============================================================================
+
+def skip_action(p):
+    """Ação vazia: a produção é reduzida sem verificar tipos nem gerar código"""
+
+def bind_actions(productions, actions, default=None):
+    """
+    Cópia das produções do parser com outras ações semânticas (o mesmo parser
+    LALR com outro significado para cada regra, como no interpretador pas_interp).
+    
+    Args:
+        productions (list): Produções do parser (parser.productions)
+        actions (dict): Nome da função da regra (ex: 'p_assignment') -> nova ação
+        default (function, optional): Ação das regras que não estão em actions
+            (None = mantém a ação do compilador)
+    
+    As produções de recuperação (com 'error') mantêm sempre a ação, que evita
+    ciclos na recuperação de erros.
+    """
+    result = []
+    for production in productions:
+        if production.callable is not None and 'error' not in production.str.split():
+            action = actions.get(production.func, default)
+            if action is not None:
+                production = copy.copy(production)
+                production.callable = action
+        result.append(production)
+    return result
+
+def syntax_productions(productions):
+    """Cópia das produções do parser com ações vazias (análise só sintática)"""
+    return bind_actions(productions, {}, default=skip_action)
+
+# Produções com as ações do compilador e com ações vazias (trocadas em parse_with)
+compile_productions = parser.productions
+syntax_only_productions = syntax_productions(compile_productions)
+
+def parse_with(productions, code, tracking=False):
+    """Analisa code com outras ações (ver bind_actions); as do compilador são repostas no fim"""
+    parser.productions = productions
+    try:
+        return parser.parse(code, tracking=tracking)
+    finally:
+        parser.productions = compile_productions
+
+def check_syntax(code, max_errors=MAX_ERRORS):
+    """
+    Verifica só a sintaxe de um programa: as mesmas tabelas LALR e a mesma
+    recuperação de erros, mas sem tabela de símbolos, tipos nem geração de código.
+    
+    Args:
+        code (str): Código fonte Pascal
+        max_errors (int): Número de erros que interrompe a análise (None ou 0 = sem limite)
+    
+    Returns:
+        list: Diagnósticos dos erros de sintaxe (vazia se o programa estiver correto)
+    """
+    init(max_errors=max_errors)
+    try:
+        parse_with(syntax_only_productions, code)
+    except TooManyErrors as e:
+        parser.diagnostics.append(Diagnostic('F001', count=e.args[0]))
+    return parser.diagnostics
+
+
+def compile_program(code, **options):
+    """
+    Compila um programa Pascal completo (init + parse), recolhendo os diagnósticos.
+    
+    Ao contrário de chamar parser.parse diretamente, trata a interrupção por
+    excesso de erros (TooManyErrors).
+    
+    Args:
+        code (str): Código fonte Pascal
+        **options: Opções passadas a init (inline_budget, tail_calls, max_errors, source_map,
+            constant_pool, coalesce_writes, read_prompts, specialize_types, index_symbols)
+    
+    Returns:
+        tuple: (código VM ou None se houve erros, lista de Diagnostic)
+    """
+    init(**options)
+    try:
+        # tracking=True dá posições também aos não-terminais (para o mapa de código fonte)
+        result = parser.parse(code, tracking=parser.track_positions)
+    except TooManyErrors as e:
+        result = None
+        parser.diagnostics.append(Diagnostic('F001', count=e.args[0]))
+        messages = parser.syntax_errors + parser.semantic_errors + [str(parser.diagnostics[-1])]
+        parser.error = "\n".join(messages)
+    if parser.error or parser.semantic_errors:
+        result = None
+    return result, parser.diagnostics
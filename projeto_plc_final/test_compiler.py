@@ -1,7 +1,22 @@
 # Importa a função init do módulo entre_parser, que inicializa o parser
-from pas_yacc import init
+from pas_yacc import compile_program, init
 # Importa o módulo os para operações do sistema, como remover arquivos
 import os
+import re
+import sys
+import contextlib
+import io
+import tempfile
+# Ponto de entrada da linha de comandos (modos --tokens e --syntax-only)
+import compilador
+# Motores de execução alternativos, comparados com a VM
+import pas_aot
+import pas_bytecode
+import pas_cost
+import pas_interp
+import pas_snapshot
+# VM local, para os testes que executam os programas compilados
+from pas_vm import VM, LimitExceeded, VMError, parse_program
 
 # Remove arquivos de cache do parser para forçar a regeneração das tabelas
 # Isso garante que mudanças na gramática sejam refletidas imediatamente
@@ -55,6 +70,36 @@ def test_program(name, code):
         # Se não houver código gerado (erro ou programa vazio)
         print("Nenhum código gerado!")
 
+# Verificações que falharam (o script termina com erro se houver alguma)
+failures = []
+
+def check(name, condition, detail=""):
+    """
+    Imprime o resultado de uma verificação e regista-a se falhar.
+    
+    Args:
+        name (str): Descrição da verificação
+        condition (bool): Resultado
+        detail (str): Informação extra mostrada quando a verificação falha
+    """
+    print(f"  {'OK' if condition else 'FALHOU'}: {name}" + (f" ({detail})" if detail and not condition else ""))
+    if not condition:
+        failures.append(name)
+
+def run_program(code, input_lines=None, **options):
+    """Compila um programa Pascal e executa-o na VM local; devolve a VM terminada"""
+    parser = init(**options)
+    result = parser.parse(code)
+    if parser.error or parser.semantic_errors:
+        raise RuntimeError(parser.error or "\n".join(parser.semantic_errors))
+    return VM(parse_program(result), list(input_lines or [])).run()
+
+def test_section(title):
+    """Cabeçalho de um grupo de verificações"""
+    print(f"\n{'='*60}")
+    print(f"Teste: {title}")
+    print(f"{'='*60}")
+
 # Cabeçalho principal dos testes
 print("TESTES DO COMPILADOR PASCAL")
 print("="*60)
@@ -258,9 +303,610 @@ begin
 end.
 """)
 
+# Arrays multidimensionais - layout contíguo row-major
+test_program("Arrays Multidimensionais", """
+program Matriz;
+var
+  m: array[1..3, 1..4] of integer;
+  t: array[0..1] of array[1..2] of real;
+  i, j, soma: integer;
+begin
+  for i := 1 to 3 do
+    for j := 1 to 4 do
+      m[i, j] := i * j;
+  t[1][2] := 1.5;
+  soma := 0;
+  for i := 1 to 3 do
+    soma := soma + m[i][4];
+  writeln('soma = ', soma, ' t = ', t[1, 2]);
+end.
+""")
+
+# Índices com expressões: constantes dobradas no deslocamento
+test_program("Índices com Expressões", """
+program Vizinhos;
+var
+  v: array[1..10] of integer;
+  i: integer;
+begin
+  for i := 1 to 10 do
+    v[i] := i;
+  for i := 1 to 9 do
+    v[i] := v[i + 1] - v[1 + i - 1];
+  writeln(v[10 - 1]);
+end.
+""")
+
+# Erro - Número errado de índices
+test_program("Erro - Número de índices", """
+program ErroIndices;
+var
+  m: array[1..3, 1..3] of integer;
+begin
+  m[1] := 0;  { m tem duas dimensões }
+end.
+""")
+
+# Funções recursivas, procedimentos e parâmetros por referência
+test_program("Subprogramas", """
+program Subprogramas;
+var
+  x, y: integer;
+  m: real;
+
+function fib(n: integer): integer;
+begin
+  if n < 2 then
+    fib := n
+  else
+    fib := fib(n - 1) + fib(n - 2)
+end;
+
+procedure trocar(var a, b: integer);
+var
+  t: integer;
+begin
+  t := a;
+  a := b;
+  b := t
+end;
+
+procedure media(a, b: integer; var r: real);
+begin
+  r := (a + b) / 2
+end;
+
+begin
+  x := fib(10);
+  y := 1;
+  trocar(x, y);
+  media(x, y, m);
+  writeln(x, ' ', y, ' ', m);
+end.
+""")
+
+# Subprogramas folha pequenos são expandidos inline nas chamadas
+test_program("Inlining de Subprogramas Folha", """
+program Inline;
+var
+  i, s: integer;
+
+function quadrado(x: integer): integer;
+begin
+  quadrado := x * x
+end;
+
+procedure acumula(var total: integer; v: integer);
+begin
+  total := total + v
+end;
+
+begin
+  s := 0;
+  for i := 1 to 10 do
+    acumula(s, quadrado(i + 1));
+  writeln(s);
+end.
+""")
+
+# Recursão em cauda: compilada como salto para o início do corpo
+test_program("Recursão em Cauda", """
+program Cauda;
+var
+  r: integer;
+
+function mdc(a, b: integer): integer;
+begin
+  if b = 0 then
+    mdc := a
+  else
+    mdc := mdc(b, a mod b)
+end;
+
+procedure contagem(n: integer);
+begin
+  if n > 0 then
+  begin
+    writeln(n);
+    contagem(n - 1)
+  end
+end;
+
+begin
+  r := mdc(1071, 462);
+  writeln(r);
+  contagem(3);
+end.
+""")
+
+# Erro - Chamadas inválidas
+test_program("Erro - Chamadas inválidas", """
+program ErroChamadas;
+var
+  x: integer;
+
+procedure p(var a: integer);
+begin
+  a := 0
+end;
+
+function f(a: integer): integer;
+begin
+  f := a
+end;
+
+begin
+  p(x + 1);   { argumento var tem de ser uma variável }
+  x := f(1, 2);  { número errado de argumentos }
+  f(x);       { função usada como procedimento }
+end.
+""")
+
+# Identificadores não distinguem maiúsculas de minúsculas
+test_program("Identificadores Case-Insensitive", """
+program Maiusculas;
+var
+  Total, i: integer;
+
+function Dobro(n: integer): integer;
+begin
+  DOBRO := N * 2
+end;
+
+begin
+  total := 0;
+  For I := 1 to 3 do
+    TOTAL := Total + dobro(i);
+  writeln('Total = ', total);
+end.
+""")
+
+# Erro - Vários erros de sintaxe (todos reportados numa só compilação)
+test_program("Erro - Vários erros de sintaxe", """
+program ErrosSintaxe;
+var
+  x, y: integer;
+  z integer;
+begin
+  x := ;
+  y := 2 +* 3;
+  while x < 10 do
+  begin
+    x := x + 1
+    y := y - 1
+  end;
+  repeat x := x - 1 until ;
+  writeln(x, y)
+end.
+""")
+
+# Escrita com vários argumentos (constantes, strings e booleanos juntados)
+test_program("Escrita Juntada", """
+program Escrita;
+var n: integer;
+    nome: string;
+    ok: boolean;
+begin
+  n := 7;
+  nome := 'Ana';
+  ok := n > 5;
+  writeln('Nome: ', nome, ', idade ', 30, ', maior: ', ok, '.');
+  write('n = ', n);
+  writeln(' (', true, ')');
+  writeln
+end.
+""")
+
+# Leitura de vários números numa linha e de um array inteiro
+test_program("Leitura de Vários Valores", """
+program LeituraLinha;
+var a, b: integer;
+    media: real;
+    notas: array[1..5] of integer;
+    i, soma: integer;
+begin
+  readln(a, b, media);
+  readln(notas);
+  soma := 0;
+  for i := 1 to 5 do
+    soma := soma + notas[i];
+  writeln(a + b, ' ', media, ' ', soma);
+end.
+""")
+
+# Literais inteiros em expressões reais e constantes calculadas em compilação
+test_program("Especialização de Tipos", """
+program Tipos;
+var i: integer;
+    x, media: real;
+begin
+  i := 7;
+  x := 3;
+  media := (x + i * 2 + 1) / 2;
+  if media > 10 then
+    writeln('Media alta: ', media)
+  else
+    writeln('Media: ', media, ' de ', 60 * 60 * 24, ' segundos e ', 1 / 4);
+end.
+""")
+
+
+# Recursão em cauda: o label do corpo não pode coincidir com o de outro subprograma (f e fbody)
+test_section("Recursão em Cauda - Colisão de Labels")
+COLLISION_SOURCE = """
+program Colisao;
+function f(n: integer): integer;
+begin
+  if n = 0 then f := 7 else f := f(n - 1)
+end;
+function fbody(n: integer): integer;
+begin
+  fbody := n + 7
+end;
+begin
+  writeln(f(3), ' ', fbody(2));
+end.
+"""
+for options in ({}, {'inline_budget': 0}):
+    try:
+        output = run_program(COLLISION_SOURCE, **options).output()
+    except VMError as e:
+        output = f"VMError: {e}"
+    check(f"f(3) e fbody(2) com {options or 'opções por omissão'}", output == "7 9\n", repr(output))
+try:
+    parse_program("start\nl:\njump l\nl:\nstop")
+    check("label duplicado rejeitado pela VM", False, "sem VMError")
+except VMError as e:
+    check("label duplicado rejeitado pela VM", "duplicado" in str(e), str(e))
+
+# Modos só léxico (--tokens) e só sintático (--syntax-only) do compilador
+test_section("Modos --tokens e --syntax-only")
+
+def run_compiler(args, code):
+    """Executa compilador.main sobre um ficheiro temporário: (código de saída, stdout, stderr)"""
+    with tempfile.NamedTemporaryFile('w', suffix='.pas', delete=False, encoding='utf-8') as f:
+        f.write(code)
+    out, err = io.StringIO(), io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = compilador.main(args + [f.name])
+    finally:
+        os.remove(f.name)
+    return status, out.getvalue(), err.getvalue()
+
+status, out, _ = run_compiler(['--tokens'], "program T;\nbegin\n  writeln('ola', 1 + 2.5)\nend.\n")
+expected = ['["PROGRAM","program",1,1]', '["ID","T",1,9]', '[";",";",1,10]', '["BEGIN","begin",2,1]',
+            '["WRITELN","writeln",3,3]', '["(","(",3,10]', '["STRING","ola",3,11]', '[",",",",3,16]',
+            '["NUM",1,3,18]', '["+","+",3,20]', '["NUM",2.5,3,22]', '[")",")",3,25]',
+            '["END","end",4,1]', '[".",".",4,4]']
+check("--tokens: um token JSON por linha (tipo, valor, linha, coluna)",
+      status == 0 and out.splitlines() == expected, out)
+status, out, err = run_compiler(['--syntax-only'], "program T;\nbegin\n  y := 1\nend.\n")
+check("--syntax-only: erros semânticos (y não declarado) não são reportados",
+      status == 0 and out == err == "", err)
+status, out, err = run_compiler(['--syntax-only'], "program T;\nvar x integer;\nbegin\n  x := ;\nend.\n")
+check("--syntax-only: todos os erros de sintaxe, com código de saída 1",
+      status == 1 and err.splitlines() == ["Linha 2: Erro: Token inesperado 'integer' (tipo: INTEGER)",
+                                            "Linha 4: Erro: Token inesperado ';' (tipo: ;)"], err)
+
+# Interpretador de referência (pas_interp): a mesma saída que a VM nos programas de exemplo
+test_section("Interpretador de Referência = VM")
+
+def example_programs():
+    """Programas de examples.pas: lista de (nome, código)"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples.pas'), encoding='utf-8') as f:
+        text = f.read()
+    return [(re.match(r'program\s+(\w+)', code, re.IGNORECASE).group(1), code)
+            for code in re.findall(r'^program\b.*?^end\.', text, re.MULTILINE | re.DOTALL | re.IGNORECASE)]
+
+EXAMPLE_INPUT = ['7'] * 10   # Números para os READLN dos exemplos
+for name, code in example_programs():
+    expected = run_program(code, EXAMPLE_INPUT).output()
+    output = pas_interp.run_source(code, list(EXAMPLE_INPUT))
+    check(f"{name}: mesma saída que a VM", output == expected, f"{output!r} != {expected!r}")
+
+# Tradução para Python (pas_aot): a mesma saída que a VM
+test_section("Tradução AOT = VM")
+for name, code in example_programs() + [("Colisao", COLLISION_SOURCE)]:
+    expected = run_program(code, EXAMPLE_INPUT).output()
+    output = pas_aot.run_source(code, list(EXAMPLE_INPUT), vectorize=False)
+    check(f"{name}: mesma saída que a VM", output == expected, f"{output!r} != {expected!r}")
+
+# Vetorização (pas_aot + NumPy): os ciclos vetorizados dão a mesma saída
+# que a VM, incluindo inteiros que ultrapassam 64 bits
+VECTOR_SOURCE = """
+program Vetores;
+var a, b, c: array[1..100] of integer;
+    x: array[1..100] of real;
+    i, n, soma: integer;
+    total: real;
+begin
+  n := 100;
+  for i := 1 to n do a[i] := i;
+  for i := 1 to n do b[i] := a[i] * 3 - 7;
+  for i := 1 to n do c[i] := a[i] + b[i];
+  for i := 1 to n do x[i] := c[i] * 0.5;
+  soma := 0;
+  for i := 1 to n do soma := soma + c[i];
+  total := 0.0;
+  for i := 1 to n do total := total + x[i] * x[i];
+  writeln(soma);
+  writeln(total);
+  for i := 1 to n do a[i] := a[i] * 1000000000000000;
+  soma := 0;
+  for i := 1 to n do soma := soma + a[i] * 1000;
+  writeln(soma)
+end.
+"""
+
+test_section("Tradução AOT = VM (com vetorização)")
+for name, code in example_programs():
+    expected = run_program(code, EXAMPLE_INPUT).output()
+    output = pas_aot.run_source(code, list(EXAMPLE_INPUT), vectorize=True)
+    check(f"{name}: mesma saída que a VM", output == expected, f"{output!r} != {expected!r}")
+
+text, _ = compile_program(VECTOR_SOURCE)
+expected = run_program(VECTOR_SOURCE).output()
+vectorized = pas_aot.Program(text, vector_min=1)
+vectorized.run()
+check("Vetores: mesma saída que a VM", vectorized.output() == expected,
+      f"{vectorized.output()!r} != {expected!r}")
+if pas_aot.numpy is not None:
+    check("Vetores: ciclos traduzidos para NumPy", 'vector_map' in vectorized.source
+          and 'vector_reduce' in vectorized.source)
+else:
+    print("  (NumPy não instalado: verificação da vetorização ignorada)")
+
+# Snapshots (pas_snapshot): parar a meio com run(limit), guardar, restaurar
+# (com a mesma entrada desde o início) e continuar dá o mesmo resultado que
+# uma execução sem interrupções
+SNAPSHOT_INPUT_SOURCE = """
+program SomaLinhas;
+var i, x, soma: integer;
+begin
+  soma := 0;
+  for i := 1 to 6 do
+  begin
+    readln(x);
+    soma := soma + x;
+    writeln(i, ': ', soma)
+  end
+end.
+"""
+
+test_section("Snapshot a Meio da Execução")
+snapshot_programs = [(name, code, EXAMPLE_INPUT) for name, code in example_programs()]
+snapshot_programs += [("Colisao", COLLISION_SOURCE, []),
+                      ("SomaLinhas", SNAPSHOT_INPUT_SOURCE, ['1', '2', '4', '8', '16', '32'])]
+for name, code, lines in snapshot_programs:
+    expected = run_program(code, lines)
+    parser = init()
+    vm = VM(parse_program(parser.parse(code)), list(lines))
+    vm.run(expected.steps // 2)
+    if not vm.paused:
+        # run(limit) só para num salto ou chamada: sem eles corre até ao fim
+        print(f"  ({name}: sem saltos nem chamadas, não há onde parar)")
+        continue
+    if code is SNAPSHOT_INPUT_SOURCE:
+        check(f"{name}: parou depois de ler parte da entrada", 0 < vm.lines_read < len(lines), str(vm.lines_read))
+    restored = pas_snapshot.restore(pas_snapshot.snapshot(vm), list(lines)).run()
+    output = vm.output() + restored.output()
+    check(f"{name}: mesma saída depois de restaurar", output == expected.output(),
+          f"{output!r} != {expected.output()!r}")
+    check(f"{name}: mesmo estado final", restored.globals == expected.globals
+          and restored.steps == expected.steps)
+
+# Análise de custo (pas_cost): a fórmula dá o número exato de instruções
+# executadas pela VM num FOR encaixado triangular
+COST_SOURCE = """
+program Triangulo;
+var i, j, n, s: integer;
+begin
+  readln(n);
+  s := 0;
+  for i := 1 to n do
+    for j := i to n do
+      s := s + 1;
+  writeln(s)
+end.
+"""
+
+test_section("Custo Exato de um FOR Encaixado")
+cost = pas_cost.estimate_source(COST_SOURCE).cost
+print(f"  Custo: {cost}")
+for n in (0, 1, 10, 100):
+    steps = run_program(COST_SOURCE, [str(n)]).steps
+    estimate = pas_cost.evaluate(cost, {'n': n})
+    check(f"n={n}: {estimate} instruções", estimate == steps, f"a VM executou {steps}")
+check("valor de referência: 67176 instruções para n=100", pas_cost.evaluate(cost, {'n': 100}) == 67176)
+
+# Limites de execução (pas_vm): cada recurso esgotado interrompe a VM com
+# LimitExceeded a indicar o recurso
+LIMIT_PROGRAMS = [
+    ('max_steps', 'instruções', """
+program Infinito;
+var i: integer;
+begin
+  i := 0;
+  while true do i := i + 1
+end.
+"""),
+    ('max_output', 'saída', """
+program Inundacao;
+begin
+  while true do writeln('linha')
+end.
+"""),
+    ('max_heap', 'heap', """
+program Grande;
+var a: array[1..1000] of integer;
+begin
+  a[1] := 1;
+  writeln(a[1])
+end.
+"""),
+    ('max_frames', 'chamadas', """
+program Recursao;
+function f(n: integer): integer;
+begin
+  f := f(n + 1) + 1
+end;
+begin
+  writeln(f(0))
+end.
+"""),
+]
+
+test_section("Limites de Execução")
+for option, resource, code in LIMIT_PROGRAMS:
+    program = parse_program(init().parse(code))
+    try:
+        VM(program, **{option: 100}).run()
+        error = None
+    except LimitExceeded as e:
+        error = e
+    check(f"{option}: LimitExceeded('{resource}')", error is not None and error.resource == resource
+          and error.limit == 100, repr(error))
+
+# Inline de um subprograma que passa um parâmetro seu por referência: o
+# endereço (PUSHFP) não pode ser copiado para o frame de quem chama
+VAR_FORWARD_SOURCE = """
+program VarInline;
+var g: integer;
+procedure setv(var a: integer);
+begin
+  a := 5
+end;
+procedure q(x: integer; var r: integer);
+begin
+  setv(x);
+  r := x
+end;
+begin
+  q(1, g);
+  writeln(g)
+end.
+"""
+
+test_section("Inline - Parâmetro Passado por Referência")
+for label, options in [("com inline", {}), ("sem inline", {'inline_budget': 0})]:
+    try:
+        output = run_program(VAR_FORWARD_SOURCE, **options).output()
+    except VMError as e:
+        output = f"VMError: {e}"
+    check(f"{label}: escreve 5", output == "5\n", repr(output))
+try:
+    output = pas_aot.run_source(VAR_FORWARD_SOURCE)
+except (VMError, pas_aot.TranslationError) as e:
+    output = f"{type(e).__name__}: {e}"
+check("tradução AOT: escreve 5", output == "5\n", repr(output))
+
+# Parâmetro por valor com argumento constante cujo endereço é passado por
+# referência: não pode ser substituído pela constante
+ADDRESS_TAKEN_SOURCE = """
+program Endereco;
+var g, h: integer;
+procedure incv(var a: integer);
+begin
+  a := a + 10
+end;
+procedure q(x: integer; var r: integer);
+begin
+  incv(x);
+  incv(x);
+  r := x * 2
+end;
+function f(x: integer): integer;
+var t: integer;
+begin
+  t := x;
+  incv(t);
+  f := t + x
+end;
+begin
+  q(1, g);
+  h := f(3);
+  writeln(g, ' ', h)
+end.
+"""
+
+test_section("Inline - Endereço de Parâmetro Constante")
+for label, options in [("com inline", {}), ("sem inline", {'inline_budget': 0})]:
+    output = run_program(ADDRESS_TAKEN_SOURCE, **options).output()
+    check(f"{label}: escreve 42 16", output == "42 16\n", repr(output))
+text, _ = compile_program(ADDRESS_TAKEN_SOURCE)
+check("corpos expandidos inline (sem CALL)", "call" not in text.split("stop")[0])
+
+# Bytecode (pas_bytecode): qualquer prefixo de um ficheiro válido é rejeitado
+# com VMError (nunca IndexError ou struct.error)
+test_section("Bytecode Truncado")
+text, _ = compile_program(COLLISION_SOURCE)
+data = pas_bytecode.encode(parse_program(text))
+errors = []
+for size in range(len(data)):
+    try:
+        pas_bytecode.decode(data[:size])
+        errors.append(f"{size}: aceite")
+    except VMError:
+        pass
+    except Exception as e:
+        errors.append(f"{size}: {type(e).__name__}")
+check(f"{len(data)} prefixos rejeitados com VMError", not errors, ", ".join(errors[:5]))
+output = VM(pas_bytecode.decode(data)).run().output()
+check("ficheiro completo: escreve 7 9", output == "7 9\n", repr(output))
+
+# Dobragem de constantes reais: os operandos de PUSHF ficam em notação fixa
+# (o EWVM não aceita expoentes, inf nem nan) e os resultados não finitos
+# ficam para a VM
+REAL_FOLDING_SOURCE = """
+program Reais;
+var x, y, z: real;
+begin
+  x := 1e300 * 1e300;
+  y := 100000000.0 * 100000000.0;
+  z := 0.000001 * 0.000001;
+  writeln(y, ' ', z)
+end.
+"""
 
+test_section("Dobragem de Constantes Reais")
+text, _ = compile_program(REAL_FOLDING_SOURCE)
+operands = [line[6:] for line in text.splitlines() if line.startswith("pushf ")]
+check("operandos de PUSHF sem expoente nem inf/nan",
+      all(re.fullmatch(r"-?\d+\.\d+", operand) for operand in operands), str(operands))
+check("1e16 e 1e-12 calculados em compilação",
+      "pushf 10000000000000000.0" in text and "pushf 0.000000000001" in text)
+check("1e300 * 1e300 calculado pela VM", "fmul" in text)
+output = run_program(REAL_FOLDING_SOURCE).output()
+check("mesma saída sem especialização de tipos",
+      output == run_program(REAL_FOLDING_SOURCE, specialize_types=False).output(), repr(output))
 
 # Nota: O Exemplo 5 do enunciado (conversão binário-decimal) não é testado
-# pois requer funções definidas pelo usuário, que não foram implementadas
-# (funcionalidade opcional no enunciado)
+# pois requer indexação de strings (bin[i]), que não foi implementada
 
+# Resumo das verificações
+print(f"\n{'='*60}")
+if failures:
+    print(f"{len(failures)} verificação(ões) falharam: {', '.join(failures)}")
+    sys.exit(1)
+print("Todas as verificações passaram")